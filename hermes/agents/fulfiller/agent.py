@@ -5,18 +5,22 @@ from typing import Literal
 from langchain_core.runnables import RunnableConfig
 from langsmith import traceable
 
-from .models import FulfillerInput, FulfillerOutput
+from .models import FulfillerInput, FulfillerOutput, OrderLineSelection, OrderSelection
 from hermes.agents.stockkeeper.models import StockkeeperOutput
 from hermes.config import HermesConfig
-from hermes.model.order import Order, OrderLineStatus
+from hermes.data.catalog_index import get_catalog_index
+from hermes.data.inventory import normalize_product_id
+from hermes.data.load_data import load_products_df
+from hermes.data.product_id_matcher import normalize_product_id as canonical_product_id
+from hermes.model.email import ProductMention
+from hermes.model.order import Order, OrderLine, OrderLineStatus
+from hermes.model.product import Product
 from hermes.tools.catalog_tools import (
-    find_alternatives,
+    find_alternatives_for_products,
 )
 from hermes.tools.order_tools import (
-    check_stock,
-    update_stock,
+    reserve_stock,
     StockUpdateStatus,
-    StockStatus,
 )
 from hermes.tools.promotion_tools import apply_promotion
 from hermes.utils.response import create_node_response
@@ -28,6 +32,298 @@ from .prompts import FULFILLER_PROMPT
 from hermes.utils.logger import logger, get_agent_logger
 
 CLARIFICATION_MARKER = "[CLARIFICATION NEEDED:"
+# Metadata catalog_tools attaches to candidates found by their exact product ID
+EXACT_ID_MATCH_METADATA = "Found by exact product ID match"
+
+
+def _exact_candidate(
+    mention: ProductMention, candidates: list[Product]
+) -> Product | None:
+    """The candidate found by an exact match of the product ID in the mention."""
+    if not mention.product_id or mention.quantity is None:
+        return None
+    # "LTH-0976" and "lth 0976" name the same product as "LTH0976"
+    product_id = canonical_product_id(mention.product_id) or normalize_product_id(
+        mention.product_id
+    )
+    for candidate in candidates:
+        exact = EXACT_ID_MATCH_METADATA in (candidate.metadata or "")
+        if exact and normalize_product_id(candidate.product_id) == product_id:
+            return candidate
+    return None
+
+
+def build_exact_order(
+    email_id: str, stockkeeper_output: StockkeeperOutput
+) -> Order | None:
+    """Draft the order without the LLM when every mention names an exact product ID.
+
+    Such an order is fully determined: each mention becomes a line for its exact
+    candidate, with the mentioned quantity and the product's promotion.
+
+    Args:
+        email_id: The email the order comes from.
+        stockkeeper_output: The candidates found for each mention.
+
+    Returns:
+        The drafted order, or None if any mention is ambiguous (unresolved, without a
+        quantity, or only matched by search or a corrected ID).
+    """
+    if (
+        not stockkeeper_output.candidate_products_for_mention
+        or stockkeeper_output.unresolved_mentions
+        or stockkeeper_output.exact_id_misses
+    ):
+        return None
+
+    selections: list[OrderLineSelection] = []
+    for index, (mention, candidates) in enumerate(
+        stockkeeper_output.candidate_products_for_mention
+    ):
+        product = _exact_candidate(mention, candidates)
+        if product is None or mention.quantity is None:
+            return None
+        selections.append(
+            OrderLineSelection(
+                mention_index=index,
+                product_id=product.product_id,
+                quantity=mention.quantity,
+            )
+        )
+
+    return hydrate_order(
+        email_id, OrderSelection(lines=selections), stockkeeper_output
+    )
+
+
+def hydrate_order(
+    email_id: str, selection: OrderSelection, stockkeeper_output: StockkeeperOutput
+) -> Order:
+    """Turn the selected product IDs into full order lines.
+
+    Name, description and price come from the catalog. The promotion is the one
+    joined onto the product in the catalog index, else the selected candidate's.
+    Selections for products that are neither in the catalog nor among the mention's
+    candidates are dropped.
+
+    Args:
+        email_id: The email the order comes from.
+        selection: The product and quantity chosen per mention.
+        stockkeeper_output: The candidates the selection was made from.
+
+    Returns:
+        The drafted order, before stock checks and promotions.
+    """
+    products_df = load_products_df()
+    catalog_index = get_catalog_index(products_df)
+    mentions = stockkeeper_output.candidate_products_for_mention
+
+    lines: list[OrderLine] = []
+    skipped: list[str] = []
+    for line in selection.lines:
+        product_id = normalize_product_id(line.product_id)
+        candidates = (
+            mentions[line.mention_index][1] if line.mention_index < len(mentions) else []
+        )
+        candidate = next(
+            (c for c in candidates if normalize_product_id(c.product_id) == product_id),
+            None,
+        )
+        position = catalog_index.position_of(product_id)
+        if position is not None:
+            row = products_df.iloc[position]
+            name, description, price = (
+                str(row["name"]),
+                str(row["description"]),
+                float(row["price"]),
+            )
+        elif candidate is not None:
+            name, description, price = (
+                candidate.name,
+                candidate.description,
+                candidate.price,
+            )
+        else:
+            skipped.append(line.product_id)
+            continue
+
+        catalog_promotion = (
+            catalog_index.promotion_at(position) if position is not None else None
+        )
+        if catalog_promotion is not None:
+            promotion, promotion_text = catalog_promotion.spec, catalog_promotion.text
+        elif candidate is not None:
+            promotion, promotion_text = candidate.promotion, candidate.promotion_text
+        else:
+            promotion, promotion_text = None, None
+
+        # Only asks the customer to confirm; the line is reserved like any other
+        if line.needs_clarification:
+            description = f"{CLARIFICATION_MARKER} please confirm this is the product you meant] {description}"
+        lines.append(
+            OrderLine(
+                product_id=product_id,
+                name=name,
+                description=description,
+                quantity=line.quantity,
+                base_price=price,
+                unit_price=price,
+                total_price=price * line.quantity,
+                promotion=promotion,
+                promotion_description=promotion_text if promotion is not None else None,
+            )
+        )
+
+    message = selection.message
+    if skipped:
+        note = f"Could not find product(s) {', '.join(skipped)} in the catalog."
+        message = f"{message} {note}" if message else note
+
+    return Order(
+        email_id=email_id,
+        overall_status="created" if lines else "no_valid_products",
+        lines=lines,
+        total_price=sum(line.total_price or 0.0 for line in lines),
+        message=message,
+        stock_updated=False,
+    )
+
+
+async def _select_order_lines(state: FulfillerInput, config: RunnableConfig) -> Order:
+    """Let the LLM pick a candidate per mention, then hydrate the order lines.
+
+    The LLM only returns compact selections (mention index, product ID, quantity and
+    a clarification flag); the rest of each line is filled in from the catalog. A
+    flagged line is still ordered; its description asks the customer to confirm it.
+    """
+    hermes_config = HermesConfig.from_runnable_config(config)
+    llm = get_llm_client(
+        config=hermes_config,
+        schema=OrderSelection,
+        tools=[],
+        model_strength="strong",
+        temperature=0.0,
+    )
+
+    # Extract email analysis - LangGraph guarantees type safety
+    analysis_dict = state.classifier.email_analysis.model_dump()
+
+    stockkeeper_output: StockkeeperOutput = state.stockkeeper
+
+    # Create the chain for order processing
+    chain = FULFILLER_PROMPT | llm
+
+    # Use the retry handler
+    retry_handler = ToolCallRetryHandler(max_retries=2, backoff_factor=0.0)
+
+    # Select the products using the LLM
+    llm_response = await retry_handler.retry_with_tool_calling(
+        chain=chain,
+        input_data={
+            "email_analysis": analysis_dict,
+            "candidate_products_for_mention": [
+                {
+                    "mention_index": index,
+                    "original_mention": mention.model_dump(),
+                    "candidates": [p.model_dump(exclude_none=True) for p in prods],
+                }
+                for index, (mention, prods) in enumerate(
+                    stockkeeper_output.candidate_products_for_mention
+                )
+            ],
+            "unresolved_mentions": [
+                mention.model_dump()
+                for mention in stockkeeper_output.unresolved_mentions
+            ],
+        },
+        retry_prompt_template=DEFAULT_RETRY_TEMPLATE,
+    )
+
+    selection = OrderSelection.model_validate(llm_response)
+
+    return hydrate_order(
+        analysis_dict.get("email_id") or state.email.email_id,
+        selection,
+        stockkeeper_output,
+    )
+
+
+def _fulfil_order(order_response: Order) -> Order:
+    """Reserve stock, look up alternatives and apply promotions for drafted lines."""
+    # Process each order item for stock checking and inventory updates
+    processed_items = []
+    total_amount = 0.0
+
+    # Reserve stock for all lines in one atomic step, so concurrent orders cannot
+    # both claim the last units of a product. Lines the customer is asked to confirm
+    # (CLARIFICATION_MARKER) are reserved too.
+    # Keyed by email and line, so reprocessing an email never decrements twice
+    reservations = reserve_stock(
+        [(item.product_id or "", item.quantity) for item in order_response.lines],
+        idempotency_keys=[
+            f"{order_response.email_id}#{line_number}:{item.product_id}"
+            for line_number, item in enumerate(order_response.lines)
+        ],
+    )
+
+    needs_alternatives = []
+    for item, reservation in zip(order_response.lines, reservations):
+        if reservation.status == StockUpdateStatus.SUCCESS:
+            item.status = OrderLineStatus.CREATED
+            # Set item.stock to the stock *after* this line's quantity is decremented
+            item.stock = reservation.stock
+            order_response.stock_updated = True
+            total_amount += (item.unit_price or item.base_price) * item.quantity
+        elif reservation.status == StockUpdateStatus.INSUFFICIENT_STOCK:
+            item.status = OrderLineStatus.OUT_OF_STOCK
+            # Stock was already insufficient or zero
+            item.stock = reservation.stock
+            if not item.alternatives:
+                needs_alternatives.append(item)
+        else:  # Product not found
+            item.status = OrderLineStatus.OUT_OF_STOCK
+            item.stock = 0  # Product not found, so effectively 0 stock for this item
+            # Ensure alternatives are still sought if appropriate for ProductNotFound
+            if item.product_id:  # Check if product_id was set on the item
+                needs_alternatives.append(item)
+            else:  # No product_id, cannot find alternatives
+                item.alternatives = []
+
+        processed_items.append(item)
+
+    # Alternatives for every out-of-stock line come from one batched lookup
+    if needs_alternatives:
+        alternatives_by_product = find_alternatives_for_products(
+            [item.product_id for item in needs_alternatives], limit=3
+        )
+        for item in needs_alternatives:
+            alternatives_result = alternatives_by_product[item.product_id]
+            if isinstance(alternatives_result, list):
+                item.alternatives = alternatives_result
+
+    # Update the order with processed items
+    order_response.lines = processed_items
+    order_response.total_price = total_amount
+
+    # Promotion specs were joined onto the lines from the catalog when the order was
+    # drafted. Each spec applies to the whole order, so it is only collected once even
+    # if several lines carry it.
+    promotion_specs = []
+    for line in order_response.lines:
+        if line.promotion and line.promotion not in promotion_specs:
+            promotion_specs.append(line.promotion)
+
+    # Apply promotions to the order if any promotion specs were found
+    if promotion_specs:
+        final_order = apply_promotion(
+            order=order_response,
+            promotion_specs=promotion_specs,
+        )
+    else:
+        # No promotions to apply, use the order as-is
+        final_order = order_response
+
+    return final_order
 
 
 @traceable(run_type="chain", name="Order Processing Agent")
@@ -53,201 +349,18 @@ async def run_fulfiller(
     )
 
     try:
-        hermes_config = HermesConfig.from_runnable_config(config)
-        llm = get_llm_client(
-            config=hermes_config,
-            schema=Order,
-            tools=[],
-            model_strength="strong",
-            temperature=0.0,
-        )
-
-        # Extract email analysis - LangGraph guarantees type safety
-        analysis_dict = state.classifier.email_analysis.model_dump()
-
-        # Extract stockkeeper output
-        stockkeeper_output: StockkeeperOutput = state.stockkeeper
-
-        # Create the chain for order processing
-        chain = FULFILLER_PROMPT | llm
-
-        # Use the retry handler
-        retry_handler = ToolCallRetryHandler(max_retries=2, backoff_factor=0.0)
-
-        # Process the order using the LLM
-        llm_response = await retry_handler.retry_with_tool_calling(
-            chain=chain,
-            input_data={
-                "email_analysis": analysis_dict,
-                "candidate_products_for_mention": [
-                    {
-                        "original_mention": mention.model_dump(),
-                        "candidates": [p.model_dump(exclude_none=True) for p in prods],
-                    }
-                    for mention, prods in stockkeeper_output.candidate_products_for_mention
-                ],
-                "unresolved_mentions": [
-                    mention.model_dump()
-                    for mention in stockkeeper_output.unresolved_mentions
-                ],
-            },
-            retry_prompt_template=DEFAULT_RETRY_TEMPLATE,
-        )
-
-        # DISABLED TO TEST IF THE NEW PROMPT SOLVES THIS
-        # # Pre-validation cleanup for OrderLine.promotion issues
-        # if isinstance(llm_response, dict) and "lines" in llm_response:
-        #     for line_idx, line_dict in enumerate(llm_response.get("lines", [])):
-        #         if isinstance(line_dict, dict) and "promotion" in line_dict and line_dict["promotion" ] is not None:
-        #             promo_spec_data = line_dict["promotion"]
-        #             if isinstance(promo_spec_data, dict):
-        #                 conditions_data = promo_spec_data.get("conditions")
-        #                 effects_data = promo_spec_data.get("effects")
-        #
-        #                 # Determine if conditions are effectively empty
-        #                 empty_conditions = False
-        #                 if conditions_data is None: # Explicitly null conditions
-        #                     empty_conditions = True
-        #                 elif isinstance(conditions_data, dict):
-        #                     # Check if all known condition fields are absent or None
-        #                     if not any(conditions_data.get(f) for f in ["min_quantity", "applies_every", "product_combination"]):
-        #                         empty_conditions = True
-        #
-        #                 # Determine if effects are effectively empty
-        #                 empty_effects = False
-        #                 if effects_data is None: # Explicitly null effects
-        #                     empty_effects = True
-        #                 elif isinstance(effects_data, dict):
-        #                     if not any(effects_data.get(f) for f in ["free_items", "free_gift", "apply_discount"]):
-        #                         empty_effects = True
-        #
-        #                 # If an LLM provides a promotion spec, but it's effectively empty (both conditions and effects are empty)
-        #                 # then it likely means no promotion should be applied. This is a safeguard.
-        #                 if (empty_conditions and empty_effects) or \
-        #                    (empty_conditions and not promo_spec_data.get("effects")): # Handles cases where effects might be missing entirely if conditions were empty
-        #                     logger.warning(
-        #                         get_agent_logger(
-        #                             agent_name,
-        #                             f"OrderLine {line_idx} for product '{line_dict.get('product_id', 'unknown')}' had an effectively empty PromotionSpec (empty conditions and effects). Setting promotion to None."
-        #                         )
-        #                     )
-        #                     line_dict["promotion"] = None
-        #                 elif empty_conditions and not empty_effects:
-        #                      logger.warning(
-        #                         get_agent_logger(
-        #                             agent_name,
-        #                             f"OrderLine {line_idx} for product '{line_dict.get('product_id', 'unknown')}' had empty conditions but non-empty effects. This is likely invalid. Setting promotion to None as a safeguard."
-        #                         )
-        #                     )
-        #                      line_dict["promotion"] = None # Invalid state, nullify
-
-        order_response = Order.model_validate(llm_response)
-
-        # Ensure email_id is set
-        if not order_response.email_id:
-            order_response.email_id = analysis_dict.get("email_id", "unknown")
-
-        # Process each order item for stock checking and inventory updates
-        processed_items = []
-        total_amount = 0.0
-        needs_clarification_present = any(
-            CLARIFICATION_MARKER in item.description
-            for item in order_response.lines
-            if item.description
-        )
-
-        for item in order_response.lines:
-            # Skip stock check and updates for items needing clarification
-            if item.description and CLARIFICATION_MARKER in item.description:
-                item.status = (
-                    OrderLineStatus.OUT_OF_STOCK
-                )  # Confirm status as per prompt convention
-                item.alternatives = []  # Ensure no alternatives are added here
-                processed_items.append(item)
-                continue  # Skip to next item, do not add to total_amount or update stock
-
-            # Check stock availability
-            stock_status = check_stock(item.product_id, item.quantity)
-
-            if isinstance(stock_status, StockStatus) and stock_status.is_available:
-                # Update stock levels
-                update_result = update_stock(item.product_id, item.quantity)
-                # item.stock = stock_status.current_stock # Old logic
-
-                if update_result == StockUpdateStatus.SUCCESS:
-                    item.status = OrderLineStatus.CREATED
-                    # Set item.stock to the stock *after* this line's quantity is decremented
-                    item.stock = stock_status.current_stock - item.quantity
-                    order_response.stock_updated = True
-                    total_amount += (item.unit_price or item.base_price) * item.quantity
-                else:
-                    # Update failed (e.g. stock changed between check and update, or product not found by update_stock)
-                    item.status = OrderLineStatus.OUT_OF_STOCK
-                    # Stock remains what it was when checked, as the decrement failed.
-                    item.stock = stock_status.current_stock
-                    # Find alternatives for out-of-stock items
-                    alternatives_result = find_alternatives.invoke(
-                        {
-                            "original_product_id": item.product_id,
-                            "limit": 3,
-                        }
-                    )
-                    if isinstance(alternatives_result, list):
-                        item.alternatives = alternatives_result
-            else:  # Not available from the start
-                item.status = OrderLineStatus.OUT_OF_STOCK
-                if isinstance(stock_status, StockStatus):
-                    item.stock = (
-                        stock_status.current_stock
-                    )  # Stock was already insufficient or zero
-                else:  # ProductNotFound from check_stock
-                    item.stock = (
-                        0  # Product not found, so effectively 0 stock for this item
-                    )
-                    # Ensure alternatives are still sought if appropriate for ProductNotFound
-                    if item.product_id:  # Check if product_id was set on the item
-                        alternatives_result = find_alternatives.invoke(
-                            {
-                                "original_product_id": item.product_id,
-                                "limit": 3,
-                            }
-                        )
-                        if isinstance(alternatives_result, list):
-                            item.alternatives = alternatives_result
-                    else:  # No product_id, cannot find alternatives
-                        item.alternatives = []
-
-            processed_items.append(item)
-
-        # Update the order with processed items
-        order_response.lines = processed_items
-        order_response.total_price = total_amount
-
-        # Determine overall_status based on new logic in prompt
-        # The LLM should set this, but we can have a fallback/adjustment logic if needed.
-        # For now, we trust the LLM to follow prompt guideline 9 for overall_status.
-        # If items needing clarification are the *only* items, LLM should set to "needs_clarification"
-        # If there are resolved_products, their status determines overall_status mainly.
-
-        # Extract promotion specs from the ORDER LINES created by the LLM
-        # The LLM should have been instructed to include promotion details from the selected candidate
-        # in the OrderLine it generated.
-        promotion_specs = []
-        for line in (
-            order_response.lines
-        ):  # Iterate over lines in the order potentially modified by stock checks
-            if line.promotion:  # Assuming OrderLine model has a 'promotion' field of type PromotionSpec | None
-                promotion_specs.append(line.promotion)
-
-        # Apply promotions to the order if any promotion specs were found
-        if promotion_specs:
-            final_order = apply_promotion(
-                order=order_response,
-                promotion_specs=promotion_specs,
+        order_response = build_exact_order(email_id, state.stockkeeper)
+        if order_response is not None:
+            logger.info(
+                get_agent_logger(
+                    agent_name,
+                    f"Every product in email [cyan]{email_id}[/cyan] was named by its exact ID, drafting the order without the LLM",
+                )
             )
         else:
-            # No promotions to apply, use the order as-is
-            final_order = order_response
+            order_response = await _select_order_lines(state, config)
+
+        final_order = _fulfil_order(order_response)
 
         # Create the final FulfillerOutput
         fulfiller_output = FulfillerOutput(
@@ -38,3 +38,31 @@ class FulfillerOutput(BaseModel):
         default_factory=list,
         description="For stockkeeper's unresolved mentions, provides the original mention and a list of potential product candidates found by catalog tools, for composer to use.",
     )
+
+
+class OrderLineSelection(BaseModel):
+    """The product chosen for one mention; everything else is filled in from the catalog."""
+
+    mention_index: int = Field(
+        ge=0,
+        description="Index of the mention in candidate_products_for_mention",
+    )
+    product_id: str = Field(description="product_id of the chosen candidate")
+    quantity: int = Field(ge=1, description="The quantity ordered")
+    needs_clarification: bool = Field(
+        default=False,
+        description="Whether the customer should confirm that this is the product they meant; the line is ordered either way",
+    )
+
+
+class OrderSelection(BaseModel):
+    """Compact order drafted by the LLM: one selection per mention that can be ordered."""
+
+    lines: list[OrderLineSelection] = Field(
+        default_factory=list,
+        description="The selected product for each mention that can be turned into an order line",
+    )
+    message: str | None = Field(
+        default=None,
+        description="Brief note about mentions that could not be turned into order lines",
+    )
@@ -7,50 +7,40 @@ from langchain_core.prompts import PromptTemplate
 markdown = str
 FULFILLER_PROMPT_STR = """
 ### SYSTEM INSTRUCTIONS
-You are an expert order processing AI for "Hermes", a high-end fashion retail store. Your task is to create an accurate Order object based on the customer's email and product candidates provided by the stockkeeper.
+You are an expert order processing AI for "Hermes", a high-end fashion retail store. Your task is to select which catalog product to order for each product the customer mentioned, based on the customer's email and the product candidates provided by the stockkeeper.
 
-**CRITICAL INSTRUCTION: Only use product details (product_id, name, description, price, stock, promotion) EXACTLY as provided in the candidate products. Do NOT invent or hallucinate information. Each product candidate has a `similarity_score` in its metadata (this is an L2 distance, lower is better).**
+**CRITICAL INSTRUCTION: Only select `product_id`s EXACTLY as they appear in the candidate products. Do NOT invent product IDs. Each product candidate has a `similarity_score` in its metadata (this is an L2 distance, lower is better).**
 
 ### INPUT DATA
 1.  **email_analysis**: Contains customer context, original email segments (`email_analysis.email_id`), and overall intent.
 2.  **candidate_products_for_mention**: A list of items. Each item contains:
+    *   `mention_index`: The index of this mention, used to refer to it in your output.
     *   `original_mention`: The customer's original product mention (e.g., what they typed), including desired `quantity`.
-    *   `candidates`: A list of potential catalog products that match this mention. Each candidate product includes `product_id`, `name`, `description`, `price`, `stock`, `promotion` (this might be a PromotionSpec object or null), and `metadata` (which contains `similarity_score: L2_DISTANCE`). An empty list means no candidates passed the initial L2 distance filter (<=1.2) from catalog_tools.
+    *   `candidates`: A list of potential catalog products that match this mention, each with its `product_id`, `name`, `description`, `price`, `stock` and `metadata` (which contains `similarity_score: L2_DISTANCE`). An empty list means no candidates passed the initial L2 distance filter (<=1.2) from catalog_tools.
 3.  **unresolved_mentions**: A list of original product mentions for which the stockkeeper found no candidates at all.
 
 ### TASK
-Your goal is to construct an `Order` object.
 For each item in `candidate_products_for_mention`:
 1.  Review the `original_mention` (especially its `quantity`).
 2.  Examine its `candidates` list. For each candidate, note its details and its `similarity_score` (L2 distance, lower is better).
 3.  **Select the SINGLE BEST candidate product** to fulfill the `original_mention`.
     *   Prioritize the candidate with the **lowest L2 distance (similarity_score)**.
     *   If the best L2 distance is low (e.g., < 0.5), you can confidently select it.
-    *   If the best L2 distance is moderate (e.g., 0.5 to 0.85), select it if it seems plausible given the original mention and context. You are making the best judgment call for order processing here.
-    *   If all candidates for a mention have high L2 distances (e.g., > 0.85), or if the candidates list is empty, or if none seem appropriate, DO NOT create an order line for that `original_mention`.
-4.  For each product you select to be part of the order, create an `OrderLine` using:
-    *   `product_id`: from the selected candidate.
-    *   `name`: from the selected candidate's `name` (use this for the OrderLine `name` field).
-    *   `description`: from the selected candidate's `description` (use this for the OrderLine `description` field).
+    *   If the best L2 distance is moderate (e.g., 0.5 to 0.85), select it if it seems plausible given the original mention and context. You are making the best judgment call for order processing here. If you are not sure it is the product the customer meant, still select it and set `needs_clarification` to true, so the customer is asked to confirm it.
+    *   If all candidates for a mention have high L2 distances (e.g., > 0.85), or if the candidates list is empty, or if none seem appropriate, DO NOT select anything for that mention.
+4.  For each selected product, output one line with only:
+    *   `mention_index`: the `mention_index` of the mention.
+    *   `product_id`: the selected candidate's `product_id`.
     *   `quantity`: from the `original_mention.quantity`.
-    *   `base_price`: from the selected candidate's `price`.
-    *   `unit_price`: initially the same as `base_price`.
-    *   `total_price`: `base_price * quantity`.
-    *   `promotion`: either `null` when there's no promotion, or the `promotion` object (which is a `PromotionSpec` schema) with ALL fields populated. If you cannot populate all fields, return `null`.
-    *   `promotion_description`: either `null` when there's no promotion, or the `promotion_text` from the selected candidate's description.
-
-Mentions in `unresolved_mentions` cannot be processed into order lines.
-
-Your output `Order` object should include:
--   `email_id`: From `email_analysis.email_id`.
--   `lines`: A list of `OrderLine` objects for products you have selected.
--   `overall_status`: Set to "created" if you are able to create at least one order line. Set to "no_valid_products" if no order lines could be created from any mentions. (Stock check and further status updates happen after your step).
--   `total_price`: Sum of `total_price` for all lines created by you.
--   `stock_updated`: Set to `False` initially.
--   `message`: Add a brief note if some mentions could not be turned into order lines due to no suitable candidates (e.g., "Could not identify a suitable product for your mention of 'xyz'.").
-
-DO NOT perform stock checks or apply promotions directly to prices; that happens in a later step based on the `promotion` field you include in the `OrderLine`.
-Focus ONLY on selecting the best product for each mention and constructing the initial Order object with its lines.
+    *   `needs_clarification`: true or false, as described above. It does not stop the line from being ordered.
+
+Mentions in `unresolved_mentions` cannot be selected.
+
+Your output should include:
+-   `lines`: One selection per mention you selected a product for.
+-   `message`: A brief note if some mentions could not be matched to a suitable candidate (e.g., "Could not identify a suitable product for your mention of 'xyz'."), otherwise null.
+
+Do NOT output names, descriptions, prices or promotions: they are filled in from the catalog, and stock checks and promotions happen in a later step.
 
 ### USER REQUEST CONTEXT
 Email Analysis:
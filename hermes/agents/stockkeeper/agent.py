@@ -36,6 +36,18 @@ def extract_l2_distance_from_metadata(metadata_str: str | None) -> float | None:
     return None
 
 
+def extract_id_correction_from_metadata(
+    metadata_str: str | None,
+) -> tuple[str, str] | None:
+    """Extract the (written ID, corrected ID) pair recorded by catalog_tools, if any."""
+    if not metadata_str:
+        return None
+    match = re.search(r"Product ID '([^']+)' corrected to '([^']+)'", metadata_str)
+    if match:
+        return match.group(1), match.group(2)
+    return None
+
+
 def create_stockkeeper_metadata_string(
     total_mentions: int,
     resolution_attempts: int,
@@ -43,6 +55,7 @@ def create_stockkeeper_metadata_string(
     mentions_with_candidates: int,
     mentions_without_candidates: int,
     candidate_log: list,
+    corrected_product_ids: dict[str, str] | None = None,
 ) -> str:
     """Create a natural language metadata string for stockkeeper output."""
     parts = []
@@ -53,6 +66,12 @@ def create_stockkeeper_metadata_string(
     parts.append(
         f"{mentions_without_candidates} mentions had no candidates found (unresolved)"
     )
+    if corrected_product_ids:
+        corrections = ", ".join(
+            f"{written} -> {corrected}"
+            for written, corrected in corrected_product_ids.items()
+        )
+        parts.append(f"Corrected product IDs: {corrections}")
     parts.append(f"Processing took {resolution_time_ms}ms")
 
     # Simplified candidate log part for this metadata string
@@ -96,6 +115,7 @@ async def run_stockkeeper(
         candidate_products_for_mention: list[Tuple[ProductMention, list[Product]]] = []
         unresolved_mentions_list: list[ProductMention] = []
         exact_id_misses_list: list[ProductMention] = []
+        corrected_product_ids: dict[str, str] = {}
 
         # Extract all product mentions from segments
         all_product_mentions = []
@@ -208,6 +228,12 @@ async def run_stockkeeper(
                     ):
                         exact_match_found_for_id_mention = True
 
+                    id_correction = extract_id_correction_from_metadata(
+                        cand_prod.metadata
+                    )
+                    if id_correction:
+                        corrected_product_ids[id_correction[0]] = id_correction[1]
+
                     current_cand_l2 = l2_score  # Use L2 score directly from the tuple
 
                     if best_l2_distance_this_mention is None or (
@@ -282,6 +308,7 @@ async def run_stockkeeper(
             mentions_with_candidates=mentions_with_candidates_count,
             mentions_without_candidates=mentions_without_candidates_count,
             candidate_log=candidate_log_per_mention_for_metadata,
+            corrected_product_ids=corrected_product_ids,
         )
 
         logger.info(
@@ -295,6 +322,7 @@ async def run_stockkeeper(
             candidate_products_for_mention=candidate_products_for_mention,
             unresolved_mentions=unresolved_mentions_list,
             exact_id_misses=exact_id_misses_list,
+            corrected_product_ids=corrected_product_ids,
             metadata=metadata_str,
         )
 
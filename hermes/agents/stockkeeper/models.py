@@ -49,6 +49,11 @@ class StockkeeperOutput(BaseModel):
         description="Product mentions from the input that had a product_id specified, but for which no exact match was found in the catalog, even if semantic alternatives were found.",
     )
 
+    corrected_product_ids: dict[str, str] = Field(
+        default_factory=dict,
+        description="Product IDs as written by the customer that were corrected to a catalog ID (e.g. a transposed digit), mapped to the catalog ID they were corrected to.",
+    )
+
     metadata: str | None = Field(
         default=None,
         description="Metadata about the resolution process in natural language",
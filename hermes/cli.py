@@ -1,10 +1,18 @@
 import argparse
 import asyncio
+import csv
+import json
 import os
 import sys
+from datetime import datetime
 
+from hermes.config import HermesConfig
 from hermes.core import run_email_processing
+from hermes.data import build_index_snapshot, get_inventory_store, load_products_df
 from hermes.utils.logger import logger, get_agent_logger
+from hermes.utils.output_segments import compact_output
+from hermes.utils.result_serializers import export_results
+from hermes.utils.results_store import SQLiteResultsStore, parse_time
 
 
 def create_parser():
@@ -24,10 +32,29 @@ Examples:
   hermes run PRODUCTS_SRC EMAILS_SRC --email-id id1 --email-id id2            # Process multiple specific email IDs
   hermes run PRODUCTS_SRC EMAILS_SRC --stop-on-error                          # Stop processing if an error occurs
 
+  hermes index build PRODUCTS_SRC                                             # Write a memory-mapped index snapshot
+  hermes index build PRODUCTS_SRC --out-dir path/to/index_snapshot
+
+  hermes inventory snapshot path/to/inventory-backup.db                       # Copy the inventory database
+  hermes inventory restore path/to/inventory-backup.db                        # Reset stock to a snapshot
+
+  hermes output compact                                                       # Fold output segments into the CSVs
+  hermes output compact --out-dir path/to/output
+
+  hermes results export --yaml                                                # Readable YAML copies of the results
+  hermes results export --yaml --results-dir output/results --out-dir path/to/yaml
+  hermes results query --out-of-stock --since 24h                             # Emails with out-of-stock lines
+  hermes results query --email-id E019 --state --format json                  # Every run's result for an email
+  hermes results query --sql "SELECT intent, avg(latency_ms) FROM results GROUP BY intent"
+
   A source can be a Google Sheet (format: 'Gsheet_Id#SheetName') or a path to a local CSV.
 
 Environment Variables:
   HERMES_PROCESSING_LIMIT Set to number to limit email processing
+  INDEX_SNAPSHOT_DIR      Memory-map the index snapshot in this directory at startup
+  INVENTORY_DB_PATH       Keep stock in this shared SQLite database
+  RESULTS_FORMAT          Per-email results as yaml (default), json or jsonl.zst
+  RESULTS_DB_PATH         Index the results of all runs in this SQLite database
         """,
     )
 
@@ -51,7 +78,10 @@ Environment Variables:
     )
 
     run_parser.add_argument(
-        "emails_source", type=str, help="Source for the customer emails."
+        "emails_source",
+        type=str,
+        help="Source for the customer emails: a GSheet, a CSV/JSONL/mbox/.eml file, "
+        "a directory or a glob pattern (quote it).",
     )
 
     run_parser.add_argument(
@@ -88,9 +118,351 @@ Environment Variables:
         help="Stop processing immediately if an error occurs with any email.",
     )
 
+    # Create the 'index' command with its 'build' subcommand
+    index_parser = subparsers.add_parser(
+        "index",
+        help="Manage prebuilt vector index snapshots",
+        description="Manage prebuilt vector index snapshots",
+    )
+    index_subparsers = index_parser.add_subparsers(
+        dest="index_command", help="Index commands"
+    )
+    index_build_parser = index_subparsers.add_parser(
+        "build",
+        help="Write a memory-mapped index snapshot of the products catalog",
+        description="""
+    Write a versioned index snapshot (embeddings matrix, product ID order, filter
+    bitmaps and catalog hash) that workers memory-map at startup when
+    INDEX_SNAPSHOT_DIR points to its directory.
+
+    A source can be a Google Sheet (format: 'Gsheet_Id#SheetName') or a path to a local CSV.
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    index_build_parser.add_argument(
+        "products_source", type=str, help="Source for products catalog."
+    )
+    index_build_parser.add_argument(
+        "--out-dir",
+        type=str,
+        default=None,
+        help="Snapshot directory (default: INDEX_SNAPSHOT_DIR or ./index_snapshot)",
+    )
+
+    # Create the 'inventory' command with its 'snapshot' and 'restore' subcommands
+    inventory_parser = subparsers.add_parser(
+        "inventory",
+        help="Back up and restore the inventory database",
+        description="Back up and restore the SQLite inventory database (INVENTORY_DB_PATH)",
+    )
+    inventory_subparsers = inventory_parser.add_subparsers(
+        dest="inventory_command", help="Inventory commands"
+    )
+    for name, help_text in (
+        ("snapshot", "Write a consistent copy of the inventory database to PATH"),
+        ("restore", "Replace the inventory database contents with the snapshot at PATH"),
+    ):
+        inventory_command_parser = inventory_subparsers.add_parser(
+            name, help=help_text, description=help_text
+        )
+        inventory_command_parser.add_argument("path", type=str, help="Snapshot file.")
+        inventory_command_parser.add_argument(
+            "--db",
+            type=str,
+            default=None,
+            help="Inventory database (default: INVENTORY_DB_PATH)",
+        )
+
+    # Create the 'output' command with its 'compact' subcommand
+    output_parser = subparsers.add_parser(
+        "output",
+        help="Manage the output CSV files",
+        description="Manage the output CSV files",
+    )
+    output_subparsers = output_parser.add_subparsers(
+        dest="output_command", help="Output commands"
+    )
+    output_compact_parser = output_subparsers.add_parser(
+        "compact",
+        help="Fold the appended output segments into the canonical CSV files",
+        description="""
+    Runs append their rows as segment files; compaction merges them into the
+    canonical CSV files (the newest rows for an email win) and deletes them.
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    output_compact_parser.add_argument(
+        "--out-dir",
+        type=str,
+        default="./output",
+        help="Output directory (default: ./output)",
+    )
+
+    # Create the 'results' command with its 'export' subcommand
+    results_parser = subparsers.add_parser(
+        "results",
+        help="Work with the per-email workflow results",
+        description="Work with the per-email workflow results",
+    )
+    results_subparsers = results_parser.add_subparsers(
+        dest="results_command", help="Results commands"
+    )
+    results_export_parser = results_subparsers.add_parser(
+        "export",
+        help="Write the workflow results as one readable file per email",
+        description="""
+    Read the workflow results in any format (json, jsonl.zst or yaml) and write the
+    latest result of each email as one file per email.
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    export_format_group = results_export_parser.add_mutually_exclusive_group()
+    export_format_group.add_argument(
+        "--yaml",
+        dest="export_format",
+        action="store_const",
+        const="yaml",
+        default="yaml",
+        help="Write <email_id>.yml files (default)",
+    )
+    export_format_group.add_argument(
+        "--json",
+        dest="export_format",
+        action="store_const",
+        const="json",
+        help="Write <email_id>.json files",
+    )
+    results_export_parser.add_argument(
+        "--results-dir",
+        type=str,
+        default="./output/results",
+        help="Directory with the workflow results (default: ./output/results)",
+    )
+    results_export_parser.add_argument(
+        "--out-dir",
+        type=str,
+        default="./output/results-export",
+        help="Directory to write the exported files to (default: ./output/results-export)",
+    )
+    results_query_parser = results_subparsers.add_parser(
+        "query",
+        help="Query the indexed results of past runs",
+        description="""
+    Query the results database that every run records its results in. Filters are
+    combined; results are listed most recent first.
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    results_query_parser.add_argument(
+        "--db",
+        type=str,
+        default=None,
+        help="Results database (default: RESULTS_DB_PATH or ./output/results.db)",
+    )
+    results_query_parser.add_argument("--email-id", type=str, help="Only this email")
+    run_group = results_query_parser.add_mutually_exclusive_group()
+    run_group.add_argument("--run-id", type=str, help="Only this run")
+    run_group.add_argument(
+        "--last-run", action="store_true", help="Only the most recent run"
+    )
+    results_query_parser.add_argument(
+        "--intent",
+        type=str,
+        help="Only this intent ('order request' or 'product inquiry')",
+    )
+    results_query_parser.add_argument(
+        "--order-status", type=str, help="Only orders with this overall status"
+    )
+    results_query_parser.add_argument(
+        "--out-of-stock",
+        action="store_true",
+        help="Only emails with at least one out-of-stock order line",
+    )
+    results_query_parser.add_argument(
+        "--errors", action="store_true", help="Only emails whose processing failed"
+    )
+    results_query_parser.add_argument(
+        "--since",
+        type=str,
+        help="Only results since a duration ago (30m, 24h, 7d) or an ISO date",
+    )
+    results_query_parser.add_argument(
+        "--until",
+        type=str,
+        help="Only results before a duration ago (30m, 24h, 7d) or an ISO date",
+    )
+    results_query_parser.add_argument(
+        "--min-latency-ms", type=float, help="Only results that took at least this long"
+    )
+    results_query_parser.add_argument(
+        "--limit", type=int, default=None, help="Maximum number of results"
+    )
+    results_query_parser.add_argument(
+        "--state",
+        action="store_true",
+        help="Include the full workflow state of each result",
+    )
+    results_query_parser.add_argument(
+        "--sql",
+        type=str,
+        help="Run a read-only SQL query on the 'results' table instead of the filters",
+    )
+    results_query_parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=["table", "json", "csv"],
+        default="table",
+        help="Output format (default: table)",
+    )
+
     return parser
 
 
+def handle_index_build_command(args):
+    """Handle the 'index build' subcommand."""
+    config = HermesConfig()
+    snapshot_dir = args.out_dir or config.index_snapshot_dir or "./index_snapshot"
+    try:
+        load_products_df(args.products_source)
+        snapshot_path = build_index_snapshot(snapshot_dir, config)
+        logger.info(
+            get_agent_logger(
+                "CLI",
+                f"Index snapshot ready: [cyan underline]{snapshot_path}[/cyan underline]",
+            )
+        )
+    except Exception as e:
+        logger.error(
+            get_agent_logger("CLI", f"Failed to build index snapshot: {e}"),
+            exc_info=True,
+        )
+        sys.exit(1)
+
+
+def handle_inventory_command(args):
+    """Handle the 'inventory snapshot' and 'inventory restore' subcommands."""
+    db_path = args.db or HermesConfig().inventory_db_path
+    if not db_path:
+        logger.error(
+            get_agent_logger(
+                "CLI", "No inventory database: set INVENTORY_DB_PATH or pass --db"
+            )
+        )
+        sys.exit(1)
+    try:
+        store = get_inventory_store(db_path)
+        assert store is not None
+        if args.inventory_command == "snapshot":
+            store.snapshot(args.path)
+            action = "Wrote inventory snapshot"
+        else:
+            store.restore(args.path)
+            action = "Restored inventory from"
+        logger.info(
+            get_agent_logger(
+                "CLI", f"{action} [cyan underline]{args.path}[/cyan underline]"
+            )
+        )
+    except Exception as e:
+        logger.error(
+            get_agent_logger("CLI", f"Inventory {args.inventory_command} failed: {e}"),
+            exc_info=True,
+        )
+        sys.exit(1)
+
+
+def handle_output_compact_command(args):
+    """Handle the 'output compact' subcommand."""
+    try:
+        if compact_output(args.out_dir) is None:
+            logger.warning(
+                get_agent_logger(
+                    "CLI", "Another process is compacting the output; try again later"
+                )
+            )
+            sys.exit(1)
+    except Exception as e:
+        logger.error(
+            get_agent_logger("CLI", f"Failed to compact output: {e}"), exc_info=True
+        )
+        sys.exit(1)
+
+
+def handle_results_export_command(args):
+    """Handle the 'results export' subcommand."""
+    try:
+        export_results(args.results_dir, args.out_dir, args.export_format)
+    except Exception as e:
+        logger.error(
+            get_agent_logger("CLI", f"Failed to export results: {e}"), exc_info=True
+        )
+        sys.exit(1)
+
+
+def _print_rows(columns: list[str], rows: list[list], output_format: str) -> None:
+    if output_format == "json":
+        print(json.dumps([dict(zip(columns, row)) for row in rows], indent=2))
+    elif output_format == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    else:
+        from tabulate import tabulate  # type: ignore
+
+        print(tabulate(rows, headers=columns, tablefmt="simple"))
+
+
+def handle_results_query_command(args):
+    """Handle the 'results query' subcommand."""
+    db_path = args.db or HermesConfig().results_db_path
+    if db_path is None:
+        db_path = "./output/results.db"
+    if not db_path or not os.path.exists(db_path):
+        logger.error(
+            get_agent_logger(
+                "CLI",
+                f"No results database at '{db_path}': set RESULTS_DB_PATH or pass --db",
+            )
+        )
+        sys.exit(1)
+    try:
+        store = SQLiteResultsStore(db_path)
+        if args.sql:
+            columns, rows = store.execute_readonly(args.sql)
+            _print_rows(columns, [list(row) for row in rows], args.output_format)
+            return
+
+        run_id = store.latest_run_id() if args.last_run else args.run_id
+        results = store.query(
+            email_id=args.email_id,
+            run_id=run_id,
+            intent=args.intent,
+            order_status=args.order_status,
+            out_of_stock=args.out_of_stock,
+            errors_only=args.errors,
+            since=parse_time(args.since) if args.since else None,
+            until=parse_time(args.until) if args.until else None,
+            min_latency_ms=args.min_latency_ms,
+            include_state=args.state,
+            limit=args.limit,
+        )
+        for result in results:
+            result["finished_at"] = datetime.fromtimestamp(
+                result["finished_at"]
+            ).isoformat(timespec="seconds")
+            if args.state and args.output_format == "json" and result["state"]:
+                result["state"] = json.loads(result["state"])
+        columns = list(results[0]) if results else []
+        _print_rows(
+            columns, [list(result.values()) for result in results], args.output_format
+        )
+    except Exception as e:
+        logger.error(
+            get_agent_logger("CLI", f"Failed to query results: {e}"), exc_info=True
+        )
+        sys.exit(1)
+
+
 def handle_run_command(args):
     """Handle the 'run' subcommand."""
 
@@ -197,6 +569,19 @@ def main():
     # Handle the specific command
     if args.command == "run":
         handle_run_command(args)
+    elif args.command == "index" and args.index_command == "build":
+        handle_index_build_command(args)
+    elif args.command == "inventory" and args.inventory_command in (
+        "snapshot",
+        "restore",
+    ):
+        handle_inventory_command(args)
+    elif args.command == "output" and args.output_command == "compact":
+        handle_output_compact_command(args)
+    elif args.command == "results" and args.results_command == "export":
+        handle_results_export_command(args)
+    elif args.command == "results" and args.results_command == "query":
+        handle_results_query_command(args)
     else:
         parser.print_help()
         sys.exit(1)
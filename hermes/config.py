@@ -30,6 +30,22 @@ _DEFAULT_CONFIG = {
     "CHROMA_COLLECTION_NAME": "product_catalog",
     "CHROMA_EMBEDDING_MODEL": "text-embedding-3-small",
     "CHROMA_EMBEDDING_DIM": 1536,
+    "EMBEDDING_BATCH_SIZE": 32,
+    "EMBEDDING_NUM_THREADS": 0,
+    "EMBEDDING_USE_ONNX": "false",
+    "EMBEDDING_MICRO_BATCH_WAIT_MS": 2.0,
+    "VECTOR_QUANTIZATION": "none",
+    "VECTOR_TRUNCATE_DIM": 0,
+    "VECTOR_RERANK_FACTOR": 4,
+    "VECTOR_SEARCH_MAX_CONCURRENCY": 4,
+    "CATALOG_RELOAD_CHECK_SECONDS": 2.0,
+    "CATALOG_REMOTE_TTL_SECONDS": 300.0,
+    "CATALOG_CACHE_DIR": "./.hermes_cache/catalog",
+    "GSHEET_CACHE_DIR": "./.hermes_cache/gsheets",
+    "GSHEET_CACHE_TTL_SECONDS": 300.0,
+    "PROMOTIONS_PATH": "./data/promotions.yaml",
+    "RESULTS_FORMAT": "yaml",
+    "EMAIL_PARSE_WORKERS": 0,
     "OPENAI": {
         "STRONG_MODEL": "gpt-4.1",
         "WEAK_MODEL": "gpt-4.1-mini",
@@ -77,6 +93,64 @@ class HermesConfig(BaseModel):
             os.getenv("CHROMA_EMBEDDING_DIM") or _DEFAULT_CONFIG["CHROMA_EMBEDDING_DIM"]
         )
     )
+    # Local embedding backend ("local:<sentence-transformers model>") settings
+    embedding_batch_size: int = Field(
+        default_factory=lambda: int(
+            os.getenv("EMBEDDING_BATCH_SIZE") or _DEFAULT_CONFIG["EMBEDDING_BATCH_SIZE"]
+        )
+    )
+    embedding_num_threads: int = Field(
+        default_factory=lambda: int(
+            os.getenv("EMBEDDING_NUM_THREADS")
+            or _DEFAULT_CONFIG["EMBEDDING_NUM_THREADS"]
+        )
+    )
+    embedding_use_onnx: bool = Field(
+        default_factory=lambda: (
+            os.getenv("EMBEDDING_USE_ONNX") or _DEFAULT_CONFIG["EMBEDDING_USE_ONNX"]
+        ).lower()
+        in ("true", "1", "t", "yes", "y")
+    )
+    embedding_onnx_file_name: str | None = Field(
+        default_factory=lambda: os.getenv("EMBEDDING_ONNX_FILE_NAME") or None,
+        description="ONNX file to load for the local backend, e.g. an int8-quantized export",
+    )
+    embedding_micro_batch_wait_ms: float = Field(
+        default_factory=lambda: float(
+            os.getenv("EMBEDDING_MICRO_BATCH_WAIT_MS")
+            or _DEFAULT_CONFIG["EMBEDDING_MICRO_BATCH_WAIT_MS"]
+        )
+    )
+    # Compact in-memory search index ("int8" and/or truncated Matryoshka dimensions)
+    vector_quantization: Literal["none", "int8"] = Field(
+        default_factory=lambda: cast(
+            Literal["none", "int8"],
+            os.getenv("VECTOR_QUANTIZATION") or _DEFAULT_CONFIG["VECTOR_QUANTIZATION"],
+        )
+    )
+    vector_truncate_dim: int = Field(
+        default_factory=lambda: int(
+            os.getenv("VECTOR_TRUNCATE_DIM") or _DEFAULT_CONFIG["VECTOR_TRUNCATE_DIM"]
+        ),
+        description="Leading embedding dimensions kept in the search index, 0 for all",
+    )
+    vector_rerank_factor: int = Field(
+        default_factory=lambda: int(
+            os.getenv("VECTOR_RERANK_FACTOR") or _DEFAULT_CONFIG["VECTOR_RERANK_FACTOR"]
+        ),
+        description="Candidates re-ranked at full precision per requested result",
+    )
+    vector_search_max_concurrency: int = Field(
+        default_factory=lambda: int(
+            os.getenv("VECTOR_SEARCH_MAX_CONCURRENCY")
+            or _DEFAULT_CONFIG["VECTOR_SEARCH_MAX_CONCURRENCY"]
+        ),
+        description="Worker threads running vector index queries off the event loop",
+    )
+    index_snapshot_dir: str | None = Field(
+        default_factory=lambda: os.getenv("INDEX_SNAPSHOT_DIR") or None,
+        description="Directory of prebuilt index snapshots ('hermes index build') to memory-map at startup",
+    )
     chroma_db_path: str = Field(
         default_factory=lambda: os.getenv("CHROMA_DB_PATH")
         or _DEFAULT_CONFIG["CHROMA_DB_PATH"]
@@ -85,6 +159,69 @@ class HermesConfig(BaseModel):
         default_factory=lambda: os.getenv("CHROMA_COLLECTION_NAME")
         or _DEFAULT_CONFIG["CHROMA_COLLECTION_NAME"]
     )
+    catalog_reload_check_seconds: float = Field(
+        default_factory=lambda: float(
+            os.getenv("CATALOG_RELOAD_CHECK_SECONDS")
+            or _DEFAULT_CONFIG["CATALOG_RELOAD_CHECK_SECONDS"]
+        ),
+        description="Minimum seconds between checks of a local catalog file for changes",
+    )
+    catalog_remote_ttl_seconds: float = Field(
+        default_factory=lambda: float(
+            os.getenv("CATALOG_REMOTE_TTL_SECONDS")
+            or _DEFAULT_CONFIG["CATALOG_REMOTE_TTL_SECONDS"]
+        ),
+        description="Seconds before a Google Sheets catalog is fetched again",
+    )
+    catalog_cache_dir: str | None = Field(
+        default_factory=lambda: os.getenv(
+            "CATALOG_CACHE_DIR", _DEFAULT_CONFIG["CATALOG_CACHE_DIR"]
+        )
+        or None,
+        description="Directory of compiled Parquet catalogs (needs pyarrow); empty disables it",
+    )
+    gsheet_cache_dir: str | None = Field(
+        default_factory=lambda: os.getenv(
+            "GSHEET_CACHE_DIR", _DEFAULT_CONFIG["GSHEET_CACHE_DIR"]
+        )
+        or None,
+        description="Directory of Google Sheets snapshots used between fetches and offline; empty keeps them in memory",
+    )
+    gsheet_cache_ttl_seconds: float = Field(
+        default_factory=lambda: float(
+            os.getenv("GSHEET_CACHE_TTL_SECONDS")
+            or _DEFAULT_CONFIG["GSHEET_CACHE_TTL_SECONDS"]
+        ),
+        description="Seconds a Google Sheets snapshot is used before it is revalidated",
+    )
+    promotions_path: str | None = Field(
+        default_factory=lambda: os.getenv(
+            "PROMOTIONS_PATH", _DEFAULT_CONFIG["PROMOTIONS_PATH"]
+        )
+        or None,
+        description="YAML or JSON file of product promotions joined onto the catalog; empty disables them",
+    )
+    results_format: Literal["json", "jsonl.zst", "yaml"] = Field(
+        default_factory=lambda: cast(
+            Literal["json", "jsonl.zst", "yaml"],
+            os.getenv("RESULTS_FORMAT") or _DEFAULT_CONFIG["RESULTS_FORMAT"],
+        ),
+        description="Format of the per-email workflow results: yaml (default), json or jsonl.zst (needs zstandard)",
+    )
+    results_db_path: str | None = Field(
+        default_factory=lambda: os.getenv("RESULTS_DB_PATH"),
+        description="SQLite database indexing the results of all runs; unset uses <output dir>/results.db, empty disables it",
+    )
+    inventory_db_path: str | None = Field(
+        default_factory=lambda: os.getenv("INVENTORY_DB_PATH") or None,
+        description="SQLite database holding stock levels shared by all workers; unset keeps stock in memory only",
+    )
+    email_parse_workers: int = Field(
+        default_factory=lambda: int(
+            os.getenv("EMAIL_PARSE_WORKERS") or _DEFAULT_CONFIG["EMAIL_PARSE_WORKERS"]
+        ),
+        description="Processes parsing directory, glob, JSONL, mbox and .eml email sources; 0 uses one per CPU",
+    )
     input_spreadsheet_id: str = Field(
         default_factory=lambda: os.getenv("INPUT_SPREADSHEET_ID")
         or _DEFAULT_CONFIG["INPUT_SPREADSHEET_ID"]
@@ -1,18 +1,36 @@
 import os
-from typing import Any
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Sized
 import asyncio
 import nest_asyncio  # type: ignore
 import pandas as pd  # type: ignore
+from langchain_core.callbacks import get_usage_metadata_callback
 
 # Apply nest_asyncio for Jupyter compatibility
 from hermes.utils.output import create_output_csv
-from hermes.utils.output import save_workflow_result_as_yaml
+from hermes.utils.output import save_workflow_result
+from hermes.utils.result_serializers import close_result_serializers
+from hermes.utils.results_store import (
+    SQLiteResultsStore,
+    TokenUsage,
+    get_results_store,
+    new_run_id,
+)
 from hermes.utils.gsheets import create_output_spreadsheet
 
 from hermes.workflow.states import WorkflowInput, WorkflowOutput
 from hermes.workflow.run import run_workflow
 from hermes.config import HermesConfig
-from hermes.data import load_emails_df, load_products_df
+from hermes.data import (
+    EmailStream,
+    is_email_stream_source,
+    load_emails_df,
+    open_email_stream,
+    load_products_df,
+    pin_products_catalog,
+    prefetch_data_sources,
+    search_cache_summary,
+)
 from hermes.model.email import CustomerEmail
 from hermes.utils.logger import logger, get_agent_logger
 
@@ -28,21 +46,57 @@ OUTPUT_DIR = "output"
 RESULTS_DIR = os.path.join(OUTPUT_DIR, "results")
 
 
+async def _iterate_emails(
+    emails: Iterable[dict[str, str]] | AsyncIterable[dict[str, str]],
+) -> AsyncIterator[dict[str, str]]:
+    if isinstance(emails, AsyncIterable):
+        iterator = aiter(emails)
+        try:
+            async for email_data in iterator:
+                yield email_data
+        finally:
+            # Closing this generator does not close the one it is iterating
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+    else:
+        for email_data in emails:
+            yield email_data
+
+
+async def _select_emails(
+    emails: EmailStream, email_ids: list[str] | None
+) -> AsyncIterator[dict[str, str]]:
+    try:
+        async for email_data in emails:
+            if not email_ids or email_data["email_id"] in email_ids:
+                yield email_data
+    finally:
+        emails.close()
+
+
 async def process_emails(
-    emails_to_process: list[dict[str, str]],
+    emails_to_process: Iterable[dict[str, str]] | AsyncIterable[dict[str, str]],
     config_obj: HermesConfig,
     results_dir: str,
     limit_processing: int | None = None,
     stop_on_error: bool = False,
+    results_store: SQLiteResultsStore | None = None,
+    run_id: str | None = None,
 ) -> dict[str, dict[str, Any]]:
     """Process a batch of emails using the Hermes workflow.
 
     Args:
-        emails_to_process: List of email dictionaries with email_id, subject, and message
+        emails_to_process: Email dictionaries with email_id, subject, and message; a
+            list, or an (async) iterable such as an EmailStream that yields emails as
+            they are parsed
         config_obj: HermesConfig object with system configuration
-        results_dir: Directory to save individual YAML results.
+        results_dir: Directory to save the individual workflow results in.
         limit_processing: Optional limit on number of emails to process
         stop_on_error: If True, stop processing on the first error.
+        results_store: Optional store to record each result in as it finishes,
+            with its latency and token usage.
+        run_id: ID the results are recorded under in the results store.
 
     Returns:
         Dictionary mapping email_id to processed results
@@ -50,119 +104,159 @@ async def process_emails(
     """
     results = {}
     processed_count = 0
-    total_emails_to_process_count = len(emails_to_process)
+    run_id = run_id or new_run_id()
+    total_emails_to_process_count = (
+        len(emails_to_process) if isinstance(emails_to_process, Sized) else "?"
+    )
     # limit_processing = 0 if limit_processing is None else limit_processing # Original logic
 
-    for i, email_data in enumerate(emails_to_process):
-        # Corrected logic: if limit_processing is not None and we've reached it, break.
-        if limit_processing is not None and processed_count >= limit_processing:
-            logger.info(
-                get_agent_logger(
-                    "Core",
-                    f"Reached processing limit of [yellow]{limit_processing}[/yellow] emails.",
+    i = -1
+    email_iterator = _iterate_emails(emails_to_process)
+    try:
+        async for email_data in email_iterator:
+            i += 1
+            # Corrected logic: if limit_processing is not None and we've reached it, break.
+            if limit_processing is not None and processed_count >= limit_processing:
+                logger.info(
+                    get_agent_logger(
+                        "Core",
+                        f"Reached processing limit of [yellow]{limit_processing}[/yellow] emails.",
+                    )
                 )
-            )
-            break
+                break
 
-        email_id = str(email_data.get("email_id", f"unknown_email_{i}"))
-        logger.info(
-            f"\n[rule #008080][bold #008080]Processing email {i + 1}/{total_emails_to_process_count}: ID [cyan]{email_id}[/cyan][/bold #008080]"
-        )
+            email_id = str(email_data.get("email_id", f"unknown_email_{i}"))
+            logger.info(
+                f"\n[rule #008080][bold #008080]Processing email {i + 1}/{total_emails_to_process_count}: ID [cyan]{email_id}[/cyan][/bold #008080]"
+            )
 
-        try:
-            # Create ClassifierInput from email_data
-            input_state = WorkflowInput(
-                email=CustomerEmail(
-                    email_id=email_data.get("email_id", f"unknown_email_{i}"),
-                    subject=email_data.get("subject", ""),
-                    message=email_data.get("message", ""),
+            started = time.perf_counter()
+            usage: TokenUsage | None = None
+            try:
+                # Create ClassifierInput from email_data
+                input_state = WorkflowInput(
+                    email=CustomerEmail(
+                        email_id=email_data.get("email_id", f"unknown_email_{i}"),
+                        subject=email_data.get("subject", ""),
+                        message=email_data.get("message", ""),
+                    )
                 )
-            )
 
-            # Execute the LangGraph workflow
-            workflow_state: WorkflowOutput = await run_workflow(
-                input_state=input_state, hermes_config=config_obj
-            )
+                # Execute the LangGraph workflow against one catalog snapshot, even if
+                # the catalog is reloaded while the email is being processed
+                with pin_products_catalog(), get_usage_metadata_callback() as usage_cb:
+                    workflow_state: WorkflowOutput = await run_workflow(
+                        input_state=input_state, hermes_config=config_obj
+                    )
+                latency_ms = (time.perf_counter() - started) * 1000
+                usage = TokenUsage.from_usage_metadata(usage_cb.usage_metadata)
 
-            # Save the workflow result as YAML file
-            await save_workflow_result_as_yaml(email_id, workflow_state, results_dir)
-
-            # Extract results for the assignment output format
-            result: dict[str, Any] = {
-                "email_id": email_id,
-                "workflow_state": workflow_state,
-                "classification": None,
-                "order_status": [],
-                "response": None,
-            }
-
-            # Extract classification from classifier output
-            if workflow_state.classifier and workflow_state.classifier.email_analysis:
-                result["classification"] = (
-                    workflow_state.classifier.email_analysis.primary_intent
+                # Save the workflow result in the configured format (RESULTS_FORMAT)
+                await save_workflow_result(
+                    email_id, workflow_state, results_dir, config_obj.results_format
                 )
-                logger.info(
-                    get_agent_logger(
-                        "Core",
-                        f"  -> Classification: [bold green_yellow]{result['classification']}[/bold green_yellow]",
+                if results_store is not None:
+                    await asyncio.to_thread(
+                        results_store.record,
+                        run_id,
+                        email_id,
+                        workflow_state,
+                        latency_ms=latency_ms,
+                        usage=usage,
                     )
-                )
 
-            # Extract order status from fulfiller output
-            if workflow_state.fulfiller and workflow_state.fulfiller.order_result:
-                order_result = workflow_state.fulfiller.order_result
-                for item in order_result.lines:
-                    order_status = {
-                        "email ID": email_id,
-                        "product ID": item.product_id,
-                        "quantity": item.quantity,
-                        "status": item.status.value if item.status else "unknown",
-                    }
-                    result["order_status"].append(order_status)
-                logger.info(
-                    get_agent_logger(
-                        "Core",
-                        f"  -> Processed [yellow]{len(result['order_status'])}[/yellow] order items",
+                # Extract results for the assignment output format
+                result: dict[str, Any] = {
+                    "email_id": email_id,
+                    "workflow_state": workflow_state,
+                    "classification": None,
+                    "order_status": [],
+                    "response": None,
+                }
+
+                # Extract classification from classifier output
+                if (
+                    workflow_state.classifier
+                    and workflow_state.classifier.email_analysis
+                ):
+                    result["classification"] = (
+                        workflow_state.classifier.email_analysis.primary_intent
+                    )
+                    logger.info(
+                        get_agent_logger(
+                            "Core",
+                            f"  -> Classification: [bold green_yellow]{result['classification']}[/bold green_yellow]",
+                        )
                     )
-                )
 
-            # Extract response from composer output
-            if workflow_state.composer:
-                result["response"] = workflow_state.composer.response_body
-                logger.info(
-                    get_agent_logger(
-                        "Core",
-                        f"  -> Generated response: [yellow]{len(str(result['response']))}[/yellow] characters",
+                # Extract order status from fulfiller output
+                if workflow_state.fulfiller and workflow_state.fulfiller.order_result:
+                    order_result = workflow_state.fulfiller.order_result
+                    for item in order_result.lines:
+                        order_status = {
+                            "email ID": email_id,
+                            "product ID": item.product_id,
+                            "quantity": item.quantity,
+                            "status": item.status.value if item.status else "unknown",
+                        }
+                        result["order_status"].append(order_status)
+                    logger.info(
+                        get_agent_logger(
+                            "Core",
+                            f"  -> Processed [yellow]{len(result['order_status'])}[/yellow] order items",
+                        )
                     )
-                )
 
-            # Store in results dictionary
-            results[email_id] = result
-            processed_count += 1
+                # Extract response from composer output
+                if workflow_state.composer:
+                    result["response"] = workflow_state.composer.response_body
+                    logger.info(
+                        get_agent_logger(
+                            "Core",
+                            f"  -> Generated response: [yellow]{len(str(result['response']))}[/yellow] characters",
+                        )
+                    )
 
-        except Exception as e:
-            logger.error(
-                get_agent_logger("Core", f"Error processing email {email_id}: {e}"),
-                exc_info=True,
-            )
+                # Store in results dictionary
+                results[email_id] = result
+                processed_count += 1
 
-            results[email_id] = {
-                "email_id": email_id,
-                "error": str(e),
-                "classification": None,
-                "order_status": [],
-                "response": None,
-            }
-            if stop_on_error:
+            except Exception as e:
                 logger.error(
-                    get_agent_logger(
-                        "Core",
-                        f"Error processing email {email_id}. Stopping due to --stop-on-error flag.",
-                    ),
+                    get_agent_logger("Core", f"Error processing email {email_id}: {e}"),
                     exc_info=True,
                 )
-                raise  # Re-raise the exception to stop further processing
-            processed_count += 1
+
+                results[email_id] = {
+                    "email_id": email_id,
+                    "error": str(e),
+                    "classification": None,
+                    "order_status": [],
+                    "response": None,
+                }
+                if results_store is not None:
+                    await asyncio.to_thread(
+                        results_store.record,
+                        run_id,
+                        email_id,
+                        latency_ms=(time.perf_counter() - started) * 1000,
+                        usage=usage,
+                        error=str(e),
+                    )
+                if stop_on_error:
+                    logger.error(
+                        get_agent_logger(
+                            "Core",
+                            f"Error processing email {email_id}. Stopping due to --stop-on-error flag.",
+                        ),
+                        exc_info=True,
+                    )
+                    raise  # Re-raise the exception to stop further processing
+                processed_count += 1
+    finally:
+        # Breaking out early (limit_processing, stop_on_error) closes the source, so
+        # an EmailStream stops parsing files nobody will read
+        await email_iterator.aclose()
 
     return results
 
@@ -203,6 +297,11 @@ async def run_email_processing(
 
     # 1. Load app config
     hermes_config = HermesConfig()
+    run_id = new_run_id()
+    results_db_path = hermes_config.results_db_path
+    if results_db_path is None:
+        results_db_path = os.path.join(output_dir, "results.db")
+    results_store = get_results_store(results_db_path)
 
     # Determine the output spreadsheet ID to use for GSheet upload
     # If output_spreadsheet_id is provided, that's where we upload.
@@ -232,6 +331,7 @@ async def run_email_processing(
             f"Output directory for CSVs: [cyan underline]{output_dir}[/cyan underline]",
         )
     )
+    logger.info(get_agent_logger("Core", f"Run ID: [yellow]{run_id}[/yellow]"))
     if gsheet_output_target:
         logger.info(
             get_agent_logger(
@@ -241,6 +341,10 @@ async def run_email_processing(
         )
 
     # 2. Load the emails dataset
+    # Both sheets are fetched concurrently into the snapshot cache; the loads below
+    # then read them from there
+    prefetch_data_sources([(emails_source, "emails"), (products_source, "products")])
+    email_stream: EmailStream | None = None
     try:
         logger.info(
             get_agent_logger(
@@ -248,15 +352,24 @@ async def run_email_processing(
                 f"Attempting to load emails from source: [cyan underline]{emails_source}[/cyan underline]",
             )
         )
-        emails_df = load_emails_df(source=emails_source)
-        logger.info(
-            get_agent_logger(
-                "Core", f"Successfully loaded [yellow]{len(emails_df)}[/yellow] emails."
+        if is_email_stream_source(emails_source):
+            # Directories, globs and JSONL/mbox/.eml files are parsed in worker
+            # processes and processed as they are decoded
+            email_stream = open_email_stream(
+                emails_source, max_workers=hermes_config.email_parse_workers
+            )
+        else:
+            emails_df = load_emails_df(source=emails_source)
+            logger.info(
+                get_agent_logger(
+                    "Core",
+                    f"Successfully loaded [yellow]{len(emails_df)}[/yellow] emails.",
+                )
             )
-        )
 
-        # Filter emails if target_email_ids are provided
-        if target_email_ids:
+        # Filter emails if target_email_ids are provided (streams are filtered as
+        # they are read)
+        if target_email_ids and email_stream is None:
             logger.info(
                 get_agent_logger(
                     "Core",
@@ -309,11 +422,9 @@ async def run_email_processing(
                 f"Attempting to load products from source: [cyan underline]{products_source}[/cyan underline]",
             )
         )
-        # The actual loading will only happen if _products_df is None or source changes
-        # and is handled within load_products_df
+        # Loads (or reuses) the catalog for this source and makes it the active one
+        # that the tools read via load_products_df()
         load_products_df(source=products_source)
-        # No need to assign to a variable here if it's only used by other modules via the global _products_df
-        # However, if HermesConfig needs it, it should be set there.
         logger.info(get_agent_logger("Core", "Products loaded/ensured available."))
     except Exception as e:
         logger.error(
@@ -326,22 +437,32 @@ async def run_email_processing(
         raise ValueError(f"Error loading products from source '{products_source}': {e}")
 
     # 3. Convert emails to dictionary format
-    emails_batch = emails_df.to_dict(orient="records")
-    emails_for_processing = []
-    for email in emails_batch:
-        email_dict = {}
-        for k, v in email.items():
-            if isinstance(k, str):
-                email_dict[k] = str(v) if v is not None else ""
-        emails_for_processing.append(email_dict)
-
-    processing_results = await process_emails(
-        emails_to_process=emails_for_processing,
-        config_obj=hermes_config,
-        results_dir=RESULTS_DIR,
-        limit_processing=processing_limit,
-        stop_on_error=stop_on_error,
-    )
+    emails_for_processing: list[dict[str, str]] | AsyncIterable[dict[str, str]]
+    if email_stream is not None:
+        emails_for_processing = _select_emails(email_stream, target_email_ids)
+    else:
+        emails_batch = emails_df.to_dict(orient="records")
+        emails_for_processing = []
+        for email in emails_batch:
+            email_dict = {}
+            for k, v in email.items():
+                if isinstance(k, str):
+                    email_dict[k] = str(v) if v is not None else ""
+            emails_for_processing.append(email_dict)
+
+    try:
+        processing_results = await process_emails(
+            emails_to_process=emails_for_processing,
+            config_obj=hermes_config,
+            results_dir=RESULTS_DIR,
+            limit_processing=processing_limit,
+            stop_on_error=stop_on_error,
+            results_store=results_store,
+            run_id=run_id,
+        )
+    finally:
+        # Flush pending result writes (and finish compressed result files)
+        await asyncio.to_thread(close_result_serializers)
 
     logger.info(
         get_agent_logger(
@@ -349,6 +470,7 @@ async def run_email_processing(
             f"\nProcessed [yellow]{len(processing_results)}[/yellow] emails successfully.",
         )
     )
+    logger.info(get_agent_logger("Core", f"Search cache: {search_cache_summary()}"))
 
     # 4. Prepare DataFrames for the output
     email_classification_data = []
@@ -411,6 +533,7 @@ async def run_email_processing(
         order_status_df=order_status_df,
         order_response_df=order_response_df,
         inquiry_response_df=inquiry_response_df,
+        run_id=run_id,
     )
     csv_message = f"CSV files saved to: {output_dir}"
 
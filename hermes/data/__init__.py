@@ -2,3 +2,15 @@
 
 from .load_data import *
 from .vector_store import *
+from .catalog_index import *
+from .lexical_index import *
+from .product_id_matcher import *
+from .search_cache import *
+from .embeddings import *
+from .quantized_index import *
+from .index_snapshot import *
+from .catalog_registry import *
+from .email_sources import *
+from .inventory import *
+from .inventory_store import *
+from .promotions import *
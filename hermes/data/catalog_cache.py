@@ -0,0 +1,130 @@
+"""Compiled on-disk cache of normalized product catalogs.
+
+Parsing a large products CSV, inferring its dtypes and normalizing categories dominates
+catalog load time. After the first load of a local file, the normalized catalog is
+written to Parquet with an explicit schema, keyed by the file's content hash; later
+loads of unchanged content read the Parquet file (memory-mapped) instead.
+
+Parquet support needs the optional `pyarrow` package (`pip install hermes[parquet]`).
+Without it catalogs are parsed from CSV every time, with the same typed schema.
+"""
+
+import hashlib
+import importlib.util
+import os
+import tempfile
+from typing import Callable
+
+import pandas as pd  # type: ignore
+
+from hermes.data.catalog_registry import file_sha256
+from hermes.utils.logger import logger, get_agent_logger
+
+
+# Bump when normalization or the schema changes, so older cache files are ignored
+CATALOG_CACHE_FORMAT_VERSION = 1
+
+CATALOG_CACHE_SUFFIX = ".parquet"
+
+
+def parquet_available() -> bool:
+    """Whether pyarrow is installed for reading and writing Parquet."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def apply_product_dtypes(products_df: pd.DataFrame) -> pd.DataFrame:
+    """Give a normalized products DataFrame its compact, explicit schema.
+
+    Low-cardinality text (category, seasons) becomes categorical and stock int32.
+    Prices stay float64: they feed order totals, and float32 would alter cents.
+    """
+    if "product_id" in products_df.columns:
+        products_df["product_id"] = products_df["product_id"].astype(str)
+    for column in ("category", "seasons"):
+        if column in products_df.columns:
+            products_df[column] = products_df[column].astype("category")
+    if "stock" in products_df.columns:
+        products_df["stock"] = (
+            pd.to_numeric(products_df["stock"], errors="coerce")
+            .fillna(0)
+            .astype("int32")
+        )
+    if "price" in products_df.columns:
+        products_df["price"] = pd.to_numeric(
+            products_df["price"], errors="coerce"
+        ).astype("float64")
+    return products_df
+
+
+def catalog_cache_path(cache_dir: str, source_path: str, content_hash: str) -> str:
+    """Cache file for a source file with the given content hash."""
+    return os.path.join(
+        cache_dir,
+        f"{_source_key(source_path)}-v{CATALOG_CACHE_FORMAT_VERSION}-{content_hash[:16]}{CATALOG_CACHE_SUFFIX}",
+    )
+
+
+def _source_key(source_path: str) -> str:
+    return hashlib.sha256(os.path.abspath(source_path).encode()).hexdigest()[:12]
+
+
+def load_cached_catalog(
+    source_path: str, cache_dir: str | None, parse: Callable[[], pd.DataFrame]
+) -> pd.DataFrame:
+    """Load a local catalog through the Parquet cache.
+
+    Args:
+        source_path: The catalog file the cache entry is derived from.
+        cache_dir: Cache directory; None or empty disables the cache.
+        parse: Parses and normalizes the source file on a cache miss.
+
+    Returns:
+        The normalized products DataFrame.
+    """
+    if not cache_dir or not parquet_available():
+        return parse()
+
+    cache_path = catalog_cache_path(cache_dir, source_path, file_sha256(source_path))
+    if os.path.exists(cache_path):
+        try:
+            products_df = pd.read_parquet(cache_path, engine="pyarrow", memory_map=True)
+            # Stock is updated in place as orders are fulfilled, so it must not be a
+            # read-only view of the mapped file
+            if "stock" in products_df.columns:
+                products_df["stock"] = products_df["stock"].to_numpy(copy=True)
+            logger.info(
+                get_agent_logger(
+                    "Data",
+                    f"Loaded [yellow]{len(products_df)}[/yellow] products from catalog cache [cyan underline]{cache_path}[/cyan underline]",
+                )
+            )
+            return products_df
+        except Exception as e:
+            logger.warning(
+                get_agent_logger(
+                    "Data", f"Ignoring unreadable catalog cache {cache_path}: {e}"
+                )
+            )
+
+    products_df = parse()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)
+        os.close(fd)
+        try:
+            products_df.to_parquet(tmp_path, engine="pyarrow", index=False)
+            os.replace(tmp_path, cache_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        # Entries for older contents of the same source are no longer reachable
+        prefix = f"{_source_key(source_path)}-"
+        for entry in os.listdir(cache_dir):
+            entry_path = os.path.join(cache_dir, entry)
+            if entry.startswith(prefix) and entry_path != cache_path:
+                os.remove(entry_path)
+    except Exception as e:
+        logger.warning(
+            get_agent_logger("Data", f"Could not write catalog cache {cache_path}: {e}")
+        )
+    return products_df
@@ -0,0 +1,330 @@
+"""Precomputed lookup tables over the product catalog.
+
+The catalog tools used to re-filter and re-sort the whole products DataFrame on every
+call. The `CatalogIndex` keeps compact per-category arrays of row positions instead,
+ordered the way `find_alternatives` and `find_complementary_products` rank results,
+and keeps them current as stock changes so both tools become simple reads. The
+catalog's promotions are joined onto products when the index is built.
+"""
+
+import bisect
+import itertools
+import threading
+import weakref
+from typing import Mapping
+
+import numpy as np
+import pandas as pd  # type: ignore
+
+from hermes.data.promotions import CatalogPromotion, get_catalog_promotions
+from hermes.utils.logger import logger, get_agent_logger
+
+
+# Categories whose products go well with a product of the key category
+COMPLEMENTARY_CATEGORIES: dict[str, list[str]] = {
+    "Women's Clothing": ["Accessories", "Women's Shoes", "Bags"],
+    "Men's Clothing": ["Men's Accessories", "Men's Shoes", "Bags"],
+    "Women's Shoes": ["Women's Clothing", "Accessories", "Bags"],
+    "Men's Shoes": ["Men's Clothing", "Men's Accessories", "Bags"],
+    "Accessories": ["Women's Clothing", "Men's Clothing", "Bags"],
+    "Bags": ["Women's Clothing", "Men's Clothing", "Accessories"],
+    "Kid's Clothing": ["Accessories", "Bags"],
+    "Loungewear": ["Accessories", "Bags"],
+}
+
+# Indexes by the id of their catalog; an entry is dropped when its catalog is garbage
+# collected, so an email pinned to a reloaded catalog keeps that catalog's index without
+# evicting the current one
+_catalog_indexes: dict[int, "CatalogIndex"] = {}
+_catalog_index_lock = threading.Lock()
+
+# Catalog versions are never reused, so a rebuilt index never matches an old version
+_catalog_versions = itertools.count(1)
+
+
+def price_similarity(price_a: float, price_b: float) -> float:
+    """Similarity of two prices in [0, 1], where 1.0 means identical prices."""
+    highest = max(price_a, price_b)
+    if highest <= 0:
+        return 1.0
+    return 1.0 - abs(price_a - price_b) / highest
+
+
+class CatalogIndex:
+    """Positional index over a products DataFrame with incrementally maintained
+    recommendation tables.
+
+    Positions are row positions (as used by `DataFrame.iloc`). For every category the
+    index keeps the in-stock positions sorted by price, which is all that is needed to
+    rank alternatives by price similarity, and for every category with complements it
+    keeps the in-stock complementary positions sorted by descending stock.
+    """
+
+    def __init__(
+        self,
+        products_df: pd.DataFrame,
+        promotions: Mapping[str, CatalogPromotion] | None = None,
+    ):
+        # Held weakly so that the index of a replaced catalog does not keep it alive
+        self._products_df = weakref.ref(products_df)
+
+        self.product_ids: np.ndarray = (
+            products_df["product_id"].astype(str).str.upper().to_numpy()
+        )
+        self.categories: np.ndarray = (
+            products_df["category"].astype(str).str.strip().to_numpy()
+        )
+        self.prices: np.ndarray = (
+            pd.to_numeric(products_df["price"], errors="coerce")
+            .fillna(0.0)
+            .to_numpy(dtype=np.float64)
+        )
+        self.stock: np.ndarray = (
+            pd.to_numeric(products_df["stock"], errors="coerce")
+            .fillna(0)
+            .to_numpy(dtype=np.int64, copy=True)
+        )
+
+        # First occurrence wins, mirroring `.iloc[0]` on a filtered DataFrame
+        self._position_by_id: dict[str, int] = {}
+        for position, product_id in enumerate(self.product_ids):
+            self._position_by_id.setdefault(product_id, position)
+
+        # The promotions the index was joined with, and their join onto positions
+        self.promotions: Mapping[str, CatalogPromotion] = promotions or {}
+        self._promotion_by_position: dict[int, CatalogPromotion] = {}
+        for product_id, promotion in self.promotions.items():
+            position = self._position_by_id.get(product_id.upper())
+            if position is None:
+                logger.debug(
+                    get_agent_logger(
+                        "Data",
+                        f"Promotion for [yellow]{product_id}[/yellow] ignored: product not in catalog",
+                    )
+                )
+                continue
+            self._promotion_by_position[position] = promotion
+
+        self._lock = threading.RLock()
+        # Changes on every stock update; caches tag their entries with it
+        self.version = next(_catalog_versions)
+        self._in_stock_by_price: dict[str, np.ndarray] = {}
+        self._complements: dict[str, np.ndarray] = {}
+        self._build_tables()
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def _build_tables(self) -> None:
+        in_stock = self.stock > 0
+        positions = np.arange(len(self), dtype=np.int32)
+
+        for category in np.unique(self.categories):
+            members = positions[(self.categories == category) & in_stock]
+            order = np.lexsort((members, self.prices[members]))
+            self._in_stock_by_price[str(category)] = members[order]
+
+        for category, targets in COMPLEMENTARY_CATEGORIES.items():
+            members = positions[np.isin(self.categories, targets) & in_stock]
+            order = np.lexsort((members, -self.stock[members]))
+            self._complements[category] = members[order]
+
+    def _price_key(self, position: int) -> tuple[float, int]:
+        return (float(self.prices[position]), int(position))
+
+    def _stock_key(self, position: int, stock: int) -> tuple[int, int]:
+        return (-int(stock), int(position))
+
+    def position_of(self, product_id: str) -> int | None:
+        """Row position of a product ID (case-insensitive), or None if unknown."""
+        return self._position_by_id.get(product_id.upper())
+
+    def promotion_at(self, position: int) -> CatalogPromotion | None:
+        """The promotion on the product at a row position, if any."""
+        return self._promotion_by_position.get(position)
+
+    def promotion_of(self, product_id: str) -> CatalogPromotion | None:
+        """The promotion on a product (case-insensitive ID), if any."""
+        position = self.position_of(product_id)
+        return None if position is None else self.promotion_at(position)
+
+    def positions_with_min_stock(self, min_stock: int) -> np.ndarray:
+        """Row positions of the products that have at least min_stock units in stock."""
+        with self._lock:
+            return np.flatnonzero(self.stock >= min_stock)
+
+    def alternatives(self, position: int, limit: int) -> list[tuple[int, float]]:
+        """In-stock products of the same category ranked by price similarity.
+
+        Args:
+            position: Row position of the original product.
+            limit: Maximum number of alternatives to return.
+
+        Returns:
+            A list of (position, price_similarity) tuples, most similar first.
+        """
+        original_id = self.product_ids[position]
+        original_price = float(self.prices[position])
+
+        with self._lock:
+            members = self._in_stock_by_price.get(str(self.categories[position]))
+            if members is None or len(members) == 0 or limit <= 0:
+                return []
+
+            # Walk outwards from the original price: similarity decreases
+            # monotonically on both sides, so a two-way merge yields the ranking.
+            right = bisect.bisect_left(
+                members, self._price_key(position), key=self._price_key
+            )
+            left = right - 1
+            results: list[tuple[int, float]] = []
+            while len(results) < limit and (left >= 0 or right < len(members)):
+                left_sim = (
+                    price_similarity(original_price, self.prices[members[left]])
+                    if left >= 0
+                    else -1.0
+                )
+                right_sim = (
+                    price_similarity(original_price, self.prices[members[right]])
+                    if right < len(members)
+                    else -1.0
+                )
+                if left_sim > right_sim or (
+                    left_sim == right_sim and members[left] < members[right]
+                ):
+                    candidate, similarity = int(members[left]), left_sim
+                    left -= 1
+                else:
+                    candidate, similarity = int(members[right]), right_sim
+                    right += 1
+
+                if self.product_ids[candidate] != original_id:
+                    results.append((candidate, similarity))
+
+        return results
+
+    def complements(self, position: int, limit: int) -> list[int] | None:
+        """In-stock complementary products, highest stock first.
+
+        Args:
+            position: Row position of the original product.
+            limit: Maximum number of complementary products to return.
+
+        Returns:
+            A list of row positions, or None if no complementary categories are
+            defined for the product's category.
+        """
+        category = str(self.categories[position])
+        with self._lock:
+            members = self._complements.get(category)
+            if members is None:
+                return None
+            return [int(p) for p in members[: max(limit, 0)]]
+
+    def set_stock(self, product_id: str, new_stock: int) -> None:
+        """Record a stock change and update the recommendation tables in place.
+
+        Args:
+            product_id: The product whose stock changed.
+            new_stock: The product's stock level after the change.
+        """
+        position = self.position_of(product_id)
+        if position is None:
+            return
+
+        with self._lock:
+            old_stock = int(self.stock[position])
+            if old_stock == new_stock:
+                return
+            category = str(self.categories[position])
+
+            # Complement lists are ordered by stock, so any change repositions the
+            # product. Keys are computed before `self.stock` is written, so existing
+            # members (including this product) are still found at their old keys.
+            for source_category, targets in COMPLEMENTARY_CATEGORIES.items():
+                if category not in targets:
+                    continue
+                members = self._complements[source_category]
+                if old_stock > 0:
+                    members = self._remove(members, position, self._current_stock_key)
+                if new_stock > 0:
+                    members = self._insert(
+                        members,
+                        position,
+                        self._current_stock_key,
+                        self._stock_key(position, new_stock),
+                    )
+                self._complements[source_category] = members
+
+            # Alternative lists only change when the in-stock status flips
+            if (old_stock > 0) != (new_stock > 0):
+                members = self._in_stock_by_price.get(
+                    category, np.empty(0, dtype=np.int32)
+                )
+                if new_stock > 0:
+                    members = self._insert(
+                        members, position, self._price_key, self._price_key(position)
+                    )
+                else:
+                    members = self._remove(members, position, self._price_key)
+                self._in_stock_by_price[category] = members
+
+            self.stock[position] = new_stock
+            self.version = next(_catalog_versions)
+
+    @property
+    def products_df(self) -> pd.DataFrame | None:
+        """The indexed catalog, or None once it has been garbage collected."""
+        return self._products_df()
+
+    def _current_stock_key(self, position: int) -> tuple[int, int]:
+        return self._stock_key(position, self.stock[position])
+
+    @staticmethod
+    def _remove(members: np.ndarray, position: int, key_func) -> np.ndarray:
+        index = bisect.bisect_left(members, key_func(position), key=key_func)
+        if index < len(members) and members[index] == position:
+            return np.delete(members, index)
+        return members
+
+    @staticmethod
+    def _insert(
+        members: np.ndarray, position: int, key_func, new_key: tuple
+    ) -> np.ndarray:
+        index = bisect.bisect_left(members, new_key, key=key_func)
+        return np.insert(members, index, np.int32(position))
+
+
+def get_catalog_index(products_df: pd.DataFrame) -> CatalogIndex:
+    """Return the catalog index for the given products DataFrame, building it on first use.
+
+    Every DataFrame object gets its own index, kept for as long as the DataFrame is
+    alive, so a reloaded catalog and an older one still in use do not evict each
+    other's index. Promotions (PROMOTIONS_PATH) are loaded when the index is built, so
+    a changed promotions file takes effect with the next catalog load.
+    """
+    key = id(products_df)
+    catalog_index = _catalog_indexes.get(key)
+    if catalog_index is not None and catalog_index.products_df is products_df:
+        return catalog_index
+
+    with _catalog_index_lock:
+        catalog_index = _catalog_indexes.get(key)
+        if catalog_index is None or catalog_index.products_df is not products_df:
+            catalog_index = CatalogIndex(products_df, get_catalog_promotions())
+            _catalog_indexes[key] = catalog_index
+            weakref.finalize(products_df, _catalog_indexes.pop, key, None)
+            logger.debug(
+                get_agent_logger(
+                    "Data",
+                    f"Built catalog index over [yellow]{len(catalog_index)}[/yellow] products",
+                )
+            )
+        return catalog_index
+
+
+def get_catalog_version(products_df: pd.DataFrame) -> int:
+    """Return a version number that changes whenever the catalog is reloaded or any
+    product's stock is updated.
+    """
+    return get_catalog_index(products_df).version
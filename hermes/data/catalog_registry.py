@@ -0,0 +1,269 @@
+"""Source-aware, hot-reloadable registry of loaded catalogs.
+
+Each source (a local CSV path or a "gsheet_id#sheet" reference) is loaded once and kept
+fresh: local files are reloaded when their modification time and content hash change,
+remote sheets when their TTL expires and their content hash changed. A reload builds the new DataFrame completely and
+then swaps it in, so code holding the previous DataFrame keeps a consistent snapshot,
+and `pin()` lets a unit of work (one email) see the same catalog from start to finish.
+Listeners are told about every swap so dependent indexes and caches can refresh; an
+`on_replace` hook sees the old and new catalog of a source before the swap, so state
+kept on the old one (such as reserved stock) can be carried over.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+import pandas as pd  # type: ignore
+
+from hermes.utils.logger import logger, get_agent_logger
+
+
+# Loads a source; returns the DataFrame, the local file path it came from, if any, and
+# for other sources a content hash that tells an unchanged reload apart (or None)
+CatalogLoader = Callable[[str], tuple[pd.DataFrame, str | None, str | None]]
+CatalogListener = Callable[[str, pd.DataFrame], None]
+CatalogReplaceHook = Callable[[pd.DataFrame, pd.DataFrame], None]
+
+
+def file_fingerprint(path: str) -> tuple[int, int]:
+    """Cheap change indicator for a file: (mtime in ns, size)."""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def file_sha256(path: str) -> str:
+    """Content hash of a file, used to ignore touches that do not change content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class CatalogEntry:
+    """A loaded catalog and what is needed to tell whether it is still current."""
+
+    source: str
+    df: pd.DataFrame
+    file_path: str | None
+    fingerprint: tuple[int, int] | None
+    content_hash: str | None
+    loaded_at: float
+    checked_at: float
+    version: int = 1
+
+
+class CatalogRegistry:
+    """Catalogs keyed by source, reloaded when their source changes."""
+
+    def __init__(
+        self,
+        loader: CatalogLoader,
+        default_source: str,
+        remote_ttl_seconds: float = 300.0,
+        check_interval_seconds: float = 2.0,
+        on_replace: CatalogReplaceHook | None = None,
+    ):
+        """Create the registry.
+
+        Args:
+            loader: Loads a source into a DataFrame.
+            default_source: Source used when none was requested yet.
+            remote_ttl_seconds: Age after which a non-file source is reloaded.
+            check_interval_seconds: Minimum time between freshness checks of a file.
+            on_replace: Called with (previous_df, new_df) before a reloaded catalog
+                replaces the previous catalog of the same source.
+        """
+        self._loader = loader
+        self.default_source = default_source
+        self.remote_ttl_seconds = remote_ttl_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self._on_replace = on_replace
+        self.active_source: str | None = None
+        self._entries: dict[str, CatalogEntry] = {}
+        self._listeners: list[CatalogListener] = []
+        self._lock = threading.RLock()
+        self._pinned: ContextVar[pd.DataFrame | None] = ContextVar(
+            f"pinned_catalog_{id(self)}", default=None
+        )
+
+    def get(self, source: str | None = None) -> pd.DataFrame:
+        """Return the current catalog for a source.
+
+        Without a source, the catalog pinned for the current context is returned, or
+        else the catalog of the most recently requested source. Requesting a source
+        explicitly makes it the active one.
+        """
+        switched = False
+        if source is None:
+            pinned = self._pinned.get()
+            if pinned is not None:
+                return pinned
+            source = self.active_source or self.default_source
+        else:
+            switched = self.active_source not in (None, source)
+            self.active_source = source
+
+        entry = self._entries.get(source)
+        if entry is None or self._is_stale(entry):
+            entry = self._reload(source, entry)
+        elif switched:
+            # Dependents were built for the previously active catalog
+            self._notify(source, entry.df)
+        return entry.df
+
+    def version(self, source: str | None = None) -> int:
+        """How many times the source's catalog has been loaded, 0 if never."""
+        entry = self._entries.get(source or self.active_source or self.default_source)
+        return entry.version if entry is not None else 0
+
+    def content_hash(self, source: str | None = None) -> str | None:
+        """Content hash of the source the catalog was last loaded from, if known."""
+        entry = self._entries.get(source or self.active_source or self.default_source)
+        return entry.content_hash if entry is not None else None
+
+    def add_listener(self, listener: CatalogListener) -> None:
+        """Call listener(source, new_df) whenever a catalog is reloaded."""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def invalidate(self, source: str | None = None) -> None:
+        """Force the source (or every source) to be reloaded on next access."""
+        with self._lock:
+            for entry in self._entries.values():
+                if source is None or entry.source == source:
+                    entry.checked_at = float("-inf")
+                    entry.loaded_at = float("-inf")
+                    entry.fingerprint = None
+                    entry.content_hash = None
+
+    def clear(self) -> None:
+        """Forget all loaded catalogs and the active source."""
+        with self._lock:
+            self._entries.clear()
+            self.active_source = None
+
+    @contextmanager
+    def pin(self, source: str | None = None) -> Iterator[pd.DataFrame]:
+        """Serve one catalog snapshot to the current context until the block exits."""
+        df = self.get(source)
+        token = self._pinned.set(df)
+        try:
+            yield df
+        finally:
+            self._pinned.reset(token)
+
+    def _is_stale(self, entry: CatalogEntry) -> bool:
+        now = time.monotonic()
+        if entry.file_path is None:
+            return now - entry.loaded_at >= self.remote_ttl_seconds
+        if now - entry.checked_at < self.check_interval_seconds:
+            return False
+        entry.checked_at = now
+        try:
+            fingerprint = file_fingerprint(entry.file_path)
+        except OSError:
+            # Keep serving the last good catalog while the file is missing
+            return False
+        if fingerprint == entry.fingerprint:
+            return False
+        if file_sha256(entry.file_path) == entry.content_hash:
+            # Touched but unchanged
+            entry.fingerprint = fingerprint
+            return False
+        return True
+
+    def _reload(self, source: str, previous: CatalogEntry | None) -> CatalogEntry:
+        with self._lock:
+            # Another thread may have reloaded while this one waited for the lock
+            current = self._entries.get(source)
+            if current is not None and current is not previous:
+                return current
+
+            try:
+                # Fingerprint before reading, so a write that lands mid-load is picked
+                # up by the next check instead of being missed
+                file_path = previous.file_path if previous is not None else None
+                fingerprint = file_fingerprint(file_path) if file_path else None
+                content_hash = file_sha256(file_path) if file_path else None
+                df, file_path, remote_hash = self._loader(source)
+                if file_path and fingerprint is None:
+                    fingerprint = file_fingerprint(file_path)
+                    content_hash = file_sha256(file_path)
+                elif not file_path:
+                    content_hash = remote_hash
+            except Exception as e:
+                if previous is None:
+                    raise
+                logger.warning(
+                    get_agent_logger(
+                        "Data",
+                        f"Reloading catalog '[cyan underline]{source}[/cyan underline]' failed, keeping the loaded version: {e}",
+                    )
+                )
+                previous.loaded_at = previous.checked_at = time.monotonic()
+                return previous
+
+            now = time.monotonic()
+            if (
+                previous is not None
+                and not file_path
+                and content_hash is not None
+                and content_hash == previous.content_hash
+            ):
+                # Remote content unchanged: keep the loaded catalog and its stock
+                previous.loaded_at = previous.checked_at = now
+                return previous
+
+            entry = CatalogEntry(
+                source=source,
+                df=df,
+                file_path=file_path,
+                fingerprint=fingerprint,
+                content_hash=content_hash,
+                loaded_at=now,
+                checked_at=now,
+                version=previous.version + 1 if previous is not None else 1,
+            )
+            if previous is not None and self._on_replace is not None:
+                try:
+                    self._on_replace(previous.df, df)
+                except Exception as e:
+                    logger.error(
+                        get_agent_logger("Data", f"Catalog replace hook failed: {e}"),
+                        exc_info=True,
+                    )
+            # The very first catalog has no dependents to refresh yet
+            replaces_catalog = previous is not None or bool(self._entries)
+            self._entries[source] = entry
+
+        if previous is not None:
+            logger.info(
+                get_agent_logger(
+                    "Data",
+                    f"Reloaded catalog '[cyan underline]{source}[/cyan underline]' (version [yellow]{entry.version}[/yellow], [yellow]{len(df)}[/yellow] rows)",
+                )
+            )
+        if replaces_catalog:
+            self._notify(source, df)
+        return entry
+
+    def _notify(self, source: str, df: pd.DataFrame) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(source, df)
+            except Exception as e:
+                logger.error(
+                    get_agent_logger("Data", f"Catalog reload listener failed: {e}"),
+                    exc_info=True,
+                )
@@ -0,0 +1,359 @@
+"""Email sources beyond a single CSV or Google Sheet tab.
+
+An emails source may also be a directory, a glob pattern, or a single JSONL, mbox or
+.eml file. Supported files are:
+
+    *.csv            one email per row (email_id, subject, message columns)
+    *.jsonl/*.ndjson one JSON object per line with the same fields
+    *.mbox           a Unix mailbox
+    *.eml            one RFC 822 message per file
+
+Files are parsed in a process pool and the emails are yielded as each group of files
+is decoded, in a stable order, so processing starts before the whole corpus is parsed.
+Only a few groups per worker are queued ahead of the consumer, and closing the stream
+(or stopping an `async for` over it early) cancels them. Emails whose email_id was
+already seen are skipped.
+"""
+
+import asyncio
+import email
+import email.policy
+import glob
+import hashlib
+import itertools
+import json
+import mailbox
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import AsyncIterator, Iterator
+
+import pandas as pd  # type: ignore
+
+from hermes.utils.logger import logger, get_agent_logger
+
+
+EMAIL_FILE_SUFFIXES = (".csv", ".jsonl", ".ndjson", ".mbox", ".eml")
+
+# Suffixes that only the streaming sources understand; a lone CSV file keeps using
+# the regular loader
+_STREAM_ONLY_SUFFIXES = (".jsonl", ".ndjson", ".mbox", ".eml")
+
+# Files are handed to workers in groups of at most this many files or bytes, so many
+# small .eml files do not cost one inter-process round trip each
+_MAX_FILES_PER_TASK = 64
+_MAX_BYTES_PER_TASK = 8 * 1024 * 1024
+# File groups queued per worker ahead of the consumer
+_GROUPS_AHEAD_PER_WORKER = 2
+
+
+@dataclass
+class EmailSourceStats:
+    """Parse throughput of an email source."""
+
+    files: int = 0
+    bytes: int = 0
+    emails: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+
+    @property
+    def emails_per_second(self) -> float:
+        return self.emails / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        megabytes_per_second = (
+            self.bytes / (1024 * 1024) / self.seconds if self.seconds > 0 else 0.0
+        )
+        return (
+            f"{self.emails} emails from {self.files} files in {self.seconds:.2f}s "
+            f"({self.emails_per_second:.0f} emails/s, {megabytes_per_second:.1f} MB/s; "
+            f"{self.duplicates} duplicates, {self.invalid} invalid skipped)"
+        )
+
+
+def is_email_stream_source(source: str) -> bool:
+    """Whether a source is a directory, glob or file that needs a streaming adapter."""
+    if glob.has_magic(source) or os.path.isdir(source):
+        return True
+    return os.path.isfile(source) and source.lower().endswith(_STREAM_ONLY_SUFFIXES)
+
+
+def resolve_email_files(source: str) -> list[str]:
+    """List the supported email files a source refers to, sorted by path."""
+    if os.path.isdir(source):
+        candidates = glob.glob(os.path.join(source, "**", "*"), recursive=True)
+    elif glob.has_magic(source):
+        candidates = glob.glob(source, recursive=True)
+    else:
+        candidates = [source]
+    return sorted(
+        path
+        for path in candidates
+        if os.path.isfile(path) and path.lower().endswith(EMAIL_FILE_SUFFIXES)
+    )
+
+
+def _normalize_record(record: dict, fallback_id: str) -> dict[str, str] | None:
+    """Map a parsed record onto email_id / subject / message, or None if it has no body."""
+    message = record.get("message")
+    if message is None:
+        message = record.get("body")
+    if message is None:
+        return None
+    email_id = record.get("email_id") or record.get("id") or fallback_id
+    subject = record.get("subject")
+    return {
+        "email_id": str(email_id),
+        "subject": "" if subject is None else str(subject),
+        "message": str(message),
+    }
+
+
+def _message_to_record(message: EmailMessage, fallback_id: str) -> dict[str, str] | None:
+    body = message.get_body(preferencelist=("plain", "html"))
+    text = body.get_content() if body is not None else None
+    if text is None:
+        return None
+    message_id = (message.get("Message-ID") or "").strip().strip("<>")
+    return _normalize_record(
+        {
+            "email_id": message_id or fallback_id,
+            "subject": message.get("Subject", ""),
+            "message": text.strip(),
+        },
+        fallback_id,
+    )
+
+
+def _content_id(path: str, position: int) -> str:
+    return hashlib.sha1(f"{os.path.abspath(path)}:{position}".encode()).hexdigest()[:16]
+
+
+def parse_email_file(path: str) -> tuple[list[dict[str, str]], int]:
+    """Parse one email file.
+
+    Emails without an email_id (or Message-ID) get a stable ID derived from their
+    file and position.
+
+    Returns:
+        The parsed emails and the number of records skipped because they had no body.
+
+    Raises:
+        ValueError: If the file type is not supported.
+        Exception: Whatever reading or decoding the file raises, e.g. on invalid UTF-8
+            or a malformed CSV.
+    """
+    lower = path.lower()
+    records: list[dict[str, str] | None] = []
+    if lower.endswith(".csv"):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        records = [
+            _normalize_record(row, _content_id(path, i))
+            for i, row in enumerate(df.to_dict(orient="records"))
+        ]
+    elif lower.endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    records.append(None)
+                    continue
+                records.append(
+                    _normalize_record(record, _content_id(path, i))
+                    if isinstance(record, dict)
+                    else None
+                )
+    elif lower.endswith(".mbox"):
+        box = mailbox.mbox(
+            path,
+            factory=lambda f: email.message_from_binary_file(
+                f, policy=email.policy.default
+            ),
+            create=False,
+        )
+        try:
+            records = [
+                _message_to_record(message, _content_id(path, i))
+                for i, message in enumerate(box)
+            ]
+        finally:
+            box.close()
+    elif lower.endswith(".eml"):
+        with open(path, "rb") as f:
+            message = email.message_from_binary_file(f, policy=email.policy.default)
+        records = [_message_to_record(message, _content_id(path, 0))]
+    else:
+        raise ValueError(f"Unsupported email file: {path}")
+
+    parsed = [record for record in records if record is not None]
+    return parsed, len(records) - len(parsed)
+
+
+def _parse_email_files(paths: list[str]) -> tuple[list[dict[str, str]], int]:
+    emails: list[dict[str, str]] = []
+    invalid = 0
+    for path in paths:
+        try:
+            parsed, skipped = parse_email_file(path)
+        except Exception as e:
+            # One unreadable file is skipped rather than stopping the whole stream
+            logger.warning(
+                get_agent_logger(
+                    "Data",
+                    f"Skipping unreadable email file [cyan underline]{path}[/cyan underline]: {e}",
+                )
+            )
+            invalid += 1
+            continue
+        emails.extend(parsed)
+        invalid += skipped
+    return emails, invalid
+
+
+def _group_files(paths: list[str]) -> list[list[str]]:
+    groups: list[list[str]] = []
+    current: list[str] = []
+    current_bytes = 0
+    for path in paths:
+        size = os.path.getsize(path)
+        if current and (
+            len(current) >= _MAX_FILES_PER_TASK
+            or current_bytes + size > _MAX_BYTES_PER_TASK
+        ):
+            groups.append(current)
+            current, current_bytes = [], 0
+        current.append(path)
+        current_bytes += size
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _parse_ahead(
+    pool: ProcessPoolExecutor, groups: list[list[str]], ahead: int
+) -> Iterator[tuple[list[dict[str, str]], int]]:
+    """Parse file groups in the pool, in order, with at most `ahead` of them queued."""
+    remaining = iter(groups)
+    pending: deque[Future] = deque(
+        pool.submit(_parse_email_files, group)
+        for group in itertools.islice(remaining, ahead)
+    )
+    while pending:
+        result = pending.popleft().result()
+        # Queue the next group before handing this one over, so workers stay busy
+        group = next(remaining, None)
+        if group is not None:
+            pending.append(pool.submit(_parse_email_files, group))
+        yield result
+
+
+class EmailStream:
+    """Emails of a multi-file source, parsed in parallel and yielded as they decode.
+
+    Iterate it synchronously or with `async for`; the async form waits for workers off
+    the event loop and closes the stream when the loop stops early. `stats` is
+    complete once iteration has finished.
+    """
+
+    def __init__(self, source: str, max_workers: int = 0):
+        """Create the stream.
+
+        Args:
+            source: Directory, glob pattern or email file.
+            max_workers: Parser processes; 0 uses one per CPU.
+
+        Raises:
+            ValueError: If the source matches no supported email files.
+        """
+        self.source = source
+        self.paths = resolve_email_files(source)
+        if not self.paths:
+            raise ValueError(f"No email files found for source '{source}'")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.stats = EmailSourceStats()
+        self._iterator: Iterator[dict[str, str]] | None = None
+
+    def __iter__(self) -> Iterator[dict[str, str]]:
+        if self._iterator is None:
+            self._iterator = self._generate()
+        return self._iterator
+
+    async def __aiter__(self) -> AsyncIterator[dict[str, str]]:
+        iterator = iter(self)
+        sentinel = object()
+        try:
+            while True:
+                item = await asyncio.to_thread(next, iterator, sentinel)
+                if item is sentinel:
+                    return
+                yield item  # type: ignore[misc]
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Stop the stream, cancelling the file groups that are still queued."""
+        if self._iterator is None:
+            return
+        try:
+            self._iterator.close()  # type: ignore[attr-defined]
+        except ValueError:
+            # A worker thread is still inside next() (the awaiting task was
+            # cancelled); the pool shuts down once the generator is collected
+            pass
+
+    def _generate(self) -> Iterator[dict[str, str]]:
+        paths = self.paths
+        started = time.perf_counter()
+        self.stats.files = len(paths)
+        self.stats.bytes = sum(os.path.getsize(path) for path in paths)
+        groups = _group_files(paths)
+        workers = min(self.max_workers, len(groups))
+        seen: set[str] = set()
+        try:
+            if workers <= 1:
+                results = map(_parse_email_files, groups)
+                yield from self._deduplicate(results, seen)
+            else:
+                pool = ProcessPoolExecutor(max_workers=workers)
+                try:
+                    yield from self._deduplicate(
+                        _parse_ahead(pool, groups, workers * _GROUPS_AHEAD_PER_WORKER),
+                        seen,
+                    )
+                finally:
+                    # Nothing is left to wait for unless the stream was closed early
+                    pool.shutdown(wait=False, cancel_futures=True)
+        finally:
+            self.stats.seconds = time.perf_counter() - started
+            logger.info(
+                get_agent_logger(
+                    "Data",
+                    f"Parsed emails from [cyan underline]{self.source}[/cyan underline]: {self.stats.summary()}",
+                )
+            )
+
+    def _deduplicate(
+        self, results: Iterator[tuple[list[dict[str, str]], int]], seen: set[str]
+    ) -> Iterator[dict[str, str]]:
+        for emails, invalid in results:
+            self.stats.invalid += invalid
+            for record in emails:
+                if record["email_id"] in seen:
+                    self.stats.duplicates += 1
+                    continue
+                seen.add(record["email_id"])
+                self.stats.emails += 1
+                yield record
+
+
+def open_email_stream(source: str, max_workers: int = 0) -> EmailStream:
+    """Stream the emails of a directory, glob or JSONL/mbox/.eml file."""
+    return EmailStream(source, max_workers=max_workers)
@@ -0,0 +1,217 @@
+"""Embedding backends for the product vector store.
+
+`HermesConfig.embedding_model_name` selects the backend: names starting with "local:"
+(e.g. "local:sentence-transformers/all-MiniLM-L6-v2") run a sentence-transformers model
+on the CPU, anything else is an OpenAI embedding model. The local backend encodes
+documents in batches and coalesces concurrent queries into micro-batches, so resolution
+latency depends on local compute rather than a provider's queue.
+"""
+
+import asyncio
+import queue
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from hermes.config import HermesConfig
+from hermes.utils.logger import logger, get_agent_logger
+
+
+LOCAL_EMBEDDING_PREFIX = "local:"
+
+EncodeFn = Callable[[list[str]], list[list[float]]]
+
+
+def is_local_embedding_model(model_name: str) -> bool:
+    """Whether the model name selects the local sentence-transformers backend."""
+    return model_name.startswith(LOCAL_EMBEDDING_PREFIX)
+
+
+def embedding_collection_name(config: HermesConfig) -> str:
+    """Chroma collection name for the configured embedding model.
+
+    Local models produce vectors of a different size than the OpenAI model, so they
+    get their own collection instead of clashing with an existing persisted one.
+    """
+    if not is_local_embedding_model(config.embedding_model_name):
+        return config.chroma_collection_name
+    model = config.embedding_model_name[len(LOCAL_EMBEDDING_PREFIX) :]
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", model).strip("_").lower()
+    return f"{config.chroma_collection_name}_{slug}"[:63]
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-text encode requests into batched calls.
+
+    Requests that arrive within `max_wait_ms` of the first pending one (up to
+    `max_batch_size`) are encoded together by a background worker thread.
+    """
+
+    def __init__(
+        self, encode: EncodeFn, max_batch_size: int = 32, max_wait_ms: float = 2.0
+    ):
+        self._encode = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max(0.0, max_wait_ms) / 1000.0
+        self.batches_encoded = 0
+        self._requests: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, text: str) -> "Future[list[float]]":
+        """Queue a text for encoding and return a future for its vector."""
+        future: Future = Future()
+        self._ensure_worker()
+        self._requests.put((text, future))
+        return future
+
+    def encode(self, text: str) -> list[float]:
+        """Encode a single text, sharing a batch with concurrent callers."""
+        return self.submit(text).result()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="hermes-embedding-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._requests.get()]
+            try:
+                while len(batch) < self.max_batch_size:
+                    batch.append(self._requests.get(timeout=self.max_wait_seconds))
+            except queue.Empty:
+                pass
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self._encode(texts)
+                self.batches_encoded += 1
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
+class LocalEmbeddings(Embeddings):
+    """CPU sentence-transformers embeddings with batched and micro-batched inference."""
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 32,
+        num_threads: int = 0,
+        use_onnx: bool = False,
+        onnx_file_name: str | None = None,
+        micro_batch_wait_ms: float = 2.0,
+        encode: EncodeFn | None = None,
+    ):
+        """Create the backend; the model is loaded on first use.
+
+        Args:
+            model_name: sentence-transformers model name or path.
+            batch_size: Batch size for document encoding and query micro-batches.
+            num_threads: CPU threads for inference, 0 to keep the library default.
+            use_onnx: Run the model with the ONNX Runtime backend.
+            onnx_file_name: Specific ONNX file to load, e.g. an int8-quantized export
+                such as "onnx/model_qint8_avx512.onnx".
+            micro_batch_wait_ms: How long a query waits for others to share its batch.
+            encode: Encode function to use instead of loading a model.
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.use_onnx = use_onnx
+        self.onnx_file_name = onnx_file_name
+        self._encode_fn = encode
+        self._model: Any = None
+        self._model_lock = threading.Lock()
+        self._batcher = MicroBatcher(
+            self._encode, max_batch_size=batch_size, max_wait_ms=micro_batch_wait_ms
+        )
+
+    def _load_model(self) -> Any:
+        if self._model is not None:
+            return self._model
+        with self._model_lock:
+            if self._model is None:
+                # Imported lazily: torch is heavy and only needed for local embeddings
+                from sentence_transformers import SentenceTransformer  # type: ignore
+
+                if self.num_threads > 0:
+                    import torch  # type: ignore
+
+                    torch.set_num_threads(self.num_threads)
+
+                kwargs: dict[str, Any] = {"device": "cpu"}
+                if self.use_onnx:
+                    kwargs["backend"] = "onnx"
+                    if self.onnx_file_name:
+                        kwargs["model_kwargs"] = {"file_name": self.onnx_file_name}
+                logger.info(
+                    get_agent_logger(
+                        "Data",
+                        f"Loading local embedding model [cyan]{self.model_name}[/cyan]"
+                        f"{' (ONNX)' if self.use_onnx else ''}",
+                    )
+                )
+                self._model = SentenceTransformer(self.model_name, **kwargs)
+        return self._model
+
+    def _encode(self, texts: list[str]) -> list[list[float]]:
+        if self._encode_fn is not None:
+            return self._encode_fn(texts)
+        vectors = self._load_model().encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents directly in batches of `batch_size`."""
+        vectors: list[list[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._encode(texts[start : start + self.batch_size]))
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query, batched together with concurrent queries."""
+        return self._batcher.encode(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Embed a query without blocking the event loop while the batch runs."""
+        return await asyncio.wrap_future(self._batcher.submit(text))
+
+
+def create_embeddings(config: HermesConfig) -> Embeddings:
+    """Create the embedding backend selected by `config.embedding_model_name`."""
+    if is_local_embedding_model(config.embedding_model_name):
+        return LocalEmbeddings(
+            model_name=config.embedding_model_name[len(LOCAL_EMBEDDING_PREFIX) :],
+            batch_size=config.embedding_batch_size,
+            num_threads=config.embedding_num_threads,
+            use_onnx=config.embedding_use_onnx,
+            onnx_file_name=config.embedding_onnx_file_name,
+            micro_batch_wait_ms=config.embedding_micro_batch_wait_ms,
+        )
+
+    return OpenAIEmbeddings(
+        model=config.embedding_model_name,
+        dimensions=config.chroma_embedding_dim,
+        api_key=config.llm_api_key,
+        base_url=config.llm_provider_url if config.llm_provider == "OpenAI" else None,
+    )
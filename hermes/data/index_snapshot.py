@@ -0,0 +1,496 @@
+"""Prebuilt, memory-mapped vector index snapshots.
+
+`hermes index build` writes the product embeddings and everything needed to search them
+into a versioned snapshot directory:
+
+    <snapshot_dir>/CURRENT                      name of the active snapshot
+    <snapshot_dir>/<name>/manifest.json         format version, catalog hashes, shapes
+    <snapshot_dir>/<name>/embeddings.f32        N x D little-endian float32 matrix
+    <snapshot_dir>/<name>/norms.f32             squared L2 norm of each vector
+    <snapshot_dir>/<name>/compact.*             int8 and/or truncated vectors, scales
+                                                and norms for the configured settings
+    <snapshot_dir>/<name>/filters.bits          one packed bitmap per filter value
+    <snapshot_dir>/<name>/documents.json        product_id order, contents and metadata
+
+Workers map the binary files read-only, so all processes on a machine share one copy of
+the index through the page cache and start without opening Chroma or calling the
+embedding API. Nothing is computed over the vectors at startup, and the snapshot is
+matched to the catalog by the content hash of the catalog source, which the catalog
+registry computes when it loads the source anyway; the catalog DataFrame itself is
+only hashed when that source changed since the snapshot was built.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd  # type: ignore
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from hermes.data.quantized_index import (
+    QuantizedVectorIndex,
+    QuantizedVectorStore,
+    VectorQuantization,
+)
+from hermes.utils.logger import logger, get_agent_logger
+
+
+SNAPSHOT_FORMAT_VERSION = 1
+CURRENT_POINTER = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.f32"
+NORMS_FILE = "norms.f32"
+COMPACT_CODES_FILE = "compact.codes"
+COMPACT_NORMS_FILE = "compact.norms"
+COMPACT_SCALES_FILE = "compact.scales"
+FILTERS_FILE = "filters.bits"
+DOCUMENTS_FILE = "documents.json"
+
+# Metadata fields that get a bitmap per distinct value for equality filters
+BITMAP_FIELDS = ("category", "season")
+
+# Catalog columns the snapshot's vectors and metadata are derived from
+_HASHED_COLUMNS = (
+    "product_id",
+    "name",
+    "description",
+    "category",
+    "price",
+    "seasons",
+    "type",
+)
+
+
+def catalog_hash(
+    products_df: pd.DataFrame, embedding_model_name: str, embedding_dim: int
+) -> str:
+    """Hash of everything a snapshot depends on.
+
+    Stock is left out: it is live data and never stored in the index.
+    """
+    columns = [column for column in _HASHED_COLUMNS if column in products_df.columns]
+    digest = hashlib.sha256(f"{embedding_model_name}\n{embedding_dim}\n".encode())
+    digest.update(products_df[columns].to_csv(index=False).encode())
+    return digest.hexdigest()
+
+
+def source_hash(
+    content_hash: str | None, embedding_model_name: str, embedding_dim: int
+) -> str | None:
+    """Cheap stand-in for `catalog_hash`, from the content hash of the catalog source.
+
+    Equal source content gives an equal catalog, so a snapshot with the same source
+    hash is current without hashing the DataFrame. Unlike `catalog_hash` it changes
+    with stock edits to the source, in which case `catalog_hash` decides.
+    """
+    if content_hash is None:
+        return None
+    return hashlib.sha256(
+        f"{embedding_model_name}\n{embedding_dim}\n{content_hash}".encode()
+    ).hexdigest()
+
+
+def _filter_key(field: str, value: Any) -> str:
+    return f"{field}={value}"
+
+
+def write_index_snapshot(
+    snapshot_dir: str,
+    vectors: np.ndarray,
+    documents: list[Document],
+    catalog_hash: str,
+    embedding_model_name: str,
+    source_hash: str | None = None,
+    quantization: VectorQuantization = "none",
+    truncate_dim: int = 0,
+) -> str:
+    """Write a snapshot and make it the current one.
+
+    The snapshot is written to a staging directory and moved into place before the
+    CURRENT pointer is atomically replaced, so readers never see a partial snapshot.
+
+    Args:
+        snapshot_dir: Directory holding the snapshots.
+        vectors: One embedding per document.
+        documents: Product documents; their metadata must include "product_id".
+        catalog_hash: Hash of the catalog the vectors were computed from.
+        embedding_model_name: The embedding model the vectors come from.
+        source_hash: `source_hash` of the catalog source, if known.
+        quantization: Compact representation to precompute for searches.
+        truncate_dim: Leading dimensions the compact representation keeps, 0 for all.
+
+    Returns:
+        Path of the new snapshot directory.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    if vectors.ndim != 2 or len(vectors) == 0 or len(vectors) != len(documents):
+        raise ValueError(
+            f"Cannot build an index snapshot from {len(vectors)} vectors and {len(documents)} documents"
+        )
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    previous = _read_current_pointer(snapshot_dir)
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{catalog_hash[:12]}"
+    staging = tempfile.mkdtemp(prefix=f".{name}-", dir=snapshot_dir)
+    try:
+        vectors.tofile(os.path.join(staging, EMBEDDINGS_FILE))
+        np.einsum("ij,ij->i", vectors, vectors).astype("<f4").tofile(
+            os.path.join(staging, NORMS_FILE)
+        )
+
+        compact: dict[str, Any] | None = None
+        if quantization != "none" or truncate_dim > 0:
+            index = QuantizedVectorIndex(
+                vectors, quantization=quantization, truncate_dim=truncate_dim
+            )
+            codes_dtype = "i1" if index.scales is not None else "<f4"
+            index.codes.astype(codes_dtype).tofile(
+                os.path.join(staging, COMPACT_CODES_FILE)
+            )
+            index.norms.astype("<f4").tofile(os.path.join(staging, COMPACT_NORMS_FILE))
+            if index.scales is not None:
+                index.scales.astype("<f4").tofile(
+                    os.path.join(staging, COMPACT_SCALES_FILE)
+                )
+            compact = {
+                "quantization": quantization,
+                "truncate_dim": truncate_dim,
+                "dims": index.dims,
+            }
+
+        filter_keys: list[str] = []
+        bitmaps: list[np.ndarray] = []
+        for field in BITMAP_FIELDS:
+            values = pd.Series([doc.metadata.get(field) for doc in documents])
+            for value in sorted(values.dropna().unique(), key=str):
+                filter_keys.append(_filter_key(field, value))
+                bitmaps.append((values == value).to_numpy(dtype=bool))
+        if bitmaps:
+            np.packbits(np.vstack(bitmaps), axis=1).tofile(
+                os.path.join(staging, FILTERS_FILE)
+            )
+
+        with open(os.path.join(staging, DOCUMENTS_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                [
+                    {"page_content": doc.page_content, "metadata": doc.metadata}
+                    for doc in documents
+                ],
+                f,
+            )
+
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "catalog_hash": catalog_hash,
+            "source_hash": source_hash,
+            "embedding_model": embedding_model_name,
+            "count": int(vectors.shape[0]),
+            "dims": int(vectors.shape[1]),
+            "filter_keys": filter_keys,
+            "compact": compact,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        snapshot_path = os.path.join(snapshot_dir, name)
+        os.replace(staging, snapshot_path)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    pointer_tmp = os.path.join(snapshot_dir, f".{CURRENT_POINTER}.{os.getpid()}")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(pointer_tmp, os.path.join(snapshot_dir, CURRENT_POINTER))
+
+    # Keep the previous snapshot for workers that still have it mapped
+    for entry in os.listdir(snapshot_dir):
+        entry_path = os.path.join(snapshot_dir, entry)
+        if (
+            os.path.isdir(entry_path)
+            and not entry.startswith(".")
+            and entry not in (name, previous)
+        ):
+            shutil.rmtree(entry_path, ignore_errors=True)
+
+    return snapshot_path
+
+
+def _read_current_pointer(snapshot_dir: str) -> str | None:
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT_POINTER), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class IndexSnapshot:
+    """A snapshot opened read-only, with its binary files memory-mapped."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported index snapshot format {manifest.get('format_version')} in {path}"
+            )
+
+        self.path = path
+        self.catalog_hash: str = manifest["catalog_hash"]
+        self.source_hash: str | None = manifest.get("source_hash")
+        self.embedding_model: str = manifest["embedding_model"]
+        self.count: int = manifest["count"]
+        self.dims: int = manifest["dims"]
+        self.vectors = np.memmap(
+            os.path.join(path, EMBEDDINGS_FILE),
+            dtype="<f4",
+            mode="r",
+            shape=(self.count, self.dims),
+        )
+        # Snapshots written before norms were stored get them computed on load
+        norms_path = os.path.join(path, NORMS_FILE)
+        self.norms: np.ndarray | None = (
+            np.memmap(norms_path, dtype="<f4", mode="r", shape=(self.count,))
+            if os.path.exists(norms_path)
+            else None
+        )
+        self.compact: dict[str, Any] | None = manifest.get("compact")
+
+        self._filter_rows = {
+            key: row for row, key in enumerate(manifest["filter_keys"])
+        }
+        self._bitmaps = (
+            np.memmap(
+                os.path.join(path, FILTERS_FILE),
+                dtype=np.uint8,
+                mode="r",
+                shape=(len(self._filter_rows), (self.count + 7) // 8),
+            )
+            if self._filter_rows
+            else None
+        )
+
+        with open(os.path.join(path, DOCUMENTS_FILE), encoding="utf-8") as f:
+            self.documents = [
+                Document(page_content=doc["page_content"], metadata=doc["metadata"])
+                for doc in json.load(f)
+            ]
+
+    def vector_index(
+        self,
+        quantization: VectorQuantization = "none",
+        truncate_dim: int = 0,
+        rerank_factor: int = 4,
+    ) -> QuantizedVectorIndex:
+        """Search index over the mapped vectors.
+
+        The float32 matrix with its stored norms, or the compact vectors precomputed
+        for these settings, are used in place; other settings (or older snapshots) are
+        computed into private memory.
+        """
+
+        def full_vector_loader(positions: np.ndarray) -> np.ndarray:
+            return np.asarray(self.vectors[positions])
+
+        if quantization == "none" and truncate_dim <= 0 and self.norms is not None:
+            return QuantizedVectorIndex.from_arrays(
+                self.vectors,
+                self.norms,
+                None,
+                self.dims,
+                rerank_factor=rerank_factor,
+                full_vector_loader=full_vector_loader,
+            )
+        compact = self.compact
+        if (
+            compact is not None
+            and compact["quantization"] == quantization
+            and compact["truncate_dim"] == truncate_dim
+        ):
+            shape = (self.count, compact["dims"])
+            scales = None
+            if quantization == "int8":
+                codes = np.memmap(
+                    os.path.join(self.path, COMPACT_CODES_FILE),
+                    dtype="i1",
+                    mode="r",
+                    shape=shape,
+                )
+                scales = np.fromfile(
+                    os.path.join(self.path, COMPACT_SCALES_FILE), dtype="<f4"
+                )
+            else:
+                codes = np.memmap(
+                    os.path.join(self.path, COMPACT_CODES_FILE),
+                    dtype="<f4",
+                    mode="r",
+                    shape=shape,
+                )
+            norms = np.memmap(
+                os.path.join(self.path, COMPACT_NORMS_FILE),
+                dtype="<f4",
+                mode="r",
+                shape=(self.count,),
+            )
+            return QuantizedVectorIndex.from_arrays(
+                codes,
+                norms,
+                scales,
+                self.dims,
+                truncate_dim=truncate_dim,
+                rerank_factor=rerank_factor,
+                full_vector_loader=full_vector_loader,
+            )
+
+        logger.info(
+            get_agent_logger(
+                "Data",
+                f"Index snapshot [cyan underline]{self.path}[/cyan underline] has no precomputed {quantization} index (truncate_dim {truncate_dim}); computing it in memory",
+            )
+        )
+        return QuantizedVectorIndex(
+            self.vectors,
+            quantization=quantization,
+            truncate_dim=truncate_dim,
+            rerank_factor=rerank_factor,
+            full_vector_loader=full_vector_loader,
+        )
+
+    def bitmap(self, field: str, value: Any) -> np.ndarray | None:
+        """Rows whose metadata field equals value, or None if the field has no bitmaps."""
+        if field not in BITMAP_FIELDS:
+            return None
+        row = self._filter_rows.get(_filter_key(field, value))
+        if row is None or self._bitmaps is None:
+            return np.zeros(self.count, dtype=bool)
+        return np.unpackbits(self._bitmaps[row], count=self.count).astype(bool)
+
+
+def open_index_snapshot(snapshot_dir: str) -> IndexSnapshot | None:
+    """Open the current snapshot in snapshot_dir, or return None if there is none."""
+    name = _read_current_pointer(snapshot_dir)
+    if name is None:
+        return None
+    return IndexSnapshot(os.path.join(snapshot_dir, name))
+
+
+class SnapshotVectorStore(QuantizedVectorStore):
+    """Vector store served from a memory-mapped index snapshot.
+
+    Equality filters on bitmap fields are answered from the snapshot's bitmaps; any
+    other condition is evaluated over the document metadata.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        snapshot: IndexSnapshot,
+        quantization: VectorQuantization = "none",
+        truncate_dim: int = 0,
+        rerank_factor: int = 4,
+    ):
+        index = snapshot.vector_index(quantization, truncate_dim, rerank_factor)
+        super().__init__(embeddings, index, snapshot.documents)
+        self.snapshot = snapshot
+
+    def _filter_mask(self, filter: dict[str, Any]) -> np.ndarray:
+        clauses = filter["$and"] if set(filter) == {"$and"} else [filter]
+        mask = np.ones(self.snapshot.count, dtype=bool)
+        remaining: list[dict[str, Any]] = []
+        for clause in clauses:
+            bitmap = None
+            if len(clause) == 1:
+                field, condition = next(iter(clause.items()))
+                if isinstance(condition, dict) and set(condition) == {"$eq"}:
+                    condition = condition["$eq"]
+                if not isinstance(condition, (dict, list)):
+                    bitmap = self.snapshot.bitmap(field, condition)
+            if bitmap is None:
+                remaining.append(clause)
+            else:
+                mask &= bitmap
+        if remaining:
+            mask &= super()._filter_mask({"$and": remaining})
+        return mask
+
+
+def load_snapshot_vector_store(
+    snapshot_dir: str,
+    embeddings: Embeddings,
+    expected_catalog_hash: str | Callable[[], str],
+    quantization: VectorQuantization = "none",
+    truncate_dim: int = 0,
+    rerank_factor: int = 4,
+    expected_source_hash: str | None = None,
+) -> SnapshotVectorStore | None:
+    """Open the current snapshot if it was built from the expected catalog.
+
+    Args:
+        snapshot_dir: Directory holding the snapshots.
+        embeddings: Embeds search queries.
+        expected_catalog_hash: `catalog_hash` of the current catalog, or a function
+            computing it; only called if the source hashes do not match.
+        quantization: Compact representation to search.
+        truncate_dim: Leading dimensions the compact representation keeps, 0 for all.
+        rerank_factor: Candidates re-ranked per requested result.
+        expected_source_hash: `source_hash` of the current catalog source, if known.
+
+    Returns:
+        The snapshot-backed store, or None if there is no usable snapshot.
+    """
+    started = time.perf_counter()
+    try:
+        snapshot = open_index_snapshot(snapshot_dir)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(
+            get_agent_logger("Data", f"Ignoring unreadable index snapshot: {e}")
+        )
+        return None
+    if snapshot is None:
+        logger.info(
+            get_agent_logger(
+                "Data",
+                f"No index snapshot in [cyan underline]{snapshot_dir}[/cyan underline]",
+            )
+        )
+        return None
+    current = (
+        expected_source_hash is not None
+        and snapshot.source_hash == expected_source_hash
+    )
+    if not current:
+        if callable(expected_catalog_hash):
+            expected_catalog_hash = expected_catalog_hash()
+        current = snapshot.catalog_hash == expected_catalog_hash
+    if not current:
+        logger.warning(
+            get_agent_logger(
+                "Data",
+                f"Index snapshot [cyan underline]{snapshot.path}[/cyan underline] was built from a different catalog or embedding model; run 'hermes index build' to refresh it",
+            )
+        )
+        return None
+
+    store = SnapshotVectorStore(
+        embeddings,
+        snapshot,
+        quantization=quantization,
+        truncate_dim=truncate_dim,
+        rerank_factor=rerank_factor,
+    )
+    logger.info(
+        get_agent_logger(
+            "Data",
+            f"Mapped index snapshot [cyan underline]{snapshot.path}[/cyan underline] "
+            f"([yellow]{snapshot.count}[/yellow] vectors) in "
+            f"[yellow]{(time.perf_counter() - started) * 1000:.1f} ms[/yellow]",
+        )
+    )
+    return store
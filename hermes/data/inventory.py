@@ -0,0 +1,599 @@
+"""Race-free stock reservations over the products catalog.
+
+Checking stock and then decrementing it in a second step lets two concurrent orders
+both pass the check and oversell. The `InventoryEngine` instead reserves stock with an
+atomic compare-and-decrement under per-product locks, and reserves the lines of an
+order together: the locks of every product in the order are taken (in a fixed order,
+so concurrent orders cannot deadlock), all lines are checked, and then all are applied.
+
+Lock striping keeps the number of locks bounded for large catalogs; products that share
+a stripe simply serialize their reservations.
+
+With INVENTORY_DB_PATH set, reservations are made in the shared SQLite inventory store
+(see `inventory_store`) and the engine mirrors the stock levels it reports; stock
+changed by other processes is picked up by `refresh()`.
+
+`stock_overlay()` forks a copy-on-write overlay for one run or email batch: inside
+the block, reservations made through `get_inventory` change only the overlay, which
+shares the base stock for every product it has not touched. On exit the overlay is
+discarded (or committed to the base), so parallel what-if runs and test workers
+neither reload the catalog nor see each other's stock changes.
+
+Without a store, the engine's stock array is the only record of the reservations made
+since the catalog was loaded. When the catalog is hot-reloaded, `carry_stock_over`
+starts the new catalog's engine from the file's stock levels less those reservations,
+so a reload cannot hand out the same stock twice. An email still pinned to the
+previous catalog reserves from the reloaded catalog's engine, which positions lines by
+product ID, so both catalogs draw on one stock and one set of idempotency keys.
+"""
+
+import threading
+import weakref
+from collections import ChainMap
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from typing import Callable, Iterable, Iterator, MutableMapping
+
+import numpy as np
+import pandas as pd  # type: ignore
+
+from hermes.config import HermesConfig
+from hermes.data.catalog_index import CatalogIndex, get_catalog_index
+from hermes.data.inventory_store import SQLiteInventoryStore, get_inventory_store
+from hermes.utils.logger import logger, get_agent_logger
+
+
+_LOCK_STRIPES = 256
+
+_config = HermesConfig()
+
+_inventory: "InventoryEngine | None" = None
+_inventory_lock = threading.Lock()
+# Reloaded catalogs by id, mapped to the catalog that replaced them; an entry is dropped
+# when the replaced catalog is garbage collected
+_replaced_catalogs: dict[int, pd.DataFrame] = {}
+_active_overlay: ContextVar["StockOverlay | None"] = ContextVar(
+    "active_stock_overlay", default=None
+)
+
+
+@dataclass(frozen=True)
+class StockReservation:
+    """Outcome of reserving one order line.
+
+    Attributes:
+        product_id: The normalized product ID.
+        quantity: The quantity requested.
+        found: Whether the product exists in the catalog.
+        reserved: Whether the quantity was reserved.
+        stock: Stock after the reservation if reserved, otherwise the stock seen when
+            the reservation was refused (0 for unknown products).
+        replayed: Whether the line's idempotency key had already been applied, in
+            which case nothing was decremented and the original result is returned.
+    """
+
+    product_id: str
+    quantity: int
+    found: bool
+    reserved: bool
+    stock: int
+    replayed: bool = False
+
+
+def normalize_product_id(product_id: str | None) -> str:
+    """Standardize a product ID the way the catalog stores it."""
+    return (product_id or "").replace(" ", "").upper()
+
+
+def _prepare_lines(
+    catalog_index: CatalogIndex,
+    lines: Iterable[tuple[str, int]],
+    idempotency_keys: Iterable[str | None] | None,
+) -> tuple[list[tuple[str, int]], list[int | None], list[str | None]]:
+    """Normalize order lines and look up their catalog positions."""
+    requests = [
+        (normalize_product_id(product_id), int(quantity))
+        for product_id, quantity in lines
+    ]
+    keys = (
+        list(idempotency_keys)
+        if idempotency_keys is not None
+        else [None] * len(requests)
+    )
+    positions = [catalog_index.position_of(product_id) for product_id, _ in requests]
+    return requests, positions, keys
+
+
+def _plan_reservations(
+    requests: list[tuple[str, int]],
+    positions: list[int | None],
+    keys: list[str | None],
+    applied: MutableMapping[str, StockReservation],
+    current_stock: Callable[[int], int],
+    all_or_nothing: bool,
+) -> tuple[list[StockReservation], dict[int, int]]:
+    """Decide every line against the current stock; the caller holds the locks.
+
+    Successful keyed lines are recorded in applied.
+
+    Returns:
+        The result per line and the new stock of each position that changed (empty
+        if the order was rolled back).
+    """
+    available: dict[int, int] = {}
+    results: list[StockReservation] = []
+    for (product_id, quantity), position, key in zip(requests, positions, keys):
+        if key is not None and key in applied:
+            results.append(replace(applied[key], replayed=True))
+            continue
+        if position is None:
+            results.append(StockReservation(product_id, quantity, False, False, 0))
+            continue
+        stock = available.setdefault(position, current_stock(position))
+        # Zero units is a successful no-op, as it always was; negative quantities
+        # would add stock and are refused
+        if quantity < 0 or stock < quantity:
+            results.append(StockReservation(product_id, quantity, True, False, stock))
+            continue
+        available[position] = stock - quantity
+        results.append(
+            StockReservation(product_id, quantity, True, True, stock - quantity)
+        )
+
+    if all_or_nothing and not all(result.reserved for result in results):
+        # Lines applied by an earlier call stay applied
+        return [
+            result
+            if result.replayed
+            else StockReservation(
+                result.product_id,
+                result.quantity,
+                result.found,
+                False,
+                current_stock(position) if position is not None else 0,
+            )
+            for result, position in zip(results, positions)
+        ], {}
+
+    for key, result in zip(keys, results):
+        if key is not None and result.reserved and not result.replayed:
+            applied[key] = result
+    changed = {
+        position: stock
+        for position, stock in available.items()
+        if stock != current_stock(position)
+    }
+    return results, changed
+
+
+class InventoryEngine:
+    """Stock levels of one products DataFrame with atomic reservations.
+
+    Without a store, the engine's stock array is the authority; with one, the store
+    is. Either way every change is mirrored into the DataFrame's "stock" column and the
+    catalog index, so readers of either see it.
+    """
+
+    def __init__(
+        self,
+        products_df: pd.DataFrame,
+        store: SQLiteInventoryStore | None = None,
+        carry_from: "InventoryEngine | None" = None,
+    ):
+        """Create the engine.
+
+        Args:
+            products_df: The catalog whose stock is managed.
+            store: Shared persistent store; products it does not know yet are seeded
+                from the catalog, and its stock levels replace the catalog's.
+            carry_from: In-memory engine of the catalog this one replaces; the stock
+                it reserved since its catalog was loaded is reserved here too.
+        """
+        # Holding the DataFrame keeps its identity stable for `get_inventory`
+        self.products_df = products_df
+        self.catalog_index: CatalogIndex = get_catalog_index(products_df)
+        self.store = store
+        self._stock: np.ndarray = (
+            pd.to_numeric(products_df["stock"], errors="coerce")
+            .fillna(0)
+            .to_numpy(dtype=np.int64, copy=True)
+        )
+        # Stock as loaded; reservations since are the difference to `_stock`
+        self._catalog_stock = self._stock.copy()
+        self._stock_column = products_df.columns.get_loc("stock")
+        self._stripes = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+        # Serializes writes into the DataFrame, which is not safe for concurrent writers
+        self._mirror_lock = threading.Lock()
+        # Reservations already applied, by idempotency key (in-memory mode)
+        self._applied: dict[str, StockReservation] = {}
+        # Orders store reservations and refreshes, so mirrored levels land in order
+        self._store_lock = threading.Lock()
+        self._data_version: int | None = None
+
+        if store is not None:
+            catalog_stock: dict[str, int] = {}
+            for product_id, stock in zip(self.catalog_index.product_ids, self._stock):
+                catalog_stock.setdefault(str(product_id), int(stock))
+            store.seed(catalog_stock)
+            with self._store_lock:
+                self._load_from_store()
+        elif carry_from is not None:
+            self._carry_reservations(carry_from)
+
+    def reserved_quantities(self) -> dict[str, int]:
+        """Stock reserved per product since the catalog was loaded (in-memory mode)."""
+        for stripe in self._stripes:
+            stripe.acquire()
+        try:
+            reserved = self._catalog_stock - self._stock
+        finally:
+            for stripe in reversed(self._stripes):
+                stripe.release()
+        return {
+            str(self.catalog_index.product_ids[position]): int(reserved[position])
+            for position in np.flatnonzero(reserved)
+        }
+
+    def _carry_reservations(self, previous: "InventoryEngine") -> None:
+        changed: dict[int, int] = {}
+        for product_id, quantity in previous.reserved_quantities().items():
+            position = self.catalog_index.position_of(product_id)
+            if position is not None:
+                changed[position] = max(int(self._stock[position]) - quantity, 0)
+        for position, stock in changed.items():
+            self._stock[position] = stock
+        self._applied.update(previous._applied)
+        self._mirror(changed)
+
+    def refresh(self) -> None:
+        """Pick up stock changed in the store by other processes (cheap if none)."""
+        if self.store is None or self.store.data_version() == self._data_version:
+            return
+        with self._store_lock:
+            self._load_from_store()
+
+    def _load_from_store(self) -> None:
+        assert self.store is not None
+        self._data_version = self.store.data_version()
+        levels = self.store.stock_levels()
+        changed: dict[int, int] = {}
+        for position, product_id in enumerate(self.catalog_index.product_ids):
+            stock = levels.get(str(product_id))
+            if stock is not None and stock != self._stock[position]:
+                changed[position] = stock
+        for position, stock in changed.items():
+            self._stock[position] = stock
+        self._mirror(changed)
+
+    def stock_of(self, product_id: str) -> int | None:
+        """Current stock of a product, or None if it is not in the catalog."""
+        position = self.catalog_index.position_of(normalize_product_id(product_id))
+        if position is None:
+            return None
+        self.refresh()
+        return int(self._stock[position])
+
+    def reserve(self, product_id: str, quantity: int) -> StockReservation:
+        """Atomically decrement a product's stock if at least quantity is available."""
+        return self.reserve_lines([(product_id, quantity)])[0]
+
+    def reserve_lines(
+        self,
+        lines: Iterable[tuple[str, int]],
+        all_or_nothing: bool = False,
+        idempotency_keys: Iterable[str | None] | None = None,
+    ) -> list[StockReservation]:
+        """Reserve several order lines in one atomic step.
+
+        Lines for the same product draw from the same stock, in line order.
+
+        Args:
+            lines: (product_id, quantity) pairs.
+            all_or_nothing: If True, nothing is reserved unless every line can be.
+            idempotency_keys: Optional key per line, e.g. "<email_id>#<line>"; a line
+                whose key was already reserved is not decremented again.
+
+        Returns:
+            One reservation per line, in the order of the lines.
+        """
+        requests, positions, keys = _prepare_lines(
+            self.catalog_index, lines, idempotency_keys
+        )
+        if self.store is not None:
+            return self._reserve_in_store(requests, positions, keys, all_or_nothing)
+        stripes = sorted(
+            {position % _LOCK_STRIPES for position in positions if position is not None}
+        )
+
+        for stripe in stripes:
+            self._stripes[stripe].acquire()
+        try:
+            results, changed = _plan_reservations(
+                requests,
+                positions,
+                keys,
+                self._applied,
+                lambda position: int(self._stock[position]),
+                all_or_nothing,
+            )
+            for position, stock in changed.items():
+                self._stock[position] = stock
+            # Mirror while still holding the stripes, so mirrored values land in order
+            self._mirror(changed)
+        finally:
+            for stripe in reversed(stripes):
+                self._stripes[stripe].release()
+        return results
+
+    def fork(self) -> "StockOverlay":
+        """Start a copy-on-write overlay of this engine's stock."""
+        return StockOverlay(self)
+
+    def _stock_at(self, position: int) -> int:
+        return int(self._stock[position])
+
+    def _applied_view(self) -> MutableMapping[str, StockReservation]:
+        # Keys applied in the store are only known to the store
+        return self._applied if self.store is None else {}
+
+    def _reserve_in_store(
+        self,
+        requests: list[tuple[str, int]],
+        positions: list[int | None],
+        keys: list[str | None],
+        all_or_nothing: bool,
+    ) -> list[StockReservation]:
+        assert self.store is not None
+        self.refresh()
+        with self._store_lock:
+            stored = self.store.reserve_lines(requests, all_or_nothing, keys)
+            changed: dict[int, int] = {}
+            for position, result in zip(positions, stored):
+                # Replayed results report the stock recorded back then, not today's
+                if position is not None and result.found and not result.replayed:
+                    changed[position] = result.stock
+            changed = {
+                position: stock
+                for position, stock in changed.items()
+                if stock != self._stock[position]
+            }
+            for position, stock in changed.items():
+                self._stock[position] = stock
+            self._mirror(changed)
+        return [
+            StockReservation(
+                result.product_id,
+                result.quantity,
+                result.found,
+                result.reserved,
+                result.stock,
+                result.replayed,
+            )
+            for result in stored
+        ]
+
+    def _mirror(self, changed: dict[int, int]) -> None:
+        if not changed:
+            return
+        with self._mirror_lock:
+            for position, stock in changed.items():
+                self.products_df.iat[position, self._stock_column] = stock
+        for position, stock in changed.items():
+            self.catalog_index.set_stock(
+                str(self.catalog_index.product_ids[position]), stock
+            )
+
+
+class StockOverlay:
+    """Copy-on-write stock changes on top of an engine (or another overlay).
+
+    Only the stock of products reserved through the overlay is copied; everything
+    else is read from the base, whose arrays are shared. Nothing reaches the base, the
+    DataFrame or the catalog index until `commit()`, so recommendation tables built
+    from them keep showing the base stock.
+    """
+
+    def __init__(self, base: "InventoryEngine | StockOverlay"):
+        """Create an overlay; usually through `fork()` or `stock_overlay()`."""
+        self.base = base
+        self.products_df = base.products_df
+        self.catalog_index = base.catalog_index
+        self._stock: dict[int, int] = {}
+        self._applied: dict[str, StockReservation] = {}
+        # Reserved lines, replayed against the base on commit
+        self._journal: list[tuple[str, int, str | None]] = []
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def refresh(self) -> None:
+        """Pick up stock changed in the base's store by other processes."""
+        self.base.refresh()
+
+    def stock_of(self, product_id: str) -> int | None:
+        """Stock of a product as seen by this overlay, or None if it is not in the catalog."""
+        position = self.catalog_index.position_of(normalize_product_id(product_id))
+        if position is None:
+            return None
+        self.refresh()
+        return self._stock_at(position)
+
+    def reserve(self, product_id: str, quantity: int) -> StockReservation:
+        """Decrement a product's stock in the overlay if at least quantity is available."""
+        return self.reserve_lines([(product_id, quantity)])[0]
+
+    def reserve_lines(
+        self,
+        lines: Iterable[tuple[str, int]],
+        all_or_nothing: bool = False,
+        idempotency_keys: Iterable[str | None] | None = None,
+    ) -> list[StockReservation]:
+        """Reserve order lines in the overlay; see `InventoryEngine.reserve_lines`."""
+        requests, positions, keys = _prepare_lines(
+            self.catalog_index, lines, idempotency_keys
+        )
+        with self._lock:
+            self._check_open()
+            results, changed = _plan_reservations(
+                requests,
+                positions,
+                keys,
+                self._applied_view(),
+                self._stock_at,
+                all_or_nothing,
+            )
+            self._stock.update(changed)
+            for result, key in zip(results, keys):
+                if result.reserved and not result.replayed:
+                    self._journal.append((result.product_id, result.quantity, key))
+        return results
+
+    def fork(self) -> "StockOverlay":
+        """Start a nested overlay; committing it applies its changes to this one."""
+        return StockOverlay(self)
+
+    def commit(self) -> list[StockReservation]:
+        """Apply the overlay's reservations to the base as one all-or-nothing order.
+
+        The lines are replayed with their idempotency keys, so the base (and its store)
+        records them as if they had been reserved there directly.
+
+        Returns:
+            The base's result per reserved line. If the base no longer has the stock
+            (it changed since the fork), nothing is applied and the overlay stays open.
+        """
+        with self._lock:
+            self._check_open()
+            results = self.base.reserve_lines(
+                [(product_id, quantity) for product_id, quantity, _ in self._journal],
+                all_or_nothing=True,
+                idempotency_keys=[key for _, _, key in self._journal],
+            )
+            if all(result.reserved for result in results):
+                self.closed = True
+        return results
+
+    def discard(self) -> None:
+        """Drop the overlay's changes; the base is left as it was."""
+        with self._lock:
+            self.closed = True
+            self._stock.clear()
+            self._journal.clear()
+
+    def _check_open(self) -> None:
+        if self.closed:
+            raise RuntimeError("Stock overlay was already committed or discarded")
+
+    def _stock_at(self, position: int) -> int:
+        stock = self._stock.get(position)
+        return stock if stock is not None else self.base._stock_at(position)
+
+    def _applied_view(self) -> MutableMapping[str, StockReservation]:
+        # New keys are recorded in this overlay only
+        return ChainMap(self._applied, self.base._applied_view())
+
+
+@contextmanager
+def stock_overlay(
+    products_df: pd.DataFrame, commit: bool = False
+) -> Iterator[StockOverlay]:
+    """Route the current context's reservations on products_df to a fresh overlay.
+
+    Overlays nest: inside an active overlay for the same catalog the new one forks
+    from it. Each thread or asyncio task entering the block gets its own overlay.
+
+    Args:
+        products_df: The catalog whose stock is overlaid.
+        commit: Commit the overlay when the block exits without an error; otherwise
+            (and always on error) it is discarded.
+    """
+    active = _active_overlay.get()
+    base = (
+        active
+        if active is not None and active.products_df is products_df
+        else get_inventory(products_df)
+    )
+    overlay = base.fork()
+    token = _active_overlay.set(overlay)
+    try:
+        yield overlay
+        if commit and not overlay.closed:
+            results = overlay.commit()
+            if not overlay.closed:
+                unavailable = sorted(
+                    {result.product_id for result in results if not result.reserved}
+                )
+                raise RuntimeError(
+                    f"Could not commit stock overlay, stock changed for: {', '.join(unavailable)}"
+                )
+    finally:
+        _active_overlay.reset(token)
+        if not overlay.closed:
+            overlay.discard()
+
+
+def carry_stock_over(previous_df: pd.DataFrame, products_df: pd.DataFrame) -> None:
+    """Carry the in-memory reservations of a catalog over to its reloaded version.
+
+    With an inventory store there is nothing to carry: the new engine reads the stock
+    from the store. Reservations made on the previous catalog after this call (e.g. by
+    an email pinned to it) go to the new catalog's engine.
+
+    Args:
+        previous_df: The catalog being replaced.
+        products_df: The reloaded catalog.
+    """
+    global _inventory
+
+    with _inventory_lock:
+        _replaced_catalogs[id(previous_df)] = products_df
+        weakref.finalize(previous_df, _replaced_catalogs.pop, id(previous_df), None)
+        previous = _inventory
+        if previous is None or previous.products_df is not previous_df:
+            return
+        if previous.store is not None:
+            _inventory = InventoryEngine(products_df, store=previous.store)
+            return
+        carried = len(previous.reserved_quantities())
+        _inventory = InventoryEngine(products_df, carry_from=previous)
+    if carried:
+        logger.info(
+            get_agent_logger(
+                "Data",
+                f"Carried stock reserved on [yellow]{carried}[/yellow] products over to the reloaded catalog",
+            )
+        )
+
+
+def get_inventory(products_df: pd.DataFrame) -> "InventoryEngine | StockOverlay":
+    """Return the inventory engine for the given products DataFrame, creating it on first use.
+
+    A new engine (starting from the DataFrame's stock column, or from the inventory
+    database if INVENTORY_DB_PATH is set) is created whenever a different DataFrame
+    object is passed in, e.g. after the catalog is reloaded. A catalog that has been
+    replaced by `carry_stock_over` gets the engine of the catalog that replaced it.
+    Inside a `stock_overlay` block for the same DataFrame, the block's overlay is
+    returned instead.
+    """
+    global _inventory
+
+    pinned_df = products_df
+    while id(products_df) in _replaced_catalogs:
+        products_df = _replaced_catalogs[id(products_df)]
+
+    overlay = _active_overlay.get()
+    if overlay is not None and (
+        overlay.products_df is pinned_df or overlay.products_df is products_df
+    ):
+        return overlay
+
+    inventory = _inventory
+    if inventory is not None and inventory.products_df is products_df:
+        return inventory
+
+    with _inventory_lock:
+        if _inventory is None or _inventory.products_df is not products_df:
+            _inventory = InventoryEngine(
+                products_df, store=get_inventory_store(_config.inventory_db_path)
+            )
+        return _inventory
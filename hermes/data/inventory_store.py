@@ -0,0 +1,265 @@
+"""Persistent inventory shared between processes, stored in SQLite.
+
+With INVENTORY_DB_PATH set, stock levels live in a SQLite database in WAL mode instead
+of only in the in-memory catalog: they survive restarts, every worker process on the
+machine reserves against the same numbers, and readers never block the writer.
+
+Each reservation runs in a `BEGIN IMMEDIATE` transaction, which serializes writers
+across processes, and decrements with `stock = stock - ? WHERE stock >= ?`, so stock
+can never go negative. A reservation may carry an idempotency key (the email ID and
+order line); a key that was already applied returns the recorded result instead of
+decrementing again, so rerunning the same emails is safe.
+
+Products are seeded from the catalog the first time they are seen; after that the
+database is the source of truth for their stock.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable
+
+from hermes.utils.logger import logger, get_agent_logger
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inventory (
+    product_id TEXT PRIMARY KEY,
+    stock INTEGER NOT NULL CHECK (stock >= 0),
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reservations (
+    idempotency_key TEXT PRIMARY KEY,
+    product_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    stock_after INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reservations_product_id ON reservations (product_id);
+"""
+
+
+@dataclass(frozen=True)
+class StoredReservation:
+    """Result of one line reserved in the store."""
+
+    product_id: str
+    quantity: int
+    found: bool
+    reserved: bool
+    stock: int
+    # True when the idempotency key had already been applied
+    replayed: bool = False
+
+
+class SQLiteInventoryStore:
+    """Stock levels and applied reservations in a SQLite database (WAL mode)."""
+
+    def __init__(self, path: str, busy_timeout_seconds: float = 30.0):
+        """Open (and create if needed) the inventory database.
+
+        Args:
+            path: Database file.
+            busy_timeout_seconds: How long to wait for another process's write lock.
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Transactions are managed explicitly; one connection per store, shared by
+        # threads under a lock
+        self._conn = sqlite3.connect(
+            path,
+            timeout=busy_timeout_seconds,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def data_version(self) -> int:
+        """Changes whenever another connection (e.g. another worker) commits."""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def seed(self, stock_by_product: dict[str, int]) -> int:
+        """Add products that are not in the store yet; existing stock is kept.
+
+        Returns:
+            Number of products added.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO inventory (product_id, stock, updated_at) VALUES (?, ?, ?)",
+                    [
+                        (product_id, max(int(stock), 0), now)
+                        for product_id, stock in stock_by_product.items()
+                    ],
+                )
+                added = self._conn.total_changes - before
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def stock_levels(self, product_ids: Iterable[str] | None = None) -> dict[str, int]:
+        """Current stock of the given products (or of all products)."""
+        with self._lock:
+            if product_ids is None:
+                rows = self._conn.execute("SELECT product_id, stock FROM inventory")
+                return dict(rows.fetchall())
+            ids = list(product_ids)
+            levels: dict[str, int] = {}
+            # Stay below SQLite's limit on bound parameters
+            for start in range(0, len(ids), 500):
+                chunk = ids[start : start + 500]
+                rows = self._conn.execute(
+                    f"SELECT product_id, stock FROM inventory WHERE product_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                levels.update(rows.fetchall())
+            return levels
+
+    def reserve_lines(
+        self,
+        lines: list[tuple[str, int]],
+        all_or_nothing: bool = False,
+        idempotency_keys: list[str | None] | None = None,
+    ) -> list[StoredReservation]:
+        """Reserve order lines in one transaction.
+
+        Args:
+            lines: (product_id, quantity) pairs with normalized product IDs.
+            all_or_nothing: If True, nothing is reserved unless every line can be.
+            idempotency_keys: Optional key per line; lines whose key was already
+                applied are not decremented again.
+
+        Returns:
+            One result per line, in order.
+        """
+        keys = idempotency_keys or [None] * len(lines)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                results = [
+                    self._reserve_line(product_id, quantity, key, now)
+                    for (product_id, quantity), key in zip(lines, keys)
+                ]
+                if all_or_nothing and not all(result.reserved for result in results):
+                    self._conn.execute("ROLLBACK")
+                    levels = self.stock_levels(product_id for product_id, _ in lines)
+                    # Lines applied by an earlier run stay applied
+                    return [
+                        result
+                        if result.replayed
+                        else StoredReservation(
+                            result.product_id,
+                            result.quantity,
+                            result.found,
+                            False,
+                            levels.get(result.product_id, 0),
+                        )
+                        for result in results
+                    ]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+        return results
+
+    def _reserve_line(
+        self, product_id: str, quantity: int, key: str | None, now: float
+    ) -> StoredReservation:
+        if key is not None:
+            applied = self._conn.execute(
+                "SELECT product_id, quantity, stock_after FROM reservations WHERE idempotency_key = ?",
+                (key,),
+            ).fetchone()
+            if applied is not None:
+                return StoredReservation(
+                    applied[0], applied[1], True, True, applied[2], replayed=True
+                )
+
+        row = self._conn.execute(
+            "SELECT stock FROM inventory WHERE product_id = ?", (product_id,)
+        ).fetchone()
+        if row is None:
+            return StoredReservation(product_id, quantity, False, False, 0)
+        # Same rules as the in-memory engine: zero units is a no-op success
+        if quantity < 0 or row[0] < quantity:
+            return StoredReservation(product_id, quantity, True, False, row[0])
+
+        self._conn.execute(
+            "UPDATE inventory SET stock = stock - ?, updated_at = ? WHERE product_id = ? AND stock >= ?",
+            (quantity, now, product_id, quantity),
+        )
+        stock_after = row[0] - quantity
+        if key is not None:
+            self._conn.execute(
+                "INSERT INTO reservations (idempotency_key, product_id, quantity, stock_after, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, product_id, quantity, stock_after, now),
+            )
+        return StoredReservation(product_id, quantity, True, True, stock_after)
+
+    def snapshot(self, destination: str) -> None:
+        """Write a consistent copy of the database to destination."""
+        with self._lock:
+            target = sqlite3.connect(destination)
+            try:
+                self._conn.backup(target)
+            finally:
+                target.close()
+
+    def restore(self, source: str) -> None:
+        """Replace the database contents with those of a snapshot."""
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"Inventory snapshot not found: {source}")
+        origin = sqlite3.connect(source)
+        try:
+            with self._lock:
+                origin.backup(self._conn)
+        finally:
+            origin.close()
+        logger.info(
+            get_agent_logger(
+                "Data",
+                f"Restored inventory [cyan underline]{self.path}[/cyan underline] from [cyan underline]{source}[/cyan underline]",
+            )
+        )
+
+
+_inventory_store: SQLiteInventoryStore | None = None
+_inventory_store_lock = threading.Lock()
+
+
+def get_inventory_store(path: str | None) -> SQLiteInventoryStore | None:
+    """Return the process-wide store for path, or None when no path is configured."""
+    global _inventory_store
+
+    if not path:
+        return None
+    with _inventory_store_lock:
+        if _inventory_store is None or _inventory_store.path != path:
+            _inventory_store = SQLiteInventoryStore(path)
+            logger.info(
+                get_agent_logger(
+                    "Data",
+                    f"Using inventory database [cyan underline]{path}[/cyan underline]",
+                )
+            )
+        return _inventory_store
@@ -0,0 +1,235 @@
+"""BM25 lexical index over product names, types and descriptions.
+
+Many product mentions are lexical ("Alpine Explorer backpack", "CBG9876"), so they can
+be resolved from an in-memory inverted index without an embedding round trip. The
+index is built once per products DataFrame and scored with BM25, with per-field
+weights so that name matches count more than description matches.
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd  # type: ignore
+
+from hermes.utils.logger import logger, get_agent_logger
+
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Relative weight of each indexed field
+FIELD_WEIGHTS: dict[str, float] = {
+    "name": 3.0,
+    "type": 2.0,
+    "description": 1.0,
+}
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from i in is it its me my of on or our so that the "
+    "these this those to with you your".split()
+)
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+_lexical_index: "LexicalIndex | None" = None
+_lexical_index_lock = threading.Lock()
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords and fold simple plurals."""
+    if not text:
+        return []
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(str(text).lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+@dataclass
+class LexicalHit:
+    """A product position with its BM25 score."""
+
+    position: int
+    score: float
+
+
+@dataclass
+class _FieldPostings:
+    postings: dict[str, tuple[np.ndarray, np.ndarray]]
+    doc_lengths: np.ndarray
+    avg_doc_length: float
+
+
+class LexicalIndex:
+    """Inverted index with BM25 scoring over a products DataFrame."""
+
+    def __init__(self, products_df: pd.DataFrame):
+        # Holding the DataFrame keeps its identity stable for `get_lexical_index`
+        self.products_df = products_df
+        self.size = len(products_df)
+
+        self.product_ids: np.ndarray = (
+            products_df["product_id"].astype(str).str.upper().to_numpy()
+        )
+        self.categories: np.ndarray = (
+            products_df["category"].astype(str).str.strip().to_numpy()
+        )
+        self._id_positions: dict[str, int] = {}
+        for position, product_id in enumerate(self.product_ids):
+            self._id_positions.setdefault(product_id, position)
+
+        self.name_tokens: list[frozenset[str]] = []
+        self._fields: dict[str, _FieldPostings] = {}
+        for field in FIELD_WEIGHTS:
+            values = (
+                products_df[field].fillna("").astype(str).tolist()
+                if field in products_df.columns
+                else [""] * self.size
+            )
+            tokenized = [tokenize(value) for value in values]
+            if field == "name":
+                self.name_tokens = [frozenset(tokens) for tokens in tokenized]
+            self._fields[field] = self._build_postings(tokenized)
+
+        # Inverse document frequency over the union of all fields, so a token that
+        # appears in both the name and the description of a product counts once
+        token_docs: dict[str, set[int]] = {}
+        for field_postings in self._fields.values():
+            for token, (docs, _) in field_postings.postings.items():
+                token_docs.setdefault(token, set()).update(docs.tolist())
+        self._idf = {
+            token: float(
+                np.log(1.0 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            )
+            for token, docs in token_docs.items()
+        }
+
+    def _build_postings(self, tokenized: list[list[str]]) -> _FieldPostings:
+        term_docs: dict[str, dict[int, int]] = {}
+        for position, tokens in enumerate(tokenized):
+            for token in tokens:
+                counts = term_docs.setdefault(token, {})
+                counts[position] = counts.get(position, 0) + 1
+
+        postings = {
+            token: (
+                np.fromiter(counts.keys(), dtype=np.int32, count=len(counts)),
+                np.fromiter(counts.values(), dtype=np.float32, count=len(counts)),
+            )
+            for token, counts in term_docs.items()
+        }
+        doc_lengths = np.array([len(tokens) for tokens in tokenized], dtype=np.float32)
+        avg_doc_length = float(doc_lengths.mean()) if self.size else 0.0
+        return _FieldPostings(postings, doc_lengths, avg_doc_length or 1.0)
+
+    def score(self, query: str) -> np.ndarray:
+        """BM25 score of every product for the query."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        query_tokens = set(tokenize(query))
+        for field, weight in FIELD_WEIGHTS.items():
+            field_postings = self._fields[field]
+            for token in query_tokens:
+                entry = field_postings.postings.get(token)
+                if entry is None:
+                    continue
+                docs, tfs = entry
+                lengths = field_postings.doc_lengths[docs]
+                norm = BM25_K1 * (
+                    1.0 - BM25_B + BM25_B * lengths / field_postings.avg_doc_length
+                )
+                scores[docs] += (
+                    weight * self._idf[token] * tfs * (BM25_K1 + 1.0) / (tfs + norm)
+                )
+        return scores
+
+    def search(
+        self, query: str, top_k: int, category: str | None = None
+    ) -> list[LexicalHit]:
+        """Return the top-k products for the query, best first.
+
+        Args:
+            query: Free-text query.
+            top_k: Maximum number of hits to return.
+            category: Optional exact category filter.
+
+        Returns:
+            A list of LexicalHit objects with positive scores.
+        """
+        scores = self.score(query)
+        if category:
+            scores[self.categories != category] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) == 0 or top_k <= 0:
+            return []
+        # Highest score first, earlier catalog rows win ties
+        order = np.lexsort((candidates, -scores[candidates]))[:top_k]
+        return [
+            LexicalHit(position=int(candidates[i]), score=float(scores[candidates[i]]))
+            for i in order
+        ]
+
+    def find_ids_in_text(self, text: str | None) -> list[int]:
+        """Positions of catalog product IDs that appear verbatim as tokens in the text."""
+        positions = []
+        for token in _TOKEN_PATTERN.findall(str(text or "").lower()):
+            position = self._id_positions.get(token.upper())
+            if position is not None and position not in positions:
+                positions.append(position)
+        return positions
+
+    def decisive_hit(self, query: str, hits: list[LexicalHit]) -> LexicalHit | None:
+        """Return the hit that settles the query on its own, if there is one.
+
+        A hit is decisive when the query names a catalog product ID verbatim, or when
+        the best-scoring product's full name is contained in the query and no other
+        hit's name is matched as completely.
+        """
+        id_positions = self.find_ids_in_text(query)
+        if len(id_positions) == 1:
+            return LexicalHit(position=id_positions[0], score=float("inf"))
+
+        if not hits:
+            return None
+
+        query_tokens = set(tokenize(query))
+        covered = [
+            hit
+            for hit in hits
+            if self.name_tokens[hit.position]
+            and self.name_tokens[hit.position] <= query_tokens
+        ]
+        if not covered:
+            return None
+
+        longest = max(len(self.name_tokens[hit.position]) for hit in covered)
+        best = [hit for hit in covered if len(self.name_tokens[hit.position]) == longest]
+        if len(best) == 1 and best[0].position == hits[0].position:
+            return best[0]
+        return None
+
+
+def get_lexical_index(products_df: pd.DataFrame) -> LexicalIndex:
+    """Return the lexical index for the given products DataFrame, building it on first use."""
+    global _lexical_index
+
+    lexical_index = _lexical_index
+    if lexical_index is not None and lexical_index.products_df is products_df:
+        return lexical_index
+
+    with _lexical_index_lock:
+        if _lexical_index is None or _lexical_index.products_df is not products_df:
+            _lexical_index = LexicalIndex(products_df)
+            logger.debug(
+                get_agent_logger(
+                    "Data",
+                    f"Built lexical index over [yellow]{_lexical_index.size}[/yellow] products",
+                )
+            )
+        return _lexical_index
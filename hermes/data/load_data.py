@@ -3,15 +3,24 @@ import os
 from chromadb.api.models.Collection import Collection  # type: ignore
 
 from hermes.config import HermesConfig
-from hermes.utils.gsheets import read_data_from_gsheet
+from hermes.data.catalog_cache import apply_product_dtypes, load_cached_catalog
+from hermes.data.catalog_registry import CatalogRegistry
+from hermes.data.email_sources import is_email_stream_source, open_email_stream
+from hermes.data.inventory import carry_stock_over, get_inventory
+from hermes.utils.gsheets import (
+    gsheet_snapshots,
+    is_gsheet_id,
+    read_data_from_gsheet,
+    read_gsheet_snapshot,
+)
 from hermes.utils.logger import logger, get_agent_logger
 from hermes.model.enums import ProductCategory
 
 # Module-level ("global") variables, initialized to None
-_products_df: pd.DataFrame | None = None
 vector_store: Collection | None = None
 
-input_spreadsheet_id = HermesConfig().input_spreadsheet_id
+_config = HermesConfig()
+input_spreadsheet_id = _config.input_spreadsheet_id
 
 
 def _parse_data_source(
@@ -27,14 +36,21 @@ def _parse_data_source(
         A tuple (gsheet_id, sheet_name, file_path).
         - If GSheet: (gsheet_id, actual_sheet_name, None)
         - If file: (None, None, file_path) (file_path is assumed to be a CSV)
+
+    Raises:
+        ValueError: If the source is neither an existing file nor a Google Sheet ID, so
+            a mistyped path fails immediately instead of after a network timeout.
     """
     if "#" in source:
         gsheet_id, sheet_name = source.split("#", 1)
+        if not is_gsheet_id(gsheet_id):
+            raise ValueError(
+                f"Source '{source}' is not a valid Google Sheet reference: '{gsheet_id}' is not a spreadsheet ID"
+            )
         return gsheet_id, sheet_name, None
     elif os.path.exists(source):
         return None, None, source
-    else:
-        # Default to assuming it's a GSheet ID using the default_sheet_name
+    elif is_gsheet_id(source):
         logger.warning(
             get_agent_logger(
                 "Data",
@@ -43,12 +59,43 @@ def _parse_data_source(
             )
         )
         return source, default_sheet_name, None
+    else:
+        raise ValueError(
+            f"Source '{source}' not found as a local file and is not a Google Sheet ID"
+        )
+
+
+def prefetch_data_sources(sources: list[tuple[str, str]]) -> None:
+    """Fetch the Google Sheets among (source, default_sheet_name) pairs concurrently.
+
+    Later loads of those sources are then served from the snapshot cache. Local files
+    and invalid sources are left to the loaders.
+    """
+    sheets: list[tuple[str, str]] = []
+    for source, default_sheet_name in sources:
+        try:
+            gsheet_id, sheet_name, _ = _parse_data_source(source, default_sheet_name)
+        except ValueError:
+            continue
+        if gsheet_id and sheet_name:
+            sheets.append((gsheet_id, sheet_name))
+    if sheets:
+        gsheet_snapshots.prefetch(sheets)
 
 
 def load_emails_df(
     source: str = f"{input_spreadsheet_id}#emails", default_sheet_name: str = "emails"
 ) -> pd.DataFrame:
-    """Loads the emails DataFrame from a specified source (Google Sheet or local CSV file)."""
+    """Loads the emails DataFrame from a specified source (Google Sheet or local CSV file).
+
+    Directories, glob patterns and JSONL, mbox or .eml files are parsed in parallel
+    with the email source adapters; use `open_email_stream` to process them as they
+    are decoded instead of loading them all at once.
+    """
+    if is_email_stream_source(source):
+        stream = open_email_stream(source, max_workers=_config.email_parse_workers)
+        return pd.DataFrame(list(stream), columns=["email_id", "subject", "message"])
+
     gsheet_id, sheet_name, file_path = _parse_data_source(source, default_sheet_name)
 
     if file_path:
@@ -73,72 +120,119 @@ def load_emails_df(
         raise ValueError(error_msg)
 
 
-def load_products_df(
-    source: str = f"{input_spreadsheet_id}#products",
-    default_sheet_name: str = "products",
-) -> pd.DataFrame:
-    """Loads the products DataFrame from a specified source (Google Sheet or local CSV file) with memoization.
+def _normalize_products_df(products_df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize category names and apply the typed products schema."""
+    # Normalize category names using regex for specific known issues
+    if "category" in products_df.columns:
+        # quick fix for known issue with kids clothing category
+        products_df["category"] = products_df["category"].astype(str).str.strip()
+        products_df["category"] = products_df["category"].str.replace(
+            r"(?i)Kid(s)?\s*['’]?\s*Clothing",
+            ProductCategory.KIDS_CLOTHING.value,
+            regex=True,
+        )
+    else:
+        logger.warning(
+            get_agent_logger(
+                "Data",
+                "Column 'category' not found in products DataFrame. Skipping normalization.",
+            )
+        )
+    products_df = apply_product_dtypes(products_df)
+    logger.info(
+        get_agent_logger(
+            "Data",
+            f"Loaded and normalized [yellow]{len(products_df)}[/yellow] products",
+        )
+    )
+    return products_df
 
-    Args:
-        source: The source string (e.g., "gsheet_id#sheet_name", "path/to/file.csv").
-        default_sheet_name: The default sheet name if source is a GSheet ID without a sheet name.
+
+def _read_products_df(
+    source: str, default_sheet_name: str = "products"
+) -> tuple[pd.DataFrame, str | None, str | None]:
+    """Read and normalize a products catalog.
+
+    Local files go through the compiled Parquet catalog cache, Google Sheets through
+    the sheet snapshot cache.
 
     Returns:
-        DataFrame with product data
+        The products DataFrame, the local file path it was read from, if any, and the
+        content hash of a Google Sheet export.
     """
-    global _products_df
+    content_hash = None
+    gsheet_id, sheet_name, file_path = _parse_data_source(source, default_sheet_name)
 
-    if _products_df is None:
-        gsheet_id, sheet_name, file_path = _parse_data_source(
-            source, default_sheet_name
-        )
+    if file_path:
+        local_path = file_path
 
-        if file_path:
-            logger.info(
-                get_agent_logger(
-                    "Data",
-                    f"Loading products from local file: [cyan underline]{file_path}[/cyan underline] (assuming CSV format)",
-                )
-            )
-            _products_df = pd.read_csv(file_path)
-        elif gsheet_id and sheet_name:
+        def parse_local_file() -> pd.DataFrame:
             logger.info(
                 get_agent_logger(
                     "Data",
-                    f"Loading products from spreadsheet ID: [cyan underline]{gsheet_id}[/cyan underline], sheet: [yellow]{sheet_name}[/yellow]",
+                    f"Loading products from local file: [cyan underline]{local_path}[/cyan underline] (assuming CSV format)",
                 )
             )
-            _products_df = read_data_from_gsheet(gsheet_id, sheet_name)
-        else:
-            # This case should ideally not be reached
-            error_msg = f"Invalid product data source: {source}"
-            logger.error(get_agent_logger("Data", error_msg))
-            raise ValueError(error_msg)
-
-        if _products_df is not None:
-            # Normalize category names using regex for specific known issues
-            if "category" in _products_df.columns:
-                # quick fix for known issue with kids clothing category
-                _products_df["category"] = (
-                    _products_df["category"].astype(str).str.strip()
-                )
-                _products_df["category"] = _products_df["category"].str.replace(
-                    r"(?i)Kid(s)?\s*['’]?\s*Clothing",
-                    ProductCategory.KIDS_CLOTHING.value,
-                    regex=True,
-                )
-            else:
-                logger.warning(
-                    get_agent_logger(
-                        "Data",
-                        "Column 'category' not found in products DataFrame. Skipping normalization.",
-                    )
-                )
-            logger.info(
-                get_agent_logger(
-                    "Data",
-                    f"Loaded and normalized [yellow]{len(_products_df)}[/yellow] products",
-                )
+            return _normalize_products_df(pd.read_csv(local_path))
+
+        products_df = load_cached_catalog(
+            local_path, _config.catalog_cache_dir, parse_local_file
+        )
+    elif gsheet_id and sheet_name:
+        logger.info(
+            get_agent_logger(
+                "Data",
+                f"Loading products from spreadsheet ID: [cyan underline]{gsheet_id}[/cyan underline], sheet: [yellow]{sheet_name}[/yellow]",
             )
+        )
+        snapshot = read_gsheet_snapshot(gsheet_id, sheet_name)
+        content_hash = snapshot.content_hash
+        products_df = _normalize_products_df(snapshot.to_dataframe())
+    else:
+        # This case should ideally not be reached
+        error_msg = f"Invalid product data source: {source}"
+        logger.error(get_agent_logger("Data", error_msg))
+        raise ValueError(error_msg)
 
-    return _products_df
+    return products_df, file_path, content_hash
+
+
+# Loaded product catalogs by source, reloaded when the source changes
+products_catalog = CatalogRegistry(
+    _read_products_df,
+    default_source=f"{input_spreadsheet_id}#products",
+    remote_ttl_seconds=_config.catalog_remote_ttl_seconds,
+    check_interval_seconds=_config.catalog_reload_check_seconds,
+    # Without an inventory store, reservations live in memory only
+    on_replace=carry_stock_over,
+)
+
+
+def load_products_df(source: str | None = None) -> pd.DataFrame:
+    """Loads the products DataFrame from a specified source (Google Sheet or local CSV file).
+
+    Catalogs are cached per source and reloaded when a local file changes or a Google
+    Sheet's TTL expires. Without a source, the catalog pinned for the current email
+    (see `pin_products_catalog`) or the most recently requested one is returned.
+
+    With INVENTORY_DB_PATH set, the stock column reflects the shared inventory
+    database, including reservations made by other worker processes.
+
+    Args:
+        source: The source string (e.g., "gsheet_id#sheet_name", "path/to/file.csv").
+
+    Returns:
+        DataFrame with product data
+    """
+    products_df = products_catalog.get(source)
+    if _config.inventory_db_path:
+        get_inventory(products_df).refresh()
+    return products_df
+
+
+def pin_products_catalog(source: str | None = None):
+    """Keep serving the current products catalog to this context, e.g. for one email.
+
+    A reload during the block swaps the catalog for new work only.
+    """
+    return products_catalog.pin(source)
@@ -0,0 +1,217 @@
+"""Product ID extraction and typo-tolerant ID matching.
+
+Product IDs follow a strict pattern of three letters and four digits, but customers
+write them as "LTH 0976", "lth-0976" or with transposed digits. The matcher normalizes
+those spellings with a regex and corrects small typos with a BK-tree over the catalog
+IDs, so a mention can be resolved to an exact product before any embedding work.
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+
+import pandas as pd  # type: ignore
+
+from hermes.utils.logger import logger, get_agent_logger
+
+
+# Maximum edit distance at which a written ID is corrected to a catalog ID
+MAX_ID_EDIT_DISTANCE = 2
+
+# IDs scanned from free text are more likely to be false positives ("the 2024"), so
+# they are only corrected for a single typo
+MAX_TEXT_ID_EDIT_DISTANCE = 1
+
+# Three letters and four digits, optionally separated by a space, dash or underscore
+# and optionally wrapped in brackets, e.g. "LTH0976", "lth-0976", "[LTH 0976]"
+PRODUCT_ID_PATTERN = re.compile(
+    r"(?<![A-Za-z0-9])([A-Za-z]{3})[\s\-_]?(\d{4})(?![A-Za-z0-9])"
+)
+
+_product_id_matcher: "ProductIdMatcher | None" = None
+_product_id_matcher_lock = threading.Lock()
+
+
+def normalize_product_id(text: str | None) -> str | None:
+    """Return the canonical form of a product ID written in any accepted format.
+
+    Returns:
+        The upper-case ID without separators, or None if the text is not ID-shaped.
+    """
+    if not text:
+        return None
+    match = PRODUCT_ID_PATTERN.fullmatch(text.strip().strip("[]()"))
+    if match is None:
+        return None
+    return f"{match.group(1)}{match.group(2)}".upper()
+
+
+def extract_product_ids(text: str | None) -> list[str]:
+    """Return the normalized product IDs found in free text, in order of appearance."""
+    found: list[str] = []
+    for match in PRODUCT_ID_PATTERN.finditer(text or ""):
+        product_id = f"{match.group(1)}{match.group(2)}".upper()
+        if product_id not in found:
+            found.append(product_id)
+    return found
+
+
+def id_edit_distance(a: str, b: str) -> int:
+    """Edit distance counting insertions, deletions, substitutions and adjacent
+    transpositions (optimal string alignment), so "LTH0967" is one edit from "LTH0976".
+    """
+    previous_previous: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + cost,
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        previous_previous, previous = previous, current
+    return previous[len(b)]
+
+
+@dataclass
+class IdMatch:
+    """A catalog product ID matched from a written ID."""
+
+    written_id: str
+    product_id: str
+    position: int
+    distance: int
+
+    @property
+    def corrected(self) -> bool:
+        """Whether the written ID needed a typo correction (not just reformatting)."""
+        return self.distance > 0
+
+
+class _BKTree:
+    """Burkhard-Keller tree for nearest-neighbour lookups under an edit distance."""
+
+    def __init__(self, words: list[str]):
+        self._root: tuple[str, dict[int, tuple]] | None = None
+        for word in words:
+            self._add(word)
+
+    def _add(self, word: str) -> None:
+        if self._root is None:
+            self._root = (word, {})
+            return
+        node = self._root
+        while True:
+            distance = id_edit_distance(word, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                return
+            node = child
+
+    def search(self, word: str, max_distance: int) -> list[tuple[int, str]]:
+        """Return (distance, word) pairs within max_distance, closest first."""
+        results: list[tuple[int, str]] = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node_word, children = stack.pop()
+            distance = id_edit_distance(word, node_word)
+            if distance <= max_distance:
+                results.append((distance, node_word))
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return sorted(results)
+
+
+class ProductIdMatcher:
+    """Matches written product IDs against the catalog IDs of a products DataFrame."""
+
+    def __init__(self, products_df: pd.DataFrame):
+        # Holding the DataFrame keeps its identity stable for `get_product_id_matcher`
+        self.products_df = products_df
+
+        self._position_by_id: dict[str, int] = {}
+        for position, product_id in enumerate(
+            products_df["product_id"].astype(str).str.upper()
+        ):
+            self._position_by_id.setdefault(product_id, position)
+        self._tree = _BKTree(list(self._position_by_id))
+
+    def match(
+        self, written_id: str, max_distance: int = MAX_ID_EDIT_DISTANCE
+    ) -> list[IdMatch]:
+        """Match a written ID to the closest catalog IDs.
+
+        Args:
+            written_id: The ID as written by the customer, in any accepted format.
+            max_distance: Maximum edit distance for a typo correction.
+
+        Returns:
+            The catalog IDs at the smallest edit distance found (several if the
+            correction is ambiguous), or an empty list if the text is not ID-shaped
+            or nothing is close enough.
+        """
+        normalized = normalize_product_id(written_id)
+        if normalized is None:
+            return []
+
+        position = self._position_by_id.get(normalized)
+        if position is not None:
+            return [IdMatch(written_id, normalized, position, 0)]
+
+        neighbours = self._tree.search(normalized, max_distance)
+        if not neighbours:
+            return []
+        closest = neighbours[0][0]
+        return [
+            IdMatch(written_id, product_id, self._position_by_id[product_id], distance)
+            for distance, product_id in neighbours
+            if distance == closest
+        ]
+
+    def match_text(
+        self, text: str | None, max_distance: int = MAX_TEXT_ID_EDIT_DISTANCE
+    ) -> list[IdMatch]:
+        """Scan free text for ID-shaped tokens and match each one unambiguously.
+
+        Returns:
+            One match per written ID that resolves to a single catalog ID.
+        """
+        matches: list[IdMatch] = []
+        for written_id in extract_product_ids(text):
+            id_matches = self.match(written_id, max_distance)
+            if len(id_matches) == 1 and all(
+                m.product_id != id_matches[0].product_id for m in matches
+            ):
+                matches.append(id_matches[0])
+        return matches
+
+
+def get_product_id_matcher(products_df: pd.DataFrame) -> ProductIdMatcher:
+    """Return the ID matcher for the given products DataFrame, building it on first use."""
+    global _product_id_matcher
+
+    product_id_matcher = _product_id_matcher
+    if product_id_matcher is not None and product_id_matcher.products_df is products_df:
+        return product_id_matcher
+
+    with _product_id_matcher_lock:
+        if (
+            _product_id_matcher is None
+            or _product_id_matcher.products_df is not products_df
+        ):
+            _product_id_matcher = ProductIdMatcher(products_df)
+            logger.debug(
+                get_agent_logger(
+                    "Data",
+                    f"Built product ID matcher over [yellow]{len(_product_id_matcher._position_by_id)}[/yellow] IDs",
+                )
+            )
+        return _product_id_matcher
@@ -0,0 +1,143 @@
+"""Promotions offered on catalog products, loaded from a YAML or JSON file.
+
+Each entry names a product, the promotion text shown to customers and the
+`PromotionSpec` that prices it:
+
+    - product_id: CBG9876
+      promotion_text: Buy one, get one 50% off!
+      spec:
+        conditions: {min_quantity: 2}
+        effects: {apply_discount: {type: bogo_half, amount: 50, to_product_id: CBG9876}}
+
+The file is read and validated once per catalog load and joined onto products by the
+`CatalogIndex`, so resolved candidates carry ready-made specs and nothing has to be
+inferred from descriptions per email. It is only read again when it changes.
+"""
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+import yaml
+from pydantic import ValidationError
+
+from hermes.config import HermesConfig
+from hermes.model.promotions import PromotionSpec
+from hermes.utils.logger import logger, get_agent_logger
+
+
+@dataclass(frozen=True)
+class CatalogPromotion:
+    """A validated promotion attached to one catalog product."""
+
+    product_id: str
+    spec: PromotionSpec
+    text: str | None = None
+
+
+def parse_promotions(
+    entries: Any, source: str = "<promotions>"
+) -> dict[str, CatalogPromotion]:
+    """Validate promotion entries and key them by upper-case product ID.
+
+    Args:
+        entries: A list of mappings with product_id, spec and optional promotion_text
+            (or a mapping with such a list under "promotions").
+        source: Name of the file the entries come from, used in error messages.
+
+    Returns:
+        The promotions by product ID.
+
+    Raises:
+        ValueError: If an entry is malformed, its spec is invalid or a product has
+            more than one promotion.
+    """
+    if isinstance(entries, dict):
+        entries = entries.get("promotions")
+    if entries is None:
+        return {}
+    if not isinstance(entries, list):
+        raise ValueError(f"{source}: expected a list of promotions")
+
+    promotions: dict[str, CatalogPromotion] = {}
+    for number, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict) or not entry.get("product_id"):
+            raise ValueError(f"{source}: promotion #{number} has no product_id")
+        product_id = str(entry["product_id"]).strip().upper()
+        if product_id in promotions:
+            raise ValueError(f"{source}: more than one promotion for {product_id}")
+        try:
+            spec = PromotionSpec.model_validate(entry.get("spec"))
+        except ValidationError as e:
+            raise ValueError(
+                f"{source}: invalid promotion spec for {product_id}: {e}"
+            ) from e
+        text = entry.get("promotion_text")
+        promotions[product_id] = CatalogPromotion(
+            product_id=product_id,
+            spec=spec,
+            text=str(text) if text else None,
+        )
+    return promotions
+
+
+def load_promotions(path: str) -> dict[str, CatalogPromotion]:
+    """Read and validate a promotions file (.yaml/.yml or .json).
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ValueError: If the file's contents are invalid.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            entries = json.load(f)
+        else:
+            entries = yaml.safe_load(f)
+    promotions = parse_promotions(entries, source=path)
+    logger.info(
+        get_agent_logger(
+            "Data",
+            f"Loaded [yellow]{len(promotions)}[/yellow] promotions from [cyan underline]{path}[/cyan underline]",
+        )
+    )
+    return promotions
+
+
+_catalog_promotions: dict[str, CatalogPromotion] = {}
+# (path, mtime_ns, size) of the file _catalog_promotions was loaded from
+_catalog_promotions_key: tuple[str, int, int] | None = None
+_catalog_promotions_lock = threading.Lock()
+
+
+def get_catalog_promotions(path: str | None = None) -> dict[str, CatalogPromotion]:
+    """Return the promotions from path (default: PROMOTIONS_PATH), loading them once.
+
+    The file is only parsed again when its modification time or size changes, so the
+    same dictionary object is returned until then. Without a configured path, or if
+    the file does not exist, there are no promotions.
+    """
+    global _catalog_promotions, _catalog_promotions_key
+
+    if path is None:
+        path = HermesConfig().promotions_path
+    if not path:
+        return {}
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        logger.warning(
+            get_agent_logger(
+                "Data",
+                f"Promotions file [cyan underline]{path}[/cyan underline] not found; products have no promotions",
+            )
+        )
+        return {}
+
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _catalog_promotions_lock:
+        if _catalog_promotions_key != key:
+            _catalog_promotions = load_promotions(path)
+            _catalog_promotions_key = key
+        return _catalog_promotions
@@ -0,0 +1,371 @@
+"""Compact in-memory vector index with int8 and Matryoshka-truncated storage.
+
+Product vectors are stored as int8 (per-dimension scalar quantization) and/or truncated
+to their first `truncate_dim` dimensions (Matryoshka-style, re-normalized), which cuts
+index memory by 4x for int8 alone and more when combined with truncation. A search
+scores every product with the compact vectors, then re-ranks the top
+`k * rerank_factor` candidates with full-precision vectors fetched on demand (from
+Chroma, which keeps them on disk). `measure_recall` reports how much recall the
+compact representation costs against an exact full-precision search.
+"""
+
+from functools import cached_property
+from typing import Any, Callable, Literal
+
+import numpy as np
+import pandas as pd  # type: ignore
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from hermes.utils.logger import logger, get_agent_logger
+
+
+VectorQuantization = Literal["none", "int8"]
+
+# Rows scored per block, to bound the float32 temporaries created from int8 codes
+_SCORE_BLOCK_ROWS = 8192
+
+FullVectorLoader = Callable[[np.ndarray], np.ndarray]
+
+
+def truncate_vectors(vectors: np.ndarray, truncate_dim: int) -> np.ndarray:
+    """Keep the first truncate_dim dimensions and re-normalize each row.
+
+    Matryoshka-trained embeddings (such as OpenAI's text-embedding-3 models) keep most
+    of their quality when shortened this way. A truncate_dim of 0 keeps all dimensions.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if truncate_dim <= 0 or truncate_dim >= vectors.shape[-1]:
+        return vectors
+    truncated = vectors[..., :truncate_dim]
+    norms = np.linalg.norm(truncated, axis=-1, keepdims=True)
+    return truncated / np.where(norms == 0, 1.0, norms)
+
+
+def squared_l2(query: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """Squared L2 distance from query to each row, the metric Chroma reports."""
+    diff = vectors - query
+    return np.einsum("ij,ij->i", diff, diff)
+
+
+class QuantizedVectorIndex:
+    """Brute-force vector index over compact vectors with full-precision re-ranking."""
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        quantization: VectorQuantization = "int8",
+        truncate_dim: int = 0,
+        rerank_factor: int = 4,
+        full_vector_loader: FullVectorLoader | None = None,
+    ):
+        """Build the index.
+
+        Args:
+            vectors: Full-precision vectors, one row per product. Not retained.
+            quantization: "int8" for scalar quantization, "none" to keep float32.
+            truncate_dim: Number of leading dimensions to keep, 0 for all.
+            rerank_factor: Candidates re-ranked per requested result.
+            full_vector_loader: Returns full-precision vectors for row positions. If
+                None, results are ranked by the compact vectors alone.
+        """
+        reduced = truncate_vectors(vectors, truncate_dim)
+        self.size, self.dims = reduced.shape
+        self.full_dims = np.asarray(vectors).shape[1]
+        self.quantization = quantization
+        self.truncate_dim = truncate_dim
+        self.rerank_factor = max(1, rerank_factor)
+        self.full_vector_loader = full_vector_loader
+
+        if quantization == "int8":
+            max_abs = np.abs(reduced).max(axis=0)
+            self.scales = np.where(max_abs == 0, 1.0, max_abs / 127.0).astype(np.float32)
+            self.codes = np.clip(np.rint(reduced / self.scales), -127, 127).astype(
+                np.int8
+            )
+            dequantized = self.codes.astype(np.float32) * self.scales
+            self.norms = np.einsum("ij,ij->i", dequantized, dequantized)
+        else:
+            self.scales = None
+            self.codes = reduced
+            self.norms = np.einsum("ij,ij->i", reduced, reduced)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        codes: np.ndarray,
+        norms: np.ndarray,
+        scales: np.ndarray | None,
+        full_dims: int,
+        truncate_dim: int = 0,
+        rerank_factor: int = 4,
+        full_vector_loader: FullVectorLoader | None = None,
+    ) -> "QuantizedVectorIndex":
+        """Wrap precomputed compact vectors (e.g. memory-mapped) without copying them.
+
+        Args:
+            codes: Compact vectors: int8 codes if scales are given, float32 otherwise.
+            norms: Squared L2 norm of each (dequantized) compact vector.
+            scales: Per-dimension int8 scales, or None for float32 codes.
+            full_dims: Dimensions of the original vectors.
+            truncate_dim: Number of leading dimensions the codes keep, 0 for all.
+            rerank_factor: Candidates re-ranked per requested result.
+            full_vector_loader: Returns full-precision vectors for row positions.
+        """
+        index = cls.__new__(cls)
+        index.size, index.dims = codes.shape
+        index.full_dims = full_dims
+        index.quantization = "int8" if scales is not None else "none"
+        index.truncate_dim = truncate_dim
+        index.rerank_factor = max(1, rerank_factor)
+        index.full_vector_loader = full_vector_loader
+        index.scales = scales
+        index.codes = codes
+        index.norms = norms
+        return index
+
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes held by the compact index."""
+        scales_bytes = self.scales.nbytes if self.scales is not None else 0
+        return self.codes.nbytes + self.norms.nbytes + scales_bytes
+
+    @property
+    def full_precision_bytes(self) -> int:
+        """Bytes a float32 index of the original vectors would need."""
+        return self.size * self.full_dims * 4
+
+    def approximate_distances(self, query: np.ndarray) -> np.ndarray:
+        """Squared L2 distance from the query to every row using the compact vectors."""
+        reduced_query = truncate_vectors(query, self.truncate_dim)
+        scaled_query = (
+            reduced_query * self.scales if self.scales is not None else reduced_query
+        )
+        dots = np.empty(self.size, dtype=np.float32)
+        for start in range(0, self.size, _SCORE_BLOCK_ROWS):
+            block = self.codes[start : start + _SCORE_BLOCK_ROWS]
+            dots[start : start + len(block)] = block.astype(np.float32) @ scaled_query
+        return float(reduced_query @ reduced_query) + self.norms - 2.0 * dots
+
+    def search(
+        self, query: np.ndarray, k: int, mask: np.ndarray | None = None
+    ) -> list[tuple[int, float]]:
+        """Return the k nearest rows as (position, squared L2 distance), closest first.
+
+        Args:
+            query: Full-precision query vector.
+            k: Number of results.
+            mask: Optional boolean array of rows that may be returned.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        distances = self.approximate_distances(query)
+        if mask is not None:
+            distances = np.where(mask, distances, np.inf)
+
+        eligible = int(np.count_nonzero(np.isfinite(distances)))
+        if k <= 0 or eligible == 0:
+            return []
+
+        num_candidates = min(eligible, k * self.rerank_factor)
+        candidates = np.argpartition(distances, num_candidates - 1)[:num_candidates]
+
+        if self.full_vector_loader is not None:
+            exact = squared_l2(query, self.full_vector_loader(candidates))
+            order = np.lexsort((candidates, exact))[:k]
+            return [(int(candidates[i]), float(exact[i])) for i in order]
+
+        order = np.lexsort((candidates, distances[candidates]))[:k]
+        return [(int(candidates[i]), float(distances[candidates[i]])) for i in order]
+
+
+def exact_search(
+    vectors: np.ndarray, query: np.ndarray, k: int
+) -> list[tuple[int, float]]:
+    """Full-precision brute-force search, the reference for recall checks."""
+    distances = squared_l2(np.asarray(query, dtype=np.float32), vectors)
+    order = np.lexsort((np.arange(len(distances)), distances))[:k]
+    return [(int(i), float(distances[i])) for i in order]
+
+
+def measure_recall(
+    index: QuantizedVectorIndex,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+) -> float:
+    """Mean recall@k of the index against an exact full-precision search.
+
+    Args:
+        index: The compact index to evaluate.
+        vectors: The full-precision vectors the index was built from.
+        queries: Query vectors, one per row.
+        k: Number of neighbours compared per query.
+
+    Returns:
+        The fraction of true top-k neighbours the index returned, averaged over queries.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    k = min(k, len(vectors))
+    if k == 0 or len(queries) == 0:
+        return 1.0
+    recalls = []
+    for query in np.asarray(queries, dtype=np.float32):
+        expected = {position for position, _ in exact_search(vectors, query, k)}
+        found = {position for position, _ in index.search(query, k)}
+        recalls.append(len(expected & found) / k)
+    return float(np.mean(recalls))
+
+
+_COMPARISONS = {
+    "$eq": lambda column, value: column == value,
+    "$ne": lambda column, value: column != value,
+    "$gt": lambda column, value: pd.to_numeric(column, errors="coerce") > value,
+    "$gte": lambda column, value: pd.to_numeric(column, errors="coerce") >= value,
+    "$lt": lambda column, value: pd.to_numeric(column, errors="coerce") < value,
+    "$lte": lambda column, value: pd.to_numeric(column, errors="coerce") <= value,
+    "$in": lambda column, value: column.isin(value),
+    "$nin": lambda column, value: ~column.isin(value),
+}
+
+
+def where_mask(metadata: pd.DataFrame, where: dict[str, Any] | None) -> np.ndarray:
+    """Evaluate a Chroma-style metadata filter over a metadata frame.
+
+    Supports "$and", "$or", plain equality and the comparison operators used by the
+    catalog tools ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin").
+    """
+    mask = np.ones(len(metadata), dtype=bool)
+    for key, condition in (where or {}).items():
+        if key == "$and":
+            for clause in condition:
+                mask &= where_mask(metadata, clause)
+        elif key == "$or":
+            any_mask = np.zeros(len(metadata), dtype=bool)
+            for clause in condition:
+                any_mask |= where_mask(metadata, clause)
+            mask &= any_mask
+        elif key not in metadata.columns:
+            mask &= False
+        elif isinstance(condition, dict):
+            for operator, value in condition.items():
+                if operator not in _COMPARISONS:
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+                mask &= _COMPARISONS[operator](metadata[key], value).to_numpy(
+                    dtype=bool
+                )
+        else:
+            mask &= (metadata[key] == condition).to_numpy(dtype=bool)
+    return mask
+
+
+class QuantizedVectorStore:
+    """Serves `similarity_search_with_score` from a QuantizedVectorIndex.
+
+    Drop-in for the Chroma vector store as far as the catalog tools are concerned.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        index: QuantizedVectorIndex,
+        documents: list[Document],
+    ):
+        self.embeddings = embeddings
+        self.index = index
+        self.documents = documents
+
+    @cached_property
+    def _metadata(self) -> pd.DataFrame:
+        # Only needed for filtered searches, so built on first use
+        return pd.DataFrame([doc.metadata for doc in self.documents])
+
+    def _filter_mask(self, filter: dict[str, Any]) -> np.ndarray:
+        return where_mask(self._metadata, filter)
+
+    @classmethod
+    def from_chroma(
+        cls,
+        chroma: Any,
+        quantization: VectorQuantization = "int8",
+        truncate_dim: int = 0,
+        rerank_factor: int = 4,
+        recall_sample_size: int = 50,
+    ) -> "QuantizedVectorStore":
+        """Build from the vectors of a populated Chroma store and log a recall check.
+
+        Full-precision vectors stay in Chroma and are fetched for re-ranking only.
+        """
+        collection = chroma._collection
+        data = collection.get(include=["embeddings", "metadatas", "documents"])
+        ids = list(data["ids"])
+        vectors = np.asarray(data["embeddings"], dtype=np.float32)
+        documents = [
+            Document(page_content=content or "", metadata=metadata or {})
+            for content, metadata in zip(data["documents"], data["metadatas"])
+        ]
+
+        def load_full_vectors(positions: np.ndarray) -> np.ndarray:
+            wanted = [ids[position] for position in positions]
+            fetched = collection.get(ids=wanted, include=["embeddings"])
+            by_id = dict(zip(fetched["ids"], fetched["embeddings"]))
+            return np.asarray(
+                [by_id[product_id] for product_id in wanted], dtype=np.float32
+            )
+
+        index = QuantizedVectorIndex(
+            vectors,
+            quantization=quantization,
+            truncate_dim=truncate_dim,
+            rerank_factor=rerank_factor,
+            full_vector_loader=load_full_vectors,
+        )
+
+        # Products themselves serve as queries: their neighbours are what resolution
+        # needs to get right
+        sample_size = min(recall_sample_size, len(vectors))
+        sample = vectors[np.linspace(0, len(vectors) - 1, sample_size).astype(int)]
+        recall = measure_recall(index, vectors, sample, k=10)
+        logger.info(
+            get_agent_logger(
+                "Data",
+                f"Compact vector index ({quantization}, {index.dims} dims): "
+                f"[yellow]{index.memory_bytes / 1024:.0f} KiB[/yellow] vs "
+                f"{index.full_precision_bytes / 1024:.0f} KiB full precision, "
+                f"recall@10 [yellow]{recall:.3f}[/yellow]",
+            )
+        )
+        return cls(chroma.embeddings, index, documents)
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: dict[str, Any] | None = None,
+        row_mask: np.ndarray | None = None,
+    ) -> list[tuple[Document, float]]:
+        """Return the k nearest documents with their squared L2 distances."""
+        return self.similarity_search_by_vector_with_relevance_scores(
+            self.embeddings.embed_query(query), k, filter, row_mask
+        )
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self,
+        embedding: list[float],
+        k: int = 4,
+        filter: dict[str, Any] | None = None,
+        row_mask: np.ndarray | None = None,
+    ) -> list[tuple[Document, float]]:
+        """Return the k nearest documents to an already embedded query.
+
+        Mirrors Chroma's method of the same name: the scores are squared L2 distances.
+        `row_mask` additionally restricts the search to the rows (documents) it marks,
+        for conditions that are not part of the metadata, such as live stock.
+        """
+        query_vector = np.asarray(embedding, dtype=np.float32)
+        mask = self._filter_mask(filter) if filter else None
+        if row_mask is not None:
+            mask = row_mask if mask is None else mask & row_mask
+        return [
+            (self.documents[position], distance)
+            for position, distance in self.index.search(query_vector, k, mask)
+        ]
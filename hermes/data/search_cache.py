@@ -0,0 +1,108 @@
+"""Bounded LRU caches for product search results.
+
+The same (query, filters, top_k) combinations are searched over and over across
+emails. Each cache entry is tagged with a version (e.g. the catalog version), and an
+entry whose version no longer matches is treated as a miss, so stock updates and
+catalog reloads never serve stale results.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+DEFAULT_SEARCH_CACHE_SIZE = 1024
+
+_MISSING = object()
+
+
+def normalize_query(text: str | None) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share a key."""
+    return " ".join(str(text or "").lower().split())
+
+
+class SearchCache:
+    """Thread-safe bounded LRU cache with version-tagged entries and hit statistics."""
+
+    def __init__(self, name: str, max_entries: int = DEFAULT_SEARCH_CACHE_SIZE):
+        self.name = name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: Any, default: Any = None) -> Any:
+        """Return the cached value for key if it was stored under the same version.
+
+        Args:
+            key: The cache key.
+            version: The version the value must have been stored under.
+            default: Returned on a miss.
+
+        Returns:
+            The cached value, or default if absent or stale.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                # Stale entry: drop it now rather than waiting for eviction
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, version: Any, value: Any) -> None:
+        """Store a value under key and version, evicting the least recently used entry."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Drop all entries, keeping the statistics."""
+        with self._lock:
+            self._entries.clear()
+
+    def clear(self) -> None:
+        """Drop all entries and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self) -> str:
+        """One-line description of the cache statistics."""
+        return (
+            f"{self.name}: {self.hits}/{self.hits + self.misses} hits "
+            f"({self.hit_rate:.1%}), {len(self)} entries"
+        )
+
+
+# Candidates returned by resolve_product_mention, tagged with the catalog version
+resolve_mention_cache = SearchCache("resolve_product_mention")
+
+# Raw vector store results, tagged with the vector store instance
+vector_search_cache = SearchCache("vector_search")
+
+
+def search_cache_summary() -> str:
+    """Statistics of all search caches, for the run summary."""
+    return "; ".join(
+        cache.summary() for cache in (resolve_mention_cache, vector_search_cache)
+    )
@@ -1,13 +1,26 @@
 """Shared vector store logic for Hermes: always uses persistent ChromaDB in ./chroma_db with a fixed embedding model."""
 
+import asyncio
 import os
-from typing import Optional, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, Dict, Any, Union
 
+import numpy as np
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
 
-from hermes.data.load_data import load_products_df
+from hermes.data.embeddings import create_embeddings, embedding_collection_name
+from hermes.data.index_snapshot import (
+    catalog_hash,
+    load_snapshot_vector_store,
+    source_hash,
+    write_index_snapshot,
+)
+from hermes.data.load_data import load_products_df, products_catalog
+from hermes.data.quantized_index import QuantizedVectorStore
+from hermes.data.search_cache import resolve_mention_cache, vector_search_cache
 from hermes.model import ProductCategory, Season
 from hermes.model.product import Product
 from hermes.utils.logger import logger, get_agent_logger
@@ -15,7 +28,9 @@ from hermes.config import HermesConfig
 
 
 # Global cache
-_vector_store: Optional[Chroma] = None
+_vector_store: Optional[Union[Chroma, QuantizedVectorStore]] = None
+_search_executor: Optional[ThreadPoolExecutor] = None
+_search_executor_lock = threading.Lock()
 
 
 def product_to_metadata(product_row) -> Dict[str, Any]:
@@ -164,31 +179,85 @@ def metadata_to_product(metadata: Dict[str, Any]) -> Product:
     )
 
 
-def get_vector_store(config: HermesConfig = HermesConfig()) -> Chroma:
-    """Get or create the persistent Chroma vector store for the product catalog."""
-    global _vector_store
-    if _vector_store is not None:
-        return _vector_store
+def product_to_document(product_row) -> Document:
+    """Convert a DataFrame row to the document stored in the vector store."""
+    # Ensure page content is a string, handling potential NaNs from DataFrame
+    name_str = str(product_row.get("name", ""))
+    description_str = str(product_row.get("description", ""))
+    content = f"{name_str} {description_str}".strip()
+    return Document(
+        page_content=content
+        if content
+        else "No content available",  # Ensure non-empty content
+        metadata=product_to_metadata(product_row),
+    )
 
-    logger.info(get_agent_logger("Data", "Initializing vector store..."))
 
+def _sync_collection(vector_store_instance: Chroma, products_df) -> None:
+    """Bring a persisted collection in line with the catalog.
+
+    New products and products whose text changed are embedded, metadata-only changes
+    are written without re-embedding, and products no longer in the catalog are
+    removed.
+    """
+    stored = vector_store_instance._collection.get(include=["documents", "metadatas"])
+    stored_by_id = {
+        product_id: (content, metadata or {})
+        for product_id, content, metadata in zip(
+            stored["ids"], stored["documents"], stored["metadatas"]
+        )
+    }
+
+    to_embed: list[Document] = []
+    to_embed_ids: list[str] = []
+    to_update_ids: list[str] = []
+    to_update_metadatas: list[Dict[str, Any]] = []
+    catalog_ids = set()
+    for _, row in products_df.iterrows():
+        document = product_to_document(row)
+        product_id = str(row["product_id"])
+        catalog_ids.add(product_id)
+        stored_content, stored_metadata = stored_by_id.get(product_id, (None, {}))
+        if stored_content != document.page_content:
+            to_embed.append(document)
+            to_embed_ids.append(product_id)
+            continue
+        # Chroma drops None values, so compare without them
+        metadata = {k: v for k, v in document.metadata.items() if v is not None}
+        if stored_metadata != metadata:
+            to_update_ids.append(product_id)
+            to_update_metadatas.append(metadata)
+    removed_ids = [pid for pid in stored_by_id if pid not in catalog_ids]
+
+    if to_embed:
+        vector_store_instance.add_documents(documents=to_embed, ids=to_embed_ids)
+    if to_update_ids:
+        vector_store_instance._collection.update(
+            ids=to_update_ids, metadatas=to_update_metadatas
+        )
+    if removed_ids:
+        vector_store_instance.delete(ids=removed_ids)
+    if to_embed or to_update_ids or removed_ids:
+        logger.info(
+            get_agent_logger(
+                "Data",
+                f"Synced vector store with the catalog: [yellow]{len(to_embed)}[/yellow] embedded, [yellow]{len(to_update_ids)}[/yellow] metadata updates, [yellow]{len(removed_ids)}[/yellow] removed",
+            )
+        )
+
+
+def open_chroma_store(config: HermesConfig = HermesConfig()) -> Chroma:
+    """Open the persistent Chroma store, populating it from the catalog if empty."""
     # Ensure persistent directory exists
     os.makedirs(config.chroma_db_path, exist_ok=True)
 
-    embedding_kwargs = {
-        "model": config.embedding_model_name,
-        "dimensions": config.chroma_embedding_dim,
-        "api_key": config.llm_api_key,
-        "base_url": config.llm_provider_url
-        if config.llm_provider == "OpenAI"
-        else None,
-    }
-    embeddings = OpenAIEmbeddings(**embedding_kwargs)
+    # OpenAI or local sentence-transformers embeddings, per config.embedding_model_name
+    embeddings = create_embeddings(config)
 
     # Load or create the Chroma vector store instance
     # This will load if exists, or create a new empty one if it doesn't.
     vector_store_instance = Chroma(
-        collection_name=config.chroma_collection_name,
+        collection_name=embedding_collection_name(config),
         embedding_function=embeddings,
         persist_directory=config.chroma_db_path,
     )
@@ -199,9 +268,10 @@ def get_vector_store(config: HermesConfig = HermesConfig()) -> Chroma:
         logger.info(
             get_agent_logger(
                 "Data",
-                f"Loaded existing vector store. Collection '[yellow]{config.chroma_collection_name}[/yellow]' in '[cyan underline]{config.chroma_db_path}[/cyan underline]' already contains [yellow]{doc_count}[/yellow] documents. Skipping re-population.",
+                f"Loaded existing vector store. Collection '[yellow]{config.chroma_collection_name}[/yellow]' in '[cyan underline]{config.chroma_db_path}[/cyan underline]' already contains [yellow]{doc_count}[/yellow] documents.",
             )
         )
+        _sync_collection(vector_store_instance, load_products_df())
     else:
         logger.info(
             get_agent_logger(
@@ -218,20 +288,7 @@ def get_vector_store(config: HermesConfig = HermesConfig()) -> Chroma:
         documents = []
         doc_ids = []
         for _, row in products_df.iterrows():
-            # Ensure page content is a string, handling potential NaNs from DataFrame
-            name_str = str(row.get("name", ""))
-            description_str = str(row.get("description", ""))
-            content = f"{name_str} {description_str}".strip()
-
-            metadata_for_doc = product_to_metadata(row)
-            documents.append(
-                Document(
-                    page_content=content
-                    if content
-                    else "No content available",  # Ensure non-empty content
-                    metadata=metadata_for_doc,
-                )
-            )
+            documents.append(product_to_document(row))
             doc_ids.append(str(row["product_id"]))
 
         vector_store_instance.add_documents(documents=documents, ids=doc_ids)
@@ -242,5 +299,207 @@ def get_vector_store(config: HermesConfig = HermesConfig()) -> Chroma:
             )
         )
 
-    _vector_store = vector_store_instance
+    return vector_store_instance
+
+
+def get_vector_store(
+    config: HermesConfig = HermesConfig(),
+) -> Union[Chroma, QuantizedVectorStore]:
+    """Get or create the vector store for the product catalog.
+
+    If `index_snapshot_dir` holds a snapshot of the current catalog, it is
+    memory-mapped instead of opening Chroma. Otherwise the persistent Chroma store is
+    used; with `vector_quantization` or `vector_truncate_dim` configured, searches are
+    served by a compact in-memory index built from the Chroma vectors, and Chroma keeps
+    the full-precision vectors used for re-ranking.
+    """
+    global _vector_store
+    if _vector_store is not None:
+        return _vector_store
+
+    logger.info(get_agent_logger("Data", "Initializing vector store..."))
+
+    if config.index_snapshot_dir:
+        products_df = load_products_df()
+        snapshot_store = load_snapshot_vector_store(
+            config.index_snapshot_dir,
+            create_embeddings(config),
+            lambda: catalog_hash(
+                products_df,
+                config.embedding_model_name,
+                config.chroma_embedding_dim,
+            ),
+            quantization=config.vector_quantization,
+            truncate_dim=config.vector_truncate_dim,
+            rerank_factor=config.vector_rerank_factor,
+            expected_source_hash=source_hash(
+                products_catalog.content_hash(),
+                config.embedding_model_name,
+                config.chroma_embedding_dim,
+            ),
+        )
+        if snapshot_store is not None:
+            _vector_store = snapshot_store
+            return _vector_store
+
+    vector_store_instance = open_chroma_store(config)
+
+    if config.vector_quantization != "none" or config.vector_truncate_dim > 0:
+        _vector_store = QuantizedVectorStore.from_chroma(
+            vector_store_instance,
+            quantization=config.vector_quantization,
+            truncate_dim=config.vector_truncate_dim,
+            rerank_factor=config.vector_rerank_factor,
+        )
+    else:
+        _vector_store = vector_store_instance
     return _vector_store
+
+
+def build_index_snapshot(
+    snapshot_dir: str, config: HermesConfig = HermesConfig()
+) -> str:
+    """Write a memory-mappable index snapshot of the current catalog.
+
+    Vectors already stored in Chroma for an unchanged product are reused; new or
+    edited products are embedded.
+
+    Args:
+        snapshot_dir: Directory holding the snapshots.
+        config: Hermes configuration (embedding model, Chroma location).
+
+    Returns:
+        Path of the new snapshot directory.
+    """
+    products_df = load_products_df()
+    if products_df is None or products_df.empty:
+        raise ValueError("Product catalog is empty, cannot build an index snapshot.")
+
+    chroma = open_chroma_store(config)
+    documents = [product_to_document(row) for _, row in products_df.iterrows()]
+    product_ids = [doc.metadata["product_id"] for doc in documents]
+
+    stored = chroma._collection.get(
+        ids=product_ids, include=["embeddings", "documents"]
+    )
+    stored_by_id = {
+        product_id: (embedding, content)
+        for product_id, embedding, content in zip(
+            stored["ids"], stored["embeddings"], stored["documents"]
+        )
+    }
+
+    vectors: list[Any] = [None] * len(documents)
+    stale_positions = []
+    for position, (product_id, doc) in enumerate(zip(product_ids, documents)):
+        embedding, content = stored_by_id.get(product_id, (None, None))
+        if embedding is not None and content == doc.page_content:
+            vectors[position] = embedding
+        else:
+            stale_positions.append(position)
+
+    if stale_positions:
+        logger.info(
+            get_agent_logger(
+                "Data",
+                f"Embedding [yellow]{len(stale_positions)}[/yellow] new or changed products for the index snapshot",
+            )
+        )
+        fresh = chroma.embeddings.embed_documents(
+            [documents[position].page_content for position in stale_positions]
+        )
+        for position, embedding in zip(stale_positions, fresh):
+            vectors[position] = embedding
+
+    snapshot_path = write_index_snapshot(
+        snapshot_dir,
+        np.asarray(vectors, dtype=np.float32),
+        documents,
+        catalog_hash(
+            products_df, config.embedding_model_name, config.chroma_embedding_dim
+        ),
+        config.embedding_model_name,
+        source_hash=source_hash(
+            products_catalog.content_hash(),
+            config.embedding_model_name,
+            config.chroma_embedding_dim,
+        ),
+        quantization=config.vector_quantization,
+        truncate_dim=config.vector_truncate_dim,
+    )
+    logger.info(
+        get_agent_logger(
+            "Data",
+            f"Wrote index snapshot of [yellow]{len(documents)}[/yellow] products to [cyan underline]{snapshot_path}[/cyan underline]",
+        )
+    )
+    return snapshot_path
+
+
+def _on_products_catalog_changed(source: str, products_df) -> None:
+    """Drop the vector store and cached searches built for the previous catalog."""
+    global _vector_store
+    _vector_store = None
+    vector_search_cache.invalidate()
+    resolve_mention_cache.invalidate()
+
+
+products_catalog.add_listener(_on_products_catalog_changed)
+
+
+def get_vector_search_executor(
+    config: HermesConfig = HermesConfig(),
+) -> ThreadPoolExecutor:
+    """Get the dedicated executor that runs vector index queries.
+
+    Its worker count (`vector_search_max_concurrency`) bounds how many index queries
+    run at once, whichever event loop or thread they come from.
+    """
+    global _search_executor
+    if _search_executor is None:
+        with _search_executor_lock:
+            if _search_executor is None:
+                _search_executor = ThreadPoolExecutor(
+                    max_workers=max(1, config.vector_search_max_concurrency),
+                    thread_name_prefix="hermes-vector-search",
+                )
+    return _search_executor
+
+
+async def asimilarity_search_with_score(
+    vector_store: Any, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None
+) -> list[tuple[Document, float]]:
+    """Vector search that never blocks the event loop.
+
+    The query is embedded with the async embedding API and the index query runs on the
+    vector search executor. Stores without a by-vector search API run their whole
+    `similarity_search_with_score` on the executor instead.
+
+    Args:
+        vector_store: The store returned by get_vector_store.
+        query: The text to search for.
+        k: Number of results.
+        filter: Optional metadata filter.
+
+    Returns:
+        (Document, distance) tuples, closest first.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_vector_search_executor()
+    if (
+        isinstance(vector_store, (Chroma, QuantizedVectorStore))
+        and vector_store.embeddings is not None
+    ):
+        embedding = await vector_store.embeddings.aembed_query(query)
+        return await loop.run_in_executor(
+            executor,
+            partial(
+                vector_store.similarity_search_by_vector_with_relevance_scores,
+                embedding,
+                k,
+                filter=filter,
+            ),
+        )
+    return await loop.run_in_executor(
+        executor, partial(vector_store.similarity_search_with_score, query, k, filter)
+    )
@@ -2,6 +2,7 @@
 
 from . import catalog_tools
 from . import order_tools
+from . import promotion_engine
 from . import promotion_tools
 
-__all__ = ["catalog_tools", "order_tools", "promotion_tools"]
+__all__ = ["catalog_tools", "order_tools", "promotion_engine", "promotion_tools"]
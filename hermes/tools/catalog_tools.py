@@ -1,5 +1,10 @@
+import json
+import threading
+from functools import partial
 from typing import Any, Literal
 
+import numpy as np
+import pandas as pd  # type: ignore
 from langchain_core.tools import tool
 
 # Import tool from langchain_core
@@ -20,9 +25,29 @@ from hermes.model.email import ProductMention
 
 # Import get_vector_store and metadata conversion from hermes.data.vector_store
 from hermes.data.vector_store import (
+    asimilarity_search_with_score,
+    get_vector_search_executor,
     get_vector_store,
     metadata_to_product,
 )
+from hermes.data.catalog_index import (
+    CatalogIndex,
+    get_catalog_index,
+    get_catalog_version,
+)
+from hermes.data.lexical_index import LexicalHit, get_lexical_index
+from hermes.data.search_cache import (
+    normalize_query,
+    resolve_mention_cache,
+    vector_search_cache,
+)
+from hermes.data.quantized_index import QuantizedVectorStore
+from hermes.data.product_id_matcher import (
+    IdMatch,
+    extract_product_ids,
+    get_product_id_matcher,
+    normalize_product_id,
+)
 from hermes.utils.logger import logger
 
 
@@ -31,6 +56,9 @@ SIMILAR_MATCH_THRESHOLD = 0.65  # Threshold for potential matches to consider -
 MAX_VECTOR_SEARCH_L2_DISTANCE = (
     1.2  # New threshold for filtering raw vector search results
 )
+RRF_K = 60  # Reciprocal rank fusion constant for merging lexical and vector rankings
+MAX_FILTERED_SEARCH_FETCH = 100  # Upper bound on candidates fetched by filtered search
+ID_CORRECTION_L2_PER_EDIT = 0.25  # Pseudo L2 distance added per edit when correcting a product ID
 
 
 class FuzzyMatchResult(BaseModel):
@@ -42,7 +70,10 @@ class FuzzyMatchResult(BaseModel):
 
 ResolutionMethod = Literal[
     "exact_id_match",
+    "corrected_id_match",
+    "lexical_match",
     "semantic_search",
+    "lexical_search",
     "fuzzy_name_match",
     "complementary_category_match",
     "price_similarity_match",
@@ -69,7 +100,10 @@ def _create_metadata_string(
     if resolution_method:
         method_desc = {
             "exact_id_match": "Found by exact product ID match",
+            "corrected_id_match": "Found by correcting a mistyped product ID",
+            "lexical_match": "Found by exact product name match",
             "semantic_search": "Found through semantic search",
+            "lexical_search": "Found through lexical search",
             "fuzzy_name_match": "Found through fuzzy name matching",
             "complementary_category_match": "Found by complementary category",
             "price_similarity_match": "Found by price similarity",
@@ -103,13 +137,22 @@ def _parse_seasons_string(seasons_str: str | None, product_id: str) -> list[Seas
 
 
 def _create_product_from_row(
-    product_row: Any, metadata_str: str | None = None
+    product_row: Any,
+    metadata_str: str | None = None,
+    products_df: pd.DataFrame | None = None,
 ) -> Product:
     # Process seasons
     seasons_list = _parse_seasons_string(
         str(product_row.get("seasons", None)), str(product_row["product_id"])
     )
 
+    # Promotions are joined onto the catalog index of the row's DataFrame
+    promotion = (
+        get_catalog_index(products_df).promotion_of(str(product_row["product_id"]))
+        if products_df is not None
+        else None
+    )
+
     return Product(
         product_id=str(product_row["product_id"]),
         name=str(product_row["name"]),
@@ -119,6 +162,8 @@ def _create_product_from_row(
         stock=int(product_row["stock"]),
         price=float(product_row["price"]),
         seasons=seasons_list,
+        promotion=promotion.spec if promotion is not None else None,
+        promotion_text=promotion.text if promotion is not None else None,
         metadata=metadata_str,
     )
 
@@ -225,7 +270,7 @@ def find_product_by_id(product_id: str) -> Product | ProductNotFound:
     # Create Product object with metadata
     metadata_str = _create_metadata_string(resolution_method="exact_id_match")
 
-    return _create_product_from_row(product_row, metadata_str)
+    return _create_product_from_row(product_row, metadata_str, products_df)
 
 
 @tool(parse_docstring=True)
@@ -289,7 +334,9 @@ def find_product_by_name(
                 search_query=product_name,
                 similarity_score=similarity_score,
             )
-            product = _create_product_from_row(product_row, metadata_str)
+            product = _create_product_from_row(
+                product_row, metadata_str, products_df
+            )
             results.append(
                 FuzzyMatchResult(
                     matched_product=product, similarity_score=similarity_score
@@ -333,9 +380,7 @@ def search_products_by_description(
         if season_filter:
             filters["season"] = season_filter
 
-        results = get_vector_store().similarity_search_with_score(
-            query, top_k, filters if filters else None
-        )
+        results = _similarity_search(query, top_k, filters if filters else None)
 
         products = _convert_vector_results_to_products(
             results, "semantic_search", search_query=query
@@ -379,64 +424,44 @@ def find_complementary_products(
     products_df = load_products_df()  # Can raise ValueError
 
     try:
-        original_product_df_match = products_df[
-            products_df["product_id"].str.upper() == product_id.upper()
-        ]
+        catalog_index = get_catalog_index(products_df)
+        original_position = catalog_index.position_of(product_id)
 
-        if original_product_df_match.empty:
+        if original_position is None:
             return ProductNotFound(
                 message=f"Original product '{product_id}' not found",
                 query_product_id=product_id,
             )
 
-        original_row = original_product_df_match.iloc[0]
-        original_category = str(original_row["category"])
-
-        complementary_categories = {
-            "Women's Clothing": ["Accessories", "Women's Shoes", "Bags"],
-            "Men's Clothing": ["Men's Accessories", "Men's Shoes", "Bags"],
-            "Women's Shoes": ["Women's Clothing", "Accessories", "Bags"],
-            "Men's Shoes": ["Men's Clothing", "Men's Accessories", "Bags"],
-            "Accessories": ["Women's Clothing", "Men's Clothing", "Bags"],
-            "Bags": ["Women's Clothing", "Men's Clothing", "Accessories"],
-            "Kid's Clothing": ["Accessories", "Bags"],
-            "Loungewear": ["Accessories", "Bags"],
-        }
+        original_category = str(catalog_index.categories[original_position])
 
-        target_categories = complementary_categories.get(original_category, [])
+        # Precomputed per-category list of in-stock complements, highest stock first
+        complement_positions = catalog_index.complements(original_position, limit)
 
-        if not target_categories:
+        if complement_positions is None:
             return ProductNotFound(
                 message=f"No complementary categories defined for '{original_category}'",
                 query_product_id=product_id,
             )
 
-        # Renamed from complementary_products_df to complementary_matches_df
-        complementary_matches_df = products_df[
-            (products_df["category"].isin(target_categories))
-            & (products_df["stock"] > 0)
-        ]
-
-        if complementary_matches_df.empty:
+        if not complement_positions:
             return ProductNotFound(
                 message=f"No in-stock complementary products found for '{product_id}'",
                 query_product_id=product_id,
             )
 
-        # Renamed from sampled_products_df to sampled_matches_df
-        sampled_matches_df = complementary_matches_df.nlargest(limit, "stock")
-
         result_products = []
-        for _, row in sampled_matches_df.iterrows():
+        for position in complement_positions:
+            row = products_df.iloc[position]
             metadata_str = _create_metadata_string(
                 resolution_method="complementary_category_match",
             )
-            product = _create_product_from_row(row, metadata_str)
+            product = _create_product_from_row(row, metadata_str, products_df)
             result_products.append(product)
 
         if (
             not result_products
-        ):  # This case should be rare if sampled_matches_df was not empty
+        ):  # This case should be rare if complement_positions was not empty
             return ProductNotFound(
                 message=f"Error processing complementary products for '{product_id}' (no products created)",  # pragma: no cover
                 query_product_id=product_id,  # pragma: no cover
@@ -484,41 +509,61 @@ def search_products_with_filters(
 
     # _perform_vector_search can raise ValueError if catalog load fails, should propagate
     try:
-        where_clause: dict[str, Any] = {}
+        conditions: list[dict[str, Any]] = []
         if category:
-            where_clause["category"] = category
+            conditions.append({"category": category})
         if season:
-            where_clause["season"] = season
-
-        results = get_vector_store().similarity_search_with_score(
-            query, top_k * 2, where_clause if where_clause else None
-        )
-
-        # _convert_vector_results_to_products will handle the L2 distance filtering.
-        # The raw results are passed, and it filters internally.
-
-        # if not results: # This check is on raw results, not post-L2-filter results
-        #     return ProductNotFound(
-        #         message=f"No products found matching query: '{query}' with initial filters",
-        #         query_product_name=query,
-        #     )
-
-        filtered_products_from_convert = _convert_vector_results_to_products(
-            results, "filtered_search", search_query=query
-        )
-
-        # Now apply other filters (price, stock) to the L2-distance-filtered list
-        further_filtered_products = []
-        for product in filtered_products_from_convert:
-            if min_price is not None and product.price < min_price:
-                continue
-            if max_price is not None and product.price > max_price:
-                continue
-            if min_stock is not None and product.stock < min_stock:
-                continue
-            further_filtered_products.append(product)
-            if len(further_filtered_products) >= top_k:
+            conditions.append({"season": season})
+        # Price ranges run inside the vector store query, so every fetched
+        # candidate is already in the requested band
+        if min_price is not None:
+            conditions.append({"price": {"$gte": float(min_price)}})
+        if max_price is not None:
+            conditions.append({"price": {"$lte": float(max_price)}})
+        # Stock is live, so _similarity_search applies min_stock as a row mask
+        if min_stock is not None:
+            catalog_index = get_catalog_index(load_products_df())
+            if len(catalog_index.positions_with_min_stock(min_stock)) == 0:
+                return ProductNotFound(
+                    message=f"No products with at least {min_stock} units in stock for query: '{query}'",
+                    query_product_name=query,
+                )
+        where_clause = _build_where_clause(conditions)
+
+        # Adaptive over-fetch: a few candidates may still fail the L2 distance filter
+        # or conversion, so fetch more until top_k survive, the store runs out of
+        # matches, or the results are past the distance threshold
+        further_filtered_products: list[Product] = []
+        seen_count = 0
+        fetch_k = top_k
+        while True:
+            results = _similarity_search(query, fetch_k, where_clause, min_stock)
+
+            # Larger fetches return the earlier results first, so only the new
+            # tail needs converting
+            for product in _convert_vector_results_to_products(
+                results[seen_count:], "filtered_search", search_query=query
+            ):
+                # Safety net for stores that ignore range predicates
+                if min_price is not None and product.price < min_price:
+                    continue
+                if max_price is not None and product.price > max_price:
+                    continue
+                if min_stock is not None and product.stock < min_stock:
+                    continue
+                further_filtered_products.append(product)
+            seen_count = len(results)
+
+            if (
+                len(further_filtered_products) >= top_k
+                or len(results) < fetch_k
+                or fetch_k >= MAX_FILTERED_SEARCH_FETCH
+                or results[-1][1] > MAX_VECTOR_SEARCH_L2_DISTANCE
+            ):
                 break
+            fetch_k = min(fetch_k * 2, MAX_FILTERED_SEARCH_FETCH)
+
+        further_filtered_products = further_filtered_products[:top_k]
 
         if not further_filtered_products:
             return ProductNotFound(
@@ -558,9 +603,7 @@ def find_products_for_occasion(
     # _perform_vector_search can raise ValueError if catalog load fails, should propagate
     try:
         search_query = f"{occasion} outfit clothing attire"
-        results = get_vector_store().similarity_search_with_score(
-            search_query, limit * 2
-        )
+        results = _similarity_search(search_query, limit * 2)
 
         # _convert_vector_results_to_products will handle the L2 distance filtering.
 
@@ -616,81 +659,464 @@ def find_alternatives(
     products_df = load_products_df()  # Can raise ValueError
 
     try:
-        original_product_df_match = products_df[
-            products_df["product_id"].str.upper() == original_product_id.upper()
-        ]
+        return _alternatives_for(products_df, original_product_id, limit)
+    except Exception as e:
+        logger.error(
+            f"Unexpected error while finding alternatives for '{original_product_id}': {e}",
+            exc_info=True,
+        )
+        raise  # Re-raise other unexpected exceptions
 
-        if original_product_df_match.empty:
-            return ProductNotFound(
-                message=f"Original product '{original_product_id}' not found",
-                query_product_id=original_product_id,
-            )
 
-        original_row = original_product_df_match.iloc[0]
-        original_category = str(original_row["category"])
-        original_price = float(original_row["price"])
+def find_alternatives_for_products(
+    product_ids: list[str], limit: int = 2
+) -> dict[str, list[AlternativeProduct] | ProductNotFound]:
+    """Find alternatives for several products against one catalog snapshot.
 
-        alternatives_df_filtered = products_df[
-            (products_df["category"] == original_category)
-            & (products_df["product_id"].str.upper() != original_product_id.upper())
-            & (products_df["stock"] > 0)
-        ]
+    Used for all out-of-stock lines of an order at once: the catalog and its index
+    are fetched once and each distinct product is looked up once.
 
-        if alternatives_df_filtered.empty:
-            return ProductNotFound(
-                message=f"No in-stock alternatives found for product '{original_product_id}'.",
-                query_product_id=original_product_id,
-            )
+    Args:
+        product_ids: Products to find alternatives for; duplicates are looked up once.
+        limit: Maximum number of alternatives per product.
 
-        alternatives_df_with_similarity = alternatives_df_filtered.copy()
-        alternatives_df_with_similarity.loc[:, "price_similarity"] = (
-            alternatives_df_with_similarity[
-                "price"
-            ].apply(
-                lambda x: 1.0
-                - abs(float(x) - original_price) / max(original_price, float(x))
-            )
+    Returns:
+        The find_alternatives result for each distinct product ID.
+    """
+    products_df = load_products_df()  # Can raise ValueError
+    return {
+        product_id: _alternatives_for(products_df, product_id, limit)
+        for product_id in dict.fromkeys(product_ids)
+    }
+
+
+def _alternatives_for(
+    products_df: pd.DataFrame, original_product_id: str, limit: int
+) -> list[AlternativeProduct] | ProductNotFound:
+    catalog_index = get_catalog_index(products_df)
+    original_position = catalog_index.position_of(original_product_id)
+
+    if original_position is None:
+        return ProductNotFound(
+            message=f"Original product '{original_product_id}' not found",
+            query_product_id=original_product_id,
+        )
+
+    original_price = float(catalog_index.prices[original_position])
+
+    # Same-category, in-stock products ranked by price similarity
+    top_alternatives = catalog_index.alternatives(original_position, limit)
+
+    if not top_alternatives:
+        return ProductNotFound(
+            message=f"No in-stock alternatives found for product '{original_product_id}'.",
+            query_product_id=original_product_id,
+        )
+
+    result_alternatives = []
+    for position, similarity_score in top_alternatives:
+        row = products_df.iloc[position]
+        metadata_str = _create_metadata_string(
+            resolution_method="price_similarity_match",
         )
+        product = _create_product_from_row(row, metadata_str, products_df)
 
-        sorted_alternatives_df = alternatives_df_with_similarity.sort_values(
-            "price_similarity", ascending=False
+        if similarity_score > 0.9:
+            reason = f"Very similar price (${float(row['price']):.2f} vs ${original_price:.2f}) and currently in stock"
+        elif similarity_score > 0.7:
+            reason = f"Similar price range and currently in stock ({int(row['stock'])} available)"
+        else:
+            reason = f"Same category alternative that's currently available ({int(row['stock'])} in stock)"
+
+        alternative = AlternativeProduct(
+            product=product, similarity_score=similarity_score, reason=reason
         )
+        result_alternatives.append(alternative)
+
+    if not result_alternatives:
+        return ProductNotFound(
+            message=f"Error processing alternatives for '{original_product_id}' (no alternatives created)",  # pragma: no cover
+            query_product_id=original_product_id,  # pragma: no cover
+        )  # pragma: no cover
 
-        top_alternatives_df = sorted_alternatives_df.head(limit)
+    return result_alternatives
+
+
+def _vector_search_cache_key(
+    query: str, k: int, filter: dict[str, Any] | None
+) -> tuple[str, int, str | None]:
+    return (
+        normalize_query(query),
+        k,
+        json.dumps(filter, sort_keys=True, default=str) if filter else None,
+    )
 
-        result_alternatives = []
-        for _, row in top_alternatives_df.iterrows():
-            similarity_score = float(row["price_similarity"])
+
+class _InStockRows:
+    """Masks over a vector store's rows marking products with enough stock.
+
+    Stock is live and not part of the vector store metadata. Stores that take a row
+    mask (`QuantizedVectorStore`) get the stock condition as one, so the index query
+    skips understocked products. The catalog row of every vector store row is computed
+    once per vector store and catalog, and masks are kept for the current catalog
+    version only: they are rebuilt after a stock change, not per query.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vector_store: Any = None
+        self._catalog_index: CatalogIndex | None = None
+        self._catalog_rows = np.empty(0, dtype=np.int64)
+        self._version: int | None = None
+        self._masks: dict[int, np.ndarray] = {}
+
+    def mask(
+        self,
+        vector_store: QuantizedVectorStore,
+        catalog_index: CatalogIndex,
+        min_stock: int,
+    ) -> tuple[int, np.ndarray]:
+        """Return the catalog version and the mask of rows with at least min_stock."""
+        # Read before the stock: a mask is never cached under a newer version
+        version = catalog_index.version
+        with self._lock:
+            if (
+                self._vector_store is not vector_store
+                or self._catalog_index is not catalog_index
+            ):
+                positions = [
+                    catalog_index.position_of(str(doc.metadata.get("product_id", "")))
+                    for doc in vector_store.documents
+                ]
+                self._catalog_rows = np.array(
+                    [-1 if position is None else position for position in positions],
+                    dtype=np.int64,
+                )
+                self._vector_store = vector_store
+                self._catalog_index = catalog_index
+                self._version = None
+            if self._version != version:
+                self._version = version
+                self._masks = {}
+            mask = self._masks.get(min_stock)
+            if mask is None:
+                known = self._catalog_rows >= 0
+                mask = np.zeros(len(self._catalog_rows), dtype=bool)
+                stock = catalog_index.stock[self._catalog_rows[known]]
+                mask[known] = stock >= min_stock
+                self._masks[min_stock] = mask
+            return version, mask
+
+
+_in_stock_rows = _InStockRows()
+
+
+def _similarity_search(
+    query: str,
+    k: int,
+    filter: dict[str, Any] | None = None,
+    min_stock: int | None = None,
+) -> list[tuple[Any, float]]:
+    """Run a vector search through the shared result cache.
+
+    Raw results depend only on the vector store contents, not on stock, so entries are
+    tagged with the vector store instance and survive stock updates. The exception is
+    a `min_stock` restriction, which stores taking a row mask apply inside the query;
+    those entries are keyed by the catalog version as well. Other stores ignore
+    `min_stock` and callers filter their results by stock. The query runs on the vector
+    search executor, which bounds concurrent index queries.
+    """
+    vector_store = get_vector_store()
+    cache_key: tuple = _vector_search_cache_key(query, k, filter)
+    search = vector_store.similarity_search_with_score
+    if min_stock is not None and isinstance(vector_store, QuantizedVectorStore):
+        version, row_mask = _in_stock_rows.mask(
+            vector_store, get_catalog_index(load_products_df()), min_stock
+        )
+        cache_key += (min_stock, version)
+        search = partial(search, row_mask=row_mask)
+    cached_results = vector_search_cache.get(cache_key, vector_store)
+    if cached_results is not None:
+        return list(cached_results)
+
+    results = get_vector_search_executor().submit(search, query, k, filter).result()
+    vector_search_cache.put(cache_key, vector_store, tuple(results))
+    return list(results)
+
+
+async def _asimilarity_search(
+    query: str, k: int, filter: dict[str, Any] | None = None
+) -> list[tuple[Any, float]]:
+    """Async twin of _similarity_search that keeps the event loop free."""
+    vector_store = get_vector_store()
+    cache_key = _vector_search_cache_key(query, k, filter)
+    cached_results = vector_search_cache.get(cache_key, vector_store)
+    if cached_results is not None:
+        return list(cached_results)
+
+    results = await asimilarity_search_with_score(vector_store, query, k, filter)
+    vector_search_cache.put(cache_key, vector_store, tuple(results))
+    return list(results)
+
+
+def _build_where_clause(conditions: list[dict[str, Any]]) -> dict[str, Any] | None:
+    """Combine vector store metadata conditions, using "$and" when there are several."""
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+def _candidates_from_id_matches(
+    id_matches: list[IdMatch],
+    products_df: Any,
+    requested_quantity: int | None = None,
+) -> list[tuple[Product, float]]:
+    """Turn product ID matches into (Product, l2_distance) candidates.
+
+    IDs that only differ in formatting ("lth-0976") count as exact matches. Corrected
+    IDs get a pseudo L2 distance proportional to the number of edits, and their
+    metadata records the correction so the stockkeeper can report it.
+    """
+    candidates: list[tuple[Product, float]] = []
+    for id_match in id_matches:
+        if id_match.corrected:
+            distance = ID_CORRECTION_L2_PER_EDIT * id_match.distance
             metadata_str = _create_metadata_string(
-                resolution_method="price_similarity_match",
+                resolution_method="corrected_id_match",
+                requested_quantity=requested_quantity,
+                similarity_score=distance,
             )
-            product = _create_product_from_row(row, metadata_str)
+            metadata_str = f"Product ID '{id_match.written_id}' corrected to '{id_match.product_id}'; {metadata_str}"
+        else:
+            distance = 0.0
+            metadata_str = _create_metadata_string(
+                resolution_method="exact_id_match",
+                requested_quantity=requested_quantity,
+            )
+        product = _create_product_from_row(
+            products_df.iloc[id_match.position], metadata_str, products_df
+        )
+        candidates.append((product, distance))
+    return candidates
+
+
+def _fuse_lexical_and_vector_candidates(
+    vector_candidates: list[tuple[Product, float]],
+    lexical_hits: list[LexicalHit],
+    products_df: Any,
+    top_k: int,
+    search_query: str,
+    requested_quantity: int | None = None,
+) -> list[tuple[Product, float]]:
+    """Merge vector and lexical rankings with reciprocal rank fusion.
 
-            if similarity_score > 0.9:
-                reason = f"Very similar price (${float(row['price']):.2f} vs ${original_price:.2f}) and currently in stock"
-            elif similarity_score > 0.7:
-                reason = f"Similar price range and currently in stock ({int(row['stock'])} available)"
-            else:
-                reason = f"Same category alternative that's currently available ({int(row['stock'])} in stock)"
+    Products found by vector search keep their L2 distance. Products found only
+    lexically get a pseudo-distance between half and all of
+    MAX_VECTOR_SEARCH_L2_DISTANCE, scaled by their BM25 score relative to the best
+    lexical hit, so they never look more certain than a close vector match.
 
-            alternative = AlternativeProduct(
-                product=product, similarity_score=similarity_score, reason=reason
+    Returns:
+        Up to top_k (Product, l2_distance) tuples ordered by fused rank.
+    """
+    if not lexical_hits:
+        return vector_candidates
+
+    fused_scores: dict[str, float] = {}
+    candidates: dict[str, tuple[Product, float]] = {}
+
+    for rank, (product, distance) in enumerate(vector_candidates):
+        fused_scores[product.product_id] = 1.0 / (RRF_K + rank + 1)
+        candidates[product.product_id] = (product, distance)
+
+    top_lexical_score = lexical_hits[0].score
+    for rank, hit in enumerate(lexical_hits):
+        row = products_df.iloc[hit.position]
+        product_id = str(row["product_id"])
+        fused_scores[product_id] = fused_scores.get(product_id, 0.0) + 1.0 / (
+            RRF_K + rank + 1
+        )
+        if product_id not in candidates:
+            distance = MAX_VECTOR_SEARCH_L2_DISTANCE * (
+                1.0 - 0.5 * hit.score / top_lexical_score
             )
-            result_alternatives.append(alternative)
+            product = _create_product_from_row(
+                row,
+                _create_metadata_string(
+                    resolution_method="lexical_search",
+                    search_query=search_query,
+                    similarity_score=distance,
+                    requested_quantity=requested_quantity,
+                ),
+                products_df,
+            )
+            candidates[product_id] = (product, distance)
+
+    # Python's sort is stable, so ties keep vector order before lexical-only hits
+    ranked_ids = sorted(fused_scores, key=lambda pid: -fused_scores[pid])
+    return [candidates[pid] for pid in ranked_ids[:top_k]]
 
-        if not result_alternatives:
+
+def _copy_resolution(
+    result: list[tuple[Product, float]] | ProductNotFound,
+) -> list[tuple[Product, float]] | ProductNotFound:
+    """Deep-copy a resolution result, since callers annotate product metadata in place."""
+    if isinstance(result, ProductNotFound):
+        return result.model_copy(deep=True)
+    return [(product.model_copy(deep=True), distance) for product, distance in result]
+
+
+async def _search_product_mention(
+    mention: ProductMention,
+    search_query: str,
+    filters: dict[str, str],
+    top_k: int,
+    products_df: Any,
+) -> list[tuple[Product, float]] | ProductNotFound:
+    """Search lexical and vector indexes (with a fuzzy fallback) for a mention.
+
+    Returns:
+        A list of (Product, l2_distance) tuples, or ProductNotFound.
+    """
+    # Lexical search first: when the query contains a product's full name (or a
+    # catalog ID) the mention is settled without an embedding round trip
+    lexical_index = get_lexical_index(products_df)
+    lexical_hits = lexical_index.search(
+        search_query, top_k, filters.get("category")
+    )
+    decisive_hit = lexical_index.decisive_hit(search_query, lexical_hits)
+    if decisive_hit is not None:
+        product = _create_product_from_row(
+            products_df.iloc[decisive_hit.position],
+            _create_metadata_string(
+                resolution_method="lexical_match",
+                search_query=search_query,
+                similarity_score=0.0,
+                requested_quantity=mention.quantity,
+            ),
+            products_df,
+        )
+        logger.info(
+            f"[RESOLVE_PRODUCT_MENTION] Returning 1 candidate from LEXICAL MATCH for '{search_query}'. Candidate: {product.product_id}"
+        )
+        return [(product, 0.0)]
+
+    # Perform vector search
+    raw_results_with_scores: list[tuple[Any, float]] = await _asimilarity_search(
+        search_query, top_k, filters if filters else None
+    )
+    logger.debug(
+        f"Stockkeeper: raw vector search results for '{search_query}': {raw_results_with_scores}"
+    )
+
+    temp_semantic_candidates: list[tuple[Product, float]] = []
+    filtered_raw_results = [
+        (doc, score_val)
+        for doc, score_val in raw_results_with_scores
+        if score_val <= MAX_VECTOR_SEARCH_L2_DISTANCE
+    ]
+
+    for doc, score_val in filtered_raw_results:
+        try:
+            product = metadata_to_product(doc.metadata)
+
+            # Get standard search metadata from _add_search_metadata_to_product
+            product = _add_search_metadata_to_product(
+                product,
+                score_val,
+                "semantic_search",
+                search_query,
+                mention.quantity,
+            )
+
+            temp_semantic_candidates.append(
+                (product, score_val)
+            )  # Store product and its L2 distance
+        except Exception as e:
+            logger.error(f"Error converting document to product: {e}")
+            continue
+
+    candidates_with_scores = _fuse_lexical_and_vector_candidates(
+        temp_semantic_candidates,
+        lexical_hits,
+        products_df,
+        top_k,
+        search_query,
+        mention.quantity,
+    )
+
+    # Fallback to fuzzy search if semantic search yields no results (after L2 filtering)
+    if not candidates_with_scores:
+        # Use mention.mention_text for fuzzy search if product_name is empty but mention_text exists
+        fuzzy_search_term = mention.product_name or mention.mention_text
+        if fuzzy_search_term:
+            logger.info(
+                f"[RESOLVE_PRODUCT_MENTION] Semantic results empty (or all > L2_dist {MAX_VECTOR_SEARCH_L2_DISTANCE}), trying fuzzy for '{fuzzy_search_term}'."
+            )
+            fuzzy_results_list: (
+                list[FuzzyMatchResult] | ProductNotFound
+            ) = await find_product_by_name.ainvoke(
+                {
+                    "product_name": fuzzy_search_term,
+                    "threshold": 0.40,  # Default was 0.6, consider if this is too low or fine for fallback
+                    "top_n": top_k,
+                }
+            )
+            if isinstance(fuzzy_results_list, list) and fuzzy_results_list:
+                logger.info(
+                    f"[RESOLVE_PRODUCT_MENTION] Fuzzy search found {len(fuzzy_results_list)} candidates for '{fuzzy_search_term}'."
+                )
+                temp_fuzzy_candidates_with_scores: list[tuple[Product, float]] = []
+                for fuzzy_match in fuzzy_results_list:
+                    product_candidate = fuzzy_match.matched_product
+                    l2_like_distance = 1.0 - fuzzy_match.similarity_score
+
+                    product_candidate.metadata = _create_metadata_string(
+                        resolution_method="fuzzy_name_match",
+                        search_query=fuzzy_search_term,
+                        similarity_score=fuzzy_match.similarity_score,
+                        requested_quantity=mention.quantity,
+                    )
+
+                    temp_fuzzy_candidates_with_scores.append(
+                        (product_candidate, l2_like_distance)
+                    )
+
+                if temp_fuzzy_candidates_with_scores:
+                    # Sort fuzzy candidates by L2-like distance (ascending)
+                    temp_fuzzy_candidates_with_scores.sort(key=lambda x: x[1])
+                    candidates_with_scores = temp_fuzzy_candidates_with_scores
+                    logger.info(
+                        f"[RESOLVE_PRODUCT_MENTION] Path A2: Returning {len(candidates_with_scores)} candidates from FUZZY block for '{fuzzy_search_term}'. L2 distances: {[s for _, s in candidates_with_scores]}"
+                    )
+                    # Do not return here yet, let the final block handle it to ensure consistent logging/return point
+
+        if not candidates_with_scores:  # If still no candidates after fuzzy attempt
+            logger.info(
+                f"[RESOLVE_PRODUCT_MENTION] Path A3: Semantic results empty AND fuzzy attempt failed/not triggered for '{search_query}' / '{fuzzy_search_term}'. Returning ProductNotFound."
+            )
             return ProductNotFound(
-                message=f"Error processing alternatives for '{original_product_id}' (no alternatives created)",  # pragma: no cover
-                query_product_id=original_product_id,  # pragma: no cover
-            )  # pragma: no cover
+                message=f"[RESOLVE_PRODUCT_MENTION] No products found matching vector search query: '{search_query}' or fuzzy: '{fuzzy_search_term}'",
+                query_product_name=mention.product_name or mention.mention_text,
+                query_product_id=mention.product_id,
+            )
 
-        return result_alternatives
-    except Exception as e:
-        logger.error(
-            f"Unexpected error while finding alternatives for '{original_product_id}': {e}",
-            exc_info=True,
+    if not candidates_with_scores:  # Final check if list is empty
+        logger.info(
+            f"[RESOLVE_PRODUCT_MENTION] Path C1: No candidates after all attempts (including L2 filter {MAX_VECTOR_SEARCH_L2_DISTANCE}) for query '{search_query}'. Returning ProductNotFound."
         )
-        raise  # Re-raise other unexpected exceptions
+        return ProductNotFound(
+            message=f"[RESOLVE_PRODUCT_MENTION] No candidates found (L2 filter {MAX_VECTOR_SEARCH_L2_DISTANCE}) for query: '{search_query}' (and fuzzy fallback if applicable)",
+            query_product_name=mention.product_name,
+            query_product_id=mention.product_id,
+        )
+
+    # Results from vector search are already sorted by L2. Fuzzy results were sorted.
+    logger.info(
+        f"[RESOLVE_PRODUCT_MENTION] Returning {len(candidates_with_scores)} candidates at END of function for mention targeting '{search_query}'. L2 distances: {[s for _, s in candidates_with_scores]}"
+    )
+    return candidates_with_scores
 
 
 async def resolve_product_mention(
@@ -707,13 +1133,7 @@ async def resolve_product_mention(
         Exception: For other unexpected errors.
     """
     try:
-        candidates_with_scores: list[tuple[Product, float]] = []
-        explicit_id_missed = False  # Initialize
-        original_provided_id: str | None = None
-        id_miss_message_prefix: str = ""  # Initialize
-
         if mention.product_id:
-            original_provided_id = mention.product_id
             id_result: Product | ProductNotFound = await find_product_by_id.ainvoke(
                 {"product_id": mention.product_id}
             )
@@ -729,12 +1149,46 @@ async def resolve_product_mention(
                 )
                 return [(id_result, 0.0)]
             elif isinstance(id_result, ProductNotFound):
+                # The ID may be a reformatted or mistyped catalog ID ("LTH 0967")
+                if normalize_product_id(mention.product_id):
+                    products_df = load_products_df()
+                    id_matches = get_product_id_matcher(products_df).match(
+                        mention.product_id
+                    )
+                    if id_matches:
+                        logger.info(
+                            f"[RESOLVE_PRODUCT_MENTION] Product ID '{mention.product_id}' matched catalog IDs {[m.product_id for m in id_matches]}"
+                        )
+                        return _candidates_from_id_matches(
+                            id_matches[:top_k], products_df, mention.quantity
+                        )
                 logger.warning(
                     f"[RESOLVE_PRODUCT_MENTION] Explicit Product ID '{mention.product_id}' not found by exact match. Returning ProductNotFound as per strict ID policy."
                 )
                 # If an explicit ID was provided and not found, return ProductNotFound immediately.
                 return id_result  # This is the ProductNotFound object from find_product_by_id
 
+        # An ID written in the mention ("lth-0976") that the classifier did not extract
+        id_text = " ".join(
+            part
+            for part in (
+                mention.mention_text,
+                mention.product_name,
+                mention.product_description,
+            )
+            if part
+        )
+        if extract_product_ids(id_text):
+            products_df = load_products_df()
+            id_matches = get_product_id_matcher(products_df).match_text(id_text)
+            if len(id_matches) == 1:
+                logger.info(
+                    f"[RESOLVE_PRODUCT_MENTION] Returning 1 candidate from ID found in mention text: {id_matches[0].product_id}"
+                )
+                return _candidates_from_id_matches(
+                    id_matches, products_df, mention.quantity
+                )
+
         search_parts = []
         if mention.product_name:
             search_parts.append(mention.product_name)
@@ -759,137 +1213,30 @@ async def resolve_product_mention(
             f"Stockkeeper: constructed search_query: '{search_query}' with filters: {filters}"
         )
 
-        # Perform vector search
-        raw_results_with_scores: list[tuple[Any, float]] = (
-            get_vector_store().similarity_search_with_score(search_query, top_k, filters if filters else None)
-        )
-        logger.debug(
-            f"Stockkeeper: raw vector search results for '{search_query}': {raw_results_with_scores}"
-        )
-
-        temp_semantic_candidates: list[tuple[Product, float]] = []
-        filtered_raw_results = [
-            (doc, score_val)
-            for doc, score_val in raw_results_with_scores
-            if score_val <= MAX_VECTOR_SEARCH_L2_DISTANCE
-        ]
-
-        for doc, score_val in filtered_raw_results:
-            try:
-                product = metadata_to_product(doc.metadata)
-
-                # Get standard search metadata from _add_search_metadata_to_product
-                product = _add_search_metadata_to_product(
-                    product,
-                    score_val,
-                    "semantic_search",
-                    search_query,
-                    mention.quantity,
-                )
-
-                # Augment with ID miss info if applicable
-                if explicit_id_missed:  # Use the flag directly
-                    if product.metadata:
-                        product.metadata = f"{id_miss_message_prefix}{product.metadata}"
-                    else:
-                        product.metadata = (
-                            id_miss_message_prefix.strip()
-                        )  # Remove trailing space if it's the only metadata
-
-                temp_semantic_candidates.append(
-                    (product, score_val)
-                )  # Store product and its L2 distance
-            except Exception as e:
-                logger.error(f"Error converting document to product: {e}")
-                continue
-
-        candidates_with_scores = temp_semantic_candidates
-
-        # Fallback to fuzzy search if semantic search yields no results (after L2 filtering)
-        if not candidates_with_scores:
-            # Use mention.mention_text for fuzzy search if product_name is empty but mention_text exists
-            fuzzy_search_term = mention.product_name or mention.mention_text
-            if fuzzy_search_term:
-                logger.info(
-                    f"[RESOLVE_PRODUCT_MENTION] Semantic results empty (or all > L2_dist {MAX_VECTOR_SEARCH_L2_DISTANCE}), trying fuzzy for '{fuzzy_search_term}'."
-                )
-                fuzzy_results_list: (
-                    list[FuzzyMatchResult] | ProductNotFound
-                ) = await find_product_by_name.ainvoke(
-                    {
-                        "product_name": fuzzy_search_term,
-                        "threshold": 0.40,  # Default was 0.6, consider if this is too low or fine for fallback
-                        "top_n": top_k,
-                    }
-                )
-                if isinstance(fuzzy_results_list, list) and fuzzy_results_list:
-                    logger.info(
-                        f"[RESOLVE_PRODUCT_MENTION] Fuzzy search found {len(fuzzy_results_list)} candidates for '{fuzzy_search_term}'."
-                    )
-                    temp_fuzzy_candidates_with_scores: list[tuple[Product, float]] = []
-                    for fuzzy_match in fuzzy_results_list:
-                        product_candidate = fuzzy_match.matched_product
-                        l2_like_distance = 1.0 - fuzzy_match.similarity_score
-
-                        # Create fuzzy match metadata string
-                        fuzzy_metadata_str = _create_metadata_string(
-                            resolution_method="fuzzy_name_match",
-                            search_query=fuzzy_search_term,
-                            similarity_score=fuzzy_match.similarity_score,
-                            requested_quantity=mention.quantity,
-                        )
-
-                        # Augment with ID miss info if applicable
-                        if explicit_id_missed:  # Use the flag directly
-                            if fuzzy_metadata_str:
-                                product_candidate.metadata = (
-                                    f"{id_miss_message_prefix}{fuzzy_metadata_str}"
-                                )
-                            else:
-                                product_candidate.metadata = (
-                                    id_miss_message_prefix.strip()
-                                )
-                        else:
-                            product_candidate.metadata = fuzzy_metadata_str
-
-                        temp_fuzzy_candidates_with_scores.append(
-                            (product_candidate, l2_like_distance)
-                        )
-
-                    if temp_fuzzy_candidates_with_scores:
-                        # Sort fuzzy candidates by L2-like distance (ascending)
-                        temp_fuzzy_candidates_with_scores.sort(key=lambda x: x[1])
-                        candidates_with_scores = temp_fuzzy_candidates_with_scores
-                        logger.info(
-                            f"[RESOLVE_PRODUCT_MENTION] Path A2: Returning {len(candidates_with_scores)} candidates from FUZZY block for '{fuzzy_search_term}'. L2 distances: {[s for _, s in candidates_with_scores]}"
-                        )
-                        # Do not return here yet, let the final block handle it to ensure consistent logging/return point
-
-            if not candidates_with_scores:  # If still no candidates after fuzzy attempt
-                logger.info(
-                    f"[RESOLVE_PRODUCT_MENTION] Path A3: Semantic results empty AND fuzzy attempt failed/not triggered for '{search_query}' / '{fuzzy_search_term}'. Returning ProductNotFound."
-                )
-                return ProductNotFound(
-                    message=f"[RESOLVE_PRODUCT_MENTION] No products found matching vector search query: '{search_query}' or fuzzy: '{fuzzy_search_term}'",
-                    query_product_name=mention.product_name or mention.mention_text,
-                    query_product_id=mention.product_id,
-                )
+        products_df = load_products_df()
 
-        if not candidates_with_scores:  # Final check if list is empty
-            logger.info(
-                f"[RESOLVE_PRODUCT_MENTION] Path C1: No candidates after all attempts (including L2 filter {MAX_VECTOR_SEARCH_L2_DISTANCE}) for query '{search_query}'. Returning ProductNotFound."
-            )
-            return ProductNotFound(
-                message=f"[RESOLVE_PRODUCT_MENTION] No candidates found (L2 filter {MAX_VECTOR_SEARCH_L2_DISTANCE}) for query: '{search_query}' (and fuzzy fallback if applicable)",
-                query_product_name=mention.product_name,
-                query_product_id=mention.product_id,
+        # Identical mentions recur across emails; the catalog version changes on any
+        # stock update or reload, so cached candidates are never stale
+        cache_key = (
+            normalize_query(search_query),
+            filters.get("category"),
+            top_k,
+            mention.quantity,
+            normalize_query(mention.product_name or mention.mention_text),
+        )
+        catalog_version = get_catalog_version(products_df)
+        cached_result = resolve_mention_cache.get(cache_key, catalog_version)
+        if cached_result is not None:
+            logger.debug(
+                f"[RESOLVE_PRODUCT_MENTION] Cache hit for '{search_query}' with filters: {filters}"
             )
+            return _copy_resolution(cached_result)
 
-        # Results from vector search are already sorted by L2. Fuzzy results were sorted.
-        logger.info(
-            f"[RESOLVE_PRODUCT_MENTION] Returning {len(candidates_with_scores)} candidates at END of function for mention targeting '{search_query}'. L2 distances: {[s for _, s in candidates_with_scores]}"
+        result = await _search_product_mention(
+            mention, search_query, filters, top_k, products_df
         )
-        return candidates_with_scores
+        resolve_mention_cache.put(cache_key, catalog_version, _copy_resolution(result))
+        return result
     except ValueError:
         raise
     except Exception as e:
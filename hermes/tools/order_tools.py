@@ -1,9 +1,9 @@
-import pandas as pd  # type: ignore
 from enum import Enum
 from pydantic import BaseModel
 import logging  # Add logging import
 
 from hermes.data.load_data import load_products_df
+from hermes.data.inventory import StockReservation, get_inventory, normalize_product_id
 from hermes.model.errors import ProductNotFound
 # Removed: from hermes.tools.catalog_tools import update_product_stock as catalog_update_product_stock
 
@@ -25,11 +25,28 @@ class StockUpdateStatus(str, Enum):
     PRODUCT_NOT_FOUND = "product_not_found"
 
 
+class StockReservationResult(BaseModel):
+    """Outcome of reserving stock for one order line."""
+
+    product_id: str
+    quantity: int
+    status: StockUpdateStatus
+    # Stock after the reservation on success, otherwise the stock that was available
+    stock: int
+    # Units actually reserved for this line: the quantity on success, otherwise 0
+    reserved_quantity: int = 0
+    # The line had already been reserved (same idempotency key); nothing was decremented
+    replayed: bool = False
+
+
 def check_stock(
     product_id: str, requested_quantity: int = 1
 ) -> StockStatus | ProductNotFound:
     """Check if a product is in stock and has enough inventory to fulfill an order.
 
+    The answer is advisory: use `update_stock` or `reserve_stock` to actually claim
+    the units, as another order may take them in between.
+
     Args:
         product_id: The product ID to check stock for.
         requested_quantity: The quantity requested (default: 1).
@@ -38,112 +55,106 @@ def check_stock(
         A StockStatus object with availability information, or ProductNotFound if the product ID is invalid.
     """
     # Standardize the product ID format
-    product_id = product_id.replace(" ", "").upper()
-
-    # Look up the product in the DataFrame
-    products_df = load_products_df()
+    product_id = normalize_product_id(product_id)
 
-    product_data = products_df[products_df["product_id"] == product_id]
-    if product_data.empty:
+    current_stock = get_inventory(load_products_df()).stock_of(product_id)
+    if current_stock is None:
         return ProductNotFound(
             message=f"Product with ID '{product_id}' not found in catalog.",
             query_product_id=product_id,
         )
 
-    product_row = product_data.iloc[0]
-    current_stock = int(product_row["stock"])
-
     return StockStatus(
         is_available=current_stock >= requested_quantity,
         current_stock=current_stock,
     )
 
 
-def update_stock(product_id: str, quantity_to_decrement: int) -> StockUpdateStatus:
-    """Update the stock level for a product by decrementing the specified quantity.
-    This should be called when an order is confirmed to be fulfilled.
+def _reservation_status(reservation: StockReservation) -> StockUpdateStatus:
+    if not reservation.found:
+        return StockUpdateStatus.PRODUCT_NOT_FOUND
+    if not reservation.reserved:
+        return StockUpdateStatus.INSUFFICIENT_STOCK
+    return StockUpdateStatus.SUCCESS
+
+
+def reserve_stock(
+    lines: list[tuple[str, int]],
+    all_or_nothing: bool = False,
+    idempotency_keys: list[str | None] | None = None,
+) -> list[StockReservationResult]:
+    """Reserve stock for the lines of an order in one atomic step.
+
+    This is the bulk check-and-reserve for whole orders: one call reports each line's
+    availability, reserved quantity and remaining stock, with constant-time lookups
+    per line instead of a catalog scan. Each product's stock is checked and decremented under its lock, so concurrent
+    orders can never sell more units than are in stock.
 
     Args:
-        product_id: The product ID to update stock for.
-        quantity_to_decrement: The amount to decrement from current stock.
+        lines: (product_id, quantity) pairs; lines for the same product share its stock.
+        all_or_nothing: If True, no line is reserved unless every line can be.
+        idempotency_keys: Optional key per line (e.g. "<email_id>#<line>"); a line
+            whose key was already reserved, in this run or, with the inventory
+            database, an earlier one, is not decremented again.
 
     Returns:
-        A StockUpdateStatus enum indicating the outcome of the stock update.
+        One StockReservationResult per line, in order.
     """
-    # Standardize the product ID format
-    product_id = product_id.replace(" ", "").upper()
-
-    # Load the products DataFrame
-    products_df = load_products_df()
-
-    if (
-        products_df is None
-    ):  # Should ideally be handled by load_products_df raising an error
-        logger.error(
-            "Products DataFrame is not loaded. Cannot update stock for product_id: %s",
-            product_id,
+    reservations = get_inventory(load_products_df()).reserve_lines(
+        lines, all_or_nothing=all_or_nothing, idempotency_keys=idempotency_keys
+    )
+    results = []
+    for reservation in reservations:
+        status = _reservation_status(reservation)
+        if reservation.replayed:
+            logger.info(
+                "Line for product ID '%s' was already reserved; not decrementing again.",
+                reservation.product_id,
+            )
+        elif status == StockUpdateStatus.SUCCESS:
+            logger.info(
+                "Reserved %d of product ID '%s'; %d left in stock.",
+                reservation.quantity,
+                reservation.product_id,
+                reservation.stock,
+            )
+        elif status == StockUpdateStatus.INSUFFICIENT_STOCK:
+            logger.info(
+                "Insufficient stock for product ID '%s'. Requested: %d, Available: %d",
+                reservation.product_id,
+                reservation.quantity,
+                reservation.stock,
+            )
+        else:
+            logger.warning(
+                "Product ID '%s' not found in DataFrame for stock update attempt.",
+                reservation.product_id,
+            )
+        results.append(
+            StockReservationResult(
+                product_id=reservation.product_id,
+                quantity=reservation.quantity,
+                status=status,
+                stock=reservation.stock,
+                reserved_quantity=reservation.quantity if reservation.reserved else 0,
+                replayed=reservation.replayed,
+            )
         )
-        return StockUpdateStatus.PRODUCT_NOT_FOUND
+    return results
 
-    # Find the product
-    product_rows = products_df[products_df["product_id"] == product_id]
-    if product_rows.empty:
-        logger.warning(
-            "Product ID '%s' not found in DataFrame for stock update attempt.",
-            product_id,
-        )
-        return StockUpdateStatus.PRODUCT_NOT_FOUND
 
-    # Get current stock
-    product_row_index = product_rows.index[0]
-    current_stock_val = products_df.loc[product_row_index, "stock"]
+def update_stock(product_id: str, quantity_to_decrement: int) -> StockUpdateStatus:
+    """Update the stock level for a product by decrementing the specified quantity.
+    This should be called when an order is confirmed to be fulfilled.
 
-    # Handle stock conversion safely
-    try:
-        current_stock = (
-            int(float(str(current_stock_val))) if pd.notna(current_stock_val) else 0
-        )
-    except (ValueError, TypeError):
-        logger.error(
-            "Error converting stock value for product ID '%s'. Value: %s",
-            product_id,
-            current_stock_val,
-            exc_info=True,
-        )
-        current_stock = 0  # Treat as 0 if conversion fails
-
-    # Check if we have enough stock
-    if current_stock < quantity_to_decrement:
-        logger.info(
-            "Insufficient stock for product ID '%s'. Requested: %d, Available: %d",
-            product_id,
-            quantity_to_decrement,
-            current_stock,
-        )
-        return StockUpdateStatus.INSUFFICIENT_STOCK
+    The check and the decrement are one atomic step, so concurrent calls never take
+    the stock below zero.
 
-    # Calculate the new stock level
-    new_stock_level = current_stock - quantity_to_decrement
-
-    # Ensure new_stock_level is non-negative (already done in previous logic, but good to be explicit)
-    if new_stock_level < 0:
-        logger.warning(
-            "Calculated new_stock_level for product ID '%s' is %d (decrementing %d from %d). Setting to 0.",
-            product_id,
-            new_stock_level,
-            quantity_to_decrement,
-            current_stock,
-        )
-        new_stock_level = 0
-
-    # Directly update the stock in the DataFrame
-    products_df.loc[product_row_index, "stock"] = new_stock_level
-    logger.info(
-        "Stock for product ID '%s' updated to %d in the in-memory DataFrame (decremented by %d from %d).",
-        product_id,
-        new_stock_level,
-        quantity_to_decrement,
-        current_stock,
-    )
+    Args:
+        product_id: The product ID to update stock for.
+        quantity_to_decrement: The amount to decrement from current stock.
 
-    return StockUpdateStatus.SUCCESS
+    Returns:
+        A StockUpdateStatus enum indicating the outcome of the stock update.
+    """
+    return reserve_stock([(product_id, quantity_to_decrement)])[0].status
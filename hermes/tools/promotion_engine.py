@@ -0,0 +1,636 @@
+"""Promotion specs compiled into indexes for fast order pricing.
+
+Pricing an order used to validate every spec and check every spec against every line.
+`compile_promotions` validates a list of specs once (compiled lists are cached by
+content and version) and indexes the rules:
+
+- combination rules under one of their trigger products, so only combinations that
+  share a product with the order are checked;
+- line rules under the product their discount targets (or as global rules), each
+  index sorted by quantity threshold, so a line only visits rules it qualifies for.
+
+Rules are still applied in spec order, so pricing is the same as checking every spec
+in turn.
+
+`CompiledPromotions.price_batch` prices many orders at once for what-if simulations:
+orders are given as columns (order ID, product ID, quantity and base price per line)
+and each rule is applied to all qualifying lines with NumPy operations, with the same
+results as `apply` on each order.
+"""
+
+import json
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Hashable, Iterable, Sequence
+
+import numpy as np
+import pandas as pd  # type: ignore
+
+from hermes.data.search_cache import SearchCache
+from hermes.model.order import Order, OrderLine
+from hermes.model.promotions import PromotionSpec
+
+
+DEFAULT_PROMOTION_CACHE_SIZE = 256
+
+_compiled_promotions = SearchCache("promotions", DEFAULT_PROMOTION_CACHE_SIZE)
+
+
+@dataclass(frozen=True)
+class _Rule:
+    # Position of the spec in the compiled list; rules are applied in this order
+    order: int
+    spec: PromotionSpec
+    # Lowest line quantity the rule can apply to
+    threshold: int = 0
+
+
+@dataclass
+class _ThresholdIndex:
+    """Rules sorted by threshold, so the rules a quantity qualifies for are a prefix."""
+
+    thresholds: list[int] = field(default_factory=list)
+    rules: list[_Rule] = field(default_factory=list)
+
+    def add(self, rule: _Rule) -> None:
+        at = bisect_right(self.thresholds, rule.threshold)
+        self.thresholds.insert(at, rule.threshold)
+        self.rules.insert(at, rule)
+
+    def qualifying(self, quantity: int) -> list[_Rule]:
+        return self.rules[: bisect_right(self.thresholds, quantity)]
+
+
+@dataclass
+class BatchPricing:
+    """Prices of a batch of order lines and their orders.
+
+    Line arrays follow the order of the input lines; order arrays follow `order_ids`
+    (the distinct order IDs, in order of first appearance).
+    """
+
+    unit_prices: np.ndarray
+    total_prices: np.ndarray
+    line_discounts: np.ndarray
+    promotion_applied: np.ndarray
+    order_ids: np.ndarray
+    order_discounts: np.ndarray
+    order_totals: np.ndarray
+
+    def lines_df(self) -> pd.DataFrame:
+        """Per-line prices as a DataFrame."""
+        return pd.DataFrame(
+            {
+                "unit_price": self.unit_prices,
+                "total_price": self.total_prices,
+                "discount": self.line_discounts,
+                "promotion_applied": self.promotion_applied,
+            }
+        )
+
+    def orders_df(self) -> pd.DataFrame:
+        """Per-order discount and total price as a DataFrame indexed by order ID."""
+        return pd.DataFrame(
+            {"total_discount": self.order_discounts, "total_price": self.order_totals},
+            index=pd.Index(self.order_ids, name="order_id"),
+        )
+
+
+class CompiledPromotions:
+    """A list of promotion specs, validated once and indexed for evaluation."""
+
+    def __init__(self, specs: Iterable[PromotionSpec]):
+        self.specs = list(specs)
+        # Combination rules, keyed by the smallest product ID they require
+        self._combinations: dict[str, list[tuple[_Rule, frozenset[str]]]] = {}
+        # Line rules that can only affect one product, keyed by that product
+        self._targeted: dict[str, _ThresholdIndex] = {}
+        # Line rules that can affect any product
+        self._global = _ThresholdIndex()
+
+        for order, spec in enumerate(self.specs):
+            conditions = spec.conditions
+            if conditions.product_combination is not None:
+                required = frozenset(conditions.product_combination)
+                self._combinations.setdefault(min(required), []).append(
+                    (_Rule(order, spec), required)
+                )
+                continue
+            if conditions.min_quantity is None and conditions.applies_every is None:
+                continue
+            rule = _Rule(
+                order,
+                spec,
+                max(conditions.min_quantity or 0, conditions.applies_every or 0),
+            )
+            effects = spec.effects
+            target = (
+                effects.apply_discount.to_product_id
+                if effects.apply_discount is not None
+                else None
+            )
+            # Free items and gifts apply to every qualifying line, whatever the target
+            if (
+                target is not None
+                and effects.free_items is None
+                and effects.free_gift is None
+            ):
+                self._targeted.setdefault(target, _ThresholdIndex()).add(rule)
+            else:
+                self._global.add(rule)
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def apply(self, order: Order) -> Order:
+        """Apply the promotions to an order in place and recalculate its totals."""
+        discounts: list[float] = []
+        order_products = {line.product_id for line in order.lines}
+
+        combinations = sorted(
+            (
+                (rule, required)
+                for product_id in order_products
+                for rule, required in self._combinations.get(product_id, ())
+            ),
+            key=lambda combination: combination[0].order,
+        )
+        for rule, required in combinations:
+            if required.issubset(order_products):
+                _apply_combination(order, rule.spec, required, discounts)
+
+        for line in order.lines:
+            # Reset promotion fields if not already set by combination promotions
+            if not line.promotion_applied:
+                line.unit_price = line.base_price
+                line.promotion_applied = False
+                line.promotion_description = None
+            if line.unit_price is None:
+                line.unit_price = line.base_price
+
+            # Only rules whose quantity threshold the line meets
+            for rule in self._line_rules(line):
+                if rule.spec.conditions.applies_every is not None:
+                    _apply_every_nth(line, rule.spec, discounts)
+                else:
+                    _apply_to_line(line, rule.spec, discounts)
+
+            line.total_price = (line.unit_price or line.base_price) * line.quantity
+
+        # Added one at a time in application order, as a spec-by-spec evaluation does;
+        # sum() uses compensated summation on Python 3.12+ and can differ in the last bit
+        total_discount = 0.0
+        for discount in discounts:
+            total_discount += discount
+        order.total_discount = total_discount
+        order.total_price = sum(line.total_price or 0.0 for line in order.lines)
+        return order
+
+    def price_batch(
+        self,
+        order_ids: Sequence[Any] | np.ndarray,
+        product_ids: Sequence[str] | np.ndarray,
+        quantities: Sequence[int] | np.ndarray,
+        base_prices: Sequence[float] | np.ndarray,
+    ) -> BatchPricing:
+        """Price many orders given as columns, one entry per order line.
+
+        Lines start at their base price, as new order lines do. The lines of an order
+        need not be contiguous; their relative order is kept.
+
+        Args:
+            order_ids: The order each line belongs to.
+            product_ids: Product ID per line.
+            quantities: Quantity per line.
+            base_prices: Base unit price per line.
+
+        Returns:
+            Unit and total price, discount and promotion flag per line, and the total
+            discount and price per order.
+        """
+        return _BatchPricer(self, order_ids, product_ids, quantities, base_prices).run()
+
+    def _line_rules(self, line: OrderLine) -> list[_Rule]:
+        rules = self._global.qualifying(line.quantity)
+        targeted = self._targeted.get(line.product_id)
+        if targeted is not None:
+            rules = sorted(
+                rules + targeted.qualifying(line.quantity), key=lambda rule: rule.order
+            )
+        elif len(rules) > 1:
+            rules = sorted(rules, key=lambda rule: rule.order)
+        return rules
+
+
+class _BatchPricer:
+    """Applies compiled rules to columnar order lines, one rule at a time.
+
+    Every rule updates all lines it applies to at once. A line's rules still run in
+    spec order, and each discount is recorded with its position in the sequence
+    `apply` would add it in, so order totals are summed in exactly that order.
+    """
+
+    def __init__(
+        self,
+        promotions: CompiledPromotions,
+        order_ids: Sequence[Any] | np.ndarray,
+        product_ids: Sequence[str] | np.ndarray,
+        quantities: Sequence[int] | np.ndarray,
+        base_prices: Sequence[float] | np.ndarray,
+    ):
+        self.promotions = promotions
+        self.order_codes, self.order_ids = pd.factorize(np.asarray(order_ids))
+        self.product_codes, product_index = pd.factorize(
+            np.asarray(product_ids, dtype=object)
+        )
+        self.product_index = pd.Index(product_index)
+        self.quantities = np.asarray(quantities, dtype=np.int64)
+        self.base_prices = np.asarray(base_prices, dtype=np.float64)
+        self.unit_prices = self.base_prices.copy()
+        self.applied = np.zeros(len(self.quantities), dtype=bool)
+        self.line_numbers = np.arange(len(self.quantities))
+        # Discounts as (phase, major, minor, step, line, amount) chunks; sorting by the
+        # first four gives the sequence `apply` adds them in within an order
+        self._discounts: list[tuple[Any, ...]] = []
+
+    def run(self) -> BatchPricing:
+        for rule, required in sorted(
+            (
+                combination
+                for combinations in self.promotions._combinations.values()
+                for combination in combinations
+            ),
+            key=lambda combination: combination[0].order,
+        ):
+            self._apply_combination(rule, required)
+
+        line_rules = [rule for index in self._line_indexes() for rule in index.rules]
+        for rule in sorted(line_rules, key=lambda rule: rule.order):
+            self._apply_line_rule(rule)
+
+        quantities = self.quantities.astype(np.float64)
+        # As in `apply`, a zero unit price falls back to the base price
+        total_prices = (
+            np.where(self.unit_prices != 0, self.unit_prices, self.base_prices)
+            * quantities
+        )
+        order_count = len(self.order_ids)
+        order_totals = self._order_totals(total_prices, order_count)
+
+        order_discounts = np.zeros(order_count)
+        line_discounts = np.zeros(len(self.quantities))
+        if self._discounts:
+            phase, major, minor, step, lines, amounts = (
+                np.concatenate(
+                    [
+                        np.broadcast_to(chunk[field], chunk[4].shape)
+                        for chunk in self._discounts
+                    ]
+                )
+                for field in range(6)
+            )
+            sequence = np.lexsort((step, minor, major, phase, self.order_codes[lines]))
+            lines, amounts = lines[sequence], amounts[sequence]
+            # np.add.at adds one element at a time, like the `+=` loop in `apply`
+            np.add.at(order_discounts, self.order_codes[lines], amounts)
+            np.add.at(line_discounts, lines, amounts)
+
+        return BatchPricing(
+            unit_prices=self.unit_prices,
+            total_prices=total_prices,
+            line_discounts=line_discounts,
+            promotion_applied=self.applied,
+            order_ids=np.asarray(self.order_ids),
+            order_discounts=order_discounts,
+            order_totals=order_totals,
+        )
+
+    def _order_totals(self, total_prices: np.ndarray, order_count: int) -> np.ndarray:
+        # `apply` totals an order's lines with the built-in sum(), which is compensated
+        # on Python 3.12+, so each order's line totals are summed with it as well
+        sequence = np.argsort(self.order_codes, kind="stable")
+        boundaries = np.searchsorted(
+            self.order_codes[sequence], np.arange(order_count + 1)
+        ).tolist()
+        prices = total_prices[sequence].tolist()
+        return np.array(
+            [
+                sum(prices[start:end])
+                for start, end in zip(boundaries[:-1], boundaries[1:])
+            ],
+            dtype=np.float64,
+        )
+
+    def _line_indexes(self) -> list[_ThresholdIndex]:
+        return [self.promotions._global, *self.promotions._targeted.values()]
+
+    def _product_mask(self, product_id: str | None) -> np.ndarray:
+        if product_id is None:
+            return np.ones(len(self.quantities), dtype=bool)
+        code = self.product_index.get_indexer([product_id])[0]
+        return self.product_codes == code
+
+    def _record(
+        self,
+        phase: int,
+        major: np.ndarray,
+        minor: np.ndarray,
+        step: int,
+        lines: np.ndarray,
+        amounts: np.ndarray,
+    ) -> None:
+        if len(lines):
+            self._discounts.append((phase, major, minor, step, lines, amounts))
+
+    def _apply_combination(self, rule: _Rule, required: frozenset[str]) -> None:
+        qualifying_orders: np.ndarray | None = None
+        for product_id in required:
+            orders = np.unique(self.order_codes[self._product_mask(product_id)])
+            qualifying_orders = (
+                orders
+                if qualifying_orders is None
+                else np.intersect1d(qualifying_orders, orders, assume_unique=True)
+            )
+        if qualifying_orders is None or len(qualifying_orders) == 0:
+            return
+        in_orders = np.isin(self.order_codes, qualifying_orders)
+
+        effects = rule.spec.effects
+        discount_spec = effects.apply_discount
+        if discount_spec is not None and discount_spec.type in ("percentage", "fixed"):
+            lines = np.flatnonzero(
+                in_orders & self._product_mask(discount_spec.to_product_id)
+            )
+            unit = self.unit_prices[lines]
+            if discount_spec.type == "percentage":
+                discount_amount = unit * (discount_spec.amount / 100)
+            else:
+                discount_amount = np.minimum(discount_spec.amount, unit)
+            self.unit_prices[lines] = unit - discount_amount
+            self.applied[lines] = True
+            # `apply` goes rule by rule, then line by line
+            self._record(
+                0,
+                np.full(len(lines), rule.order),
+                lines,
+                0,
+                lines,
+                discount_amount * self.quantities[lines],
+            )
+
+        if effects.free_gift is not None:
+            # Noted on the first line of each order with a required product
+            required_mask = np.isin(
+                self.product_codes, self.product_index.get_indexer(list(required))
+            )
+            lines = np.flatnonzero(in_orders & required_mask)
+            _, first = np.unique(self.order_codes[lines], return_index=True)
+            self.applied[lines[first]] = True
+
+    def _apply_line_rule(self, rule: _Rule) -> None:
+        lines = np.flatnonzero(self.quantities >= rule.threshold)
+        if not len(lines):
+            return
+        effects = rule.spec.effects
+        every = rule.spec.conditions.applies_every
+
+        discount_spec = effects.apply_discount
+        if discount_spec is not None:
+            targeted = lines[self._product_mask(discount_spec.to_product_id)[lines]]
+            unit = self.unit_prices[targeted]
+            base = self.base_prices[targeted]
+            quantity = self.quantities[targeted]
+            if every is not None:
+                items = quantity // every
+                if discount_spec.type == "percentage":
+                    line_discount = unit * (discount_spec.amount / 100) * items
+                elif discount_spec.type == "fixed":
+                    line_discount = np.minimum(discount_spec.amount, unit) * items
+                else:
+                    line_discount = base * 0.5 * items
+                self.unit_prices[targeted] = unit - line_discount / quantity
+            elif discount_spec.type in ("percentage", "fixed"):
+                if discount_spec.type == "percentage":
+                    discount_amount = unit * (discount_spec.amount / 100)
+                else:
+                    discount_amount = np.minimum(discount_spec.amount, unit)
+                self.unit_prices[targeted] = unit - discount_amount
+                line_discount = discount_amount * quantity
+            else:
+                # Buy one, get one 50% off: every second item is half price
+                bogo = quantity >= 2
+                targeted, base, quantity = targeted[bogo], base[bogo], quantity[bogo]
+                line_discount = (base * 0.5) * (quantity // 2)
+                self.unit_prices[targeted] = (
+                    base * quantity - line_discount
+                ) / quantity
+            self.applied[targeted] = True
+            self._record_line_discounts(rule, 0, targeted, line_discount)
+
+        if effects.free_items is not None:
+            unit = self.unit_prices[lines]
+            quantity = self.quantities[lines]
+            free_count = np.minimum(
+                effects.free_items * (quantity // every if every is not None else 1),
+                quantity,
+            )
+            discount_per_item = unit * (free_count / quantity)
+            self.unit_prices[lines] = unit - discount_per_item
+            self.applied[lines] = True
+            self._record_line_discounts(rule, 1, lines, discount_per_item * quantity)
+
+        if effects.free_gift is not None:
+            self.applied[lines] = True
+
+    def _record_line_discounts(
+        self, rule: _Rule, step: int, lines: np.ndarray, amounts: np.ndarray
+    ) -> None:
+        # `apply` goes line by line, then rule by rule, then discount before free items
+        self._record(1, lines, np.full(len(lines), rule.order), step, lines, amounts)
+
+
+def _apply_combination(
+    order: Order,
+    promotion: PromotionSpec,
+    required: frozenset[str],
+    discounts: list[float],
+) -> None:
+    if promotion.effects.apply_discount is not None:
+        discount_spec = promotion.effects.apply_discount
+        target_product_id = discount_spec.to_product_id
+        for line in order.lines:
+            if target_product_id is None or line.product_id == target_product_id:
+                if line.unit_price is None:
+                    line.unit_price = line.base_price
+                if discount_spec.type == "percentage":
+                    discount_amount = line.unit_price * (discount_spec.amount / 100)
+                    line.unit_price -= discount_amount
+                    discounts.append(discount_amount * line.quantity)
+                    line.promotion_applied = True
+                    line.promotion_description = (
+                        f"{discount_spec.amount}% discount applied"
+                    )
+                elif discount_spec.type == "fixed":
+                    discount_amount = min(discount_spec.amount, line.unit_price)
+                    line.unit_price -= discount_amount
+                    discounts.append(discount_amount * line.quantity)
+                    line.promotion_applied = True
+                    line.promotion_description = (
+                        f"${discount_spec.amount} discount applied"
+                    )
+
+    if promotion.effects.free_gift is not None:
+        # Noted on the first qualifying product only
+        for line in order.lines:
+            if line.product_id in required:
+                _add_free_gift(line, promotion.effects.free_gift)
+                break
+
+
+def _apply_to_line(
+    line: OrderLine, promotion: PromotionSpec, discounts: list[float]
+) -> None:
+    """Apply a min-quantity promotion to a line that meets the threshold."""
+    assert line.unit_price is not None
+    discount_spec = promotion.effects.apply_discount
+    if discount_spec is not None and (
+        discount_spec.to_product_id is None
+        or discount_spec.to_product_id == line.product_id
+    ):
+        if discount_spec.type == "percentage":
+            discount_amount = line.unit_price * (discount_spec.amount / 100)
+            line.unit_price -= discount_amount
+            discounts.append(discount_amount * line.quantity)
+            line.promotion_applied = True
+            line.promotion_description = f"{discount_spec.amount}% discount applied"
+        elif discount_spec.type == "fixed":
+            discount_amount = min(discount_spec.amount, line.unit_price)
+            line.unit_price -= discount_amount
+            discounts.append(discount_amount * line.quantity)
+            line.promotion_applied = True
+            line.promotion_description = f"${discount_spec.amount} discount applied"
+        elif discount_spec.type == "bogo_half":
+            # BOGO: Buy one get one 50% off
+            # For quantity >= 2, every second item gets 50% off
+            if line.quantity >= 2:
+                discounted_items = line.quantity // 2
+                discount_per_item = line.base_price * 0.5
+                total_item_discount = discount_per_item * discounted_items
+
+                # Calculate new unit price (average across all items)
+                total_original = line.base_price * line.quantity
+                total_after_discount = total_original - total_item_discount
+                line.unit_price = total_after_discount / line.quantity
+
+                discounts.append(total_item_discount)
+                line.promotion_applied = True
+                line.promotion_description = f"Buy one, get one 50% off (saved ${total_item_discount:.2f})"
+
+    if promotion.effects.free_items is not None:
+        free_count = min(promotion.effects.free_items, line.quantity)
+        discount_per_item = line.unit_price * (free_count / line.quantity)
+        discounts.append(discount_per_item * line.quantity)
+        line.unit_price -= discount_per_item
+        line.promotion_applied = True
+        line.promotion_description = (
+            f"Buy {line.quantity - free_count}, get {free_count} free"
+        )
+
+    if promotion.effects.free_gift is not None:
+        _add_free_gift(line, promotion.effects.free_gift)
+
+
+def _apply_every_nth(
+    line: OrderLine, promotion: PromotionSpec, discounts: list[float]
+) -> None:
+    """Apply a promotion to every Nth item of a line (applies_every = N).
+
+    A discount is taken off each Nth item, free_items are given per N items bought,
+    and a free gift is added once. The line meets the rule's threshold, so it has at
+    least N items (and min_quantity, if that is set too).
+    """
+    assert line.unit_price is not None
+    every = promotion.conditions.applies_every
+    assert every is not None
+    items = line.quantity // every
+
+    every_nth = f"every {_ordinal(every)} item"
+    discount_spec = promotion.effects.apply_discount
+    if discount_spec is not None and (
+        discount_spec.to_product_id is None
+        or discount_spec.to_product_id == line.product_id
+    ):
+        if discount_spec.type == "percentage":
+            line_discount = line.unit_price * (discount_spec.amount / 100) * items
+            description = f"{discount_spec.amount}% discount on {every_nth}"
+        elif discount_spec.type == "fixed":
+            line_discount = min(discount_spec.amount, line.unit_price) * items
+            description = f"${discount_spec.amount} discount on {every_nth}"
+        else:
+            line_discount = line.base_price * 0.5 * items
+            description = f"50% off {every_nth}"
+        line.unit_price -= line_discount / line.quantity
+        discounts.append(line_discount)
+        line.promotion_applied = True
+        line.promotion_description = f"{description} (saved ${line_discount:.2f})"
+
+    if promotion.effects.free_items is not None:
+        free_count = min(promotion.effects.free_items * items, line.quantity)
+        discount_per_item = line.unit_price * (free_count / line.quantity)
+        discounts.append(discount_per_item * line.quantity)
+        line.unit_price -= discount_per_item
+        line.promotion_applied = True
+        line.promotion_description = (
+            f"Buy {line.quantity - free_count}, get {free_count} free"
+        )
+
+    if promotion.effects.free_gift is not None:
+        _add_free_gift(line, promotion.effects.free_gift)
+
+
+def _add_free_gift(line: OrderLine, gift_description: str) -> None:
+    line.promotion_applied = True
+    line.promotion_description = (
+        f"Free gift: {gift_description}"
+        if line.promotion_description is None
+        else f"{line.promotion_description} + Free gift: {gift_description}"
+    )
+
+
+def _ordinal(number: int) -> str:
+    if 10 <= number % 100 <= 20:
+        suffix = "th"
+    else:
+        suffix = {1: "st", 2: "nd", 3: "rd"}.get(number % 10, "th")
+    return f"{number}{suffix}"
+
+
+def _spec_key(spec: PromotionSpec | dict[str, Any]) -> str:
+    if isinstance(spec, dict):
+        return json.dumps(spec, sort_keys=True, default=str)
+    return spec.model_dump_json()
+
+
+def compile_promotions(
+    specs: Iterable[PromotionSpec | dict[str, Any]], version: Hashable = None
+) -> CompiledPromotions:
+    """Validate and index promotion specs, reusing an earlier compilation of the same specs.
+
+    Args:
+        specs: PromotionSpec objects or dictionaries, in the order they apply.
+        version: Compilations made under another version (e.g. catalog version) are
+            not reused.
+
+    Returns:
+        The compiled promotions.
+    """
+    specs = list(specs)
+    key = tuple(_spec_key(spec) for spec in specs)
+    compiled = _compiled_promotions.get(key, version)
+    if compiled is None:
+        compiled = CompiledPromotions(
+            spec if isinstance(spec, PromotionSpec) else PromotionSpec.model_validate(spec)
+            for spec in specs
+        )
+        _compiled_promotions.put(key, version, compiled)
+    return compiled
@@ -1,11 +1,293 @@
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Callable
+
 import pandas as pd
+from hermes.config import HermesConfig
 from hermes.utils.logger import logger, get_agent_logger
 
 
+GSHEET_EXPORT_URL = "https://docs.google.com/spreadsheets/d/{document_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
+
+# Google Sheets document IDs are long URL-safe tokens (44 characters in practice)
+GSHEET_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{20,}$")
+
+
+def is_gsheet_id(value: str) -> bool:
+    """Whether a string looks like a Google Sheets document ID."""
+    return bool(GSHEET_ID_PATTERN.match(value))
+
+
+@dataclass
+class TransportResponse:
+    """Status, body and headers of an HTTP GET."""
+
+    status: int
+    body: bytes
+    headers: dict[str, str]
+
+
+# Performs a GET of url with the given request headers
+GSheetTransport = Callable[[str, dict[str, str]], TransportResponse]
+
+
+def urllib_transport(
+    url: str, headers: dict[str, str], timeout: float = 30.0
+) -> TransportResponse:
+    """Default transport; a 304 Not Modified is returned rather than raised."""
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return TransportResponse(
+                response.status, response.read(), dict(response.headers.items())
+            )
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return TransportResponse(304, b"", dict(e.headers.items()))
+        raise
+
+
+@dataclass
+class GSheetSnapshot:
+    """The last fetched CSV export of a sheet."""
+
+    document_id: str
+    sheet_name: str
+    content: bytes
+    content_hash: str
+    fetched_at: float
+    etag: str | None = None
+    last_modified: str | None = None
+    # True when served from the snapshot after the sheet could not be fetched
+    stale: bool = False
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.read_csv(io.BytesIO(self.content))
+
+
+class GSheetSnapshotCache:
+    """Local snapshots of Google Sheets CSV exports.
+
+    A snapshot younger than the TTL is served without touching the network. An older
+    one is revalidated with a conditional request (ETag / Last-Modified) and kept when
+    the sheet's content hash is unchanged. If the sheet cannot be fetched, the last
+    snapshot is served instead, so runs keep working offline.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | None,
+        ttl_seconds: float = 300.0,
+        transport: GSheetTransport = urllib_transport,
+        url_template: str = GSHEET_EXPORT_URL,
+    ):
+        """Create the cache.
+
+        Args:
+            cache_dir: Directory for snapshot files; None keeps snapshots in memory only.
+            ttl_seconds: Age after which a snapshot is revalidated.
+            transport: Performs the HTTP requests.
+            url_template: Export URL with {document_id} and {sheet_name} placeholders.
+        """
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.transport = transport
+        self.url_template = url_template
+        self._snapshots: dict[tuple[str, str], GSheetSnapshot] = {}
+        self._locks: dict[tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def fetch(self, document_id: str, sheet_name: str) -> GSheetSnapshot:
+        """Return a snapshot of the sheet, fetching it if the TTL has expired."""
+        key = (document_id, sheet_name)
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        # One fetch per sheet at a time; concurrent callers share its result
+        with lock:
+            snapshot = self._snapshots.get(key) or self._read_snapshot(key)
+            if snapshot is not None and time.time() - snapshot.fetched_at < self.ttl_seconds:
+                self._snapshots[key] = snapshot
+                return snapshot
+
+            headers: dict[str, str] = {}
+            if snapshot is not None and snapshot.etag:
+                headers["If-None-Match"] = snapshot.etag
+            if snapshot is not None and snapshot.last_modified:
+                headers["If-Modified-Since"] = snapshot.last_modified
+            url = self.url_template.format(
+                document_id=urllib.parse.quote(document_id, safe=""),
+                sheet_name=urllib.parse.quote(sheet_name, safe=""),
+            )
+            try:
+                response = self.transport(url, headers)
+                if response.status not in (200, 304) or (
+                    response.status == 304 and snapshot is None
+                ):
+                    raise OSError(f"HTTP {response.status}")
+            except Exception as e:
+                if snapshot is None:
+                    raise
+                logger.warning(
+                    get_agent_logger(
+                        "Utils",
+                        f"Could not fetch GSheet [cyan underline]{document_id}#[/cyan underline][yellow]{sheet_name}[/yellow] ({e}); "
+                        f"using the snapshot from {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot.fetched_at))}",
+                    )
+                )
+                snapshot = replace(snapshot, stale=True)
+                self._snapshots[key] = snapshot
+                return snapshot
+
+            now = time.time()
+            etag = response.headers.get("ETag") or response.headers.get("Etag")
+            last_modified = response.headers.get("Last-Modified")
+            if response.status == 304:
+                assert snapshot is not None
+                snapshot = replace(snapshot, fetched_at=now, stale=False)
+            else:
+                content_hash = hashlib.sha256(response.body).hexdigest()
+                if snapshot is not None and snapshot.content_hash == content_hash:
+                    # Refetched but unchanged: only the timestamp moves
+                    snapshot = replace(
+                        snapshot,
+                        fetched_at=now,
+                        etag=etag,
+                        last_modified=last_modified,
+                        stale=False,
+                    )
+                else:
+                    snapshot = GSheetSnapshot(
+                        document_id=document_id,
+                        sheet_name=sheet_name,
+                        content=response.body,
+                        content_hash=content_hash,
+                        fetched_at=now,
+                        etag=etag,
+                        last_modified=last_modified,
+                    )
+                    self._write_content(key, snapshot)
+            self._write_metadata(key, snapshot)
+            self._snapshots[key] = snapshot
+            return snapshot
+
+    def prefetch(self, sheets: list[tuple[str, str]]) -> None:
+        """Fetch several sheets concurrently; failures surface on the later `fetch`."""
+        unique = list(dict.fromkeys(sheets))
+        if len(unique) < 2:
+            for document_id, sheet_name in unique:
+                self._fetch_quietly(document_id, sheet_name)
+            return
+        with ThreadPoolExecutor(
+            max_workers=len(unique), thread_name_prefix="hermes-gsheet"
+        ) as pool:
+            list(pool.map(lambda sheet: self._fetch_quietly(*sheet), unique))
+
+    def clear(self) -> None:
+        """Forget the in-memory snapshots; files on disk are kept."""
+        self._snapshots.clear()
+
+    def _fetch_quietly(self, document_id: str, sheet_name: str) -> None:
+        try:
+            self.fetch(document_id, sheet_name)
+        except Exception:
+            pass
+
+    def _paths(self, key: tuple[str, str]) -> tuple[str, str] | None:
+        if not self.cache_dir:
+            return None
+        name = hashlib.sha256("#".join(key).encode()).hexdigest()[:16]
+        base = os.path.join(self.cache_dir, name)
+        return f"{base}.csv", f"{base}.json"
+
+    def _read_snapshot(self, key: tuple[str, str]) -> GSheetSnapshot | None:
+        paths = self._paths(key)
+        if paths is None or not os.path.exists(paths[1]):
+            return None
+        try:
+            with open(paths[1], encoding="utf-8") as f:
+                metadata = json.load(f)
+            with open(paths[0], "rb") as f:
+                content = f.read()
+        except (OSError, ValueError) as e:
+            logger.warning(
+                get_agent_logger("Utils", f"Ignoring unreadable GSheet snapshot: {e}")
+            )
+            return None
+        if hashlib.sha256(content).hexdigest() != metadata.get("content_hash"):
+            return None
+        return GSheetSnapshot(
+            document_id=key[0],
+            sheet_name=key[1],
+            content=content,
+            content_hash=metadata["content_hash"],
+            fetched_at=metadata.get("fetched_at", 0.0),
+            etag=metadata.get("etag"),
+            last_modified=metadata.get("last_modified"),
+        )
+
+    def _write_content(self, key: tuple[str, str], snapshot: GSheetSnapshot) -> None:
+        paths = self._paths(key)
+        if paths is not None:
+            self._write_atomically(paths[0], snapshot.content)
+
+    def _write_metadata(self, key: tuple[str, str], snapshot: GSheetSnapshot) -> None:
+        paths = self._paths(key)
+        if paths is None:
+            return
+        metadata = {
+            "document_id": snapshot.document_id,
+            "sheet_name": snapshot.sheet_name,
+            "content_hash": snapshot.content_hash,
+            "fetched_at": snapshot.fetched_at,
+            "etag": snapshot.etag,
+            "last_modified": snapshot.last_modified,
+        }
+        self._write_atomically(paths[1], json.dumps(metadata).encode())
+
+    def _write_atomically(self, path: str, data: bytes) -> None:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        except OSError as e:
+            logger.warning(
+                get_agent_logger("Utils", f"Could not write GSheet snapshot {path}: {e}")
+            )
+
+
+_config = HermesConfig()
+
+# Process-wide snapshot cache used by read_data_from_gsheet
+gsheet_snapshots = GSheetSnapshotCache(
+    _config.gsheet_cache_dir, ttl_seconds=_config.gsheet_cache_ttl_seconds
+)
+
+
+def read_gsheet_snapshot(document_id: str, sheet_name: str) -> GSheetSnapshot:
+    """Return the (possibly cached) CSV snapshot of a Google Sheet."""
+    return gsheet_snapshots.fetch(document_id, sheet_name)
+
+
 def read_data_from_gsheet(document_id: str, sheet_name: str) -> pd.DataFrame:
     """Reads a sheet from a Google Spreadsheet into a pandas DataFrame."""
-    export_link = f"https://docs.google.com/spreadsheets/d/{document_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
-    dataframe = pd.read_csv(export_link)
+    dataframe = read_gsheet_snapshot(document_id, sheet_name).to_dataframe()
     logger.info(
         get_agent_logger(
             "Utils",
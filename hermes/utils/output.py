@@ -1,96 +1,104 @@
 import asyncio
 import os
 import pandas as pd
-import yaml
-from typing import Any
 
 from hermes.workflow.states import WorkflowOutput
+from hermes.utils.output_segments import (
+    COMPACT_AFTER_SEGMENTS,
+    OUTPUT_TABLES,
+    append_output_segment,
+    compact_output,
+    count_output_segments,
+    new_segment_name,
+    table_path,
+)
+from hermes.utils.result_serializers import get_result_serializer
 from hermes.utils.logger import logger, get_agent_logger
 
 
+# Background compactions still running; referenced so they are not garbage collected
+_compactions: set[asyncio.Task] = set()
+
+
+def _compact_quietly(output_dir: str) -> None:
+    try:
+        compact_output(output_dir)
+    except Exception as e:
+        # The segments are kept, so readers and the next compaction still see them
+        logger.warning(
+            get_agent_logger(
+                "Utils",
+                f"Error compacting output in [cyan underline]{output_dir}[/cyan underline]: {e}",
+            ),
+            exc_info=True,
+        )
+
+
 async def create_output_csv(
     email_classification_df: pd.DataFrame,
     order_status_df: pd.DataFrame,
     order_response_df: pd.DataFrame,
     inquiry_response_df: pd.DataFrame,
     output_dir: str = "./output",  # Changed default, though core.py will pass this value
+    run_id: str | None = None,
+    compact: bool = False,
+    compact_after_segments: int = COMPACT_AFTER_SEGMENTS,
 ) -> dict[str, str]:
-    """Create CSV files with the assignment output, merging with existing data."""
+    """Create CSV files with the assignment output, merging with existing data.
+
+    The rows are appended as one segment per table (see `output_segments`), so a run
+    writes only its own rows; `read_output_table` merges them with earlier output, and
+    emails processed again replace their earlier rows. Once a table has collected
+    compact_after_segments segments, a compaction into the canonical CSVs is started
+    in the background without the run waiting for it.
+
+    Args:
+        email_classification_df: Rows for email-classification.csv.
+        order_status_df: Rows for order-status.csv.
+        order_response_df: Rows for order-response.csv.
+        inquiry_response_df: Rows for inquiry-response.csv.
+        output_dir: The output directory.
+        run_id: Optional name of the run or shard, recorded in the segment names.
+        compact: Compact the output directory now and wait for it.
+        compact_after_segments: Segments per table that start a background compaction.
+
+    Returns:
+        The canonical CSV paths by table. Until a compaction has run they may be
+        missing or behind the segments; read tables with `read_output_table`.
+    """
     # Create output directory if it doesn't exist
     await asyncio.to_thread(os.makedirs, output_dir, exist_ok=True)
 
-    # Define file paths
-    email_classification_path = os.path.join(output_dir, "email-classification.csv")
-    order_status_path = os.path.join(output_dir, "order-status.csv")
-    order_response_path = os.path.join(output_dir, "order-response.csv")
-    inquiry_response_path = os.path.join(output_dir, "inquiry-response.csv")
-
-    # Ensure dataframes have the correct column order
-    email_classification_df = email_classification_df[["email ID", "category"]]
-    order_status_df = order_status_df[["email ID", "product ID", "quantity", "status"]]
-    order_response_df = order_response_df[["email ID", "response"]]
-    inquiry_response_df = inquiry_response_df[["email ID", "response"]]
-
-    # Helper function to merge new data with existing CSV
-    async def merge_and_save_csv(
-        new_df: pd.DataFrame, file_path: str, id_column: str = "email ID"
-    ) -> None:
-        """Merge new data with existing CSV file, updating/adding rows for processed emails."""
-        try:
-            # Try to read existing CSV file
-            if os.path.exists(file_path):
-                existing_df = await asyncio.to_thread(pd.read_csv, file_path)
-
-                # Get email IDs that are being updated in this run
-                processed_email_ids = new_df[id_column].tolist()
-
-                # Remove rows for emails being processed in this run from existing data
-                filtered_existing_df = existing_df[
-                    ~existing_df[id_column].isin(processed_email_ids)
-                ]
-
-                # Combine filtered existing data with new data
-                merged_df = pd.concat([filtered_existing_df, new_df], ignore_index=True)
-
-                # Sort by email ID for consistent output
-                merged_df = merged_df.sort_values(by=id_column).reset_index(drop=True)
-            else:
-                # If file doesn't exist, just use the new data
-                merged_df = new_df
-
-            # Save the merged data
-            await asyncio.to_thread(merged_df.to_csv, file_path, index=False)
-
-        except Exception as e:
-            logger.warning(
-                get_agent_logger(
-                    "Utils",
-                    f"Error merging data for [cyan underline]{file_path}[/cyan underline]: {e}. Will attempt to overwrite.",
-                ),
-                exc_info=True,
-            )
-            # Fallback to overwriting if merge fails
-            await asyncio.to_thread(new_df.to_csv, file_path, index=False)
+    frames = {
+        "email-classification": email_classification_df,
+        "order-status": order_status_df,
+        "order-response": order_response_df,
+        "inquiry-response": inquiry_response_df,
+    }
+    segment_name = new_segment_name(run_id)
 
-    # Save each DataFrame, merging with existing data
     logger.info(
         get_agent_logger(
             "Utils",
-            f"Saving CSV files to [cyan underline]{output_dir}[/cyan underline] (merging with existing data)",
+            f"Appending output segments to [cyan underline]{output_dir}[/cyan underline]",
         )
     )
-    await merge_and_save_csv(email_classification_df, email_classification_path)
-    await merge_and_save_csv(order_status_df, order_status_path)
-    await merge_and_save_csv(order_response_df, order_response_path)
-    await merge_and_save_csv(inquiry_response_df, inquiry_response_path)
+    for table, df in frames.items():
+        await asyncio.to_thread(
+            append_output_segment, output_dir, table, df, segment_name
+        )
+
+    if compact:
+        await asyncio.to_thread(_compact_quietly, output_dir)
+    elif await asyncio.to_thread(count_output_segments, output_dir) >= max(
+        compact_after_segments, 1
+    ):
+        task = asyncio.create_task(asyncio.to_thread(_compact_quietly, output_dir))
+        _compactions.add(task)
+        task.add_done_callback(_compactions.discard)
 
     # Return file paths
-    return {
-        "email-classification": email_classification_path,
-        "order-status": order_status_path,
-        "order-response": order_response_path,
-        "inquiry-response": inquiry_response_path,
-    }
+    return {table: table_path(output_dir, table) for table in OUTPUT_TABLES}
 
 
 def write_yaml_to_file(file_path: str, yaml_content: str) -> None:
@@ -99,34 +107,26 @@ def write_yaml_to_file(file_path: str, yaml_content: str) -> None:
         f.write(yaml_content)
 
 
-async def save_workflow_result_as_yaml(
-    email_id: str, workflow_state: WorkflowOutput, results_dir: str
+async def save_workflow_result(
+    email_id: str,
+    workflow_state: WorkflowOutput,
+    results_dir: str,
+    result_format: str = "yaml",
 ) -> None:
-    """Save the workflow result for a given email as a YAML file.
+    """Save the workflow result for a given email in the configured format.
+
+    The result is dumped and encoded on the serializer's worker thread (see
+    `result_serializers`), so the event loop keeps processing other emails.
 
     Args:
         email_id: The ID of the email
         workflow_state: The final state of the workflow
-        results_dir: The directory to save the YAML files.
-
+        results_dir: The directory to save the results in.
+        result_format: "json", "jsonl.zst" or "yaml" (RESULTS_FORMAT).
     """
-    # Create results directory if it doesn't exist
-    await asyncio.to_thread(os.makedirs, results_dir, exist_ok=True)
-
-    # Define the file path
-    file_path = os.path.join(results_dir, f"{email_id}.yml")
-
-    # Convert workflow state to a serializable dict
-    if hasattr(workflow_state, "model_dump"):
-        state_dict: dict[str, Any] = workflow_state.model_dump()
-    else:
-        state_dict: dict[str, Any] = workflow_state  # type: ignore
-
-    # Write the YAML file
     try:
-        # Use a simpler approach without async context manager
-        yaml_str = yaml.dump(state_dict, default_flow_style=False)
-        await asyncio.to_thread(write_yaml_to_file, file_path, yaml_str)
+        serializer = get_result_serializer(results_dir, result_format)
+        file_path = await serializer.save(email_id, workflow_state)
         logger.info(
             get_agent_logger(
                 "Utils",
@@ -138,3 +138,17 @@ async def save_workflow_result_as_yaml(
             get_agent_logger("Utils", f"  -> Error saving workflow result: {e}"),
             exc_info=True,
         )
+
+
+async def save_workflow_result_as_yaml(
+    email_id: str, workflow_state: WorkflowOutput, results_dir: str
+) -> None:
+    """Save the workflow result for a given email as a YAML file.
+
+    Args:
+        email_id: The ID of the email
+        workflow_state: The final state of the workflow
+        results_dir: The directory to save the YAML files.
+
+    """
+    await save_workflow_result(email_id, workflow_state, results_dir, "yaml")
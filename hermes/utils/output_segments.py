@@ -0,0 +1,217 @@
+"""Append-only output segments for the assignment CSVs.
+
+Each run appends one immutable segment file per output table under
+`<output_dir>/segments/<table>/` instead of rewriting the canonical CSV, so writing is
+proportional to the run and processes sharing an output directory never overwrite
+each other's rows. Segment names start with a nanosecond timestamp, so they sort in
+write order.
+
+Rows are merged with last-writer-wins by email ID: an email's rows come from the
+newest source that has any rows for it, the canonical CSV being the oldest source.
+`read_output_table` presents this merged view directly from the segments;
+`compact_output` folds the segments into the canonical CSVs and deletes them. Runs
+never wait for a compaction: it runs from `hermes output compact`, or in the
+background once a table has `COMPACT_AFTER_SEGMENTS` segments. Only one process
+compacts at a time, and segments written meanwhile are kept for the next compaction.
+"""
+
+import os
+import time
+import uuid
+
+import pandas as pd  # type: ignore
+
+from hermes.utils.logger import logger, get_agent_logger
+
+
+ID_COLUMN = "email ID"
+
+# Output tables and their columns, in file order
+OUTPUT_TABLES: dict[str, list[str]] = {
+    "email-classification": [ID_COLUMN, "category"],
+    "order-status": [ID_COLUMN, "product ID", "quantity", "status"],
+    "order-response": [ID_COLUMN, "response"],
+    "inquiry-response": [ID_COLUMN, "response"],
+}
+
+SEGMENTS_DIR = "segments"
+COMPACTION_LOCK = ".compact.lock"
+# A compaction lock older than this was left behind by a crashed process
+STALE_LOCK_SECONDS = 600.0
+# Segments a table may collect before a run starts a background compaction
+COMPACT_AFTER_SEGMENTS = 64
+
+
+def table_path(output_dir: str, table: str) -> str:
+    """Path of a table's canonical CSV."""
+    return os.path.join(output_dir, f"{table}.csv")
+
+
+def _segment_dir(output_dir: str, table: str) -> str:
+    return os.path.join(output_dir, SEGMENTS_DIR, table)
+
+
+def new_segment_name(run_id: str | None = None) -> str:
+    """A segment name that sorts after every segment written before it."""
+    return f"{time.time_ns():020d}-{os.getpid()}-{run_id or uuid.uuid4().hex[:8]}"
+
+
+def _write_csv_atomically(df: pd.DataFrame, path: str) -> None:
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def append_output_segment(
+    output_dir: str, table: str, df: pd.DataFrame, segment_name: str
+) -> str | None:
+    """Write a run's rows for one table as a new segment.
+
+    Args:
+        output_dir: The output directory.
+        table: One of OUTPUT_TABLES.
+        df: The rows, with (at least) the table's columns.
+        segment_name: Name shared by the run's segments (see `new_segment_name`).
+
+    Returns:
+        The segment's path, or None if there were no rows to write.
+    """
+    if df.empty:
+        return None
+    directory = _segment_dir(output_dir, table)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{segment_name}.csv")
+    # Readers only pick up complete segments
+    _write_csv_atomically(df[OUTPUT_TABLES[table]], path)
+    return path
+
+
+def list_output_segments(output_dir: str, table: str) -> list[str]:
+    """Paths of a table's segments, oldest first."""
+    directory = _segment_dir(output_dir, table)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [
+        os.path.join(directory, name) for name in sorted(names) if name.endswith(".csv")
+    ]
+
+
+def count_output_segments(output_dir: str) -> int:
+    """Segments of the table that has the most, without reading any of them."""
+    counts = [0]
+    for table in OUTPUT_TABLES:
+        try:
+            names = os.listdir(_segment_dir(output_dir, table))
+        except FileNotFoundError:
+            continue
+        counts.append(sum(name.endswith(".csv") for name in names))
+    return max(counts)
+
+
+def _read_csv(path: str) -> pd.DataFrame:
+    return pd.read_csv(path, dtype={ID_COLUMN: str})
+
+
+def merge_output_frames(frames: list[pd.DataFrame], table: str) -> pd.DataFrame:
+    """Merge sources (oldest first) with last-writer-wins by email ID."""
+    columns = OUTPUT_TABLES[table]
+    frames = [frame[columns] for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    combined = pd.concat(
+        [frame.assign(_source=rank) for rank, frame in enumerate(frames)],
+        ignore_index=True,
+    )
+    newest = combined.groupby(ID_COLUMN)["_source"].transform("max")
+    merged = combined[combined["_source"] == newest].drop(columns="_source")
+    # A stable sort keeps an email's rows in the order they were written
+    return merged.sort_values(by=ID_COLUMN, kind="stable").reset_index(drop=True)
+
+
+def read_output_table(output_dir: str, table: str) -> pd.DataFrame:
+    """The merged view of a table: its canonical CSV with all segments applied."""
+    canonical_path = table_path(output_dir, table)
+    while True:
+        segments = list_output_segments(output_dir, table)
+        try:
+            frames = [_read_csv(path) for path in segments]
+            base = (
+                [_read_csv(canonical_path)] if os.path.exists(canonical_path) else []
+            )
+        except FileNotFoundError:
+            # A compaction folded a segment into the canonical CSV meanwhile
+            continue
+        return merge_output_frames(base + frames, table)
+
+
+def _acquire_compaction_lock(lock_path: str) -> bool:
+    try:
+        if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+            os.remove(lock_path)
+    except FileNotFoundError:
+        pass
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    os.write(fd, str(os.getpid()).encode())
+    os.close(fd)
+    return True
+
+
+def compact_output(output_dir: str) -> dict[str, str] | None:
+    """Fold the segments into the canonical CSVs and delete them.
+
+    Canonical CSVs are replaced atomically, so readers see either the old file plus
+    the segments or the new file. A table without a canonical CSV gets one, even
+    if it has no rows.
+
+    Returns:
+        The canonical CSV paths by table, or None if another process is compacting.
+    """
+    os.makedirs(os.path.join(output_dir, SEGMENTS_DIR), exist_ok=True)
+    lock_path = os.path.join(output_dir, SEGMENTS_DIR, COMPACTION_LOCK)
+    if not _acquire_compaction_lock(lock_path):
+        logger.info(
+            get_agent_logger(
+                "Utils",
+                f"Output in [cyan underline]{output_dir}[/cyan underline] is being compacted by another process; segments are kept",
+            )
+        )
+        return None
+
+    paths: dict[str, str] = {}
+    compacted = 0
+    try:
+        for table in OUTPUT_TABLES:
+            canonical_path = table_path(output_dir, table)
+            paths[table] = canonical_path
+            segments = list_output_segments(output_dir, table)
+            if not segments and os.path.exists(canonical_path):
+                continue
+            base = (
+                [_read_csv(canonical_path)] if os.path.exists(canonical_path) else []
+            )
+            merged = merge_output_frames(
+                base + [_read_csv(path) for path in segments], table
+            )
+            _write_csv_atomically(merged, canonical_path)
+            for path in segments:
+                os.remove(path)
+            compacted += len(segments)
+    finally:
+        os.remove(lock_path)
+
+    logger.info(
+        get_agent_logger(
+            "Utils",
+            f"Compacted [yellow]{compacted}[/yellow] output segments into [cyan underline]{output_dir}[/cyan underline]",
+        )
+    )
+    return paths
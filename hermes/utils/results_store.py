@@ -0,0 +1,332 @@
+"""Indexed store of workflow results, kept in SQLite.
+
+Every processed email is recorded as it finishes: one row per (run_id, email_id) with
+indexed columns for the questions operations ask (intent, order status, out-of-stock
+lines, latency, token counts, errors, finish time) and the full workflow state as a
+JSON blob. Answering "which emails had out-of-stock lines yesterday?" is an index
+lookup instead of parsing every result file.
+
+The state is stored as uncompressed JSON so SQLite's JSON functions can reach into it
+from ad-hoc queries, e.g. `json_extract(state, '$.composer.language')`. The database
+is in WAL mode, so `hermes results query` reads while a run is writing.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from hermes.utils.logger import logger, get_agent_logger
+from hermes.utils.result_serializers import dumps_json, result_to_dict
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL,
+    email_id TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    intent TEXT,
+    order_status TEXT,
+    order_lines INTEGER NOT NULL DEFAULT 0,
+    out_of_stock_lines INTEGER NOT NULL DEFAULT 0,
+    latency_ms REAL,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    total_tokens INTEGER,
+    error TEXT,
+    state BLOB,
+    PRIMARY KEY (run_id, email_id)
+);
+CREATE INDEX IF NOT EXISTS results_email_id ON results (email_id, finished_at);
+CREATE INDEX IF NOT EXISTS results_finished_at ON results (finished_at);
+CREATE INDEX IF NOT EXISTS results_intent ON results (intent, finished_at);
+CREATE INDEX IF NOT EXISTS results_order_status ON results (order_status, finished_at);
+CREATE INDEX IF NOT EXISTS results_out_of_stock
+    ON results (out_of_stock_lines, finished_at);
+CREATE INDEX IF NOT EXISTS results_latency ON results (latency_ms);
+CREATE INDEX IF NOT EXISTS results_total_tokens ON results (total_tokens);
+"""
+
+# Columns returned by queries unless the state is requested too
+SUMMARY_COLUMNS = (
+    "run_id",
+    "email_id",
+    "finished_at",
+    "intent",
+    "order_status",
+    "order_lines",
+    "out_of_stock_lines",
+    "latency_ms",
+    "input_tokens",
+    "output_tokens",
+    "total_tokens",
+    "error",
+)
+
+_DURATION_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhd])\s*$")
+_DURATION_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+@dataclass(frozen=True)
+class TokenUsage:
+    """LLM tokens used while processing one email."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+
+    @classmethod
+    def from_usage_metadata(cls, usage_metadata: dict[str, Any]) -> "TokenUsage":
+        """Sum LangChain usage metadata, which is keyed by model name."""
+        totals = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        for usage in usage_metadata.values():
+            for key in totals:
+                totals[key] += int(usage.get(key) or 0)
+        return cls(**totals)
+
+
+def new_run_id() -> str:
+    """A run ID that sorts by start time, e.g. 20250601T120000-1a2b3c."""
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{os.urandom(3).hex()}"
+
+
+def parse_time(value: str, now: float | None = None) -> float:
+    """Parse a point in time given as a duration ago ("30m", "24h", "7d") or ISO date.
+
+    Returns:
+        Seconds since the epoch.
+
+    Raises:
+        ValueError: If the value is neither.
+    """
+    match = _DURATION_PATTERN.match(value)
+    if match:
+        amount, unit = match.groups()
+        now = time.time() if now is None else now
+        return now - float(amount) * _DURATION_SECONDS[unit]
+    return datetime.fromisoformat(value.strip()).timestamp()
+
+
+def summarize_result(workflow_state: Any) -> dict[str, Any]:
+    """The indexed columns of a workflow result."""
+    summary: dict[str, Any] = {
+        "intent": None,
+        "order_status": None,
+        "order_lines": 0,
+        "out_of_stock_lines": 0,
+    }
+    if workflow_state is None:
+        return summary
+    classifier = getattr(workflow_state, "classifier", None)
+    if classifier is not None and classifier.email_analysis is not None:
+        summary["intent"] = classifier.email_analysis.primary_intent
+    fulfiller = getattr(workflow_state, "fulfiller", None)
+    if fulfiller is not None and fulfiller.order_result is not None:
+        order = fulfiller.order_result
+        summary["order_status"] = order.overall_status
+        summary["order_lines"] = len(order.lines)
+        summary["out_of_stock_lines"] = sum(
+            1 for line in order.lines if line.status == "out of stock"
+        )
+    return summary
+
+
+class SQLiteResultsStore:
+    """Workflow results of all runs in a SQLite database (WAL mode)."""
+
+    def __init__(self, path: str, busy_timeout_seconds: float = 30.0):
+        """Open (and create if needed) the results database.
+
+        Args:
+            path: Database file.
+            busy_timeout_seconds: How long to wait for another process's write lock.
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path,
+            timeout=busy_timeout_seconds,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def record(
+        self,
+        run_id: str,
+        email_id: str,
+        workflow_state: Any = None,
+        latency_ms: float | None = None,
+        usage: TokenUsage | None = None,
+        error: str | None = None,
+        finished_at: float | None = None,
+    ) -> None:
+        """Record the result of one email; recording it again in a run replaces it.
+
+        Args:
+            run_id: The run the email was processed in.
+            email_id: The email.
+            workflow_state: The final WorkflowOutput, or None if processing failed.
+            latency_ms: Time the workflow took.
+            usage: LLM tokens used for the email.
+            error: Why processing failed, if it did.
+            finished_at: When processing finished (default: now).
+        """
+        summary = summarize_result(workflow_state)
+        state = (
+            dumps_json(result_to_dict(workflow_state))
+            if workflow_state is not None
+            else None
+        )
+        row = {
+            "run_id": run_id,
+            "email_id": email_id,
+            "finished_at": time.time() if finished_at is None else finished_at,
+            **summary,
+            "latency_ms": latency_ms,
+            "input_tokens": usage.input_tokens if usage else None,
+            "output_tokens": usage.output_tokens if usage else None,
+            "total_tokens": usage.total_tokens if usage else None,
+            "error": error,
+            "state": state,
+        }
+        columns = ", ".join(row)
+        placeholders = ", ".join(f":{column}" for column in row)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO results ({columns}) VALUES ({placeholders})",
+                row,
+            )
+
+    def latest_run_id(self) -> str | None:
+        """The run that finished an email most recently."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id FROM results ORDER BY finished_at DESC LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def query(
+        self,
+        email_id: str | None = None,
+        run_id: str | None = None,
+        intent: str | None = None,
+        order_status: str | None = None,
+        out_of_stock: bool = False,
+        errors_only: bool = False,
+        since: float | None = None,
+        until: float | None = None,
+        min_latency_ms: float | None = None,
+        include_state: bool = False,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Results matching all given filters, most recent first.
+
+        Args:
+            email_id: Only this email.
+            run_id: Only this run.
+            intent: Only this primary intent ("order request", "product inquiry").
+            order_status: Only orders with this overall status.
+            out_of_stock: Only emails with at least one out-of-stock order line.
+            errors_only: Only emails whose processing failed.
+            since: Only results finished at or after this time (epoch seconds).
+            until: Only results finished before this time (epoch seconds).
+            min_latency_ms: Only results that took at least this long.
+            include_state: Also return the full state (as JSON text).
+            limit: Maximum number of rows.
+
+        Returns:
+            One dict per result.
+        """
+        conditions: list[str] = []
+        params: list[Any] = []
+        for column, value in (
+            ("email_id", email_id),
+            ("run_id", run_id),
+            ("intent", intent),
+            ("order_status", order_status),
+        ):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if out_of_stock:
+            conditions.append("out_of_stock_lines > 0")
+        if errors_only:
+            conditions.append("error IS NOT NULL")
+        if since is not None:
+            conditions.append("finished_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("finished_at < ?")
+            params.append(until)
+        if min_latency_ms is not None:
+            conditions.append("latency_ms >= ?")
+            params.append(min_latency_ms)
+
+        columns = list(SUMMARY_COLUMNS) + (["state"] if include_state else [])
+        sql = f"SELECT {', '.join(columns)} FROM results"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY finished_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        results = [dict(zip(columns, row)) for row in rows]
+        if include_state:
+            for result in results:
+                if isinstance(result["state"], bytes):
+                    result["state"] = result["state"].decode("utf-8")
+        return results
+
+    def execute_readonly(self, sql: str) -> tuple[list[str], list[tuple]]:
+        """Run an ad-hoc SQL query on a read-only connection.
+
+        Returns:
+            The column names and the rows.
+        """
+        uri = f"file:{os.path.abspath(self.path)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True)
+        try:
+            cursor = conn.execute(sql)
+            columns = [description[0] for description in cursor.description or ()]
+            return columns, cursor.fetchall()
+        finally:
+            conn.close()
+
+
+_results_store: SQLiteResultsStore | None = None
+_results_store_lock = threading.Lock()
+
+
+def get_results_store(path: str | None) -> SQLiteResultsStore | None:
+    """Return the process-wide store for path, or None when no path is configured."""
+    global _results_store
+
+    if not path:
+        return None
+    with _results_store_lock:
+        if _results_store is None or _results_store.path != path:
+            _results_store = SQLiteResultsStore(path)
+            logger.info(
+                get_agent_logger(
+                    "Utils",
+                    f"Recording workflow results in [cyan underline]{path}[/cyan underline]",
+                )
+            )
+        return _results_store
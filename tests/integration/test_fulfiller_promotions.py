@@ -10,7 +10,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from hermes.agents.fulfiller.agent import run_fulfiller
-from hermes.agents.fulfiller.models import FulfillerInput, FulfillerOutput
+from hermes.agents.fulfiller.models import (
+    FulfillerInput,
+    FulfillerOutput,
+    OrderLineSelection,
+    OrderSelection,
+)
 from hermes.agents.classifier.models import ClassifierOutput
 from hermes.agents.stockkeeper.models import StockkeeperOutput
 from hermes.model.email import (
@@ -27,7 +32,6 @@ from hermes.model.promotions import (
     PromotionEffects,
     DiscountSpec,
 )
-from hermes.model.order import Order, OrderLine, OrderLineStatus
 from hermes.model.enums import ProductCategory, Season, Agents
 from hermes.config import HermesConfig
 
@@ -94,40 +98,16 @@ class TestFulfillerPromotionDetection:
             promotion_text=promotion_text,
         )
 
-    def create_mock_order_response(
-        self,
-        email_id: str,
-        product_id: str,
-        name: str,
-        quantity: int,
-        base_price: float,
-        promotion_text: Optional[str] = None,
-        promotion_spec: Optional[PromotionSpec] = None,
-    ) -> Order:
-        """Create a mock order response that simulates LLM output."""
-        order_line = OrderLine(
-            product_id=product_id,
-            name=name,
-            description=f"Test product {product_id} - {name}",
-            quantity=quantity,
-            base_price=base_price,
-            unit_price=base_price,
-            total_price=base_price * quantity,
-            status=OrderLineStatus.CREATED,  # LLM sets initial status
-            stock=None,  # Stock will be set by fulfiller agent
-            promotion_applied=False,  # Promotions will be applied by fulfiller agent
-            promotion_description=promotion_text,
-            promotion=promotion_spec,
-        )
-
-        return Order(
-            email_id=email_id,
-            overall_status="created",
-            lines=[order_line],
-            total_price=base_price * quantity,
-            total_discount=0.0,  # Discounts will be calculated by fulfiller agent
-            message="Order processed successfully",
-            stock_updated=False,  # Stock will be updated by fulfiller agent
+    def create_mock_selection_response(
+        self, product_id: str, quantity: int
+    ) -> OrderSelection:
+        """Create a mock selection that simulates LLM output for the first mention."""
+        return OrderSelection(
+            lines=[
+                OrderLineSelection(
+                    mention_index=0, product_id=product_id, quantity=quantity
+                )
+            ]
         )
 
     @pytest.mark.asyncio
@@ -537,14 +517,8 @@ class TestFulfillerPromotionDetection:
         )
 
         # Mock LLM response
-        mock_order_response = self.create_mock_order_response(
-            email_id="test_004",
-            product_id="BMX5432",
-            name="Bomber Jacket",
-            quantity=1,
-            base_price=62.99,
-            promotion_text="Buy now and get a free matching beanie!",
-            promotion_spec=free_gift_promotion,
+        mock_order_response = self.create_mock_selection_response(
+            product_id="BMX5432", quantity=1
         )
 
         # Create test input
@@ -666,14 +640,8 @@ class TestFulfillerPromotionDetection:
         )
 
         # Mock LLM response
-        mock_order_response = self.create_mock_order_response(
-            email_id="test_005",
-            product_id="KMN3210",
-            name="Knit Mini Dress",
-            quantity=2,
-            base_price=53.0,
-            promotion_text="Limited-time sale - get two for the price of one!",
-            promotion_spec=bogo_promotion,
+        mock_order_response = self.create_mock_selection_response(
+            product_id="KMN3210", quantity=2
         )
 
         # Create test input
@@ -787,14 +755,8 @@ class TestFulfillerPromotionDetection:
         )
 
         # Mock LLM response
-        mock_order_response = self.create_mock_order_response(
-            email_id="test_006",
-            product_id="RSG8901",
-            name="Retro Sunglasses",
-            quantity=1,
-            base_price=26.99,
-            promotion_text=None,
-            promotion_spec=None,
+        mock_order_response = self.create_mock_selection_response(
+            product_id="RSG8901", quantity=1
         )
 
         # Create test input
@@ -121,6 +121,8 @@ class TestResolveProductMentionIntegration:
                     "found by exact product id match",
                     "found through semantic search",
                     "found through fuzzy name matching",
+                    "found by exact product name match",
+                    "found through lexical search",
                 ]
                 metadata_lower = product.metadata.lower()
                 # print(f"DEBUG: Metadata for description_search: [{metadata_lower}]") # Optional: for debugging
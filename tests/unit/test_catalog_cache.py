@@ -0,0 +1,102 @@
+"""Tests for catalog_cache.py and typed catalog loading."""
+
+import os
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+
+from hermes.data.catalog_cache import (
+    apply_product_dtypes,
+    catalog_cache_path,
+    load_cached_catalog,
+)
+from hermes.data.catalog_registry import file_sha256
+from hermes.data.load_data import _read_products_df
+
+
+def _write_products_csv(path):
+    pd.DataFrame(
+        {
+            "product_id": ["RSG8901", "KDS0001"],
+            "name": ["Retro Sunglasses", "Kids Tee"],
+            "category": [" Accessories", "Kids Clothing"],
+            "description": ["Shades", "A tee"],
+            "stock": [1, None],
+            "seasons": ["Spring, Summer", "All seasons"],
+            "price": [26.99, 10.0],
+        }
+    ).to_csv(path, index=False)
+
+
+class TestProductDtypes:
+    """Tests for the typed products schema."""
+
+    def test_local_catalog_is_normalized_and_typed(self, tmp_path):
+        """Categories are normalized and columns get compact dtypes."""
+        path = tmp_path / "products.csv"
+        _write_products_csv(path)
+
+        with patch("hermes.data.load_data._config.catalog_cache_dir", None):
+            products_df, file_path, _ = _read_products_df(str(path))
+
+        assert file_path == str(path)
+        assert products_df["category"].tolist() == ["Accessories", "Kid's Clothing"]
+        assert isinstance(products_df["category"].dtype, pd.CategoricalDtype)
+        assert isinstance(products_df["seasons"].dtype, pd.CategoricalDtype)
+        assert products_df["stock"].dtype == "int32"
+        assert products_df["stock"].tolist() == [1, 0]
+        # Prices keep full precision for order totals
+        assert products_df["price"].dtype == "float64"
+        assert products_df["price"].iloc[0] == 26.99
+
+    def test_apply_product_dtypes_tolerates_missing_columns(self):
+        """Catalogs without optional columns keep loading."""
+        products_df = apply_product_dtypes(pd.DataFrame({"product_id": [1]}))
+
+        assert products_df["product_id"].tolist() == ["1"]
+
+
+class TestLoadCachedCatalog:
+    """Tests for the Parquet catalog cache."""
+
+    def test_without_pyarrow_parses_every_time(self, tmp_path):
+        """The cache is skipped when Parquet support is not installed."""
+        source = tmp_path / "products.csv"
+        _write_products_csv(source)
+        parse = MagicMock(return_value=pd.DataFrame({"product_id": ["A"]}))
+
+        with patch("hermes.data.catalog_cache.parquet_available", return_value=False):
+            load_cached_catalog(str(source), str(tmp_path / "cache"), parse)
+            load_cached_catalog(str(source), str(tmp_path / "cache"), parse)
+
+        assert parse.call_count == 2
+        assert not (tmp_path / "cache").exists()
+
+    def test_round_trip_skips_parsing_until_source_changes(self, tmp_path):
+        """Unchanged content is read from Parquet; new content is parsed again."""
+        pytest.importorskip("pyarrow")
+        source = tmp_path / "products.csv"
+        cache_dir = str(tmp_path / "cache")
+        _write_products_csv(source)
+
+        def parse():
+            return apply_product_dtypes(pd.read_csv(source))
+
+        first = load_cached_catalog(str(source), cache_dir, parse)
+        parse_mock = MagicMock(side_effect=parse)
+        second = load_cached_catalog(str(source), cache_dir, parse_mock)
+
+        parse_mock.assert_not_called()
+        pd.testing.assert_frame_equal(first, second)
+        second.loc[0, "stock"] = 0
+
+        source.write_text(source.read_text().replace("26.99", "27.99"))
+        load_cached_catalog(str(source), cache_dir, parse_mock)
+
+        parse_mock.assert_called_once()
+        assert os.listdir(cache_dir) == [
+            os.path.basename(
+                catalog_cache_path(cache_dir, str(source), file_sha256(str(source)))
+            )
+        ]
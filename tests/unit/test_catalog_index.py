@@ -0,0 +1,175 @@
+"""Tests for catalog_index.py."""
+
+import gc
+import weakref
+from unittest.mock import patch
+
+from hermes.data.catalog_index import (
+    COMPLEMENTARY_CATEGORIES,
+    CatalogIndex,
+    get_catalog_index,
+    price_similarity,
+)
+from hermes.tools.catalog_tools import (
+    find_alternatives,
+    find_alternatives_for_products,
+    find_complementary_products,
+)
+from hermes.tools.order_tools import update_stock, StockUpdateStatus
+
+from tests.fixtures.mock_product_catalog import get_mock_products_df
+from tests.fixtures.test_product_catalog import get_test_products_df
+
+
+def _brute_force_alternatives(df, product_id, limit):
+    """Rank alternatives the way find_alternatives did before the index existed."""
+    original = df[df["product_id"] == product_id].iloc[0]
+    candidates = df[
+        (df["category"] == original["category"])
+        & (df["product_id"] != product_id)
+        & (df["stock"] > 0)
+    ]
+    scored = [
+        (price_similarity(float(original["price"]), float(row["price"])), pid)
+        for pid, row in zip(candidates["product_id"], candidates.to_dict("records"))
+    ]
+    return [score for score, _ in sorted(scored, reverse=True)[:limit]]
+
+
+def _brute_force_complements(df, product_id, limit):
+    """Rank complements the way find_complementary_products did before the index."""
+    original = df[df["product_id"] == product_id].iloc[0]
+    targets = COMPLEMENTARY_CATEGORIES[original["category"]]
+    matches = df[(df["category"].isin(targets)) & (df["stock"] > 0)]
+    return list(matches.nlargest(limit, "stock")["product_id"])
+
+
+class TestCatalogIndex:
+    """Tests for the CatalogIndex recommendation tables."""
+
+    def test_alternatives_match_brute_force_ranking(self):
+        """Alternatives are ranked by price similarity like the DataFrame scan."""
+        df = get_test_products_df()
+        index = CatalogIndex(df)
+
+        for product_id in df["product_id"]:
+            position = index.position_of(product_id)
+            scores = [score for _, score in index.alternatives(position, 3)]
+            assert scores == _brute_force_alternatives(df, product_id, 3)
+
+    def test_complements_match_brute_force_ranking(self):
+        """Complements are the in-stock products with the highest stock."""
+        df = get_test_products_df()
+        index = CatalogIndex(df)
+
+        for product_id, category in zip(df["product_id"], df["category"]):
+            if category not in COMPLEMENTARY_CATEGORIES:
+                continue
+            position = index.position_of(product_id)
+            found = [index.product_ids[p] for p in index.complements(position, 3)]
+            assert found == _brute_force_complements(df, product_id, 3)
+
+    def test_set_stock_updates_tables_incrementally(self):
+        """Products leave and re-enter the tables as their stock changes."""
+        df = get_mock_products_df()
+        index = CatalogIndex(df)
+        shirt = index.position_of("TST001")
+        blue_shirt = index.position_of("TST004")
+
+        assert [p for p, _ in index.alternatives(shirt, 5)] == [blue_shirt]
+
+        index.set_stock("TST004", 0)
+        assert index.alternatives(shirt, 5) == []
+
+        index.set_stock("TST004", 3)
+        assert [p for p, _ in index.alternatives(shirt, 5)] == [blue_shirt]
+
+    def test_set_stock_reorders_complements(self):
+        """Complement order follows the current stock levels."""
+        df = get_test_products_df()
+        index = CatalogIndex(df)
+        position = index.position_of("RSG8901")
+        least_stocked = index.product_ids[index.complements(position, 100)[-1]]
+
+        index.set_stock(least_stocked, 1000)
+        df.loc[df["product_id"] == least_stocked, "stock"] = 1000
+
+        found = [index.product_ids[p] for p in index.complements(position, 3)]
+        assert found[0] == least_stocked
+        assert found == _brute_force_complements(df, "RSG8901", 3)
+
+    def test_get_catalog_index_rebuilds_for_new_dataframe(self):
+        """A different DataFrame object gets its own index."""
+        first_df = get_mock_products_df()
+        second_df = get_mock_products_df()
+
+        assert get_catalog_index(first_df) is get_catalog_index(first_df)
+        assert get_catalog_index(second_df).products_df is second_df
+
+    def test_catalogs_in_use_keep_their_own_index(self):
+        """Alternating between two catalogs does not rebuild either index."""
+        first_df = get_mock_products_df()
+        second_df = get_mock_products_df()
+        first_index = get_catalog_index(first_df)
+        second_index = get_catalog_index(second_df)
+
+        assert get_catalog_index(first_df) is first_index
+        assert get_catalog_index(second_df) is second_index
+
+        index_ref = weakref.ref(first_index)
+        del first_df, first_index
+        gc.collect()
+        assert index_ref() is None
+
+    @patch("hermes.tools.order_tools.load_products_df")
+    @patch("hermes.tools.catalog_tools.load_products_df")
+    def test_update_stock_keeps_alternatives_current(
+        self, mock_catalog_load_df, mock_order_load_df
+    ):
+        """Selling out a product through update_stock removes it from alternatives."""
+        df = get_mock_products_df()
+        mock_catalog_load_df.return_value = df
+        mock_order_load_df.return_value = df
+
+        result = find_alternatives.invoke({"original_product_id": "TST001", "limit": 2})
+        assert [alt.product.product_id for alt in result] == ["TST004"]
+
+        assert update_stock("TST004", 8) == StockUpdateStatus.SUCCESS
+
+        result = find_alternatives.invoke({"original_product_id": "TST001", "limit": 2})
+        assert "No in-stock alternatives" in result.message
+
+    @patch("hermes.tools.catalog_tools.load_products_df")
+    def test_batched_alternatives_match_single_lookups(self, mock_load_df):
+        """One batched call gives the same result per product as find_alternatives."""
+        df = get_test_products_df()
+        mock_load_df.return_value = df
+        product_ids = list(df["product_id"][:6]) + [df["product_id"][0], "NOPE999"]
+
+        batched = find_alternatives_for_products(product_ids, limit=3)
+
+        assert list(batched) == list(dict.fromkeys(product_ids))
+        for product_id, result in batched.items():
+            single = find_alternatives.invoke(
+                {"original_product_id": product_id, "limit": 3}
+            )
+            if isinstance(single, list):
+                assert [alt.product.product_id for alt in result] == [
+                    alt.product.product_id for alt in single
+                ]
+            else:
+                assert result.message == single.message
+
+    @patch("hermes.tools.catalog_tools.load_products_df")
+    def test_find_complementary_products_uses_stock_order(self, mock_load_df):
+        """Complementary products come back highest stock first."""
+        df = get_test_products_df()
+        mock_load_df.return_value = df
+
+        result = find_complementary_products.invoke(
+            {"product_id": "RSG8901", "limit": 2}
+        )
+
+        assert [p.product_id for p in result] == _brute_force_complements(
+            df, "RSG8901", 2
+        )
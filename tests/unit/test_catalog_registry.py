@@ -0,0 +1,150 @@
+"""Tests for catalog_registry.py."""
+
+import asyncio
+import os
+
+import pandas as pd
+import pytest
+
+from hermes.data.catalog_registry import CatalogRegistry
+
+
+def _write_catalog(path, rows):
+    pd.DataFrame(rows, columns=["product_id", "stock"]).to_csv(path, index=False)
+
+
+def _csv_registry(**kwargs) -> CatalogRegistry:
+    return CatalogRegistry(
+        lambda source: (pd.read_csv(source), source, None),
+        default_source="unused",
+        check_interval_seconds=0.0,
+        **kwargs,
+    )
+
+
+class TestCatalogRegistry:
+    """Tests for source-keyed loading and hot reload."""
+
+    def test_reloads_when_file_content_changes(self, tmp_path):
+        """An edited file is reloaded and listeners are told about the new catalog."""
+        path = str(tmp_path / "products.csv")
+        _write_catalog(path, [("AAA0001", 1)])
+        registry = _csv_registry()
+        notified = []
+        registry.add_listener(lambda source, df: notified.append((source, len(df))))
+
+        first = registry.get(path)
+        assert registry.get() is first
+
+        _write_catalog(path, [("AAA0001", 1), ("BBB0002", 5)])
+        second = registry.get()
+
+        assert second is not first
+        assert len(second) == 2
+        assert registry.version(path) == 2
+        assert notified == [(path, 2)]
+
+    def test_touch_without_changes_keeps_catalog(self, tmp_path):
+        """A new mtime with identical content does not trigger a reload."""
+        path = str(tmp_path / "products.csv")
+        _write_catalog(path, [("AAA0001", 1)])
+        registry = _csv_registry()
+        first = registry.get(path)
+
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+
+        assert registry.get() is first
+        assert registry.version(path) == 1
+
+    def test_sources_are_cached_separately(self, tmp_path):
+        """Requesting another source switches the active catalog."""
+        path_a = str(tmp_path / "a.csv")
+        path_b = str(tmp_path / "b.csv")
+        _write_catalog(path_a, [("AAA0001", 1)])
+        _write_catalog(path_b, [("BBB0002", 2), ("CCC0003", 3)])
+        registry = _csv_registry()
+        notified = []
+        registry.add_listener(lambda source, df: notified.append(source))
+
+        catalog_a = registry.get(path_a)
+        catalog_b = registry.get(path_b)
+
+        assert registry.get() is catalog_b
+        assert registry.get(path_a) is catalog_a
+        assert notified == [path_b, path_a]
+
+    @pytest.mark.asyncio
+    async def test_pinned_context_keeps_its_snapshot(self, tmp_path):
+        """Work pinned to a catalog keeps it while new work sees the reload."""
+        path = str(tmp_path / "products.csv")
+        _write_catalog(path, [("AAA0001", 1)])
+        registry = _csv_registry()
+        registry.get(path)
+        pinned_ready = asyncio.Event()
+        reloaded = asyncio.Event()
+
+        async def in_flight_email():
+            with registry.pin() as snapshot:
+                pinned_ready.set()
+                await reloaded.wait()
+                return snapshot, registry.get()
+
+        task = asyncio.create_task(in_flight_email())
+        await pinned_ready.wait()
+        _write_catalog(path, [("AAA0001", 1), ("BBB0002", 5)])
+        fresh = registry.get()
+        reloaded.set()
+        snapshot, seen_by_email = await task
+
+        assert seen_by_email is snapshot
+        assert len(snapshot) == 1
+        assert len(fresh) == 2
+
+    def test_remote_sources_reload_after_ttl(self):
+        """Sources without a local file are fetched again once the TTL expires."""
+        loads = []
+
+        def loader(source):
+            loads.append(source)
+            return pd.DataFrame({"product_id": [f"AAA000{len(loads)}"]}), None, None
+
+        registry = CatalogRegistry(loader, "sheet#products", remote_ttl_seconds=3600)
+        registry.get()
+        registry.get()
+        assert loads == ["sheet#products"]
+
+        registry.remote_ttl_seconds = 0
+        registry.get()
+        assert len(loads) == 2
+
+    def test_unchanged_remote_content_keeps_loaded_catalog(self):
+        """A refetch with the same content hash does not swap the catalog."""
+        hashes = iter(["hash-1", "hash-1", "hash-2"])
+
+        def loader(source):
+            return pd.DataFrame({"product_id": ["AAA0001"]}), None, next(hashes)
+
+        registry = CatalogRegistry(loader, "sheet#products", remote_ttl_seconds=0)
+        first = registry.get()
+
+        assert registry.get() is first
+        assert registry.version() == 1
+        assert registry.get() is not first
+        assert registry.version() == 2
+
+    def test_failed_reload_keeps_last_good_catalog(self):
+        """A source that fails to load again keeps serving the loaded catalog."""
+        calls = []
+
+        def loader(source):
+            calls.append(source)
+            if len(calls) > 1:
+                raise OSError("sheet unavailable")
+            return pd.DataFrame({"product_id": ["AAA0001"]}), None, None
+
+        registry = CatalogRegistry(loader, "sheet#products", remote_ttl_seconds=0)
+        first = registry.get()
+
+        assert registry.get() is first
+        assert len(calls) == 2
@@ -2,6 +2,9 @@
 
 from unittest.mock import patch, MagicMock
 
+import numpy as np
+from langchain_core.documents import Document
+
 from hermes.tools.catalog_tools import (
     find_product_by_id,
     find_product_by_name,
@@ -10,6 +13,8 @@ from hermes.tools.catalog_tools import (
     search_products_with_filters,
     find_products_for_occasion,
 )
+from hermes.data.catalog_index import get_catalog_index
+from hermes.data.quantized_index import QuantizedVectorIndex, QuantizedVectorStore
 from hermes.data.vector_store import metadata_to_product
 
 # import hermes.data.vector_store # No longer needed for patch.object
@@ -610,3 +615,185 @@ class TestCatalogToolsWithTestData:
         assert isinstance(result, list)
         assert len(result) == 1
         assert result[0].product_id == "LTH0976"
+
+
+class TestFilteredSearchPushdown:
+    """Tests for price/stock predicates and over-fetch in search_products_with_filters."""
+
+    @staticmethod
+    def _doc(product_id):
+        doc = MagicMock()
+        doc.metadata = {"product_id": product_id}
+        return doc
+
+    @staticmethod
+    def _product(product_id, price=30.0, stock=5):
+        return Product(
+            product_id=product_id,
+            name=f"Product {product_id}",
+            description="",
+            category=ProductCategory.SHIRTS,
+            product_type="",
+            stock=stock,
+            price=price,
+            seasons=[],
+        )
+
+    @patch("hermes.tools.catalog_tools.metadata_to_product")
+    @patch("hermes.tools.catalog_tools.get_vector_store")
+    def test_price_range_is_part_of_the_index_query(
+        self, mock_create_vector_store_func, mock_metadata_to_product
+    ):
+        """Price bounds are sent to the vector store as range predicates."""
+        mock_vector_store_instance = mock_create_vector_store_func.return_value
+        mock_vector_store_instance.similarity_search_with_score.return_value = [
+            (self._doc("TST001"), 0.4)
+        ]
+        mock_metadata_to_product.side_effect = lambda m: self._product(m["product_id"])
+
+        result = search_products_with_filters.invoke(
+            {
+                "query": "price band shirt",
+                "category": "Shirts",
+                "season": None,
+                "min_price": 20.0,
+                "max_price": 50.0,
+                "min_stock": None,
+                "top_k": 3,
+            }
+        )
+
+        assert [p.product_id for p in result] == ["TST001"]
+        query, k, where = (
+            mock_vector_store_instance.similarity_search_with_score.call_args.args
+        )
+        assert k == 3
+        assert where == {
+            "$and": [
+                {"category": "Shirts"},
+                {"price": {"$gte": 20.0}},
+                {"price": {"$lte": 50.0}},
+            ]
+        }
+
+    @patch("hermes.tools.catalog_tools.load_products_df")
+    @patch("hermes.tools.catalog_tools.metadata_to_product")
+    @patch("hermes.tools.catalog_tools.get_vector_store")
+    def test_min_stock_masks_understocked_rows_in_the_index_query(
+        self, mock_create_vector_store_func, mock_metadata_to_product, mock_load_df
+    ):
+        """Live stock is a row mask inside the index query, rebuilt on stock changes."""
+        products_df = get_mock_products_df()
+        mock_load_df.return_value = products_df
+        product_ids = products_df["product_id"].tolist()
+        embeddings = MagicMock()
+        # Closest to TST002, which has 5 units
+        embeddings.embed_query.return_value = [0.0, 0.3, 0.0, 0.0, 0.0]
+        vector_store = QuantizedVectorStore(
+            embeddings,
+            QuantizedVectorIndex(np.eye(5, dtype=np.float32) * 0.3),
+            [
+                Document(page_content=pid, metadata={"product_id": pid})
+                for pid in product_ids
+            ],
+        )
+        mock_create_vector_store_func.return_value = vector_store
+        # Converted products all look well stocked, so only the mask can drop TST002
+        mock_metadata_to_product.side_effect = lambda m: self._product(
+            m["product_id"], stock=10
+        )
+        search = {
+            "query": "masked by stock",
+            "category": None,
+            "season": None,
+            "min_price": None,
+            "max_price": None,
+            "min_stock": 8,
+            "top_k": 1,
+        }
+
+        result = search_products_with_filters.invoke(search)
+
+        assert [p.product_id for p in result] == ["TST001"]
+
+        get_catalog_index(products_df).set_stock("TST002", 9)
+        result = search_products_with_filters.invoke(search)
+
+        assert [p.product_id for p in result] == ["TST002"]
+
+    @patch("hermes.tools.catalog_tools.load_products_df")
+    @patch("hermes.tools.catalog_tools.metadata_to_product")
+    @patch("hermes.tools.catalog_tools.get_vector_store")
+    def test_min_stock_filters_results_of_stores_without_row_masks(
+        self, mock_create_vector_store_func, mock_metadata_to_product, mock_load_df
+    ):
+        """Chroma gets no product ID list; understocked results are dropped after."""
+        mock_load_df.return_value = get_mock_products_df()
+        mock_vector_store_instance = mock_create_vector_store_func.return_value
+        mock_vector_store_instance.similarity_search_with_score.return_value = [
+            (self._doc("TST002"), 0.3),
+            (self._doc("TST001"), 0.4),
+        ]
+        mock_metadata_to_product.side_effect = lambda m: self._product(
+            m["product_id"], stock=10 if m["product_id"] == "TST001" else 5
+        )
+
+        result = search_products_with_filters.invoke(
+            {
+                "query": "well stocked",
+                "category": None,
+                "season": None,
+                "min_price": None,
+                "max_price": None,
+                "min_stock": 8,
+                "top_k": 2,
+            }
+        )
+
+        assert [p.product_id for p in result] == ["TST001"]
+        where = mock_vector_store_instance.similarity_search_with_score.call_args.args[2]
+        assert where is None
+
+    @patch("hermes.tools.catalog_tools.metadata_to_product")
+    @patch("hermes.tools.catalog_tools.get_vector_store")
+    def test_over_fetches_until_top_k_survive(
+        self, mock_create_vector_store_func, mock_metadata_to_product
+    ):
+        """Candidates lost in conversion are replaced by fetching more results."""
+        pool = [
+            (self._doc("BAD1"), 0.2),
+            (self._doc("BAD2"), 0.3),
+            (self._doc("TST001"), 0.4),
+            (self._doc("TST004"), 0.5),
+            (self._doc("TST002"), 0.6),
+        ]
+        mock_vector_store_instance = mock_create_vector_store_func.return_value
+        mock_vector_store_instance.similarity_search_with_score.side_effect = (
+            lambda query, k, where: pool[:k]
+        )
+
+        def convert(metadata):
+            if metadata["product_id"].startswith("BAD"):
+                raise ValueError("Product no longer in catalog")
+            return self._product(metadata["product_id"])
+
+        mock_metadata_to_product.side_effect = convert
+
+        result = search_products_with_filters.invoke(
+            {
+                "query": "over fetch",
+                "category": None,
+                "season": None,
+                "min_price": None,
+                "max_price": None,
+                "min_stock": None,
+                "top_k": 2,
+            }
+        )
+
+        assert [p.product_id for p in result] == ["TST001", "TST004"]
+        fetched = [
+            call.args[1]
+            for call in mock_vector_store_instance.similarity_search_with_score.call_args_list
+        ]
+        assert fetched == [2, 4]
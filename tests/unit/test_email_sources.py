@@ -0,0 +1,187 @@
+"""Tests for email_sources.py."""
+
+import json
+import mailbox
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+
+import pytest
+
+from hermes.data.email_sources import (
+    is_email_stream_source,
+    open_email_stream,
+    parse_email_file,
+)
+
+
+def _message(message_id: str | None, subject: str, body: str) -> EmailMessage:
+    message = EmailMessage()
+    if message_id:
+        message["Message-ID"] = f"<{message_id}>"
+    message["Subject"] = subject
+    message["From"] = "customer@example.com"
+    message.set_content(body)
+    return message
+
+
+@pytest.fixture
+def mail_dir(tmp_path):
+    """A directory mixing JSONL, CSV and .eml files, with one duplicate email."""
+    (tmp_path / "dump-1.jsonl").write_text(
+        "\n".join(
+            json.dumps(record)
+            for record in [
+                {"email_id": "E001", "subject": "Order", "message": "Two CBT8901"},
+                {"email_id": "E002", "subject": "", "message": "Do you sell hats?"},
+                {"email_id": "E003", "subject": "No body"},
+            ]
+        )
+    )
+    (tmp_path / "legacy.csv").write_text(
+        "email_id,subject,message\nE002,Duplicate,Again\nE004,Hi,Need a bag\n"
+    )
+    eml_dir = tmp_path / "eml"
+    eml_dir.mkdir()
+    (eml_dir / "one.eml").write_bytes(
+        bytes(_message("abc@mail.example", "Question", "Is it waterproof?"))
+    )
+    return tmp_path
+
+
+class TestEmailFileParsing:
+    """Tests for the per-format parsers."""
+
+    def test_mbox_messages_use_message_id(self, tmp_path):
+        """Each mbox message becomes an email keyed by its Message-ID."""
+        path = str(tmp_path / "inbox.mbox")
+        box = mailbox.mbox(path)
+        box.add(_message("m1@mail.example", "First", "Hello"))
+        box.add(_message(None, "Second", "No id here"))
+        box.close()
+
+        emails, invalid = parse_email_file(path)
+
+        assert invalid == 0
+        assert emails[0] == {
+            "email_id": "m1@mail.example",
+            "subject": "First",
+            "message": "Hello",
+        }
+        # Without a Message-ID the ID is derived from the file and position
+        assert emails[1]["email_id"] == parse_email_file(path)[0][1]["email_id"]
+
+    def test_records_without_body_are_counted_invalid(self, mail_dir):
+        """JSONL records that have no message are skipped, not processed."""
+        emails, invalid = parse_email_file(str(mail_dir / "dump-1.jsonl"))
+
+        assert [email["email_id"] for email in emails] == ["E001", "E002"]
+        assert invalid == 1
+
+
+class TestEmailStream:
+    """Tests for streaming multi-file sources."""
+
+    def test_directory_is_streamed_and_deduplicated(self, mail_dir):
+        """Files are read in path order and a repeated email_id is skipped."""
+        stream = open_email_stream(str(mail_dir), max_workers=1)
+
+        emails = list(stream)
+
+        assert [email["email_id"] for email in emails] == [
+            "E001",
+            "E002",
+            "abc@mail.example",
+            "E004",
+        ]
+        assert stream.stats.files == 3
+        assert stream.stats.duplicates == 1
+        assert stream.stats.invalid == 1
+        assert stream.stats.emails == 4
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_corrupt_files_are_skipped(self, mail_dir, workers, monkeypatch):
+        """A file that cannot be decoded counts as invalid; the others still stream."""
+        monkeypatch.setattr("hermes.data.email_sources._MAX_FILES_PER_TASK", 1)
+        (mail_dir / "broken.jsonl").write_bytes(
+            b'{"email_id": "E9", "message": "\xff\xfe"}\n'
+        )
+        (mail_dir / "broken.csv").write_text('email_id,message\nE8,"unterminated\n')
+
+        stream = open_email_stream(str(mail_dir), max_workers=workers)
+        emails = list(stream)
+
+        assert [email["email_id"] for email in emails] == [
+            "E001",
+            "E002",
+            "abc@mail.example",
+            "E004",
+        ]
+        assert stream.stats.invalid == 3
+
+    def test_process_pool_yields_same_emails(self, mail_dir, monkeypatch):
+        """Parsing in worker processes gives the same stream as in-process parsing."""
+        monkeypatch.setattr("hermes.data.email_sources._MAX_FILES_PER_TASK", 1)
+
+        in_process = list(open_email_stream(str(mail_dir), max_workers=1))
+        pooled = list(open_email_stream(str(mail_dir), max_workers=2))
+
+        assert pooled == in_process
+
+    @pytest.mark.asyncio
+    async def test_async_iteration(self, mail_dir):
+        """The stream can be consumed with async for."""
+        stream = open_email_stream(str(mail_dir / "*.jsonl"), max_workers=1)
+
+        emails = [email async for email in stream]
+
+        assert [email["email_id"] for email in emails] == ["E001", "E002"]
+
+    @pytest.mark.asyncio
+    async def test_closing_early_cancels_queued_groups(self, tmp_path, monkeypatch):
+        """Only a few groups are queued ahead, and closing the stream stops the pool."""
+        monkeypatch.setattr("hermes.data.email_sources._MAX_FILES_PER_TASK", 1)
+        for n in range(20):
+            (tmp_path / f"dump-{n:02}.jsonl").write_text(
+                json.dumps({"email_id": f"E{n:02}", "message": "Hi"})
+            )
+        pools = []
+
+        class RecordingPool(ThreadPoolExecutor):
+            def __init__(self, max_workers):
+                super().__init__(max_workers)
+                self.submitted = 0
+                self.cancelled_on_shutdown: list[bool] = []
+                pools.append(self)
+
+            def submit(self, *args, **kwargs):
+                self.submitted += 1
+                return super().submit(*args, **kwargs)
+
+            def shutdown(self, wait=True, *, cancel_futures=False):
+                self.cancelled_on_shutdown.append(cancel_futures)
+                super().shutdown(wait=wait, cancel_futures=cancel_futures)
+
+        monkeypatch.setattr(
+            "hermes.data.email_sources.ProcessPoolExecutor", RecordingPool
+        )
+        emails = aiter(open_email_stream(str(tmp_path), max_workers=2))
+
+        assert (await anext(emails))["email_id"] == "E00"
+        await emails.aclose()
+
+        [pool] = pools
+        # Two groups per worker, plus the one queued when the first was handed over
+        assert pool.submitted == 5
+        assert pool.cancelled_on_shutdown == [True]
+
+    def test_source_detection(self, mail_dir):
+        """Single CSV files keep using the regular loader."""
+        assert is_email_stream_source(str(mail_dir))
+        assert is_email_stream_source(str(mail_dir / "*.csv"))
+        assert is_email_stream_source(str(mail_dir / "dump-1.jsonl"))
+        assert not is_email_stream_source(str(mail_dir / "legacy.csv"))
+
+    def test_empty_source_fails_immediately(self, tmp_path):
+        """A source without email files is reported before processing starts."""
+        with pytest.raises(ValueError, match="No email files found"):
+            open_email_stream(str(tmp_path / "*.jsonl"))
@@ -0,0 +1,131 @@
+"""Tests for embeddings.py."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from hermes.config import HermesConfig
+from hermes.data.embeddings import (
+    LocalEmbeddings,
+    MicroBatcher,
+    create_embeddings,
+    embedding_collection_name,
+)
+
+
+class _RecordingEncoder:
+    """Encode function that records the batches it receives."""
+
+    def __init__(self, delay: threading.Event | None = None):
+        self.batches: list[list[str]] = []
+        self._delay = delay
+
+    def __call__(self, texts: list[str]) -> list[list[float]]:
+        if self._delay is not None:
+            self._delay.wait(timeout=5)
+        self.batches.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class TestLocalEmbeddings:
+    """Tests for the local embedding backend."""
+
+    def test_embed_documents_encodes_in_batches(self):
+        """Documents are encoded in chunks of batch_size, preserving order."""
+        encoder = _RecordingEncoder()
+        embeddings = LocalEmbeddings("test-model", batch_size=2, encode=encoder)
+
+        vectors = embeddings.embed_documents(["a", "bb", "ccc", "dddd", "eeeee"])
+
+        assert [len(batch) for batch in encoder.batches] == [2, 2, 1]
+        assert [vector[0] for vector in vectors] == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+    def test_concurrent_queries_share_micro_batches(self):
+        """Queries arriving while a batch is being encoded are coalesced."""
+        release = threading.Event()
+        encoder = _RecordingEncoder(delay=release)
+        batcher = MicroBatcher(encoder, max_batch_size=16, max_wait_ms=50)
+
+        futures = [batcher.submit("x" * n) for n in range(1, 9)]
+        release.set()
+        vectors = [future.result(timeout=5) for future in futures]
+
+        assert [vector[0] for vector in vectors] == [float(n) for n in range(1, 9)]
+        assert sum(len(batch) for batch in encoder.batches) == 8
+        assert len(encoder.batches) < 8
+
+    def test_embed_query_from_many_threads(self):
+        """Each caller receives the vector for its own query."""
+        embeddings = LocalEmbeddings(
+            "test-model", batch_size=4, micro_batch_wait_ms=5, encode=_RecordingEncoder()
+        )
+        queries = ["q" * n for n in range(1, 21)]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            vectors = list(pool.map(embeddings.embed_query, queries))
+
+        assert [vector[0] for vector in vectors] == [float(n) for n in range(1, 21)]
+
+    def test_encode_errors_reach_every_caller(self):
+        """A failing batch fails each pending request instead of hanging."""
+
+        def failing_encode(texts):
+            raise RuntimeError("model unavailable")
+
+        batcher = MicroBatcher(failing_encode)
+
+        with pytest.raises(RuntimeError, match="model unavailable"):
+            batcher.encode("query")
+
+    @pytest.mark.asyncio
+    async def test_aembed_query_shares_micro_batches(self):
+        """Concurrent async queries are batched without blocking the event loop."""
+        encoder = _RecordingEncoder()
+        embeddings = LocalEmbeddings(
+            "test-model", batch_size=8, micro_batch_wait_ms=20, encode=encoder
+        )
+
+        vectors = await asyncio.gather(
+            *(embeddings.aembed_query("q" * n) for n in range(1, 6))
+        )
+
+        assert [vector[0] for vector in vectors] == [1.0, 2.0, 3.0, 4.0, 5.0]
+        assert len(encoder.batches) < 5
+
+
+class TestEmbeddingSelection:
+    """Tests for choosing the embedding backend from the config."""
+
+    def test_local_prefix_selects_local_backend(self):
+        """A "local:" model name creates a lazily loaded LocalEmbeddings."""
+        config = HermesConfig(
+            embedding_model_name="local:sentence-transformers/all-MiniLM-L6-v2",
+            embedding_batch_size=8,
+            embedding_num_threads=2,
+        )
+
+        embeddings = create_embeddings(config)
+
+        assert isinstance(embeddings, LocalEmbeddings)
+        assert embeddings.model_name == "sentence-transformers/all-MiniLM-L6-v2"
+        assert embeddings.batch_size == 8
+        assert embeddings.num_threads == 2
+
+    def test_local_models_get_their_own_collection(self):
+        """Local vectors are stored apart from the OpenAI collection."""
+        openai_config = HermesConfig(
+            embedding_model_name="text-embedding-3-small",
+            chroma_collection_name="product_catalog",
+        )
+        local_config = HermesConfig(
+            embedding_model_name="local:sentence-transformers/all-MiniLM-L6-v2",
+            chroma_collection_name="product_catalog",
+        )
+
+        assert embedding_collection_name(openai_config) == "product_catalog"
+        assert (
+            embedding_collection_name(local_config)
+            == "product_catalog_sentence_transformers_all_minilm_l6_v2"
+        )
@@ -0,0 +1,255 @@
+"""Unit tests for the fulfiller agent."""
+
+from unittest.mock import patch
+
+import pytest
+
+from hermes.agents.classifier.models import ClassifierOutput
+from hermes.agents.fulfiller.agent import (
+    CLARIFICATION_MARKER,
+    _fulfil_order,
+    build_exact_order,
+    hydrate_order,
+    run_fulfiller,
+)
+from hermes.agents.fulfiller.models import (
+    FulfillerInput,
+    OrderLineSelection,
+    OrderSelection,
+)
+from hermes.agents.stockkeeper.models import StockkeeperOutput
+from hermes.config import HermesConfig
+from hermes.model.email import CustomerEmail, EmailAnalysis, ProductMention
+from hermes.model.enums import ProductCategory, Season
+from hermes.model.order import OrderLineStatus
+from hermes.model.product import Product
+from hermes.model.promotions import (
+    DiscountSpec,
+    PromotionConditions,
+    PromotionEffects,
+    PromotionSpec,
+)
+
+from tests.fixtures.mock_product_catalog import get_mock_products_df
+
+
+def _candidate(product_id: str, price: float, metadata: str, **kwargs) -> Product:
+    return Product(
+        product_id=product_id,
+        name=f"Product {product_id}",
+        description=f"Description of {product_id}",
+        category=ProductCategory.SHIRTS,
+        product_type="shirt",
+        stock=10,
+        seasons=[Season.SPRING],
+        price=price,
+        metadata=metadata,
+        **kwargs,
+    )
+
+
+EXACT = "Resolution confidence: 1.000; Found by exact product ID match"
+PERCENT_OFF = PromotionSpec(
+    conditions=PromotionConditions(min_quantity=2),
+    effects=PromotionEffects(
+        apply_discount=DiscountSpec(type="percentage", amount=10.0)
+    ),
+)
+
+
+class TestExactOrderFastPath:
+    """Test cases for drafting orders without the LLM."""
+
+    def test_search_candidates_need_the_llm(self):
+        """A mention matched by search is ambiguous, so no order is drafted."""
+        stockkeeper = StockkeeperOutput(
+            candidate_products_for_mention=[
+                (
+                    ProductMention(product_id="TST001", quantity=1),
+                    [_candidate("TST001", 29.99, EXACT)],
+                ),
+                (
+                    ProductMention(product_name="blue shirt", quantity=1),
+                    [_candidate("TST004", 34.99, "Found through semantic search")],
+                ),
+            ]
+        )
+
+        assert build_exact_order("E001", stockkeeper) is None
+
+    def test_reformatted_ids_take_the_fast_path(self):
+        """IDs written with separators or in lower case still count as exact."""
+        stockkeeper = StockkeeperOutput(
+            candidate_products_for_mention=[
+                (
+                    ProductMention(product_id="LTH-0976", quantity=1),
+                    [_candidate("LTH0976", 29.99, EXACT)],
+                ),
+                (
+                    ProductMention(product_id="cbg 9876", quantity=3),
+                    [_candidate("CBG9876", 34.99, EXACT)],
+                ),
+            ]
+        )
+
+        with patch(
+            "hermes.agents.fulfiller.agent.load_products_df",
+            return_value=get_mock_products_df(),
+        ):
+            order = build_exact_order("E001", stockkeeper)
+
+        assert order is not None
+        assert [(line.product_id, line.quantity) for line in order.lines] == [
+            ("LTH0976", 1),
+            ("CBG9876", 3),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_exact_order_is_fulfilled_without_llm(self):
+        """Exact ID mentions are reserved and promoted without calling the model."""
+        stockkeeper = StockkeeperOutput(
+            candidate_products_for_mention=[
+                (
+                    ProductMention(product_id="tst 001", quantity=2),
+                    [
+                        _candidate(
+                            "TST001",
+                            29.99,
+                            EXACT,
+                            promotion=PERCENT_OFF,
+                            promotion_text="10% off two or more",
+                        )
+                    ],
+                ),
+                (
+                    ProductMention(product_id="TST003", quantity=1),
+                    [_candidate("TST003", 99.99, EXACT)],
+                ),
+            ]
+        )
+        state = FulfillerInput(
+            email=CustomerEmail(email_id="E001", message="2x TST001 and TST003"),
+            classifier=ClassifierOutput(
+                email_analysis=EmailAnalysis(
+                    email_id="E001", primary_intent="order request", segments=[]
+                )
+            ),
+            stockkeeper=stockkeeper,
+        )
+
+        products_df = get_mock_products_df()
+        with (
+            patch(
+                "hermes.agents.fulfiller.agent.load_products_df",
+                return_value=products_df,
+            ),
+            patch(
+                "hermes.tools.order_tools.load_products_df",
+                return_value=products_df,
+            ),
+            patch(
+                "hermes.tools.catalog_tools.load_products_df",
+                return_value=get_mock_products_df(),
+            ),
+            patch("hermes.agents.fulfiller.agent.get_llm_client") as get_llm_client,
+        ):
+            response = await run_fulfiller(
+                state, HermesConfig().as_runnable_config()
+            )
+
+        get_llm_client.assert_not_called()
+        order = response["fulfiller"].order_result
+        shirt, jacket = order.lines
+        assert shirt.status == OrderLineStatus.CREATED and shirt.stock == 8
+        assert shirt.promotion_applied
+        assert order.total_discount == pytest.approx(2 * 29.99 * 0.1)
+        assert jacket.status == OrderLineStatus.OUT_OF_STOCK
+
+
+class TestOrderHydration:
+    """Test cases for turning compact LLM selections into order lines."""
+
+    def test_lines_are_filled_in_from_the_catalog(self):
+        """Only IDs and quantities come from the selection; the rest is looked up."""
+        stockkeeper = StockkeeperOutput(
+            candidate_products_for_mention=[
+                (
+                    ProductMention(product_name="blue shirt", quantity=1),
+                    [
+                        _candidate(
+                            "TST004",
+                            1.0,
+                            "Found through semantic search",
+                            promotion=PERCENT_OFF,
+                            promotion_text="10% off two or more",
+                        )
+                    ],
+                ),
+            ]
+        )
+        selection = OrderSelection(
+            lines=[
+                OrderLineSelection(
+                    mention_index=0,
+                    product_id="tst004",
+                    quantity=2,
+                    needs_clarification=True,
+                ),
+                OrderLineSelection(mention_index=0, product_id="XYZ999", quantity=1),
+            ]
+        )
+
+        with patch(
+            "hermes.agents.fulfiller.agent.load_products_df",
+            return_value=get_mock_products_df(),
+        ):
+            order = hydrate_order("E002", selection, stockkeeper)
+
+        (line,) = order.lines
+        assert line.product_id == "TST004"
+        assert line.name == "Test Shirt Blue"
+        assert line.base_price == 34.99
+        assert line.total_price == pytest.approx(69.98)
+        assert line.promotion == PERCENT_OFF
+        assert line.description.startswith(CLARIFICATION_MARKER)
+        assert line.description.endswith("A different test shirt in blue color.")
+        assert "XYZ999" in (order.message or "")
+
+    def test_lines_to_confirm_are_still_reserved(self):
+        """The clarification flag only asks for confirmation; stock is reserved."""
+        stockkeeper = StockkeeperOutput(
+            candidate_products_for_mention=[
+                (
+                    ProductMention(product_name="blue shirt", quantity=2),
+                    [_candidate("TST004", 34.99, "Found through semantic search")],
+                ),
+            ]
+        )
+        selection = OrderSelection(
+            lines=[
+                OrderLineSelection(
+                    mention_index=0,
+                    product_id="TST004",
+                    quantity=2,
+                    needs_clarification=True,
+                )
+            ]
+        )
+
+        products_df = get_mock_products_df()
+        with (
+            patch(
+                "hermes.agents.fulfiller.agent.load_products_df",
+                return_value=products_df,
+            ),
+            patch(
+                "hermes.tools.order_tools.load_products_df",
+                return_value=products_df,
+            ),
+        ):
+            order = _fulfil_order(hydrate_order("E003", selection, stockkeeper))
+
+        (line,) = order.lines
+        assert CLARIFICATION_MARKER in line.description
+        assert line.status == OrderLineStatus.CREATED and line.stock == 6
+        assert order.total_price == pytest.approx(2 * 34.99)
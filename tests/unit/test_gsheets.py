@@ -0,0 +1,155 @@
+"""Tests for the Google Sheets snapshot cache in gsheets.py."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from hermes.data.load_data import _parse_data_source
+from hermes.utils.gsheets import (
+    GSheetSnapshotCache,
+    TransportResponse,
+    urllib_transport,
+)
+
+SHEET_ID = "1AbCdEfGhIjKlMnOpQrStUvWxYz0123456789-_abcd"
+
+
+class _SheetServer:
+    """Local stand-in for the Google Sheets CSV export, with ETag support."""
+
+    def __init__(self):
+        self.sheets = {"products": b"product_id,stock\nAAA0001,3\n"}
+        self.requests: list[dict[str, str]] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(dict(self.headers.items()))
+                sheet_name = self.path.rsplit("/", 1)[-1]
+                body = server.sheets.get(sheet_name)
+                if body is None:
+                    self.send_error(404)
+                    return
+                etag = f'"{hash(body)}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url_template = (
+            f"http://127.0.0.1:{self.httpd.server_port}/{{document_id}}/{{sheet_name}}"
+        )
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def sheet_server():
+    server = _SheetServer()
+    yield server
+    server.stop()
+
+
+def _cache(server, tmp_path, ttl_seconds=300.0, transport=urllib_transport):
+    return GSheetSnapshotCache(
+        str(tmp_path),
+        ttl_seconds=ttl_seconds,
+        transport=transport,
+        url_template=server.url_template,
+    )
+
+
+class TestGSheetSnapshotCache:
+    """Tests for TTL, conditional fetches and the offline fallback."""
+
+    def test_snapshot_is_reused_within_ttl(self, sheet_server, tmp_path):
+        """A fresh snapshot is served without another request."""
+        cache = _cache(sheet_server, tmp_path)
+
+        first = cache.fetch(SHEET_ID, "products")
+        second = cache.fetch(SHEET_ID, "products")
+
+        assert len(sheet_server.requests) == 1
+        assert second.content_hash == first.content_hash
+        assert list(second.to_dataframe()["product_id"]) == ["AAA0001"]
+
+    def test_expired_snapshot_is_revalidated(self, sheet_server, tmp_path):
+        """After the TTL a conditional request is made and a 304 keeps the snapshot."""
+        cache = _cache(sheet_server, tmp_path, ttl_seconds=0)
+
+        first = cache.fetch(SHEET_ID, "products")
+        second = cache.fetch(SHEET_ID, "products")
+
+        assert "If-None-Match" in sheet_server.requests[1]
+        assert second.content == first.content
+        assert second.fetched_at >= first.fetched_at
+
+        sheet_server.sheets["products"] = b"product_id,stock\nAAA0001,3\nBBB0002,1\n"
+        third = cache.fetch(SHEET_ID, "products")
+        assert third.content_hash != first.content_hash
+        assert len(third.to_dataframe()) == 2
+
+    def test_last_snapshot_is_served_offline(self, sheet_server, tmp_path):
+        """When the sheet cannot be fetched, the snapshot on disk is used."""
+        _cache(sheet_server, tmp_path).fetch(SHEET_ID, "products")
+        sheet_server.stop()
+
+        def offline(url, headers):
+            raise OSError("network unreachable")
+
+        snapshot = _cache(sheet_server, tmp_path, ttl_seconds=0, transport=offline).fetch(
+            SHEET_ID, "products"
+        )
+
+        assert snapshot.stale
+        assert list(snapshot.to_dataframe()["stock"]) == [3]
+
+    def test_missing_snapshot_and_failed_fetch_raises(self, sheet_server, tmp_path):
+        """Without a snapshot to fall back to, the fetch error propagates."""
+        with pytest.raises(Exception):
+            _cache(sheet_server, tmp_path).fetch(SHEET_ID, "missing")
+
+    def test_prefetch_fetches_sheets_concurrently(self, sheet_server, tmp_path):
+        """Products and emails are requested at the same time."""
+        both_in_flight = threading.Barrier(2, timeout=5)
+
+        def transport(url, headers):
+            both_in_flight.wait()
+            return TransportResponse(200, b"id\n1\n", {})
+
+        cache = _cache(sheet_server, tmp_path, transport=transport)
+        cache.prefetch([(SHEET_ID, "products"), (SHEET_ID, "emails")])
+
+        assert not both_in_flight.broken
+        assert cache.fetch(SHEET_ID, "emails").content == b"id\n1\n"
+
+
+class TestParseDataSource:
+    """Tests for telling files, sheets and typos apart."""
+
+    def test_unknown_string_is_rejected(self):
+        """A mistyped path fails immediately instead of being fetched as a sheet."""
+        with pytest.raises(ValueError, match="not found as a local file"):
+            _parse_data_source("data/prodcts.csv", "products")
+
+    def test_sheet_id_without_sheet_name_uses_default(self):
+        """A bare spreadsheet ID is read from the default sheet."""
+        assert _parse_data_source(SHEET_ID, "products") == (SHEET_ID, "products", None)
+
+    def test_invalid_sheet_id_is_rejected(self):
+        """A '#' reference must start with a spreadsheet ID."""
+        with pytest.raises(ValueError, match="not a valid Google Sheet reference"):
+            _parse_data_source("products.csv#sheet", "products")
@@ -0,0 +1,213 @@
+"""Tests for index_snapshot.py and building snapshots from the vector store."""
+
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from hermes.config import HermesConfig
+from hermes.data.index_snapshot import (
+    CURRENT_POINTER,
+    SnapshotVectorStore,
+    catalog_hash,
+    load_snapshot_vector_store,
+    open_index_snapshot,
+    write_index_snapshot,
+)
+from hermes.data.vector_store import build_index_snapshot, product_to_document
+
+from tests.fixtures.test_product_catalog import get_test_products_df
+
+
+class _FixedEmbeddings:
+    """Embeddings that return a fixed query vector."""
+
+    def __init__(self, vector):
+        self.vector = list(vector)
+
+    def embed_query(self, text):
+        return self.vector
+
+    def embed_documents(self, texts):
+        return [self.vector for _ in texts]
+
+
+def _documents() -> list[Document]:
+    rows = [("A", "Bags", "Winter", 10.0), ("B", "Bags", "Summer", 50.0)]
+    rows.append(("C", "Shoes", "Winter", 30.0))
+    return [
+        Document(
+            page_content=product_id.lower(),
+            metadata={
+                "product_id": product_id,
+                "category": category,
+                "season": season,
+                "price": price,
+            },
+        )
+        for product_id, category, season, price in rows
+    ]
+
+
+class TestIndexSnapshot:
+    """Tests for writing and memory-mapping snapshots."""
+
+    def test_round_trip_is_memory_mapped(self, tmp_path):
+        """The written matrix is mapped read-only with ids and hash preserved."""
+        vectors = np.eye(3, dtype=np.float32)
+        write_index_snapshot(str(tmp_path), vectors, _documents(), "abc123", "model")
+
+        snapshot = open_index_snapshot(str(tmp_path))
+
+        assert isinstance(snapshot.vectors, np.memmap)
+        assert not snapshot.vectors.flags.writeable
+        assert np.array_equal(snapshot.vectors, vectors)
+        assert [doc.metadata["product_id"] for doc in snapshot.documents] == [
+            "A",
+            "B",
+            "C",
+        ]
+        assert snapshot.catalog_hash == "abc123"
+        assert snapshot.bitmap("category", "Bags").tolist() == [True, True, False]
+        assert not snapshot.bitmap("category", "Hats").any()
+        assert snapshot.bitmap("price", 10.0) is None
+
+    def test_filtered_search_uses_bitmaps_and_metadata(self, tmp_path):
+        """Bitmap and range conditions combine like a Chroma where clause."""
+        write_index_snapshot(
+            str(tmp_path), np.eye(3, dtype=np.float32), _documents(), "abc123", "model"
+        )
+        store = SnapshotVectorStore(
+            _FixedEmbeddings([0.0, 1.0, 0.0]), open_index_snapshot(str(tmp_path))
+        )
+
+        results = store.similarity_search_with_score(
+            "query",
+            k=3,
+            filter={"$and": [{"season": "Winter"}, {"price": {"$gte": 20.0}}]},
+        )
+
+        assert [doc.metadata["product_id"] for doc, _ in results] == ["C"]
+        assert results[0][1] == pytest.approx(2.0)
+
+    def test_rebuild_switches_current_and_prunes_old_snapshots(self, tmp_path):
+        """Each build becomes current; only it and its predecessor are kept."""
+        paths = []
+        for build in range(3):
+            with patch(
+                "hermes.data.index_snapshot.time.strftime", return_value=f"b{build}"
+            ):
+                paths.append(
+                    write_index_snapshot(
+                        str(tmp_path), np.eye(3), _documents(), f"hash{build}", "model"
+                    )
+                )
+
+        assert (tmp_path / CURRENT_POINTER).read_text() == os.path.basename(paths[2])
+        assert not os.path.exists(paths[0])
+        assert os.path.exists(paths[1])
+
+    def test_stale_snapshot_is_not_loaded(self, tmp_path):
+        """A snapshot of a different catalog falls back to the regular store."""
+        write_index_snapshot(
+            str(tmp_path), np.eye(3, dtype=np.float32), _documents(), "old", "model"
+        )
+
+        embeddings = _FixedEmbeddings([1.0, 0.0, 0.0])
+
+        assert load_snapshot_vector_store(str(tmp_path), embeddings, "new") is None
+        assert load_snapshot_vector_store(str(tmp_path), embeddings, "old") is not None
+
+    def test_matching_source_hash_skips_catalog_hash(self, tmp_path):
+        """The catalog is only hashed when the source changed since the build."""
+        write_index_snapshot(
+            str(tmp_path),
+            np.eye(3, dtype=np.float32),
+            _documents(),
+            "old",
+            "model",
+            source_hash="src1",
+        )
+        embeddings = _FixedEmbeddings([1.0, 0.0, 0.0])
+
+        def fail():
+            raise AssertionError("catalog hashed")
+
+        assert load_snapshot_vector_store(
+            str(tmp_path), embeddings, fail, expected_source_hash="src1"
+        )
+        assert load_snapshot_vector_store(
+            str(tmp_path), embeddings, lambda: "old", expected_source_hash="src2"
+        )
+        assert not load_snapshot_vector_store(
+            str(tmp_path), embeddings, lambda: "new", expected_source_hash="src2"
+        )
+
+    @pytest.mark.parametrize(
+        ("quantization", "truncate_dim"), [("none", 0), ("int8", 0), ("none", 2)]
+    )
+    def test_search_index_maps_stored_arrays(
+        self, tmp_path, quantization, truncate_dim
+    ):
+        """Norms and compact vectors are stored, so loading computes nothing."""
+        vectors = np.random.default_rng(0).normal(size=(3, 4)).astype(np.float32)
+        write_index_snapshot(
+            str(tmp_path),
+            vectors,
+            _documents(),
+            "abc123",
+            "model",
+            quantization=quantization,
+            truncate_dim=truncate_dim,
+        )
+        snapshot = open_index_snapshot(str(tmp_path))
+
+        index = snapshot.vector_index(quantization, truncate_dim)
+
+        assert isinstance(index.codes, np.memmap)
+        assert isinstance(index.norms, np.memmap)
+        assert index.quantization == quantization
+        store = SnapshotVectorStore(
+            _FixedEmbeddings(vectors[1]),
+            snapshot,
+            quantization=quantization,
+            truncate_dim=truncate_dim,
+        )
+        [(doc, _)] = store.similarity_search_with_score("b", k=1)
+        assert doc.metadata["product_id"] == "B"
+
+
+class TestBuildIndexSnapshot:
+    """Tests for building a snapshot from the Chroma store."""
+
+    @patch("hermes.data.vector_store.open_chroma_store")
+    @patch("hermes.data.vector_store.load_products_df")
+    def test_reuses_stored_vectors_and_embeds_changed_products(
+        self, mock_load_df, mock_open_chroma, tmp_path
+    ):
+        """Only products missing from Chroma or with changed text are embedded."""
+        df = get_test_products_df().head(3)
+        mock_load_df.return_value = df
+        documents = [product_to_document(row) for _, row in df.iterrows()]
+        ids = [doc.metadata["product_id"] for doc in documents]
+        chroma = mock_open_chroma.return_value
+        chroma._collection.get.return_value = {
+            "ids": ids[:2],
+            "embeddings": [[1.0, 0.0], [0.0, 1.0]],
+            "documents": [documents[0].page_content, "outdated description"],
+        }
+        chroma.embeddings.embed_documents.side_effect = lambda texts: [
+            [0.5, 0.5] for _ in texts
+        ]
+        config = HermesConfig(embedding_model_name="model", chroma_embedding_dim=2)
+
+        build_index_snapshot(str(tmp_path), config)
+        snapshot = open_index_snapshot(str(tmp_path))
+
+        chroma.embeddings.embed_documents.assert_called_once_with(
+            [documents[1].page_content, documents[2].page_content]
+        )
+        assert snapshot.vectors.tolist() == [[1.0, 0.0], [0.5, 0.5], [0.5, 0.5]]
+        assert snapshot.catalog_hash == catalog_hash(df, "model", 2)
@@ -0,0 +1,251 @@
+"""Tests for inventory.py."""
+
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from hermes.data.catalog_index import get_catalog_index
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from hermes.data.catalog_registry import CatalogRegistry
+from hermes.data.inventory import (
+    InventoryEngine,
+    carry_stock_over,
+    get_inventory,
+    stock_overlay,
+)
+from hermes.tools.order_tools import StockUpdateStatus, update_stock
+
+from tests.fixtures.mock_product_catalog import get_mock_products_df
+
+
+class TestInventoryEngine:
+    """Tests for atomic stock reservations."""
+
+    def test_reserve_decrements_and_returns_remaining_stock(self):
+        """A successful reservation reports the stock left after it."""
+        df = get_mock_products_df()
+        inventory = InventoryEngine(df)
+
+        reservation = inventory.reserve("tst 001", 4)
+
+        assert reservation.reserved
+        assert reservation.product_id == "TST001"
+        assert reservation.stock == 6
+        assert inventory.stock_of("TST001") == 6
+
+    def test_changes_are_mirrored_to_dataframe_and_catalog_index(self):
+        """Readers of the DataFrame and the catalog index see reservations."""
+        df = get_mock_products_df()
+        inventory = InventoryEngine(df)
+
+        inventory.reserve("TST004", 8)
+
+        assert int(df.loc[df["product_id"] == "TST004", "stock"].iloc[0]) == 0
+        index = get_catalog_index(df)
+        assert index.stock[index.position_of("TST004")] == 0
+
+    def test_lines_for_the_same_product_share_its_stock(self):
+        """Two lines of one product cannot together exceed its stock."""
+        inventory = InventoryEngine(get_mock_products_df())
+
+        first, second = inventory.reserve_lines([("TST002", 3), ("TST002", 3)])
+
+        assert first.reserved and first.stock == 2
+        assert not second.reserved and second.stock == 2
+        assert inventory.stock_of("TST002") == 2
+
+    def test_all_or_nothing_reserves_nothing_if_any_line_fails(self):
+        """A failing line rolls back the whole order."""
+        inventory = InventoryEngine(get_mock_products_df())
+
+        results = inventory.reserve_lines(
+            [("TST001", 2), ("TST003", 1), ("NOPE999", 1)], all_or_nothing=True
+        )
+
+        assert [result.reserved for result in results] == [False, False, False]
+        assert [result.found for result in results] == [True, True, False]
+        assert results[0].stock == 10
+        assert inventory.stock_of("TST001") == 10
+
+    def test_idempotency_key_is_applied_once(self):
+        """Reserving the same email line twice only decrements once."""
+        inventory = InventoryEngine(get_mock_products_df())
+
+        for _ in range(2):
+            (result,) = inventory.reserve_lines(
+                [("TST005", 2)], idempotency_keys=["E007#0:TST005"]
+            )
+
+        assert result.replayed and result.reserved
+        assert inventory.stock_of("TST005") == 1
+
+    def test_no_overselling_under_concurrent_orders(self):
+        """Many threads placing multi-line orders never sell more than the stock."""
+        df = get_mock_products_df()
+        df["stock"] = 500
+        inventory = InventoryEngine(df)
+        product_ids = list(df["product_id"])
+        start = threading.Barrier(16)
+        sold = {product_id: 0 for product_id in product_ids}
+        sold_lock = threading.Lock()
+
+        def place_orders(seed: int) -> None:
+            rng = random.Random(seed)
+            start.wait()
+            for _ in range(300):
+                lines = [
+                    (rng.choice(product_ids), rng.randint(1, 4))
+                    for _ in range(rng.randint(1, 3))
+                ]
+                results = inventory.reserve_lines(
+                    lines, all_or_nothing=rng.random() < 0.5
+                )
+                with sold_lock:
+                    for result in results:
+                        if result.reserved:
+                            sold[result.product_id] += result.quantity
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(place_orders, range(16)))
+
+        for product_id in product_ids:
+            remaining = inventory.stock_of(product_id)
+            assert remaining is not None and remaining >= 0
+            assert sold[product_id] + remaining == 500
+            assert (
+                int(df.loc[df["product_id"] == product_id, "stock"].iloc[0])
+                == remaining
+            )
+        # The demand exceeds the supply, so every product sells out
+        assert all(inventory.stock_of(product_id) < 4 for product_id in product_ids)
+
+    def test_reservations_survive_a_catalog_reload(self, tmp_path):
+        """A hot reload keeps in-memory reservations on top of the file's stock."""
+        path = str(tmp_path / "products.csv")
+        catalog = get_mock_products_df()
+        catalog.to_csv(path, index=False)
+        registry = CatalogRegistry(
+            lambda source: (pd.read_csv(source), source, None),
+            default_source=path,
+            check_interval_seconds=0.0,
+            on_replace=carry_stock_over,
+        )
+        df = registry.get(path)
+        get_inventory(df).reserve_lines([("TST001", 4)], idempotency_keys=["E1#0"])
+
+        # Restocked by 2 and another product edited
+        catalog.loc[catalog["product_id"] == "TST001", "stock"] = 12
+        catalog.loc[catalog["product_id"] == "TST002", "price"] = 1.0
+        catalog.to_csv(path, index=False)
+        reloaded = registry.get()
+
+        assert reloaded is not df
+        inventory = get_inventory(reloaded)
+        assert inventory.stock_of("TST001") == 8
+        stock = reloaded.loc[reloaded["product_id"] == "TST001", "stock"]
+        assert int(stock.iloc[0]) == 8
+        assert inventory.stock_of("TST002") == 5
+        # The reservation is not replayed against the reloaded catalog
+        [replayed] = inventory.reserve_lines(
+            [("TST001", 4)], idempotency_keys=["E1#0"]
+        )
+        assert replayed.replayed and inventory.stock_of("TST001") == 8
+
+    def test_a_pinned_catalog_reserves_from_the_reloaded_engine(self):
+        """An email pinned to the replaced catalog shares the reloaded engine."""
+        df = get_mock_products_df()
+        inventory = get_inventory(df)
+        inventory.reserve_lines([("TST001", 4)], idempotency_keys=["E1#0"])
+        reloaded = get_mock_products_df()
+        carry_stock_over(df, reloaded)
+
+        pinned = get_inventory(df)
+        assert pinned is get_inventory(reloaded) and pinned is not inventory
+        [replayed] = pinned.reserve_lines([("TST001", 4)], idempotency_keys=["E1#0"])
+        assert replayed.replayed
+        pinned.reserve("TST001", 2)
+        assert get_inventory(reloaded).stock_of("TST001") == 4
+        # Alternating between the catalogs does not rebuild the engine
+        assert get_inventory(df) is get_inventory(reloaded) is pinned
+
+
+class TestStockOverlay:
+    """Tests for copy-on-write stock overlays."""
+
+    def test_parallel_overlays_are_isolated_from_each_other_and_the_base(self):
+        """Runs in separate threads only see their own reservations."""
+        df = get_mock_products_df()
+        start = threading.Barrier(4)
+
+        def run(quantity: int) -> tuple[int | None, int | None]:
+            with stock_overlay(df) as overlay:
+                start.wait()
+                get_inventory(df).reserve("TST001", quantity)
+                start.wait()
+                return overlay.stock_of("TST001"), get_inventory(df).stock_of("TST001")
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            seen = list(pool.map(run, [1, 2, 3, 4]))
+
+        assert seen == [(9, 9), (8, 8), (7, 7), (6, 6)]
+        assert get_inventory(df).stock_of("TST001") == 10
+        assert int(df.loc[df["product_id"] == "TST001", "stock"].iloc[0]) == 10
+
+    def test_commit_applies_reservations_to_the_base(self):
+        """Committing replays the overlay's lines, including their idempotency keys."""
+        df = get_mock_products_df()
+        base = InventoryEngine(df)
+        overlay = base.fork()
+        overlay.reserve_lines([("TST002", 2)], idempotency_keys=["E001#0:TST002"])
+        overlay.reserve("TST001", 1)
+
+        results = overlay.commit()
+
+        assert all(result.reserved for result in results)
+        assert base.stock_of("TST002") == 3
+        assert base.stock_of("TST001") == 9
+        (replayed,) = base.reserve_lines(
+            [("TST002", 2)], idempotency_keys=["E001#0:TST002"]
+        )
+        assert replayed.replayed
+        with pytest.raises(RuntimeError):
+            overlay.reserve("TST001", 1)
+
+    def test_commit_fails_if_base_stock_was_taken_meanwhile(self):
+        """A commit that no longer fits the base applies nothing."""
+        base = InventoryEngine(get_mock_products_df())
+        overlay = base.fork()
+        overlay.reserve("TST004", 6)
+        base.reserve("TST004", 5)
+
+        (result,) = overlay.commit()
+
+        assert not result.reserved
+        assert base.stock_of("TST004") == 3
+        assert not overlay.closed
+
+    def test_nested_overlay_commits_into_its_parent(self):
+        """A nested block's changes reach the outer overlay but not the base."""
+        df = get_mock_products_df()
+
+        with stock_overlay(df) as outer:
+            with stock_overlay(df, commit=True):
+                get_inventory(df).reserve("TST005", 2)
+            assert outer.stock_of("TST005") == 1
+
+        assert get_inventory(df).stock_of("TST005") == 3
+
+    def test_update_stock_inside_overlay_leaves_catalog_untouched(self):
+        """Tools reserving through get_inventory use the active overlay."""
+        df = get_mock_products_df()
+
+        with patch("hermes.tools.order_tools.load_products_df", return_value=df):
+            with stock_overlay(df):
+                assert update_stock("TST004", 8) == StockUpdateStatus.SUCCESS
+                assert (
+                    update_stock("TST004", 1) == StockUpdateStatus.INSUFFICIENT_STOCK
+                )
+            assert update_stock("TST004", 1) == StockUpdateStatus.SUCCESS
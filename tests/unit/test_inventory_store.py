@@ -0,0 +1,96 @@
+"""Tests for inventory_store.py."""
+
+from concurrent.futures import ProcessPoolExecutor
+
+from hermes.data.inventory import InventoryEngine
+from hermes.data.inventory_store import SQLiteInventoryStore
+
+from tests.fixtures.mock_product_catalog import get_mock_products_df
+
+
+def _reserve_many(db_path: str, count: int) -> int:
+    """Worker process: reserve one unit at a time; return how many were granted."""
+    store = SQLiteInventoryStore(db_path)
+    granted = 0
+    for _ in range(count):
+        (result,) = store.reserve_lines([("TST001", 1)])
+        granted += result.reserved
+    store.close()
+    return granted
+
+
+class TestSQLiteInventoryStore:
+    """Tests for the persistent, shared inventory."""
+
+    def test_stored_stock_replaces_catalog_stock(self, tmp_path):
+        """Stock persisted by an earlier run survives a restart."""
+        db_path = str(tmp_path / "inventory.db")
+        first_run = InventoryEngine(get_mock_products_df(), SQLiteInventoryStore(db_path))
+        first_run.reserve("TST001", 4)
+
+        df = get_mock_products_df()
+        second_run = InventoryEngine(df, SQLiteInventoryStore(db_path))
+
+        assert second_run.stock_of("TST001") == 6
+        assert int(df.loc[df["product_id"] == "TST001", "stock"].iloc[0]) == 6
+
+    def test_rerun_with_same_idempotency_key_does_not_decrement(self, tmp_path):
+        """Reprocessing an email replays its reservation instead of taking stock again."""
+        db_path = str(tmp_path / "inventory.db")
+        keys = ["E001#0:TST002"]
+        first = InventoryEngine(get_mock_products_df(), SQLiteInventoryStore(db_path))
+        (reserved,) = first.reserve_lines([("TST002", 2)], idempotency_keys=keys)
+
+        rerun = InventoryEngine(get_mock_products_df(), SQLiteInventoryStore(db_path))
+        (replayed,) = rerun.reserve_lines([("TST002", 2)], idempotency_keys=keys)
+
+        assert reserved.reserved and not reserved.replayed
+        assert replayed.reserved and replayed.replayed
+        assert replayed.stock == reserved.stock == 3
+        assert rerun.stock_of("TST002") == 3
+
+    def test_zero_units_succeed_without_changing_stock(self, tmp_path):
+        """The store decides zero and negative quantities like the in-memory engine."""
+        store = SQLiteInventoryStore(str(tmp_path / "inventory.db"))
+        engine = InventoryEngine(get_mock_products_df(), store)
+
+        zero, negative = engine.reserve_lines([("TST003", 0), ("TST002", -1)])
+
+        assert zero.reserved and zero.stock == 0
+        assert not negative.reserved
+        assert engine.stock_of("TST002") == 5
+
+    def test_refresh_picks_up_other_workers_reservations(self, tmp_path):
+        """Stock taken through another connection shows up in this worker's catalog."""
+        db_path = str(tmp_path / "inventory.db")
+        df = get_mock_products_df()
+        inventory = InventoryEngine(df, SQLiteInventoryStore(db_path))
+
+        SQLiteInventoryStore(db_path).reserve_lines([("TST004", 5)])
+        inventory.refresh()
+
+        assert inventory.stock_of("TST004") == 3
+        assert int(df.loc[df["product_id"] == "TST004", "stock"].iloc[0]) == 3
+
+    def test_no_overselling_across_processes(self, tmp_path):
+        """Worker processes sharing the database never sell more than the stock."""
+        db_path = str(tmp_path / "inventory.db")
+        InventoryEngine(get_mock_products_df(), SQLiteInventoryStore(db_path))
+
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            granted = sum(pool.map(_reserve_many, [db_path] * 4, [10] * 4))
+
+        assert granted == 10
+        assert SQLiteInventoryStore(db_path).stock_levels(["TST001"]) == {"TST001": 0}
+
+    def test_snapshot_and_restore(self, tmp_path):
+        """Restoring a snapshot resets stock to the snapshotted levels."""
+        db_path = str(tmp_path / "inventory.db")
+        store = SQLiteInventoryStore(db_path)
+        InventoryEngine(get_mock_products_df(), store)
+        store.snapshot(str(tmp_path / "backup.db"))
+        store.reserve_lines([("TST005", 3)])
+
+        store.restore(str(tmp_path / "backup.db"))
+
+        assert store.stock_levels(["TST005"]) == {"TST005": 3}
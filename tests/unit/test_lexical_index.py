@@ -0,0 +1,143 @@
+"""Tests for lexical_index.py and the lexical path of resolve_product_mention."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from hermes.data.lexical_index import LexicalIndex, get_lexical_index, tokenize
+from hermes.model.email import ProductMention
+from hermes.model.enums import ProductCategory
+from hermes.tools.catalog_tools import _create_product_from_row, resolve_product_mention
+
+from tests.fixtures.test_product_catalog import get_test_products_df
+
+
+def _names(df, hits):
+    return [df.iloc[hit.position]["name"] for hit in hits]
+
+
+class TestLexicalIndex:
+    """Tests for BM25 scoring and decisive-match detection."""
+
+    def test_tokenize_folds_case_plurals_and_stopwords(self):
+        """Tokens are lowercase, singular and free of stopwords."""
+        assert tokenize("The Leather Wallets, for you!") == ["leather", "wallet"]
+        assert tokenize(None) == []
+
+    def test_search_ranks_name_matches_first(self):
+        """Products whose name matches the query outrank description-only matches."""
+        df = get_test_products_df()
+        index = LexicalIndex(df)
+
+        hits = index.search("leather wallet", top_k=3)
+
+        assert _names(df, hits)[0] == "Leather Bifold Wallet"
+        assert all(a.score >= b.score for a, b in zip(hits, hits[1:]))
+
+    def test_search_applies_category_filter(self):
+        """The category filter excludes products from other categories."""
+        df = get_test_products_df()
+        index = LexicalIndex(df)
+
+        hits = index.search("leather", top_k=10, category="Bags")
+
+        assert hits
+        assert {df.iloc[hit.position]["category"] for hit in hits} == {"Bags"}
+
+    def test_full_name_in_query_is_decisive(self):
+        """A query containing exactly one product's full name settles the mention."""
+        df = get_test_products_df()
+        index = LexicalIndex(df)
+        query = "a pair of retro sunglasses"
+
+        decisive = index.decisive_hit(query, index.search(query, top_k=3))
+
+        assert decisive is not None
+        assert df.iloc[decisive.position]["product_id"] == "RSG8901"
+
+    def test_partial_name_is_not_decisive(self):
+        """A generic term shared by several products is left to vector search."""
+        df = get_test_products_df()
+        index = LexicalIndex(df)
+
+        for query in ["wallet", "sunglasses for summer"]:
+            assert index.decisive_hit(query, index.search(query, top_k=3)) is None
+
+    def test_product_id_in_query_is_decisive(self):
+        """A catalog ID appearing in the text is decisive regardless of case."""
+        df = get_test_products_df()
+        index = LexicalIndex(df)
+
+        decisive = index.decisive_hit("something like cbt8901", [])
+
+        assert decisive is not None
+        assert df.iloc[decisive.position]["product_id"] == "CBT8901"
+
+    def test_get_lexical_index_rebuilds_for_new_dataframe(self):
+        """A different DataFrame object gets its own index."""
+        first_df = get_test_products_df()
+        second_df = get_test_products_df()
+
+        assert get_lexical_index(first_df) is get_lexical_index(first_df)
+        assert get_lexical_index(second_df).products_df is second_df
+
+
+class TestResolveProductMentionLexical:
+    """Tests for the hybrid lexical and vector resolution path."""
+
+    @pytest.mark.asyncio
+    @patch("hermes.tools.catalog_tools.get_vector_store")
+    @patch("hermes.tools.catalog_tools.load_products_df")
+    async def test_decisive_match_skips_vector_search(
+        self, mock_load_df, mock_get_vector_store
+    ):
+        """An exact name match is returned without an embedding call."""
+        mock_load_df.return_value = get_test_products_df()
+
+        result = await resolve_product_mention(
+            ProductMention(product_name="Retro Sunglasses", quantity=2)
+        )
+
+        assert isinstance(result, list)
+        assert len(result) == 1
+        product, distance = result[0]
+        assert product.product_id == "RSG8901"
+        assert distance == 0.0
+        assert "Found by exact product name match" in product.metadata
+        assert "Requested quantity: 2" in product.metadata
+        mock_get_vector_store.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("hermes.tools.catalog_tools.metadata_to_product")
+    @patch("hermes.tools.catalog_tools.get_vector_store")
+    @patch("hermes.tools.catalog_tools.load_products_df")
+    async def test_lexical_hits_are_fused_with_vector_results(
+        self, mock_load_df, mock_get_vector_store, mock_metadata_to_product
+    ):
+        """Lexical-only hits join the vector candidates, ranked by fused rank."""
+        df = get_test_products_df()
+        mock_load_df.return_value = df
+
+        scarf_row = df[df["product_id"] == "VSC6789"].iloc[0]
+        doc = MagicMock(metadata={"product_id": "VSC6789"})
+        mock_get_vector_store.return_value.similarity_search_with_score.return_value = [
+            (doc, 0.9)
+        ]
+        mock_metadata_to_product.return_value = _create_product_from_row(scarf_row)
+
+        result = await resolve_product_mention(
+            ProductMention(
+                product_description="sunglasses for summer",
+                product_category=ProductCategory.ACCESSORIES,
+            ),
+            top_k=3,
+        )
+
+        assert isinstance(result, list)
+        distances = dict((p.product_id, d) for p, d in result)
+        assert set(distances) == {"VSC6789", "RSG8901"}
+        # The vector hit keeps its distance, the lexical-only hit gets a pseudo-distance
+        assert distances["VSC6789"] == 0.9
+        assert 0.0 < distances["RSG8901"] <= 1.2
+        lexical_product = next(p for p, _ in result if p.product_id == "RSG8901")
+        assert "Found through lexical search" in lexical_product.metadata
@@ -5,6 +5,7 @@ from unittest.mock import patch
 
 from hermes.tools.order_tools import (
     check_stock,
+    reserve_stock,
     update_stock,
     StockStatus,
     StockUpdateStatus,
@@ -98,6 +99,31 @@ class TestOrderTools:
         # Verify result
         assert result == StockUpdateStatus.INSUFFICIENT_STOCK
 
+    @patch("hermes.tools.order_tools.load_products_df")
+    def test_update_stock_zero_is_a_no_op(self, mock_load_df):
+        """Decrementing by zero succeeds and leaves stock alone, even when sold out."""
+        mock_load_df.return_value = get_mock_products_df()
+
+        assert update_stock("TST002", 0) == StockUpdateStatus.SUCCESS
+        assert update_stock("TST003", 0) == StockUpdateStatus.SUCCESS
+        assert update_stock("TST002", -1) == StockUpdateStatus.INSUFFICIENT_STOCK
+        [result] = reserve_stock([("TST002", 0)])
+        assert result.stock == 5
+
+    @patch("hermes.tools.order_tools.load_products_df")
+    def test_reserve_stock_reports_each_line(self, mock_load_df):
+        """Order lines are reserved together, with a status and stock per line."""
+        mock_load_df.return_value = get_mock_products_df()
+
+        results = reserve_stock([("TST001", 2), ("TST003", 1), ("NONEXISTENT", 1)])
+
+        assert [result.status for result in results] == [
+            StockUpdateStatus.SUCCESS,
+            StockUpdateStatus.INSUFFICIENT_STOCK,
+            StockUpdateStatus.PRODUCT_NOT_FOUND,
+        ]
+        assert [result.stock for result in results] == [8, 0, 0]
+
     @patch("hermes.tools.order_tools.load_products_df")
     def test_update_stock_invalid_product(self, mock_load_df):
         """Test updating stock for an invalid product."""
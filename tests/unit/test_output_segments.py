@@ -0,0 +1,145 @@
+"""Tests for output_segments.py."""
+
+import os
+
+import asyncio
+
+import pandas as pd  # type: ignore
+import pytest
+
+from hermes.utils import output
+from hermes.utils.output import create_output_csv
+from hermes.utils.output_segments import (
+    COMPACTION_LOCK,
+    SEGMENTS_DIR,
+    append_output_segment,
+    compact_output,
+    list_output_segments,
+    new_segment_name,
+    read_output_table,
+    table_path,
+)
+
+
+def _status(*rows: tuple[str, str, int, str]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["email ID", "product ID", "quantity", "status"])
+
+
+def _classification(*rows: tuple[str, str]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["email ID", "category"])
+
+
+class TestOutputSegments:
+    """Tests for append-only output with last-writer-wins compaction."""
+
+    def test_newest_rows_per_email_win_before_and_after_compaction(self, tmp_path):
+        """An email's rows are replaced by those of the latest run that has it."""
+        output_dir = str(tmp_path)
+        append_output_segment(
+            output_dir,
+            "order-status",
+            _status(("E002", "A", 1, "created"), ("E001", "B", 2, "created")),
+            new_segment_name("run1"),
+        )
+        append_output_segment(
+            output_dir,
+            "order-status",
+            _status(("E001", "C", 1, "out of stock"), ("E001", "D", 3, "created")),
+            new_segment_name("run2"),
+        )
+        expected = _status(
+            ("E001", "C", 1, "out of stock"),
+            ("E001", "D", 3, "created"),
+            ("E002", "A", 1, "created"),
+        )
+
+        merged = read_output_table(output_dir, "order-status")
+        pd.testing.assert_frame_equal(merged, expected)
+        assert not os.path.exists(table_path(output_dir, "order-status"))
+
+        compact_output(output_dir)
+
+        assert list_output_segments(output_dir, "order-status") == []
+        compacted = pd.read_csv(table_path(output_dir, "order-status"))
+        pd.testing.assert_frame_equal(compacted, expected)
+        pd.testing.assert_frame_equal(
+            read_output_table(output_dir, "order-status"), expected
+        )
+
+    def test_existing_csv_is_the_oldest_source(self, tmp_path):
+        """CSVs written before segments existed are merged like an old segment."""
+        output_dir = str(tmp_path)
+        _classification(("E001", "order request"), ("E003", "product inquiry")).to_csv(
+            table_path(output_dir, "email-classification"), index=False
+        )
+        append_output_segment(
+            output_dir,
+            "email-classification",
+            _classification(("E003", "order request")),
+            new_segment_name(),
+        )
+
+        paths = compact_output(output_dir)
+
+        assert paths is not None
+        assert all(os.path.exists(path) for path in paths.values())
+        pd.testing.assert_frame_equal(
+            pd.read_csv(paths["email-classification"]),
+            _classification(("E001", "order request"), ("E003", "order request")),
+        )
+
+    def test_segments_are_kept_while_another_process_compacts(self, tmp_path):
+        """A held compaction lock skips compaction; readers still see the segments."""
+        output_dir = str(tmp_path)
+        append_output_segment(
+            output_dir,
+            "email-classification",
+            _classification(("E001", "order request")),
+            new_segment_name(),
+        )
+        (tmp_path / SEGMENTS_DIR / COMPACTION_LOCK).write_text("12345")
+
+        assert compact_output(output_dir) is None
+        assert len(list_output_segments(output_dir, "email-classification")) == 1
+        merged = read_output_table(output_dir, "email-classification")
+        assert list(merged["email ID"]) == ["E001"]
+
+    @pytest.mark.asyncio
+    async def test_create_output_csv_merges_runs(self, tmp_path):
+        """Rerunning an email through create_output_csv replaces its earlier rows."""
+        output_dir = str(tmp_path)
+        empty = pd.DataFrame(columns=["email ID", "response"])
+        for category in ("product inquiry", "order request"):
+            await create_output_csv(
+                email_classification_df=_classification(("E001", category)),
+                order_status_df=_status(),
+                order_response_df=empty,
+                inquiry_response_df=empty,
+                output_dir=output_dir,
+            )
+
+        # Runs only append; the merged view comes from the segments
+        assert not os.path.exists(table_path(output_dir, "email-classification"))
+        classification = read_output_table(output_dir, "email-classification")
+        assert classification.values.tolist() == [["E001", "order request"]]
+        assert read_output_table(output_dir, "order-status").empty
+
+    @pytest.mark.asyncio
+    async def test_segment_backlog_is_compacted_in_the_background(self, tmp_path):
+        """Reaching the segment threshold starts a compaction the run does not await."""
+        output_dir = str(tmp_path)
+        empty = pd.DataFrame(columns=["email ID", "response"])
+        for email_id in ("E001", "E002"):
+            await create_output_csv(
+                email_classification_df=_classification((email_id, "order request")),
+                order_status_df=_status(),
+                order_response_df=empty,
+                inquiry_response_df=empty,
+                output_dir=output_dir,
+                compact_after_segments=2,
+            )
+        await asyncio.gather(*output._compactions)
+
+        assert not list_output_segments(output_dir, "email-classification")
+        classification = pd.read_csv(table_path(output_dir, "email-classification"))
+        assert classification["email ID"].tolist() == ["E001", "E002"]
@@ -0,0 +1,116 @@
+"""Tests for product_id_matcher.py and ID correction in resolve_product_mention."""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from hermes.agents.stockkeeper.agent import extract_id_correction_from_metadata
+from hermes.data.product_id_matcher import (
+    ProductIdMatcher,
+    extract_product_ids,
+    id_edit_distance,
+    normalize_product_id,
+)
+from hermes.model.email import ProductMention
+from hermes.model.errors import ProductNotFound
+from hermes.tools.catalog_tools import resolve_product_mention
+
+from tests.fixtures.test_product_catalog import get_test_products_df
+
+
+class TestProductIdMatcher:
+    """Tests for ID normalization, extraction and typo correction."""
+
+    def test_normalize_product_id_accepts_common_spellings(self):
+        """Spaces, dashes, brackets and lowercase are normalized away."""
+        for written in ["LTH0976", "lth-0976", "LTH 0976", "[LTH_0976]"]:
+            assert normalize_product_id(written) == "LTH0976"
+        assert normalize_product_id("NONEXISTENT123") is None
+        assert normalize_product_id(None) is None
+
+    def test_extract_product_ids_scans_free_text(self):
+        """IDs embedded in text are found in order, without duplicates."""
+        text = "I want lth 0976 and CBT-8901, not LTH0976 again or ABCD12345"
+        assert extract_product_ids(text) == ["LTH0976", "CBT8901"]
+
+    def test_id_edit_distance_counts_transpositions_once(self):
+        """A swapped pair of digits is a single edit."""
+        assert id_edit_distance("LTH0967", "LTH0976") == 1
+        assert id_edit_distance("LTH0976", "LTH0976") == 0
+        assert id_edit_distance("LTH0976", "LTH2109") == 4
+
+    def test_match_corrects_typos(self):
+        """Transposed and mistyped digits resolve to the closest catalog ID."""
+        matcher = ProductIdMatcher(get_test_products_df())
+
+        matches = matcher.match("lth-0967")
+
+        assert [(m.product_id, m.distance) for m in matches] == [("LTH0976", 1)]
+        assert matches[0].corrected
+        assert not matcher.match("LTH 0976")[0].corrected
+        assert matcher.match("XYZ5555") == []
+
+    def test_match_text_requires_an_unambiguous_single_edit(self):
+        """Free text is only corrected for a single typo."""
+        matcher = ProductIdMatcher(get_test_products_df())
+
+        assert [m.product_id for m in matcher.match_text("the rsg 8910 please")] == [
+            "RSG8901"
+        ]
+        # Two edits away from RSG8901: fine as an explicit ID, too loose for free text
+        assert matcher.match_text("the RSG 8019 please") == []
+        assert [m.product_id for m in matcher.match("RSG8019")] == ["RSG8901"]
+
+
+class TestResolveProductMentionIds:
+    """Tests for ID matching before vector search in resolve_product_mention."""
+
+    @pytest.mark.asyncio
+    @patch("hermes.tools.catalog_tools.get_vector_store")
+    @patch("hermes.tools.catalog_tools.find_product_by_id", new_callable=AsyncMock)
+    @patch("hermes.tools.catalog_tools.load_products_df")
+    async def test_mistyped_product_id_is_corrected(
+        self, mock_load_df, mock_find_by_id_tool, mock_get_vector_store
+    ):
+        """A transposed ID resolves to the catalog ID and records the correction."""
+        mock_load_df.return_value = get_test_products_df()
+        mock_find_by_id_tool.ainvoke = AsyncMock(
+            return_value=ProductNotFound(
+                message="No product found with ID 'LTH0967'",
+                query_product_id="LTH0967",
+            )
+        )
+
+        result = await resolve_product_mention(
+            ProductMention(product_id="LTH0967", quantity=1)
+        )
+
+        assert isinstance(result, list)
+        product, distance = result[0]
+        assert product.product_id == "LTH0976"
+        assert 0.0 < distance < 0.5
+        assert extract_id_correction_from_metadata(product.metadata) == (
+            "LTH0967",
+            "LTH0976",
+        )
+        mock_get_vector_store.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("hermes.tools.catalog_tools.get_vector_store")
+    @patch("hermes.tools.catalog_tools.load_products_df")
+    async def test_id_in_mention_text_is_used_without_classifier_id(
+        self, mock_load_df, mock_get_vector_store
+    ):
+        """An ID left in the mention text is matched before any embedding work."""
+        mock_load_df.return_value = get_test_products_df()
+
+        result = await resolve_product_mention(
+            ProductMention(
+                product_name="boots", mention_text="the chelsea boots (cbt 8901)"
+            )
+        )
+
+        assert isinstance(result, list)
+        assert [(p.product_id, d) for p, d in result] == [("CBT8901", 0.0)]
+        assert "Found by exact product ID match" in result[0][0].metadata
+        mock_get_vector_store.assert_not_called()
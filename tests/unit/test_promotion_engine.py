@@ -0,0 +1,439 @@
+"""Tests for promotion_engine.py."""
+
+import copy
+import random
+
+import pytest
+
+from hermes.model.order import Order, OrderLine
+from hermes.model.promotions import PromotionSpec
+from hermes.tools.promotion_engine import compile_promotions
+from hermes.tools.promotion_tools import apply_promotion
+
+
+def _scan_all_specs(
+    order: Order,
+    promotion_specs: list[PromotionSpec],
+) -> Order:
+    """The original spec-by-spec evaluation, kept as the reference for pricing."""
+    # Convert dictionaries to PromotionSpec objects if needed
+    processed_promotion_specs: list[PromotionSpec] = []
+    for spec in promotion_specs:
+        if isinstance(spec, dict):
+            processed_promotion_specs.append(PromotionSpec.model_validate(spec))
+        else:
+            processed_promotion_specs.append(spec)
+
+    # Initialize discount tracking
+    total_discount = 0.0
+    new_lines = []  # For free gifts that need to be added as new lines
+
+    # Process each promotion spec
+    for promotion in processed_promotion_specs:
+        # Check product_combination condition
+        if promotion.conditions.product_combination is not None:
+            # Check if all required products are in the order
+            required_products = set(promotion.conditions.product_combination)
+            order_products = {line.product_id for line in order.lines}
+
+            if required_products.issubset(order_products):
+                # Apply the promotion effects
+                if promotion.effects.apply_discount is not None:
+                    discount_spec = promotion.effects.apply_discount
+                    target_product_id = discount_spec.to_product_id
+
+                    # Find the target product line
+                    for line in order.lines:
+                        if (
+                            target_product_id is None
+                            or line.product_id == target_product_id
+                        ):
+                            # Ensure unit_price is set
+                            if line.unit_price is None:
+                                line.unit_price = line.base_price
+
+                            if discount_spec.type == "percentage":
+                                discount_amount = line.unit_price * (
+                                    discount_spec.amount / 100
+                                )
+                                line.unit_price -= discount_amount
+                                total_discount += discount_amount * line.quantity
+                                line.promotion_applied = True
+                                line.promotion_description = (
+                                    f"{discount_spec.amount}% discount applied"
+                                )
+                            elif discount_spec.type == "fixed":
+                                discount_amount = min(
+                                    discount_spec.amount, line.unit_price
+                                )
+                                line.unit_price -= discount_amount
+                                total_discount += discount_amount * line.quantity
+                                line.promotion_applied = True
+                                line.promotion_description = (
+                                    f"${discount_spec.amount} discount applied"
+                                )
+
+                # Handle free gift
+                if promotion.effects.free_gift is not None:
+                    # Add free gift description to one of the qualifying products
+                    for line in order.lines:
+                        if line.product_id in required_products:
+                            if line.promotion_description:
+                                line.promotion_description += (
+                                    f" + Free gift: {promotion.effects.free_gift}"
+                                )
+                            else:
+                                line.promotion_description = (
+                                    f"Free gift: {promotion.effects.free_gift}"
+                                )
+                            line.promotion_applied = True
+                            break
+
+    # Process each order line for individual promotions
+    for line in order.lines:
+        # Reset promotion fields if not already set by combination promotions
+        if not line.promotion_applied:
+            line.unit_price = line.base_price
+            line.promotion_applied = False
+            line.promotion_description = None
+
+        # Ensure unit_price is set
+        if line.unit_price is None:
+            line.unit_price = line.base_price
+
+        # Check each promotion spec for applicability to this line
+        for promotion in processed_promotion_specs:
+            # Skip combination promotions (already handled above)
+            if promotion.conditions.product_combination is not None:
+                continue
+
+            # Check min_quantity condition
+            if (
+                promotion.conditions.min_quantity is not None
+                and line.quantity >= promotion.conditions.min_quantity
+            ):
+                # Apply percentage discount if specified
+                if promotion.effects.apply_discount is not None and (
+                    promotion.effects.apply_discount.to_product_id is None
+                    or promotion.effects.apply_discount.to_product_id == line.product_id
+                ):
+                    discount_spec = promotion.effects.apply_discount
+                    if discount_spec.type == "percentage":
+                        discount_amount = line.unit_price * (discount_spec.amount / 100)
+                        line.unit_price -= discount_amount
+                        total_discount += discount_amount * line.quantity
+                        line.promotion_applied = True
+                        line.promotion_description = (
+                            f"{discount_spec.amount}% discount applied"
+                        )
+                    elif discount_spec.type == "fixed":
+                        discount_amount = min(discount_spec.amount, line.unit_price)
+                        line.unit_price -= discount_amount
+                        total_discount += discount_amount * line.quantity
+                        line.promotion_applied = True
+                        line.promotion_description = (
+                            f"${discount_spec.amount} discount applied"
+                        )
+                    elif discount_spec.type == "bogo_half":
+                        # BOGO: Buy one get one 50% off
+                        # For quantity >= 2, every second item gets 50% off
+                        if line.quantity >= 2:
+                            discounted_items = line.quantity // 2
+                            discount_per_item = line.base_price * 0.5
+                            total_item_discount = discount_per_item * discounted_items
+
+                            # Calculate new unit price (average across all items)
+                            total_original = line.base_price * line.quantity
+                            total_after_discount = total_original - total_item_discount
+                            line.unit_price = total_after_discount / line.quantity
+
+                            total_discount += total_item_discount
+                            line.promotion_applied = True
+                            line.promotion_description = f"Buy one, get one 50% off (saved ${total_item_discount:.2f})"
+
+                # Handle free items if specified
+                if promotion.effects.free_items is not None:
+                    free_count = min(promotion.effects.free_items, line.quantity)
+                    effective_quantity = line.quantity
+                    # Calculate effective price considering free items
+                    if effective_quantity > 0:
+                        discount_per_item = line.unit_price * (
+                            free_count / effective_quantity
+                        )
+                        total_discount += discount_per_item * line.quantity
+                        line.unit_price -= discount_per_item
+                        line.promotion_applied = True
+                        line.promotion_description = f"Buy {effective_quantity - free_count}, get {free_count} free"
+
+                # Handle free gift if specified (don't affect unit price but note in description)
+                if promotion.effects.free_gift is not None:
+                    line.promotion_applied = True
+                    gift_description = promotion.effects.free_gift
+                    line.promotion_description = (
+                        f"Free gift: {gift_description}"
+                        if line.promotion_description is None
+                        else f"{line.promotion_description} + Free gift: {gift_description}"
+                    )
+
+            # Check applies_every condition (e.g., every Nth item gets discount)
+            if promotion.conditions.applies_every is not None:
+                # Future enhancement: implement applies_every logic
+                pass
+
+        # Update the line's total price
+        line.total_price = (line.unit_price or line.base_price) * line.quantity
+
+    # Add any new lines for free gifts
+    order.lines.extend(new_lines)
+
+    # Update order totals
+    order.total_discount = total_discount
+    order.total_price = sum(line.total_price or 0.0 for line in order.lines)
+
+    return order
+
+
+def _line(product_id: str, quantity: int, price: float) -> OrderLine:
+    return OrderLine(
+        product_id=product_id,
+        name=product_id,
+        description=product_id,
+        quantity=quantity,
+        base_price=price,
+        unit_price=price,
+    )
+
+
+def _random_spec(
+    rng: random.Random, product_ids: list[str], every_nth: bool = False
+) -> PromotionSpec:
+    conditions: dict = {}
+    if rng.random() < 0.25:
+        conditions["product_combination"] = rng.sample(product_ids, rng.randint(1, 3))
+    elif every_nth and rng.random() < 0.3:
+        conditions["applies_every"] = rng.randint(2, 4)
+    else:
+        conditions["min_quantity"] = rng.randint(1, 5)
+    effects: dict = {}
+    kind = rng.choice(["percentage", "fixed", "bogo_half", "free_items", "free_gift"])
+    if kind == "free_items":
+        effects["free_items"] = rng.randint(1, 2)
+    elif kind == "free_gift":
+        effects["free_gift"] = "Tote bag"
+    else:
+        effects["apply_discount"] = {
+            "type": kind,
+            "amount": rng.choice([5.0, 10.0, 15.0, 25.0]),
+            "to_product_id": rng.choice([None, rng.choice(product_ids)]),
+        }
+    if rng.random() < 0.2:
+        effects["free_gift"] = "Sticker"
+    return PromotionSpec.model_validate(
+        {"conditions": conditions, "effects": effects}
+    )
+
+
+class TestPromotionEngine:
+    """Tests for compiled promotion specs."""
+
+    def test_matches_spec_by_spec_evaluation_on_synthetic_orders(self):
+        """Indexed evaluation prices thousands of orders exactly like a full scan."""
+        rng = random.Random(7)
+        product_ids = [f"PRD{number:03d}" for number in range(200)]
+        prices = {product_id: round(rng.uniform(5, 200), 2) for product_id in product_ids}
+        specs = [_random_spec(rng, product_ids) for _ in range(150)]
+        orders = [
+            Order(
+                email_id=f"E{number}",
+                overall_status="created",
+                lines=[
+                    _line(product_id, rng.randint(1, 6), prices[product_id])
+                    for product_id in rng.sample(product_ids, rng.randint(1, 5))
+                ],
+            )
+            for number in range(2000)
+        ]
+        expected = [copy.deepcopy(order) for order in orders]
+
+        scanned = [_scan_all_specs(order, specs) for order in expected]
+        compiled = compile_promotions(specs)
+        priced = [compiled.apply(order) for order in orders]
+
+        for order, reference in zip(priced, scanned):
+            assert order.model_dump() == reference.model_dump()
+
+    def test_compiled_specs_are_reused(self):
+        """Equal spec lists compile once; another version compiles again."""
+        specs = [
+            {"conditions": {"min_quantity": 2}, "effects": {"free_items": 1}},
+        ]
+
+        first = compile_promotions(specs)
+
+        assert compile_promotions([dict(spec) for spec in specs]) is first
+        assert compile_promotions(specs, version=2) is not first
+
+    def test_applies_every_discounts_every_nth_item(self):
+        """Every third item is 50% off; the rest stay at full price."""
+        order = Order(
+            email_id="E001",
+            overall_status="created",
+            lines=[_line("TST001", 7, 30.0)],
+        )
+        specs = [
+            {
+                "conditions": {"applies_every": 3},
+                "effects": {"apply_discount": {"type": "percentage", "amount": 50.0}},
+            }
+        ]
+
+        result = compile_promotions(specs).apply(order)
+
+        (line,) = result.lines
+        assert result.total_discount == pytest.approx(30.0)
+        assert line.total_price == pytest.approx(180.0)
+        assert line.promotion_description == (
+            "50.0% discount on every 3rd item (saved $30.00)"
+        )
+
+    def test_applies_every_gives_free_items_per_group(self):
+        """Buy two, get one free: five items earn two free ones."""
+        order = Order(
+            email_id="E002",
+            overall_status="created",
+            lines=[_line("TST002", 5, 10.0), _line("TST003", 1, 10.0)],
+        )
+        specs = [{"conditions": {"applies_every": 2}, "effects": {"free_items": 1}}]
+
+        result = compile_promotions(specs).apply(order)
+
+        assert result.lines[0].total_price == pytest.approx(30.0)
+        assert not result.lines[1].promotion_applied
+        assert result.total_price == pytest.approx(40.0)
+
+
+# The cases of test_promotion_tools.py: (lines, specs)
+PROMOTION_TOOLS_CASES = [
+    (
+        [("TST001", 2, 100.0)],
+        [
+            {
+                "conditions": {"min_quantity": 1},
+                "effects": {"apply_discount": {"type": "percentage", "amount": 20.0}},
+            }
+        ],
+    ),
+    (
+        [("TST001", 4, 50.0)],
+        [{"conditions": {"min_quantity": 4}, "effects": {"free_items": 1}}],
+    ),
+    (
+        [("TST001", 1, 50.0)],
+        [
+            {
+                "conditions": {"min_quantity": 1},
+                "effects": {"free_gift": "Free matching scarf"},
+            }
+        ],
+    ),
+    (
+        [("TST001", 2, 50.0), ("TST002", 1, 100.0)],
+        [
+            {
+                "conditions": {"min_quantity": 1},
+                "effects": {
+                    "apply_discount": {
+                        "type": "percentage",
+                        "amount": 10.0,
+                        "to_product_id": "TST001",
+                    }
+                },
+            }
+        ],
+    ),
+    ([], []),
+]
+
+
+class TestBatchPricing:
+    """Tests for pricing columnar orders."""
+
+    @pytest.mark.parametrize("lines, specs", PROMOTION_TOOLS_CASES)
+    def test_matches_apply_promotion_on_promotion_tools_cases(self, lines, specs):
+        """Each promotion_tools case prices the same in columnar form."""
+        order = Order(
+            email_id="test@example.com",
+            overall_status="created",
+            lines=[_line(*line) for line in lines],
+        )
+        expected = apply_promotion(order=copy.deepcopy(order), promotion_specs=specs)
+
+        batch = compile_promotions(specs).price_batch(
+            ["test@example.com"] * len(lines),
+            [product_id for product_id, _, _ in lines],
+            [quantity for _, quantity, _ in lines],
+            [price for _, _, price in lines],
+        )
+
+        assert [line.unit_price for line in expected.lines] == list(batch.unit_prices)
+        assert [line.total_price for line in expected.lines] == list(
+            batch.total_prices
+        )
+        if lines:
+            assert batch.orders_df().loc["test@example.com", "total_discount"] == (
+                expected.total_discount
+            )
+            assert batch.orders_df().loc["test@example.com", "total_price"] == (
+                expected.total_price
+            )
+
+    def test_matches_apply_on_synthetic_orders(self):
+        """Batch prices equal per-order evaluation exactly, including every-Nth rules."""
+        rng = random.Random(11)
+        product_ids = [f"PRD{number:03d}" for number in range(60)]
+        prices = {product_id: round(rng.uniform(5, 200), 2) for product_id in product_ids}
+        specs = [
+            _random_spec(rng, product_ids, every_nth=True) for _ in range(80)
+        ]
+        orders = [
+            Order(
+                email_id=f"E{number}",
+                overall_status="created",
+                lines=[
+                    _line(product_id, rng.randint(1, 8), prices[product_id])
+                    for product_id in rng.sample(product_ids, rng.randint(1, 6))
+                ],
+            )
+            for number in range(1000)
+        ]
+        compiled = compile_promotions(specs)
+        # Lines of different orders interleaved, each order keeping its line order
+        numbered = sorted(
+            (
+                (position, order.email_id, line.product_id, line.quantity, line.base_price)
+                for order in orders
+                for position, line in enumerate(order.lines)
+            ),
+            key=lambda row: row[0],
+        )
+        rows = [row[1:] for row in numbered]
+
+        batch = compiled.price_batch(*zip(*rows))
+
+        priced = {order.email_id: compiled.apply(order) for order in orders}
+        expected = [priced[order_id] for order_id in batch.order_ids]
+        by_line = {
+            (order.email_id, line.product_id): line
+            for order in expected
+            for line in order.lines
+        }
+        lines = [by_line[(row[0], row[1])] for row in rows]
+        assert list(batch.unit_prices) == [line.unit_price for line in lines]
+        assert list(batch.total_prices) == [line.total_price for line in lines]
+        assert list(batch.promotion_applied) == [
+            line.promotion_applied for line in lines
+        ]
+        assert list(batch.order_discounts) == [
+            order.total_discount for order in expected
+        ]
+        assert list(batch.order_totals) == [order.total_price for order in expected]
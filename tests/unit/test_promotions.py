@@ -0,0 +1,140 @@
+"""Tests for promotions.py."""
+
+from unittest.mock import patch
+
+import pandas as pd  # type: ignore
+import pytest
+
+from hermes.data.catalog_index import CatalogIndex, get_catalog_index
+from hermes.data.promotions import (
+    get_catalog_promotions,
+    load_promotions,
+    parse_promotions,
+)
+from hermes.model.order import Order, OrderLine
+from hermes.tools.catalog_tools import find_product_by_id
+from hermes.tools.promotion_tools import apply_promotion
+
+from tests.fixtures.mock_product_catalog import get_mock_products_df
+
+PRODUCTS_PATH = "data/products.csv"
+PROMOTIONS_PATH = "data/promotions.yaml"
+
+TEN_PERCENT_OFF_TST001 = {
+    "conditions": {"min_quantity": 1},
+    "effects": {
+        "apply_discount": {
+            "to_product_id": "TST001",
+            "type": "percentage",
+            "amount": 10,
+        }
+    },
+}
+
+
+def _line(product_id: str, quantity: int, price: float) -> OrderLine:
+    return OrderLine(
+        product_id=product_id,
+        name=product_id,
+        description=product_id,
+        quantity=quantity,
+        base_price=price,
+        unit_price=price,
+        total_price=price * quantity,
+    )
+
+
+class TestCatalogPromotions:
+    """Tests for loading promotions and joining them onto the catalog."""
+
+    def test_shipped_promotions_are_valid_and_in_the_catalog(self):
+        """Every promotion in data/promotions.yaml names a catalog product."""
+        promotions = load_promotions(PROMOTIONS_PATH)
+        index = CatalogIndex(pd.read_csv(PRODUCTS_PATH), promotions)
+
+        assert len(promotions) == 7
+        for product_id, promotion in promotions.items():
+            assert index.promotion_of(product_id) is promotion
+            assert promotion.text
+
+    def test_invalid_entries_are_rejected(self):
+        """Specs are validated at load, and a product can only have one promotion."""
+        with pytest.raises(ValueError, match="TST001"):
+            parse_promotions(
+                [{"product_id": "TST001", "spec": {"conditions": {}, "effects": {}}}]
+            )
+        with pytest.raises(ValueError, match="more than one"):
+            parse_promotions(
+                [
+                    {"product_id": "TST001", "spec": TEN_PERCENT_OFF_TST001},
+                    {"product_id": "tst001", "spec": TEN_PERCENT_OFF_TST001},
+                ]
+            )
+
+    def test_file_is_only_parsed_again_when_it_changes(self, tmp_path):
+        """Repeated lookups return the same promotions until the file changes."""
+        path = tmp_path / "promotions.json"
+        path.write_text(
+            '[{"product_id": "TST001", "spec": {"conditions": {"min_quantity": 1}, '
+            '"effects": {"free_gift": "Socks"}}}]'
+        )
+
+        first = get_catalog_promotions(str(path))
+        assert get_catalog_promotions(str(path)) is first
+
+        path.write_text("[]")
+        assert get_catalog_promotions(str(path)) == {}
+        assert get_catalog_promotions(str(tmp_path / "missing.yaml")) == {}
+
+    def test_products_carry_their_catalog_promotion(self):
+        """Resolved products come with the spec and text joined in the index."""
+        df = get_mock_products_df()
+        promotions = parse_promotions(
+            [
+                {
+                    "product_id": "TST001",
+                    "promotion_text": "10% off",
+                    "spec": TEN_PERCENT_OFF_TST001,
+                }
+            ]
+        )
+
+        with (
+            patch(
+                "hermes.data.catalog_index.get_catalog_promotions",
+                return_value=promotions,
+            ),
+            patch("hermes.tools.catalog_tools.load_products_df", return_value=df),
+        ):
+            assert get_catalog_index(df).promotion_of("tst001") is promotions["TST001"]
+            with_promotion = find_product_by_id.invoke({"product_id": "TST001"})
+            without_promotion = find_product_by_id.invoke({"product_id": "TST002"})
+
+        assert with_promotion.promotion == promotions["TST001"].spec
+        assert with_promotion.promotion_text == "10% off"
+        assert without_promotion.promotion is None
+
+    def test_shipped_specs_only_discount_their_own_products(self):
+        """Catalog specs applied to a mixed order leave other lines at full price."""
+        promotions = load_promotions(PROMOTIONS_PATH)
+        order = Order(
+            email_id="E001",
+            overall_status="created",
+            lines=[
+                _line("CBG9876", 2, 24.0),
+                _line("KMN3210", 2, 53.0),
+                _line("BMX5432", 1, 62.99),
+                _line("TST001", 1, 29.99),
+            ],
+        )
+
+        apply_promotion(
+            order,
+            [promotions[pid].spec for pid in ("CBG9876", "KMN3210", "BMX5432")],
+        )
+
+        cbg, kmn, bmx, other = order.lines
+        assert cbg.total_price == pytest.approx(36.0)
+        assert kmn.total_price == pytest.approx(53.0)
+        assert bmx.promotion_applied and bmx.total_price == pytest.approx(62.99)
+        assert not other.promotion_applied and other.total_price == pytest.approx(29.99)
@@ -0,0 +1,141 @@
+"""Tests for quantized_index.py."""
+
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hermes.data.quantized_index import (
+    QuantizedVectorIndex,
+    QuantizedVectorStore,
+    exact_search,
+    measure_recall,
+    truncate_vectors,
+    where_mask,
+)
+
+
+def _unit_vectors(count: int, dims: int, seed: int = 7) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(count, dims)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestQuantizedVectorIndex:
+    """Tests for compact storage and re-ranked search."""
+
+    def test_int8_uses_a_quarter_of_the_memory(self):
+        """int8 codes take one byte per dimension instead of four."""
+        index = QuantizedVectorIndex(_unit_vectors(500, 128), quantization="int8")
+
+        assert index.codes.dtype == np.int8
+        assert index.memory_bytes < index.full_precision_bytes / 3.5
+
+    def test_truncation_keeps_leading_dimensions_normalized(self):
+        """Truncated vectors are re-normalized to unit length."""
+        truncated = truncate_vectors(_unit_vectors(10, 64), 16)
+
+        assert truncated.shape == (10, 16)
+        assert np.allclose(np.linalg.norm(truncated, axis=1), 1.0, atol=1e-5)
+        assert truncate_vectors(truncated, 0).shape == (10, 16)
+
+    def test_rerank_returns_exact_distances(self):
+        """With a full-precision loader, results match an exact search."""
+        vectors = _unit_vectors(300, 64)
+        index = QuantizedVectorIndex(
+            vectors,
+            quantization="int8",
+            truncate_dim=32,
+            rerank_factor=8,
+            full_vector_loader=lambda positions: vectors[positions],
+        )
+        query = vectors[5] + 0.05 * _unit_vectors(1, 64, seed=3)[0]
+
+        results = index.search(query, k=5)
+        expected = exact_search(vectors, query, k=5)
+
+        assert [position for position, _ in results] == [p for p, _ in expected]
+        assert [d for _, d in results] == pytest.approx([d for _, d in expected])
+
+    def test_recall_against_full_precision(self):
+        """int8 with re-ranking keeps recall@10 close to the full-precision index."""
+        vectors = _unit_vectors(1000, 96)
+        index = QuantizedVectorIndex(
+            vectors,
+            quantization="int8",
+            full_vector_loader=lambda positions: vectors[positions],
+        )
+
+        recall = measure_recall(index, vectors, vectors[:40], k=10)
+
+        assert recall >= 0.95
+
+    def test_mask_restricts_results(self):
+        """Rows outside the mask are never returned."""
+        vectors = _unit_vectors(50, 16)
+        index = QuantizedVectorIndex(vectors, quantization="none")
+        mask = np.zeros(50, dtype=bool)
+        mask[[3, 9]] = True
+
+        results = index.search(vectors[0], k=5, mask=mask)
+
+        assert sorted(position for position, _ in results) == [3, 9]
+
+
+class TestWhereMask:
+    """Tests for evaluating Chroma-style filters."""
+
+    metadata = pd.DataFrame(
+        [
+            {"product_id": "A", "category": "Bags", "price": 20.0},
+            {"product_id": "B", "category": "Bags", "price": 80.0},
+            {"product_id": "C", "category": "Men's Shoes", "price": 50.0},
+        ]
+    )
+
+    def test_and_of_equality_range_and_membership(self):
+        """The filter shapes built by the catalog tools are supported."""
+        where = {
+            "$and": [
+                {"category": "Bags"},
+                {"price": {"$gte": 10.0}},
+                {"price": {"$lte": 50.0}},
+                {"product_id": {"$in": ["A", "B"]}},
+            ]
+        }
+
+        assert where_mask(self.metadata, where).tolist() == [True, False, False]
+
+    def test_unknown_field_matches_nothing(self):
+        """Filtering on a field no document has matches no rows."""
+        assert not where_mask(self.metadata, {"color": "red"}).any()
+
+
+class TestQuantizedVectorStore:
+    """Tests for the similarity_search_with_score adapter."""
+
+    def test_similarity_search_with_filter(self):
+        """Results are documents with squared L2 distances, filtered by metadata."""
+        vectors = _unit_vectors(3, 8)
+        embeddings = MagicMock()
+        embeddings.embed_query.return_value = vectors[1].tolist()
+        collection = MagicMock()
+        collection.get.return_value = {
+            "ids": ["A", "B", "C"],
+            "embeddings": vectors.tolist(),
+            "documents": ["a", "b", "c"],
+            "metadatas": [
+                {"product_id": "A", "category": "Bags"},
+                {"product_id": "B", "category": "Bags"},
+                {"product_id": "C", "category": "Shoes"},
+            ],
+        }
+        chroma = MagicMock(_collection=collection, embeddings=embeddings)
+
+        store = QuantizedVectorStore.from_chroma(chroma, quantization="int8")
+        results = store.similarity_search_with_score(
+            "query", k=2, filter={"category": "Bags"}
+        )
+
+        assert [doc.metadata["product_id"] for doc, _ in results] == ["B", "A"]
+        assert results[0][1] == pytest.approx(0.0, abs=1e-5)
@@ -0,0 +1,100 @@
+"""Tests for result_serializers.py."""
+
+import os
+
+import pytest
+import yaml
+from pydantic import BaseModel
+
+from hermes.model.enums import ProductCategory
+from hermes.utils.result_serializers import (
+    JsonlZstdResultSerializer,
+    ResultSerializer,
+    create_result_serializer,
+    export_results,
+    iter_results,
+)
+
+
+class _Result(BaseModel):
+    email_id: str
+    category: ProductCategory
+    lines: list[tuple[str, int]]
+
+
+def _result(email_id: str, quantity: int = 1) -> _Result:
+    return _Result(
+        email_id=email_id,
+        category=ProductCategory.ACCESSORIES,
+        lines=[("CBG9876", quantity)],
+    )
+
+
+def _plain(email_id: str, quantity: int = 1) -> dict:
+    return {
+        "email_id": email_id,
+        "category": ProductCategory.ACCESSORIES.value,
+        "lines": [["CBG9876", quantity]],
+    }
+
+
+class TestResultSerializers:
+    """Tests for the pluggable per-email result formats."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("result_format", ["json", "yaml", "jsonl.zst"])
+    async def test_results_round_trip_as_plain_values(self, tmp_path, result_format):
+        """Every format reads back as the model's JSON-mode dump."""
+        serializer = create_result_serializer(str(tmp_path), result_format)
+        await serializer.save("E001", _result("E001"))
+        await serializer.save("E002", _result("E002", 3))
+        serializer.close()
+
+        assert dict(iter_results(str(tmp_path))) == {
+            "E001": _plain("E001"),
+            "E002": _plain("E002", 3),
+        }
+
+    def test_jsonl_rolls_over_and_latest_result_wins(self, tmp_path):
+        """Small files roll over; a reprocessed email exports its newest result."""
+        serializer = JsonlZstdResultSerializer(str(tmp_path), max_file_bytes=1)
+        for quantity in (1, 2, 3):
+            serializer.write("E001", _result("E001", quantity))
+        serializer.close()
+
+        assert len(os.listdir(tmp_path)) == 3
+        assert export_results(str(tmp_path), str(tmp_path / "yaml")) == 1
+        with open(tmp_path / "yaml" / "E001.yml") as f:
+            assert yaml.safe_load(f) == _plain("E001", 3)
+
+    def test_unclosed_jsonl_file_is_readable(self, tmp_path):
+        """Lines are flushed as they are written, so a crashed run keeps them."""
+        serializer = JsonlZstdResultSerializer(str(tmp_path))
+        serializer.write("E001", _result("E001"))
+        serializer.write("E002", _result("E002"))
+
+        assert [email_id for email_id, _ in iter_results(str(tmp_path))] == [
+            "E001",
+            "E002",
+        ]
+        serializer.close()
+
+    def test_older_python_tagged_yaml_exports_as_plain_yaml(self, tmp_path):
+        """YAML written by yaml.dump of model_dump() is exported safe-loadable."""
+        results_dir = tmp_path / "results"
+        results_dir.mkdir()
+        (results_dir / "E001.yml").write_text(yaml.dump(_result("E001").model_dump()))
+
+        export_results(str(results_dir), str(tmp_path / "export"))
+
+        with open(tmp_path / "export" / "E001.yml") as f:
+            assert yaml.safe_load(f) == _plain("E001")
+
+    def test_serializer_must_implement_write(self, tmp_path):
+        """A serializer without `write` cannot be created."""
+
+        class Incomplete(ResultSerializer):
+            format = "json"
+
+        with pytest.raises(TypeError):
+            Incomplete(str(tmp_path))
@@ -0,0 +1,145 @@
+"""Tests for results_store.py."""
+
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from hermes.agents.classifier.models import ClassifierOutput
+from hermes.agents.fulfiller.models import FulfillerOutput
+from hermes.model.email import CustomerEmail, EmailAnalysis
+from hermes.model.order import Order, OrderLine, OrderLineStatus
+from hermes.utils.results_store import SQLiteResultsStore, TokenUsage, parse_time
+from hermes.workflow.states import OverallState
+
+
+def _state(email_id: str, intent: str, *statuses: OrderLineStatus) -> OverallState:
+    fulfiller = None
+    if statuses:
+        lines = [
+            OrderLine(
+                product_id=f"P{number}",
+                name="Product",
+                description="",
+                quantity=1,
+                base_price=10.0,
+                status=status,
+            )
+            for number, status in enumerate(statuses)
+        ]
+        out_of_stock = OrderLineStatus.OUT_OF_STOCK in statuses
+        fulfiller = FulfillerOutput(
+            order_result=Order(
+                email_id=email_id,
+                overall_status="partially_fulfilled" if out_of_stock else "created",
+                lines=lines,
+            )
+        )
+    return OverallState(
+        email=CustomerEmail(email_id=email_id, message="Hello"),
+        classifier=ClassifierOutput(
+            email_analysis=EmailAnalysis(
+                email_id=email_id,
+                primary_intent=intent,  # type: ignore[arg-type]
+            )
+        ),
+        fulfiller=fulfiller,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteResultsStore(str(tmp_path / "results.db"))
+    yield store
+    store.close()
+
+
+class TestResultsStore:
+    """Tests for the indexed results of past runs."""
+
+    def test_records_indexed_columns_and_queryable_state(self, store):
+        """Summary fields are indexed columns; the full state is queryable JSON."""
+        store.record(
+            "run1",
+            "E001",
+            _state(
+                "E001",
+                "order request",
+                OrderLineStatus.CREATED,
+                OrderLineStatus.OUT_OF_STOCK,
+            ),
+            latency_ms=1234.5,
+            usage=TokenUsage.from_usage_metadata(
+                {
+                    "gpt-4.1": {
+                        "input_tokens": 100,
+                        "output_tokens": 20,
+                        "total_tokens": 120,
+                    },
+                    "gpt-4.1-mini": {
+                        "input_tokens": 10,
+                        "output_tokens": 5,
+                        "total_tokens": 15,
+                    },
+                }
+            ),
+        )
+
+        [result] = store.query(include_state=True)
+
+        assert result["intent"] == "order request"
+        assert result["order_status"] == "partially_fulfilled"
+        assert (result["order_lines"], result["out_of_stock_lines"]) == (2, 1)
+        assert result["latency_ms"] == 1234.5
+        assert (result["input_tokens"], result["total_tokens"]) == (110, 135)
+        assert json.loads(result["state"])["email"]["email_id"] == "E001"
+        columns, rows = store.execute_readonly(
+            "SELECT json_extract(state, '$.fulfiller.order_result.lines[1].status') "
+            "FROM results"
+        )
+        assert rows == [("out of stock",)]
+
+    def test_filters_combine_and_rerecording_replaces(self, store):
+        """Filters are ANDed; an email recorded twice in a run keeps the latest row."""
+        store.record(
+            "run1", "E001", _state("E001", "order request"), finished_at=1_000.0
+        )
+        store.record(
+            "run1",
+            "E001",
+            _state("E001", "order request", OrderLineStatus.OUT_OF_STOCK),
+            finished_at=2_000.0,
+        )
+        store.record(
+            "run2",
+            "E002",
+            _state("E002", "order request", OrderLineStatus.OUT_OF_STOCK),
+            finished_at=3_000.0,
+        )
+        store.record("run2", "E003", error="LLM timeout", finished_at=4_000.0)
+
+        out_of_stock = store.query(out_of_stock=True)
+        assert [r["email_id"] for r in out_of_stock] == ["E002", "E001"]
+        assert [r["email_id"] for r in store.query(out_of_stock=True, since=2_500)] == [
+            "E002"
+        ]
+        assert [r["email_id"] for r in store.query(run_id="run1")] == ["E001"]
+        assert [r["error"] for r in store.query(errors_only=True)] == ["LLM timeout"]
+        assert store.latest_run_id() == "run2"
+
+    def test_ad_hoc_sql_is_read_only(self, store):
+        """The --sql connection cannot change the database."""
+        store.record("run1", "E001", _state("E001", "product inquiry"))
+
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            store.execute_readonly("DELETE FROM results")
+        assert len(store.query()) == 1
+
+    def test_parse_time_accepts_durations_and_iso_dates(self):
+        """--since/--until take "24h"-style durations ago or ISO dates."""
+        assert parse_time("24h", now=100_000.0) == 100_000.0 - 86_400
+        assert parse_time("30m", now=100_000.0) == 100_000.0 - 1_800
+        assert parse_time("2025-06-01") == datetime(2025, 6, 1).timestamp()
+        with pytest.raises(ValueError):
+            parse_time("yesterday")
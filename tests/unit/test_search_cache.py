@@ -0,0 +1,124 @@
+"""Tests for search_cache.py and cached product resolution."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from hermes.data.catalog_index import get_catalog_version
+from hermes.data.search_cache import SearchCache, normalize_query, resolve_mention_cache
+from hermes.model.email import ProductMention
+from hermes.tools.catalog_tools import _create_product_from_row, resolve_product_mention
+from hermes.tools.order_tools import update_stock, StockUpdateStatus
+
+from tests.fixtures.test_product_catalog import get_test_products_df
+
+
+class TestSearchCache:
+    """Tests for the version-tagged LRU cache."""
+
+    def test_normalize_query_collapses_case_and_whitespace(self):
+        """Trivially different spellings of a query share a key."""
+        assert normalize_query("  Leather   WALLET ") == "leather wallet"
+        assert normalize_query(None) == ""
+
+    def test_evicts_least_recently_used(self):
+        """The oldest untouched entry is evicted when the cache is full."""
+        cache = SearchCache("test", max_entries=2)
+        cache.put("a", 1, "A")
+        cache.put("b", 1, "B")
+        assert cache.get("a", 1) == "A"
+
+        cache.put("c", 1, "C")
+
+        assert cache.get("b", 1) is None
+        assert cache.get("a", 1) == "A"
+        assert cache.get("c", 1) == "C"
+
+    def test_version_mismatch_is_a_miss(self):
+        """Entries stored under an older version are dropped on lookup."""
+        cache = SearchCache("test")
+        cache.put("query", 1, "old")
+
+        assert cache.get("query", 2) is None
+        assert len(cache) == 0
+
+    def test_hit_rate(self):
+        """Hits and misses are counted for the run summary."""
+        cache = SearchCache("test")
+        cache.get("query", 1)
+        cache.put("query", 1, "value")
+        cache.get("query", 1)
+        cache.get("query", 1)
+
+        assert cache.hits == 2
+        assert cache.misses == 1
+        assert cache.hit_rate == pytest.approx(2 / 3)
+        assert "test: 2/3 hits" in cache.summary()
+
+
+class TestResolveProductMentionCache:
+    """Tests for caching in resolve_product_mention."""
+
+    def _configure_vector_store(self, mock_get_vector_store, mock_metadata_to_product, df):
+        doc = MagicMock(metadata={"product_id": "CBT8901"})
+        vector_store = mock_get_vector_store.return_value
+        vector_store.similarity_search_with_score.return_value = [(doc, 0.4)]
+        # Read the row on every call so live stock levels are picked up
+        mock_metadata_to_product.side_effect = lambda _: _create_product_from_row(
+            df[df["product_id"] == "CBT8901"].iloc[0]
+        )
+        return vector_store
+
+    @pytest.mark.asyncio
+    @patch("hermes.tools.catalog_tools.metadata_to_product")
+    @patch("hermes.tools.catalog_tools.get_vector_store")
+    @patch("hermes.tools.catalog_tools.load_products_df")
+    async def test_repeated_mention_is_served_from_cache(
+        self, mock_load_df, mock_get_vector_store, mock_metadata_to_product
+    ):
+        """A repeated mention does not search again and returns independent copies."""
+        df = get_test_products_df()
+        mock_load_df.return_value = df
+        vector_store = self._configure_vector_store(
+            mock_get_vector_store, mock_metadata_to_product, df
+        )
+        mention = ProductMention(product_description="ankle boots for autumn")
+
+        first = await resolve_product_mention(mention)
+        first[0][0].metadata = "changed by caller"
+        hits_before = resolve_mention_cache.hits
+        second = await resolve_product_mention(
+            ProductMention(product_description="Ankle  boots for AUTUMN")
+        )
+
+        assert resolve_mention_cache.hits == hits_before + 1
+        assert vector_store.similarity_search_with_score.call_count == 1
+        assert second[0][0].product_id == "CBT8901"
+        assert second[0][0].metadata != "changed by caller"
+
+    @pytest.mark.asyncio
+    @patch("hermes.tools.order_tools.load_products_df")
+    @patch("hermes.tools.catalog_tools.metadata_to_product")
+    @patch("hermes.tools.catalog_tools.get_vector_store")
+    @patch("hermes.tools.catalog_tools.load_products_df")
+    async def test_stock_update_invalidates_cached_candidates(
+        self,
+        mock_load_df,
+        mock_get_vector_store,
+        mock_metadata_to_product,
+        mock_order_load_df,
+    ):
+        """Candidates carry stock levels, so a stock update forces a fresh resolution."""
+        df = get_test_products_df()
+        mock_load_df.return_value = df
+        mock_order_load_df.return_value = df
+        self._configure_vector_store(mock_get_vector_store, mock_metadata_to_product, df)
+        mention = ProductMention(product_description="ankle boots for autumn")
+
+        first = await resolve_product_mention(mention)
+        version_before = get_catalog_version(df)
+        assert update_stock("CBT8901", 1) == StockUpdateStatus.SUCCESS
+        second = await resolve_product_mention(mention)
+
+        assert get_catalog_version(df) != version_before
+        assert second[0][0].stock == first[0][0].stock - 1
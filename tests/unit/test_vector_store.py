@@ -0,0 +1,115 @@
+"""Tests for vector_store.py."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from hermes.data.quantized_index import QuantizedVectorIndex, QuantizedVectorStore
+from hermes.data.vector_store import (
+    _sync_collection,
+    asimilarity_search_with_score,
+    product_to_document,
+)
+
+from tests.fixtures.test_product_catalog import get_test_products_df
+
+
+class _AsyncOnlyEmbeddings:
+    """Embeddings whose sync API must not be used by the async search path."""
+
+    def __init__(self, vector: list[float]):
+        self.vector = vector
+        self.async_calls = 0
+
+    def embed_query(self, text: str) -> list[float]:
+        raise AssertionError("embed_query blocks the event loop")
+
+    async def aembed_query(self, text: str) -> list[float]:
+        self.async_calls += 1
+        return self.vector
+
+
+class TestAsyncSimilaritySearch:
+    """Tests for asimilarity_search_with_score."""
+
+    @pytest.mark.asyncio
+    async def test_embeds_asynchronously_and_queries_on_executor(self):
+        """The query is embedded with aembed_query and searched off the loop thread."""
+        vectors = np.eye(3, dtype=np.float32)
+        embeddings = _AsyncOnlyEmbeddings(vectors[2].tolist())
+        store = QuantizedVectorStore(
+            embeddings,
+            QuantizedVectorIndex(vectors, quantization="none"),
+            [Document(page_content=pid, metadata={"product_id": pid}) for pid in "ABC"],
+        )
+        search_threads: list[str] = []
+        search_by_vector = store.similarity_search_by_vector_with_relevance_scores
+
+        def recording_search(*args, **kwargs):
+            search_threads.append(threading.current_thread().name)
+            return search_by_vector(*args, **kwargs)
+
+        store.similarity_search_by_vector_with_relevance_scores = recording_search
+
+        results = await asimilarity_search_with_score(store, "query", k=1)
+
+        assert embeddings.async_calls == 1
+        assert results[0][0].metadata["product_id"] == "C"
+        assert search_threads[0].startswith("hermes-vector-search")
+
+    @pytest.mark.asyncio
+    async def test_slow_search_does_not_stall_other_tasks(self):
+        """Other coroutines keep running while a slow index query is in flight."""
+        store = MagicMock()
+        store.similarity_search_with_score.side_effect = lambda *args: (
+            time.sleep(0.3) or []
+        )
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker_task = asyncio.create_task(ticker())
+        await asimilarity_search_with_score(store, "query", k=3)
+        ticker_task.cancel()
+
+        assert ticks >= 10
+
+
+class TestSyncCollection:
+    """Tests for keeping a persisted collection in line with the catalog."""
+
+    def test_embeds_changed_updates_metadata_and_removes_stale(self):
+        """Only text changes are re-embedded; removed products are deleted."""
+        df = get_test_products_df().head(3)
+        documents = [product_to_document(row) for _, row in df.iterrows()]
+        ids = [doc.metadata["product_id"] for doc in documents]
+        # Chroma does not return None-valued metadata
+        stored = [
+            {k: v for k, v in doc.metadata.items() if v is not None}
+            for doc in documents
+        ]
+        chroma = MagicMock()
+        chroma._collection.get.return_value = {
+            "ids": [ids[0], ids[1], "OLD0001"],
+            "documents": [documents[0].page_content, documents[1].page_content, "x"],
+            "metadatas": [stored[0], dict(stored[1], price=1.0), {}],
+        }
+
+        _sync_collection(chroma, df)
+
+        chroma.add_documents.assert_called_once_with(
+            documents=[documents[2]], ids=[ids[2]]
+        )
+        chroma._collection.update.assert_called_once_with(
+            ids=[ids[1]], metadatas=[stored[1]]
+        )
+        chroma.delete.assert_called_once_with(ids=["OLD0001"])